@@ -0,0 +1,83 @@
+import random
+import time
+from datetime import time as dtime
+
+from django.core.management.base import BaseCommand
+
+from academics.conflicts import SLOT_DIMENSIONS, IntervalIndex, find_conflicts
+from academics.models import AcademicTimetableSlot
+
+
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark timetable conflict detection (pairwise scan vs interval index) on synthetic slots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, default=10000)
+        parser.add_argument('--rooms', type=int, default=150)
+        parser.add_argument('--faculty', type=int, default=400)
+        parser.add_argument('--batches', type=int, default=250)
+        parser.add_argument('--probes', type=int, default=1000, help='Incremental insert checks to time')
+        parser.add_argument('--skip-pairwise', action='store_true')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _slots(self, options):
+        rnd = random.Random(options['seed'])
+        slots = []
+        for i in range(options['slots']):
+            start = rnd.randrange(8 * 4, 17 * 4)  # quarter hours between 08:00 and 17:00
+            length = rnd.choice((4, 4, 4, 8))
+            end = min(start + length, 24 * 4 - 1)
+            slots.append(AcademicTimetableSlot(
+                id=i + 1,
+                day_of_week=rnd.choice(DAYS),
+                start_time=dtime(start // 4, (start % 4) * 15),
+                end_time=dtime(end // 4, (end % 4) * 15),
+                room=f'R{rnd.randrange(options["rooms"])}',
+                faculty_id=rnd.randrange(options['faculty']),
+                student_batch_id=rnd.randrange(options['batches']),
+            ))
+        return slots
+
+    @staticmethod
+    def _pairwise(slots):
+        # The previous approach: compare every pair, per dimension
+        found = 0
+        for i, a in enumerate(slots):
+            for b in slots[i + 1:]:
+                if a.day_of_week == b.day_of_week and a.start_time < b.end_time and b.start_time < a.end_time:
+                    for path in SLOT_DIMENSIONS.values():
+                        if getattr(a, path) == getattr(b, path):
+                            found += 1
+        return found
+
+    def handle(self, *args, **options):
+        slots = self._slots(options)
+        n = len(slots)
+
+        start = time.perf_counter()
+        conflicts = find_conflicts(slots, SLOT_DIMENSIONS)
+        indexed = time.perf_counter() - start
+        self.stdout.write(f'interval index: {len(conflicts)} conflicts in {indexed * 1000:.1f} ms ({n} slots)')
+
+        if not options['skip_pairwise']:
+            start = time.perf_counter()
+            found = self._pairwise(slots)
+            pairwise = time.perf_counter() - start
+            self.stdout.write(f'pairwise scan:  {found} conflicts in {pairwise * 1000:.1f} ms')
+            if found != len(conflicts):
+                self.stderr.write(self.style.ERROR('Mismatch between pairwise and indexed results'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'speedup: {pairwise / indexed:.1f}x'))
+
+        index = IntervalIndex.build(slots, SLOT_DIMENSIONS)
+        probes = self._slots({**options, 'slots': options['probes'], 'seed': options['seed'] + 1})
+        start = time.perf_counter()
+        hits = sum(1 for probe in probes if index.query(probe))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'incremental checks: {len(probes)} probes, {hits} rejected, '
+            f'{elapsed / len(probes) * 1e6:.1f} us/check'
+        )
@@ -6,6 +6,19 @@ from .models import (
 from faculty.serializers import FacultySerializer
 from students.serializers import StudentSerializer, StudentBatchSerializer
 from students.models import AcademicYear as StudentAcademicYear, Semester as StudentSemester
+from .conflicts import SLOT_DIMENSIONS, TIMETABLE_DIMENSIONS, check_slot_conflicts, describe
+
+
+def _merged_instance(model, instance, data):
+    """Unsaved copy of ``instance`` (or a new ``model``) with validated ``data`` applied."""
+    candidate = model(pk=instance.pk) if instance is not None else model()
+    if instance is not None:
+        for field in model._meta.concrete_fields:
+            setattr(candidate, field.attname, getattr(instance, field.attname))
+    for name, value in data.items():
+        if name in {f.name for f in model._meta.concrete_fields}:
+            setattr(candidate, name, value)
+    return candidate
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -190,6 +203,15 @@ class TimetableCreateSerializer(serializers.ModelSerializer):
             'is_active', 'notes'
         ]
 
+    def validate(self, data):
+        """Reject entries overlapping an active one in the same room, faculty or section"""
+        candidate = _merged_instance(Timetable, self.instance, data)
+        if candidate.is_active and candidate.day_of_week and candidate.start_time and candidate.end_time:
+            conflicts = check_slot_conflicts(candidate, Timetable.objects.filter(is_active=True), TIMETABLE_DIMENSIONS)
+            if conflicts:
+                raise serializers.ValidationError(describe(conflicts))
+        return data
+
 
 class CourseEnrollmentSerializer(serializers.ModelSerializer):
     student = StudentSerializer(read_only=True)
@@ -531,6 +553,18 @@ class AcademicTimetableSlotCreateSerializer(serializers.ModelSerializer):
                     "Student batch semester must match the selected semester"
                 )
         
+        # Room / faculty / batch overlaps within the same academic period
+        candidate = _merged_instance(AcademicTimetableSlot, self.instance, data)
+        if candidate.is_active and candidate.academic_year_id and candidate.semester_id and candidate.start_time and candidate.end_time:
+            existing = AcademicTimetableSlot.objects.filter(
+                academic_year_id=candidate.academic_year_id,
+                semester_id=candidate.semester_id,
+                is_active=True,
+            )
+            conflicts = check_slot_conflicts(candidate, existing, SLOT_DIMENSIONS)
+            if conflicts:
+                raise serializers.ValidationError(describe(conflicts))
+        
         return data
 
 
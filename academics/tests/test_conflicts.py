@@ -0,0 +1,81 @@
+import pytest
+from datetime import time
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from academics.conflicts import (
+	SLOT_DIMENSIONS, TIMETABLE_DIMENSIONS, IntervalIndex, check_slot_conflicts, find_conflicts, pair_conflicts,
+)
+from academics.models import AcademicTimetableSlot, CourseSection, Timetable
+
+
+def _slot(pk, day, start, end, room='R1', faculty_id=None, batch_id=None):
+	return AcademicTimetableSlot(
+		id=pk, day_of_week=day, start_time=time(*start), end_time=time(*end),
+		room=room, faculty_id=faculty_id, student_batch_id=batch_id,
+	)
+
+
+def _pairwise(slots):
+	found = set()
+	for i, a in enumerate(slots):
+		for b in slots[i + 1:]:
+			if a.day_of_week == b.day_of_week and a.start_time < b.end_time and b.start_time < a.end_time:
+				for dim, path in SLOT_DIMENSIONS.items():
+					if getattr(a, path) not in (None, '') and getattr(a, path) == getattr(b, path):
+						found.add((dim, frozenset((a.pk, b.pk))))
+	return found
+
+
+def test_sweep_matches_pairwise_scan():
+	import random
+	rnd = random.Random(7)
+	slots = []
+	for pk in range(1, 301):
+		start = rnd.randrange(8, 17)
+		slots.append(_slot(
+			pk, rnd.choice(['MON', 'TUE']), (start, rnd.choice([0, 30])), (start + 1, 0),
+			room=f'R{rnd.randrange(10)}', faculty_id=rnd.randrange(15), batch_id=rnd.choice([None, 1, 2, 3]),
+		))
+	found = {(c.dimension, frozenset((c.first.pk, c.second.pk))) for c in find_conflicts(slots, SLOT_DIMENSIONS)}
+	assert found == _pairwise(slots)
+
+
+def test_touching_slots_do_not_conflict_and_query_finds_overlaps():
+	slots = [_slot(1, 'MON', (9, 0), (10, 0)), _slot(2, 'MON', (10, 0), (11, 0)), _slot(3, 'MON', (8, 0), (12, 0), room='R2')]
+	assert find_conflicts(slots, SLOT_DIMENSIONS) == []
+	index = IntervalIndex.build(slots, SLOT_DIMENSIONS)
+	hits = index.query(_slot(4, 'MON', (9, 30), (10, 15)))
+	assert sorted(c.first.pk for c in hits) == [1, 2]
+	assert index.query(_slot(5, 'TUE', (9, 30), (10, 15))) == []
+	# Pairs overlapping in several dimensions are reported once
+	pairs = pair_conflicts(find_conflicts([_slot(6, 'WED', (9, 0), (10, 0), faculty_id=1), _slot(7, 'WED', (9, 30), (11, 0), faculty_id=1)], SLOT_DIMENSIONS))
+	assert [sorted(dims) for _, _, dims in pairs] == [['faculty', 'room']]
+
+
+@pytest.mark.django_db
+def test_timetable_validator_and_conflicts_endpoint(django_user_model, department, faculty):
+	course = baker.make('academics.Course', department=department)
+	section = CourseSection.objects.create(course=course, faculty=faculty)
+	other = CourseSection.objects.create(course=course, faculty=faculty, section_type='LAB')
+	Timetable.objects.create(course_section=section, day_of_week='MON', start_time='09:00', end_time='10:00', room='R1')
+
+	candidate = Timetable(course_section=other, day_of_week='MON', start_time=time(9, 30), end_time=time(10, 30), room='R9')
+	conflicts = check_slot_conflicts(candidate, Timetable.objects.filter(is_active=True), TIMETABLE_DIMENSIONS)
+	assert [c.dimension for c in conflicts] == ['faculty']
+
+	client = APIClient()
+	client.force_authenticate(django_user_model.objects.create_user(username='tt', email='tt@example.com', password='p'))
+	payload = {'course_section': other.id, 'day_of_week': 'MON', 'start_time': '09:30', 'end_time': '10:30', 'room': 'R9'}
+	res = client.post(reverse('academics:timetable-list'), payload, format='json')
+	assert res.status_code == 400
+	payload['start_time'], payload['end_time'] = '10:00', '11:00'
+	assert client.post(reverse('academics:timetable-list'), payload, format='json').status_code == 201
+
+	Timetable.objects.create(course_section=other, day_of_week='TUE', start_time='09:00', end_time='10:00', room='R1')
+	Timetable.objects.create(course_section=section, day_of_week='TUE', start_time='09:30', end_time='10:30', room='R1')
+	res = client.get(reverse('academics:timetable-conflicts'), {'room': 'R1'})
+	assert res.status_code == 200
+	assert res.data['total_conflicts'] == 1
+	assert sorted(res.data['conflicts'][0]['dimensions']) == ['faculty', 'room']
@@ -24,6 +24,7 @@ from .serializers import (
     BatchCourseEnrollmentCreateSerializer, BatchCourseEnrollmentDetailSerializer,
     CoursePrerequisiteSerializer, CoursePrerequisiteCreateSerializer
 )
+from .conflicts import SLOT_DIMENSIONS, TIMETABLE_DIMENSIONS, find_conflicts, pair_conflicts
 
 
 class CourseViewSet(viewsets.ModelViewSet):
@@ -287,31 +288,27 @@ class TimetableViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def conflicts(self, request):
-        """Check for timetable conflicts"""
+        """Check for timetable conflicts (same room, faculty or section overlapping)"""
         faculty_id = request.query_params.get('faculty_id')
         room = request.query_params.get('room')
         
-        if not all([faculty_id, room]):
-            return Response({'error': 'faculty_id and room parameters required'}, status=400)
-        
-        # Find overlapping schedules
-        conflicts = []
-        timetables = Timetable.objects.filter(
-            course_section__faculty_id=faculty_id,
-            room=room,
-            is_active=True
+        timetables = Timetable.objects.filter(is_active=True).select_related(
+            'course_section__course', 'course_section__faculty'
         )
+        if faculty_id:
+            timetables = timetables.filter(course_section__faculty_id=faculty_id)
+        if room:
+            timetables = timetables.filter(room=room)
         
-        for i, t1 in enumerate(timetables):
-            for t2 in timetables[i+1:]:
-                if t1.day_of_week == t2.day_of_week:
-                    # Check for time overlap
-                    if (t1.start_time < t2.end_time and t2.start_time < t1.end_time):
-                        conflicts.append({
-                            'conflict_type': 'Time Overlap',
-                            'timetable1': TimetableSerializer(t1).data,
-                            'timetable2': TimetableSerializer(t2).data
-                        })
+        # Interval index per (dimension, key, day): O(n log n) instead of pairwise
+        conflicts = []
+        for t1, t2, dimensions in pair_conflicts(find_conflicts(timetables, TIMETABLE_DIMENSIONS)):
+            conflicts.append({
+                'conflict_type': 'Time Overlap',
+                'dimensions': dimensions,
+                'timetable1': TimetableSerializer(t1).data,
+                'timetable2': TimetableSerializer(t2).data
+            })
         
         return Response({'conflicts': conflicts, 'total_conflicts': len(conflicts)})
 
@@ -962,31 +959,26 @@ class AcademicTimetableSlotViewSet(viewsets.ModelViewSet):
                 'error': 'academic_year_id and semester_id parameters are required'
             }, status=400)
         
-        # Find overlapping schedules
-        conflicts = []
         queryset = AcademicTimetableSlot.objects.filter(
             academic_year_id=academic_year_id,
             semester_id=semester_id,
             is_active=True
-        )
+        ).select_related('academic_year', 'semester', 'course', 'faculty', 'student_batch', 'created_by')
         
         if faculty_id:
             queryset = queryset.filter(faculty_id=faculty_id)
         if room:
             queryset = queryset.filter(room=room)
         
-        timetables = list(queryset)
-        
-        for i, t1 in enumerate(timetables):
-            for t2 in timetables[i+1:]:
-                if t1.day_of_week == t2.day_of_week:
-                    # Check for time overlap
-                    if (t1.start_time < t2.end_time and t2.start_time < t1.end_time):
-                        conflicts.append({
-                            'conflict_type': 'Time Overlap',
-                            'slot1': AcademicTimetableSlotSerializer(t1).data,
-                            'slot2': AcademicTimetableSlotSerializer(t2).data
-                        })
+        # Overlaps sharing a room, faculty or student batch
+        conflicts = []
+        for t1, t2, dimensions in pair_conflicts(find_conflicts(queryset, SLOT_DIMENSIONS)):
+            conflicts.append({
+                'conflict_type': 'Time Overlap',
+                'dimensions': dimensions,
+                'slot1': AcademicTimetableSlotSerializer(t1).data,
+                'slot2': AcademicTimetableSlotSerializer(t2).data
+            })
         
         return Response({
             'conflicts': conflicts,
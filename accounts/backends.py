@@ -4,25 +4,25 @@ Custom authentication backends for the accounts app.
 
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+
+from .login_index import resolve_login_user
 
 User = get_user_model()
 
 
 class EmailBackend(ModelBackend):
     """
-    Custom authentication backend that allows users to log in using their email address.
+    Custom authentication backend that allows users to log in using their email address,
+    username or roll number (resolved with a single LoginIdentifier lookup).
     """
     
     def authenticate(self, request, username=None, password=None, **kwargs):
         try:
-            # Try to find user by email or username
-            user = User.objects.get(
-                Q(email=username) | Q(username=username)
-            )
+            # Email, username or roll number via the login identifier index
+            user = resolve_login_user(username)
             
             # Check if the password is correct
-            if user.check_password(password):
+            if user is not None and user.check_password(password):
                 return user
         except User.DoesNotExist:
             # No user found with the given email/username
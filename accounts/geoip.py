@@ -0,0 +1,382 @@
+"""Pluggable IP geolocation with an offline range database and an LRU cache.
+
+Providers (``GEOIP_PROVIDER``):
+- ``local``: in-memory interval table loaded from ``GEOIP_DATABASE``. Accepts a
+  range CSV (start_ip,end_ip | network,country,region,city,latitude,longitude),
+  a MaxMind GeoLite2 City blocks CSV (with ``GEOIP_LOCATIONS`` pointing at the
+  matching locations CSV) or a binary ``.mmdb`` file when ``maxminddb`` is installed
+- ``ipapi``: the legacy HTTP lookup in ``accounts.utils.geolocate_ip``
+- ``none``: never resolve
+- ``auto`` (default): ``local`` when a database is configured, else ``ipapi``
+
+Every provider returns the same 6-tuple as ``geolocate_ip``:
+``(raw, country, region, city, latitude, longitude)``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import csv
+import ipaddress
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import maxminddb  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    maxminddb = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+GeoTuple = Tuple[Optional[dict], Optional[str], Optional[str], Optional[str], Optional[float], Optional[float]]
+EMPTY: GeoTuple = (None, None, None, None, None, None)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _record(country, region, city, lat, lon, source: str) -> GeoTuple:
+    lat_f, lon_f = _to_float(lat), _to_float(lon)
+    raw = {
+        'country_name': country or None,
+        'region': region or None,
+        'city': city or None,
+        'latitude': lat_f,
+        'longitude': lon_f,
+        'source': source,
+    }
+    return raw, country or None, region or None, city or None, lat_f, lon_f
+
+
+def _is_public(ip: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return not (addr.is_private or addr.is_loopback or addr.is_reserved or addr.is_link_local)
+
+
+class IntervalTable:
+    """Sorted, non-overlapping IP ranges searchable with ``bisect``.
+
+    IPv4 and IPv6 live in separate tables because their integer spaces differ.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, List[Tuple[int, int, GeoTuple]]] = {4: [], 6: []}
+        self._starts: Dict[int, List[int]] = {4: [], 6: []}
+        self._ends: Dict[int, List[int]] = {4: [], 6: []}
+        self._values: Dict[int, List[GeoTuple]] = {4: [], 6: []}
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._starts.values())
+
+    def add_range(self, start: str, end: str, value: GeoTuple) -> None:
+        lo, hi = ipaddress.ip_address(start.strip()), ipaddress.ip_address(end.strip())
+        if lo.version != hi.version or int(lo) > int(hi):
+            raise ValueError(f'Invalid IP range {start}-{end}')
+        self._pending[lo.version].append((int(lo), int(hi), value))
+
+    def add_network(self, cidr: str, value: GeoTuple) -> None:
+        net = ipaddress.ip_network(cidr.strip(), strict=False)
+        self._pending[net.version].append((int(net.network_address), int(net.broadcast_address), value))
+
+    def build(self) -> 'IntervalTable':
+        for version, rows in self._pending.items():
+            rows.sort(key=lambda r: r[0])
+            self._starts[version] = [r[0] for r in rows]
+            self._ends[version] = [r[1] for r in rows]
+            self._values[version] = [r[2] for r in rows]
+        self._pending = {4: [], 6: []}
+        return self
+
+    def lookup(self, ip: str) -> Optional[GeoTuple]:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        starts = self._starts[addr.version]
+        value = int(addr)
+        idx = bisect.bisect_right(starts, value) - 1
+        if idx < 0 or value > self._ends[addr.version][idx]:
+            return None
+        return self._values[addr.version][idx]
+
+
+def load_range_csv(path: Path) -> IntervalTable:
+    """Load a range CSV with either ``start_ip``/``end_ip`` or ``network`` columns."""
+    table = IntervalTable()
+    with open(path, newline='', encoding='utf-8') as fh:
+        for row in csv.DictReader(fh):
+            value = _record(
+                row.get('country') or row.get('country_name'),
+                row.get('region'),
+                row.get('city'),
+                row.get('latitude'),
+                row.get('longitude'),
+                'local',
+            )
+            if row.get('network'):
+                table.add_network(row['network'], value)
+            else:
+                table.add_range(row['start_ip'], row['end_ip'], value)
+    return table.build()
+
+
+def load_maxmind_csv(blocks_path: Path, locations_path: Path) -> IntervalTable:
+    """Load GeoLite2-City-Blocks + GeoLite2-City-Locations CSV exports."""
+    locations: Dict[str, Tuple[str, str, str]] = {}
+    with open(locations_path, newline='', encoding='utf-8') as fh:
+        for row in csv.DictReader(fh):
+            locations[row['geoname_id']] = (
+                row.get('country_name', ''),
+                row.get('subdivision_1_name', ''),
+                row.get('city_name', ''),
+            )
+    table = IntervalTable()
+    with open(blocks_path, newline='', encoding='utf-8') as fh:
+        for row in csv.DictReader(fh):
+            geo_id = row.get('geoname_id') or row.get('registered_country_geoname_id') or ''
+            country, region, city = locations.get(geo_id, ('', '', ''))
+            table.add_network(
+                row['network'],
+                _record(country, region, city, row.get('latitude'), row.get('longitude'), 'maxmind'),
+            )
+    return table.build()
+
+
+class LRUCache:
+    """Small thread-safe LRU used for resolved IPs."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class GeoResolver:
+    """Resolve IPs through the configured provider, caching results per process."""
+
+    def __init__(self, provider: str = 'auto', database: Optional[str] = None,
+                 locations: Optional[str] = None, cache_size: int = 10000):
+        self.table: Optional[IntervalTable] = None
+        self.reader = None
+        if provider == 'auto':
+            provider = 'local' if database else 'ipapi'
+        if provider == 'local':
+            self._load(database, locations)
+        self.provider = provider
+        self.cache = LRUCache(cache_size)
+
+    def _load(self, database: Optional[str], locations: Optional[str]) -> None:
+        if not database:
+            raise ValueError('GEOIP_DATABASE is required for the local provider')
+        path = Path(database)
+        if path.suffix == '.mmdb':
+            if maxminddb is None:
+                raise ImportError('maxminddb is required to read .mmdb databases')
+            self.reader = maxminddb.open_database(str(path))
+        elif locations:
+            self.table = load_maxmind_csv(path, Path(locations))
+        else:
+            self.table = load_range_csv(path)
+
+    @property
+    def is_local(self) -> bool:
+        """True when lookups never leave the process (safe on the request path)."""
+        return self.provider in ('local', 'none')
+
+    def _lookup(self, ip: str) -> GeoTuple:
+        if self.provider == 'none':
+            return EMPTY
+        if self.table is not None:
+            return self.table.lookup(ip) or EMPTY
+        if self.reader is not None:
+            data = self.reader.get(ip) or {}
+            loc = data.get('location') or {}
+            subdivisions = data.get('subdivisions') or [{}]
+            return _record(
+                (data.get('country') or {}).get('names', {}).get('en'),
+                subdivisions[0].get('names', {}).get('en'),
+                (data.get('city') or {}).get('names', {}).get('en'),
+                loc.get('latitude'),
+                loc.get('longitude'),
+                'mmdb',
+            )
+        from accounts.utils import geolocate_ip
+
+        return geolocate_ip(ip)
+
+    def peek(self, ip: Optional[str]) -> Optional[GeoTuple]:
+        """Return a result only if it is available without a network call."""
+        if not ip:
+            return EMPTY
+        cached = self.cache.get(ip)
+        if cached is not None:
+            return cached
+        if self.is_local or not _is_public(ip):
+            return self.resolve(ip)
+        return None
+
+    def resolve(self, ip: Optional[str]) -> GeoTuple:
+        if not ip:
+            return EMPTY
+        cached = self.cache.get(ip)
+        if cached is not None:
+            return cached
+        result = self._lookup(ip) if _is_public(ip) else EMPTY
+        # Remote failures are not cached so a transient outage is retried later
+        if result != EMPTY or self.is_local:
+            self.cache.set(ip, result)
+        return result
+
+
+_resolver: Optional[GeoResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> GeoResolver:
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = GeoResolver(
+                    provider=getattr(settings, 'GEOIP_PROVIDER', 'auto'),
+                    database=getattr(settings, 'GEOIP_DATABASE', None),
+                    locations=getattr(settings, 'GEOIP_LOCATIONS', None),
+                    cache_size=getattr(settings, 'GEOIP_CACHE_SIZE', 10000),
+                )
+    return _resolver
+
+
+def reset_resolver() -> None:
+    global _resolver
+    with _resolver_lock:
+        _resolver = None
+    _enriched.clear()
+
+
+def resolve_ip(ip: Optional[str]) -> GeoTuple:
+    return get_resolver().resolve(ip)
+
+
+# ---------------------------
+# Session enrichment off-path
+# ---------------------------
+
+GEO_FIELDS = ('country', 'region', 'city', 'latitude', 'longitude', 'location_raw')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# (user_id, ip) pairs already enriched by this process; skips the per-request lookup query
+_enriched = LRUCache(50000)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GEOIP_ENRICH_WORKERS', 2),
+                    thread_name_prefix='geoip-enrich',
+                )
+    return _executor
+
+
+def geo_update_fields(result: GeoTuple) -> Dict[str, Any]:
+    raw, country, region, city, lat, lon = result
+    return {
+        'country': country,
+        'region': region,
+        'city': city,
+        'latitude': lat,
+        'longitude': lon,
+        'location_raw': raw or {},
+    }
+
+
+def enrich_session_geo(session_id: Any, ip: Optional[str]) -> bool:
+    """Resolve ``ip`` and fill geo columns of a UserSession that has none yet."""
+    from accounts.models import UserSession
+
+    result = resolve_ip(ip)
+    if result == EMPTY:
+        return False
+    updated = UserSession.objects.filter(pk=session_id, country__isnull=True).update(**geo_update_fields(result))
+    return bool(updated)
+
+
+def _run_enrichment(session_id: Any, ip: Optional[str]) -> None:
+    from django.db import connections
+
+    try:
+        enrich_session_geo(session_id, ip)
+    except Exception:
+        logger.exception('GeoIP enrichment failed for session %s', session_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_session_enrichment(session_id: Any, ip: Optional[str]) -> None:
+    """Enrich a session after the current transaction commits, on a worker thread."""
+    if not ip or session_id is None:
+        return
+    if not getattr(settings, 'GEOIP_ENRICH_ASYNC', True):
+        enrich_session_geo(session_id, ip)
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run_enrichment, session_id, ip))
+
+
+def enrich_latest_session(user: Any, ip: Optional[str]) -> None:
+    """Enrich the user's newest session from ``ip`` once per process per (user, ip)."""
+    if not ip:
+        return
+    key = f'{user.pk}:{ip}'
+    if key in _enriched:
+        return
+    from accounts.models import UserSession
+
+    latest = (
+        UserSession.objects.filter(user=user, ip=ip)
+        .order_by('-created_at')
+        .values('pk', 'country')
+        .first()
+    )
+    _enriched.set(key, True)
+    if latest and not latest['country']:
+        schedule_session_enrichment(latest['pk'], ip)
@@ -0,0 +1,160 @@
+"""Single-query login identifier resolution.
+
+``LoginIdentifier`` holds one normalized row per accepted identifier (email,
+username, roll number / AuthIdentifier). ``resolve_login_user`` replaces the
+email → AuthIdentifier → username cascade with one indexed lookup.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from .models import AuthIdentifier, IdentifierType, LoginIdentifier, LoginIdentifierSource
+
+
+# Lower value wins when one identifier maps to several users
+PRIORITY = {
+    LoginIdentifierSource.EMAIL: 0,
+    LoginIdentifierSource.AUTH_IDENTIFIER: 1,
+    LoginIdentifierSource.USERNAME: 2,
+}
+# AuthIdentifier types that are accepted as login names (phone is not)
+LOGIN_ID_TYPES = (IdentifierType.USERNAME, IdentifierType.EMAIL)
+
+
+def normalize_identifier(value: Optional[str]) -> str:
+    return (value or '').strip().lower()
+
+
+def _row(identifier: str, user_id, source: str) -> LoginIdentifier:
+    return LoginIdentifier(identifier=identifier, user_id=user_id, source=source, priority=PRIORITY[source])
+
+
+def user_rows(user) -> List[LoginIdentifier]:
+    rows = []
+    if user.email:
+        rows.append(_row(normalize_identifier(user.email), user.pk, LoginIdentifierSource.EMAIL))
+    if user.username:
+        rows.append(_row(normalize_identifier(user.username), user.pk, LoginIdentifierSource.USERNAME))
+    return rows
+
+
+def sync_user_identifiers(user) -> None:
+    """Make the email/username rows of ``user`` match its current fields."""
+    rows = user_rows(user)
+    keep = Q()
+    for row in rows:
+        keep |= Q(identifier=row.identifier, source=row.source)
+    stale = LoginIdentifier.objects.filter(
+        user_id=user.pk,
+        source__in=[LoginIdentifierSource.EMAIL, LoginIdentifierSource.USERNAME],
+    )
+    if rows:
+        stale = stale.exclude(keep)
+    stale.delete()
+    LoginIdentifier.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def sync_auth_identifier(auth_identifier: AuthIdentifier) -> None:
+    """Mirror one AuthIdentifier row (added, changed or deleted) into the index."""
+    user_id = auth_identifier.user_id
+    # Rebuild this user's auth-identifier rows; users have only a handful
+    LoginIdentifier.objects.filter(user_id=user_id, source=LoginIdentifierSource.AUTH_IDENTIFIER).delete()
+    values = AuthIdentifier.objects.filter(user_id=user_id, id_type__in=LOGIN_ID_TYPES).values_list('identifier', flat=True)
+    LoginIdentifier.objects.bulk_create(
+        [_row(normalize_identifier(v), user_id, LoginIdentifierSource.AUTH_IDENTIFIER) for v in set(values) if v],
+        ignore_conflicts=True,
+    )
+
+
+def remove_auth_identifier(auth_identifier: AuthIdentifier) -> None:
+    """Drop the index row of a deleted AuthIdentifier (never inserts, safe during cascades)."""
+    normalized = normalize_identifier(auth_identifier.identifier)
+    still_used = AuthIdentifier.objects.filter(
+        user_id=auth_identifier.user_id, identifier__iexact=normalized, id_type__in=LOGIN_ID_TYPES,
+    ).exists()
+    if not still_used:
+        LoginIdentifier.objects.filter(
+            user_id=auth_identifier.user_id,
+            source=LoginIdentifierSource.AUTH_IDENTIFIER,
+            identifier=normalized,
+        ).delete()
+
+
+def _legacy_lookup(identifier: str):
+    User = get_user_model()
+    user = User.objects.filter(email__iexact=identifier).first()
+    if user:
+        return user
+    auth_id = (
+        AuthIdentifier.objects.filter(identifier__iexact=identifier, id_type__in=LOGIN_ID_TYPES)
+        .select_related('user')
+        .first()
+    )
+    if auth_id:
+        return auth_id.user
+    return User.objects.filter(username__iexact=identifier).first()
+
+
+def resolve_login_user(identifier: Optional[str]):
+    """Return the user for a login identifier (email, username or roll number)."""
+    normalized = normalize_identifier(identifier)
+    if not normalized:
+        return None
+    match = (
+        LoginIdentifier.objects.select_related('user')
+        .filter(identifier=normalized)
+        .order_by('priority')
+        .first()
+    )
+    if match is not None:
+        return match.user
+    # Until the index has been backfilled, misses fall back to the old cascade
+    if getattr(settings, 'LOGIN_IDENTIFIER_FALLBACK', True):
+        return _legacy_lookup(identifier.strip())
+    return None
+
+
+def rebuild_login_identifiers(batch_size: int = 5000) -> int:
+    """Recreate the whole index from User and AuthIdentifier rows."""
+    User = get_user_model()
+    created = 0
+
+    def flush(rows: List[LoginIdentifier]) -> int:
+        LoginIdentifier.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+        return len(rows)
+
+    def chunks(rows: Iterable[LoginIdentifier]):
+        buf: List[LoginIdentifier] = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= batch_size:
+                yield buf
+                buf = []
+        if buf:
+            yield buf
+
+    def user_source():
+        for pk, email, username in User.objects.values_list('pk', 'email', 'username').iterator(chunk_size=batch_size):
+            if email:
+                yield _row(normalize_identifier(email), pk, LoginIdentifierSource.EMAIL)
+            if username:
+                yield _row(normalize_identifier(username), pk, LoginIdentifierSource.USERNAME)
+
+    def auth_source():
+        qs = AuthIdentifier.objects.filter(id_type__in=LOGIN_ID_TYPES).values_list('user_id', 'identifier')
+        for user_id, value in qs.iterator(chunk_size=batch_size):
+            if value:
+                yield _row(normalize_identifier(value), user_id, LoginIdentifierSource.AUTH_IDENTIFIER)
+
+    with transaction.atomic():
+        LoginIdentifier.objects.all().delete()
+        for source in (user_source(), auth_source()):
+            for chunk in chunks(source):
+                created += flush(chunk)
+    return created
@@ -0,0 +1,88 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from accounts import session_buffer
+from accounts.login_index import _legacy_lookup, rebuild_login_identifiers, resolve_login_user
+from accounts.models import AuthIdentifier, IdentifierType, User
+from accounts.views import RollOrEmailTokenSerializer
+from campshub360.audit_buffer import BufferedWriter
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login: identifier lookup (legacy cascade vs index) and the full JWT issue path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000, help='Synthetic users to create (rolled back)')
+        parser.add_argument('--logins', type=int, default=500, help='Logins to time')
+        parser.add_argument(
+            '--real-hasher', action='store_true',
+            help='Keep the configured password hasher (default uses MD5 to isolate DB/JWT cost)',
+        )
+
+    def handle(self, *args, **options):
+        hashers = settings.PASSWORD_HASHERS if options['real_hasher'] else ['django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(PASSWORD_HASHERS=hashers, LOGIN_SESSION_BUFFER_ENABLED=True):
+            try:
+                with transaction.atomic():
+                    self._run(options['users'], options['logins'])
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    def _run(self, n_users, n_logins):
+        password = make_password('Bench@12345')
+        users = User.objects.bulk_create([
+            User(email=f'bench{i}@example.com', username=f'bench{i}', password=password) for i in range(n_users)
+        ])
+        AuthIdentifier.objects.bulk_create([
+            AuthIdentifier(user=u, identifier=f'R{i:07d}', id_type=IdentifierType.USERNAME, is_primary=True)
+            for i, u in enumerate(users)
+        ])
+        rebuild_login_identifiers()
+        # Roll numbers are the worst case for the legacy cascade (second lookup)
+        identifiers = [f'R{(i * 7919) % n_users:07d}' for i in range(n_logins)]
+
+        for label, fn in (('legacy cascade', _legacy_lookup), ('login index', resolve_login_user)):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                for ident in identifiers:
+                    assert fn(ident) is not None
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{label:15s} {n_logins / elapsed:9.0f} lookups/s  {len(ctx.captured_queries) / n_logins:.1f} queries/login'
+            )
+
+        # Queue sessions without the flusher thread; the batch is written below,
+        # inside the rolled-back transaction
+        buffer = BufferedWriter(batch_size=n_logins + 1, max_queue=n_logins + 1, start_thread=False,
+                                writer=session_buffer.write_sessions, name='bench-session')
+        previous, session_buffer._buffer = session_buffer._buffer, buffer
+        factory = RequestFactory()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for ident in identifiers:
+                request = factory.post('/api/auth/token/', REMOTE_ADDR='10.0.0.1', HTTP_USER_AGENT='bench')
+                serializer = RollOrEmailTokenSerializer(
+                    data={'username': ident, 'password': 'Bench@12345'}, context={'request': request},
+                )
+                serializer.is_valid(raise_exception=True)
+            elapsed = time.perf_counter() - start
+        session_buffer._buffer = previous
+        self.stdout.write(
+            f'{"JWT issue path":15s} {n_logins / elapsed:9.0f} logins/s   {len(ctx.captured_queries) / n_logins:.1f} queries/login'
+        )
+
+        start = time.perf_counter()
+        written = buffer.flush()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{"session flush":15s} {written} sessions in {elapsed * 1000:.1f} ms (one bulk insert)')
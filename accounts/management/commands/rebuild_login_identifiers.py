@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.login_index import rebuild_login_identifiers
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the LoginIdentifier index from users and auth identifiers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+
+    def handle(self, *args, **options):
+        created = rebuild_login_identifiers(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt login identifier index ({created} rows)'))
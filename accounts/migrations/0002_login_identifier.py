@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_login_identifiers(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    AuthIdentifier = apps.get_model('accounts', 'AuthIdentifier')
+    LoginIdentifier = apps.get_model('accounts', 'LoginIdentifier')
+
+    rows = []
+    for pk, email, username in User.objects.values_list('pk', 'email', 'username').iterator(chunk_size=5000):
+        if email:
+            rows.append(LoginIdentifier(identifier=email.strip().lower(), user_id=pk, source='email', priority=0))
+        if username:
+            rows.append(LoginIdentifier(identifier=username.strip().lower(), user_id=pk, source='username', priority=2))
+    auth_ids = AuthIdentifier.objects.filter(id_type__in=['username', 'email']).values_list('user_id', 'identifier')
+    for user_id, value in auth_ids.iterator(chunk_size=5000):
+        if value:
+            rows.append(LoginIdentifier(identifier=value.strip().lower(), user_id=user_id, source='auth_identifier', priority=1))
+    LoginIdentifier.objects.bulk_create(rows, batch_size=5000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginIdentifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=255)),
+                ('source', models.CharField(choices=[('email', 'User email'), ('auth_identifier', 'Auth identifier'), ('username', 'Username')], max_length=20)),
+                ('priority', models.PositiveSmallIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='login_identifiers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['identifier', 'priority'], name='accounts_loginid_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('identifier', 'user', 'source'), name='uniq_login_identifier_user_source')],
+            },
+        ),
+        migrations.RunPython(backfill_login_identifiers, migrations.RunPython.noop),
+    ]
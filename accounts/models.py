@@ -210,3 +210,34 @@ class AuditLog(TimeStampedUUIDModel):
         ] + ([GinIndex(fields=['meta'])] if GinIndex else [])
 
 
+
+
+class LoginIdentifierSource(models.TextChoices):
+    EMAIL = 'email', 'User email'
+    AUTH_IDENTIFIER = 'auth_identifier', 'Auth identifier'
+    USERNAME = 'username', 'Username'
+
+
+class LoginIdentifier(models.Model):
+    """Materialized login lookup: every accepted identifier, normalized, per user.
+
+    Kept in sync by ``accounts.login_index`` from ``User.email``/``User.username``
+    and ``AuthIdentifier`` rows so login resolves in a single indexed query.
+    ``priority`` preserves the legacy precedence: email, auth identifier, username.
+    """
+
+    identifier = models.CharField(max_length=255)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_identifiers')
+    source = models.CharField(max_length=20, choices=LoginIdentifierSource.choices)
+    priority = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['identifier', 'user', 'source'], name='uniq_login_identifier_user_source'),
+        ]
+        indexes = [
+            Index(fields=['identifier', 'priority'], name='accounts_loginid_lookup_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.identifier} -> {self.user_id}"
@@ -1,5 +1,6 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from django.core.cache import cache
+
+from .rbac import resolve
 
 
 class HasRole(BasePermission):
@@ -15,14 +16,8 @@ class HasRole(BasePermission):
             return True
         if not user or not user.is_authenticated:
             return False
-        # Try cached roles first (seeded by RolesPermissionsView); fallback to DB via groups
-        cache_key = f"rolesperms:v2:{user.id}"
-        cached = cache.get(cache_key)
-        if cached and 'roles' in cached:
-            user_roles = set(cached['roles'])
-        else:
-            user_roles = set(user.groups.values_list('name', flat=True))
-        return any(r in user_roles for r in roles)
+        # Versioned RBAC cache (see accounts/rbac.py)
+        return resolve(user).has_any_role(roles)
 
 
 class HasAnyPermission(BasePermission):
@@ -38,12 +33,6 @@ class HasAnyPermission(BasePermission):
             return True
         if not user or not user.is_authenticated:
             return False
-        cache_key = f"rolesperms:v2:{user.id}"
-        cached = cache.get(cache_key)
-        if cached and 'permissions' in cached:
-            user_perms = set(cached['permissions'])
-        else:
-            user_perms = set(user.get_all_permissions())
-        return any(p in user_perms for p in perms)
+        return resolve(user).has_any_perm(perms)
 
 
@@ -0,0 +1,180 @@
+"""Versioned role/permission resolution.
+
+Every Django permission is a bit (its primary key) and every role (Group)
+is compiled into an int bitset of its permissions. Compiled roles are kept
+in-process per RBAC version; a user's cached entry only stores their group
+ids and direct-permission bits, so effective permissions are an OR of a few
+ints. Any role, membership or grant change bumps the version (see
+``accounts.signals``), which retires every compiled table and user entry at
+once instead of relying on per-key deletes.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+
+
+VERSION_KEY = 'rbac:version'
+
+# Bumped alongside the shared version so this process never reuses a compiled
+# table it invalidated itself, even with a non-shared (dummy/local) cache
+_local_generation = itertools.count(1)
+_generation = 0
+_compiled: Optional['CompiledRoles'] = None
+_compile_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CompiledRoles:
+    version: Tuple[int, int]
+    perm_bits: Dict[str, int]                 # 'app_label.codename' -> bit
+    perm_names: Dict[int, str]                # bit -> 'app_label.codename'
+    role_bits: Dict[int, int]                 # group id -> permission bitset
+    role_names: Dict[int, str]                # group id -> group name
+    all_bits: int = 0
+
+    def mask(self, names: Iterable[str]) -> int:
+        bits = 0
+        for name in names:
+            bit = self.perm_bits.get(name)
+            if bit is not None:
+                bits |= 1 << bit
+        return bits
+
+    def names(self, bits: int) -> List[str]:
+        out = []
+        while bits:
+            low = bits & -bits
+            name = self.perm_names.get(low.bit_length() - 1)
+            if name:
+                out.append(name)
+            bits ^= low
+        return sorted(out)
+
+
+@dataclass(frozen=True)
+class EffectivePermissions:
+    version: Tuple[int, int]
+    roles: FrozenSet[str] = field(default_factory=frozenset)
+    bits: int = 0
+    compiled: Optional[CompiledRoles] = None
+
+    def has_any_role(self, roles: Iterable[str]) -> bool:
+        return any(r in self.roles for r in roles)
+
+    def has_any_perm(self, perms: Iterable[str]) -> bool:
+        return bool(self.compiled and self.bits & self.compiled.mask(perms))
+
+    def has_perm(self, perm: str) -> bool:
+        return self.has_any_perm([perm])
+
+    def permission_names(self) -> List[str]:
+        return self.compiled.names(self.bits) if self.compiled else []
+
+
+def _seed_version() -> int:
+    # Microseconds since the epoch: a key re-created after an eviction starts above every
+    # version handed out before it (that would take a million bumps a second to overtake)
+    return time.time_ns() // 1000
+
+
+def current_version() -> Tuple[int, int]:
+    shared = cache.get(VERSION_KEY)
+    if shared is None:
+        # Missing (never bumped or evicted): entries cached under an older version must not come back
+        cache.add(VERSION_KEY, _seed_version(), timeout=None)
+        shared = cache.get(VERSION_KEY)
+    return (int(shared or 0), _generation)
+
+
+def bump_version() -> None:
+    """Invalidate every compiled role table and cached user entry."""
+    global _generation
+    _generation = next(_local_generation)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing (first bump or evicted): start above any version in use
+        cache.add(VERSION_KEY, _seed_version(), timeout=None) or cache.incr(VERSION_KEY)
+    except Exception:
+        pass
+
+
+def compile_roles(version: Tuple[int, int]) -> CompiledRoles:
+    perm_bits: Dict[str, int] = {}
+    perm_names: Dict[int, str] = {}
+    all_bits = 0
+    for pk, app_label, codename in Permission.objects.values_list('pk', 'content_type__app_label', 'codename'):
+        name = f'{app_label}.{codename}'
+        perm_bits[name] = pk
+        perm_names[pk] = name
+        all_bits |= 1 << pk
+    role_names = dict(Group.objects.values_list('pk', 'name'))
+    role_bits = dict.fromkeys(role_names, 0)
+    for group_id, perm_id in Group.permissions.through.objects.values_list('group_id', 'permission_id'):
+        role_bits[group_id] = role_bits.get(group_id, 0) | (1 << perm_id)
+    return CompiledRoles(version, perm_bits, perm_names, role_bits, role_names, all_bits)
+
+
+def get_compiled(version: Optional[Tuple[int, int]] = None) -> CompiledRoles:
+    global _compiled
+    version = version or current_version()
+    compiled = _compiled
+    if compiled is not None and compiled.version == version:
+        return compiled
+    with _compile_lock:
+        if _compiled is None or _compiled.version != version:
+            _compiled = compile_roles(version)
+        return _compiled
+
+
+def _user_key(user_id, version: Tuple[int, int]) -> str:
+    return f'rbac:user:{version[0]}:{user_id}'
+
+
+def _load_user_entry(user, version: Tuple[int, int]) -> Tuple[List[int], int]:
+    key = _user_key(user.pk, version)
+    entry = cache.get(key)
+    if entry is None:
+        groups = list(user.groups.values_list('pk', flat=True))
+        direct = 0
+        for perm_id in user.user_permissions.values_list('pk', flat=True):
+            direct |= 1 << perm_id
+        entry = (groups, direct)
+        cache.set(key, entry, timeout=getattr(settings, 'RBAC_USER_CACHE_TTL', 3600))
+    return entry
+
+
+def resolve(user) -> EffectivePermissions:
+    """Effective roles and permission bits of ``user`` at the current version.
+
+    Mirrors ``ModelBackend``: inactive users have no permissions and
+    superusers have all of them. The result is memoised on the user object,
+    so repeated checks within one request cost nothing.
+    """
+    version = current_version()
+    memo = getattr(user, '_rbac_effective', None)
+    if memo is not None and memo.version == version:
+        return memo
+    compiled = get_compiled(version)
+    group_ids, direct = _load_user_entry(user, version)
+    roles = frozenset(compiled.role_names[g] for g in group_ids if g in compiled.role_names)
+    if not user.is_active:
+        bits = 0
+    elif user.is_superuser:
+        bits = compiled.all_bits
+    else:
+        bits = direct
+        for group_id in group_ids:
+            bits |= compiled.role_bits.get(group_id, 0)
+    effective = EffectivePermissions(version, roles, bits, compiled)
+    user._rbac_effective = effective
+    return effective
@@ -0,0 +1,147 @@
+"""Batched UserSession recording for the login path.
+
+Login builds the ``UserSession`` in memory (id and timestamps assigned up
+front, so the token response can reference it) and queues it; a background
+flusher inserts queued sessions with ``bulk_create``. Sessions that could not
+be geolocated inline are enriched after they are written.
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from campshub360.audit_buffer import BufferedWriter, SpillStore
+
+from .geoip import EMPTY, GeoTuple, geo_update_fields, schedule_session_enrichment
+from .models import UserSession
+from .utils import extract_client_ip
+
+
+def _session_lifetime() -> timedelta:
+    return getattr(settings, 'SIMPLE_JWT', {}).get('ACCESS_TOKEN_LIFETIME') or timedelta(minutes=30)
+
+
+def build_session(user, request, geo: Optional[GeoTuple] = None) -> UserSession:
+    """Return an unsaved UserSession for a login from ``request``."""
+    now = timezone.now()
+    session = UserSession(
+        id=uuid.uuid4(),
+        user=user,
+        session_token_hash='jwt',  # marker
+        device_info=request.META.get('HTTP_USER_AGENT', '')[:255],
+        ip=extract_client_ip(request),
+        expires_at=now + _session_lifetime(),
+        revoked=False,
+    )
+    session.created_at = session.updated_at = session.login_at = now
+    if geo and geo != EMPTY:
+        for field, value in geo_update_fields(geo).items():
+            setattr(session, field, value)
+    return session
+
+
+def session_to_event(session: UserSession, needs_geo: bool) -> Dict[str, Any]:
+    return {
+        'id': str(session.id),
+        'user_id': str(session.user_id),
+        'device_info': session.device_info,
+        'ip': session.ip,
+        'login_at': session.login_at.isoformat(),
+        'expires_at': session.expires_at.isoformat(),
+        'country': session.country,
+        'region': session.region,
+        'city': session.city,
+        'latitude': session.latitude,
+        'longitude': session.longitude,
+        'location_raw': session.location_raw or {},
+        'needs_geo': needs_geo,
+    }
+
+
+def write_sessions(events: List[Dict[str, Any]], batch_size: int = 500) -> int:
+    """Insert queued sessions; ``ignore_conflicts`` makes spill replays idempotent."""
+    if not events:
+        return 0
+    rows = []
+    for event in events:
+        rows.append(UserSession(
+            id=uuid.UUID(event['id']),
+            user_id=event['user_id'],
+            session_token_hash='jwt',
+            device_info=event.get('device_info', ''),
+            ip=event.get('ip'),
+            expires_at=parse_datetime(event['expires_at']),
+            revoked=False,
+            country=event.get('country'),
+            region=event.get('region'),
+            city=event.get('city'),
+            latitude=event.get('latitude'),
+            longitude=event.get('longitude'),
+            location_raw=event.get('location_raw') or {},
+        ))
+    UserSession.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    _restore_login_times(events, batch_size)
+    for event in events:
+        if event.get('needs_geo'):
+            schedule_session_enrichment(event['id'], event.get('ip'))
+    return len(rows)
+
+
+def _restore_login_times(events: List[Dict[str, Any]], batch_size: int) -> None:
+    """Stamp rows with the time of the login rather than of the flush (or spill replay).
+
+    ``login_at`` and ``created_at`` are ``auto_now_add``, which ``bulk_create``
+    applies over the values given, so they are set by one UPDATE per batch.
+    """
+    stamped = [(uuid.UUID(e['id']), parse_datetime(e['login_at'])) for e in events if e.get('login_at')]
+    for start in range(0, len(stamped), batch_size):
+        batch = stamped[start:start + batch_size]
+        login_at = Case(*[When(pk=pk, then=Value(at)) for pk, at in batch], output_field=DateTimeField())
+        UserSession.objects.filter(pk__in=[pk for pk, _ in batch]).update(login_at=login_at, created_at=login_at)
+
+
+_buffer: Optional[BufferedWriter] = None
+_buffer_lock = threading.Lock()
+
+
+def get_session_buffer() -> BufferedWriter:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                spill_dir = Path(getattr(settings, 'AUDIT_SPILL_DIR', Path(settings.BASE_DIR) / 'var' / 'audit_spill'))
+                _buffer = BufferedWriter(
+                    batch_size=getattr(settings, 'LOGIN_SESSION_BUFFER_BATCH_SIZE', 200),
+                    flush_interval=getattr(settings, 'LOGIN_SESSION_BUFFER_FLUSH_INTERVAL', 1.0),
+                    spill=SpillStore(spill_dir, prefix='session', writer=write_sessions),
+                    writer=write_sessions,
+                    name='session-flusher',
+                )
+                import atexit
+
+                atexit.register(_buffer.stop)
+    return _buffer
+
+
+def record_login_session(user, request, geo: Optional[GeoTuple] = None) -> UserSession:
+    """Record a login session; buffered when ``LOGIN_SESSION_BUFFER_ENABLED`` is on.
+
+    ``geo`` is the inline geolocation result, or ``None`` when it needs a
+    network lookup (the session is then enriched after it is written).
+    """
+    session = build_session(user, request, geo)
+    needs_geo = geo is None and bool(session.ip)
+    if getattr(settings, 'LOGIN_SESSION_BUFFER_ENABLED', True):
+        get_session_buffer().enqueue(session_to_event(session, needs_geo))
+    else:
+        write_sessions([session_to_event(session, needs_geo)])
+    return session
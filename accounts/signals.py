@@ -1,9 +1,12 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
+from django.contrib.auth.models import Group, Permission as DjangoPermission
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
-from .models import AuditLog, User, FailedLogin
+from .models import AuditLog, AuthIdentifier, User, FailedLogin
+from .login_index import remove_auth_identifier, sync_auth_identifier, sync_user_identifiers
+from .rbac import bump_version
 import json
 
 
@@ -147,6 +150,42 @@ def log_user_deletion(sender, instance, **kwargs):
         )
 
 
+@receiver(post_save, sender=User)
+def sync_login_identifiers_for_user(sender, instance, created, update_fields=None, **kwargs):
+    """Keep LoginIdentifier rows in step with email/username changes."""
+    if update_fields is not None and not {'email', 'username'} & set(update_fields):
+        # e.g. last_login updates: nothing login-relevant changed
+        return
+    sync_user_identifiers(instance)
+
+
+@receiver(post_save, sender=AuthIdentifier)
+def sync_login_identifiers_for_auth_identifier(sender, instance, **kwargs):
+    sync_auth_identifier(instance)
+
+
+@receiver(post_delete, sender=AuthIdentifier)
+def remove_login_identifier_for_auth_identifier(sender, instance, **kwargs):
+    remove_auth_identifier(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def bump_rbac_version_on_grant_change(sender, action, **kwargs):
+    """Role membership or grant edits retire every cached permission set."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=DjangoPermission)
+@receiver(post_delete, sender=DjangoPermission)
+def bump_rbac_version_on_role_change(sender, **kwargs):
+    bump_version()
+
+
 # Generic audit logging for other models
 def log_model_changes(sender, **kwargs):
     """Generic signal handler for model changes"""
@@ -160,7 +199,7 @@ def log_model_changes(sender, **kwargs):
     app_label = instance._meta.app_label
     
     # Skip logging for certain models to avoid noise
-    skip_models = ['auditlog', 'failedlogin', 'usersession', 'passwordreset']
+    skip_models = ['auditlog', 'failedlogin', 'usersession', 'passwordreset', 'loginidentifier']
     if model_name.lower() in skip_models:
         return
     
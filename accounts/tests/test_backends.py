@@ -10,12 +10,11 @@ def test_email_backend_multiple_objects_returned(monkeypatch):
     User = get_user_model()
     User.objects.create_user(email="dup1@example.com", username="dup", password="Pass123456")
 
-    # Monkeypatch manager.get to raise MultipleObjectsReturned to exercise the branch
-    class DummyMgr:
-        def get(self, *args, **kwargs):
-            raise User.MultipleObjectsReturned
+    # Force the lookup to report an ambiguous identifier to exercise the branch
+    def ambiguous(identifier):
+        raise User.MultipleObjectsReturned
 
-    monkeypatch.setattr(User, "objects", DummyMgr())
+    monkeypatch.setattr("accounts.backends.resolve_login_user", ambiguous)
 
     backend = EmailBackend()
     result = backend.authenticate(request=None, username='dup', password='Pass123456')
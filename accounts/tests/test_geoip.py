@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import patch
+
+from accounts import geoip
+from accounts.geoip import EMPTY, GeoResolver, IntervalTable, enrich_session_geo, load_maxmind_csv
+from accounts.models import UserSession
+from django.utils import timezone
+
+
+RANGE_CSV = """start_ip,end_ip,country,region,city,latitude,longitude
+1.0.0.0,1.0.0.255,Australia,Queensland,Brisbane,-27.47,153.02
+8.8.8.0,8.8.8.255,United States,California,Mountain View,37.38,-122.08
+"""
+
+
+@pytest.fixture
+def range_db(tmp_path):
+    path = tmp_path / "ranges.csv"
+    path.write_text(RANGE_CSV)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def _reset_resolver():
+    geoip.reset_resolver()
+    yield
+    geoip.reset_resolver()
+
+
+def test_interval_table_bisect_lookup():
+    table = IntervalTable()
+    table.add_network("10.1.0.0/16", ("r1",) * 6)
+    table.add_range("20.0.0.1", "20.0.0.9", ("r2",) * 6)
+    table.add_network("2001:db8::/32", ("r6",) * 6)
+    table.build()
+    assert len(table) == 3
+    assert table.lookup("10.1.255.255")[0] == "r1"
+    assert table.lookup("20.0.0.1")[0] == "r2"
+    assert table.lookup("20.0.0.10") is None
+    assert table.lookup("9.255.255.255") is None
+    assert table.lookup("2001:db8::1")[0] == "r6"
+    assert table.lookup("not-an-ip") is None
+
+
+def test_local_resolver_resolves_offline_and_caches(range_db):
+    resolver = GeoResolver(provider="auto", database=range_db)
+    assert resolver.is_local
+    with patch("accounts.utils.requests.get") as http:
+        raw, country, region, city, lat, lon = resolver.resolve("8.8.8.8")
+        assert (country, city, lat) == ("United States", "Mountain View", 37.38)
+        assert raw["source"] == "local"
+        assert resolver.resolve("9.9.9.9") == EMPTY
+        assert resolver.resolve("192.168.1.5") == EMPTY
+        http.assert_not_called()
+    assert "8.8.8.8" in resolver.cache
+    assert resolver.peek("1.0.0.7")[1] == "Australia"
+
+
+def test_maxmind_csv_loader(tmp_path):
+    blocks = tmp_path / "blocks.csv"
+    blocks.write_text("network,geoname_id,registered_country_geoname_id,latitude,longitude\n5.6.0.0/16,100,,12.5,77.5\n")
+    locations = tmp_path / "locations.csv"
+    locations.write_text("geoname_id,locale_code,country_name,subdivision_1_name,city_name\n100,en,India,Karnataka,Bengaluru\n")
+    table = load_maxmind_csv(blocks, locations)
+    raw, country, region, city, lat, lon = table.lookup("5.6.7.8")
+    assert (country, region, city, lat, lon) == ("India", "Karnataka", "Bengaluru", 12.5, 77.5)
+
+
+def test_remote_provider_peek_never_calls_network_and_failures_not_cached():
+    resolver = GeoResolver(provider="ipapi")
+    assert not resolver.is_local
+    with patch("accounts.utils.geolocate_ip", return_value=EMPTY) as remote:
+        assert resolver.peek("8.8.4.4") is None
+        remote.assert_not_called()
+        assert resolver.resolve("8.8.4.4") == EMPTY
+        assert resolver.resolve("8.8.4.4") == EMPTY
+        assert remote.call_count == 2
+
+
+@pytest.mark.django_db
+def test_enrich_session_geo_fills_only_missing_country(range_db, django_user_model, settings):
+    settings.GEOIP_DATABASE = range_db
+    user = django_user_model.objects.create_user(email="g@example.com", username="g", password="xX12345678")
+    session = UserSession.objects.create(user=user, session_token_hash="jwt", ip="1.0.0.1", expires_at=timezone.now())
+
+    assert enrich_session_geo(session.pk, "1.0.0.1") is True
+    session.refresh_from_db()
+    assert (session.country, session.city) == ("Australia", "Brisbane")
+    assert session.location_raw["source"] == "local"
+    # Already enriched rows are left alone
+    assert enrich_session_geo(session.pk, "8.8.8.8") is False
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import session_buffer
+from accounts.geoip import EMPTY
+from accounts.login_index import rebuild_login_identifiers, resolve_login_user
+from accounts.models import AuthIdentifier, IdentifierType, LoginIdentifier, LoginIdentifierSource, UserSession
+from campshub360.audit_buffer import BufferedWriter, SpillStore
+
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def test_user_save_indexes_email_and_username():
+    user = User.objects.create_user(email="Idx@Example.com", username="IdxUser", password="GoodPass123")
+    rows = set(LoginIdentifier.objects.filter(user=user).values_list("identifier", "source"))
+    assert rows == {
+        ("idx@example.com", LoginIdentifierSource.EMAIL),
+        ("idxuser", LoginIdentifierSource.USERNAME),
+    }
+
+    user.email = "moved@example.com"
+    user.save(update_fields=["email"])
+    assert not LoginIdentifier.objects.filter(identifier="idx@example.com").exists()
+    assert resolve_login_user("MOVED@example.com") == user
+
+
+def test_auth_identifier_rows_follow_save_and_delete():
+    user = User.objects.create_user(email="roll@example.com", username="rolluser", password="GoodPass123")
+    ident = AuthIdentifier.objects.create(user=user, identifier="21A91A0501", id_type=IdentifierType.USERNAME, is_primary=True)
+    AuthIdentifier.objects.create(user=user, identifier="9999999999", id_type=IdentifierType.PHONE)
+    assert resolve_login_user("21a91a0501") == user
+    assert not LoginIdentifier.objects.filter(identifier="9999999999").exists()
+
+    ident.delete()
+    assert not LoginIdentifier.objects.filter(identifier="21a91a0501").exists()
+
+
+def test_email_wins_over_other_users_username(settings):
+    settings.LOGIN_IDENTIFIER_FALLBACK = False
+    owner = User.objects.create_user(email="shared@example.com", username="owner", password="GoodPass123")
+    User.objects.create_user(email="other@example.com", username="shared@example.com", password="GoodPass123")
+    assert resolve_login_user("shared@example.com") == owner
+
+
+def test_fallback_covers_unindexed_rows(settings):
+    user = User.objects.create_user(email="legacy@example.com", username="legacy", password="GoodPass123")
+    LoginIdentifier.objects.all().delete()
+    settings.LOGIN_IDENTIFIER_FALLBACK = False
+    assert resolve_login_user("legacy") is None
+    settings.LOGIN_IDENTIFIER_FALLBACK = True
+    assert resolve_login_user("legacy") == user
+
+    assert rebuild_login_identifiers() == 2
+    settings.LOGIN_IDENTIFIER_FALLBACK = False
+    assert resolve_login_user("legacy") == user
+
+
+def test_token_view_accepts_roll_number():
+    user = User.objects.create_user(email="stud@example.com", username="stud", password="GoodPass123")
+    AuthIdentifier.objects.create(user=user, identifier="22B81A0401", id_type=IdentifierType.USERNAME, is_primary=True)
+    res = APIClient().post(reverse("token_obtain_pair"), {"username": "22b81a0401", "password": "GoodPass123"}, format="json")
+    assert res.status_code == 200, res.data
+    assert res.data["user"]["email"] == "stud@example.com"
+    assert UserSession.objects.filter(user=user).count() == 1
+
+
+def test_buffered_login_sessions_are_written_on_flush(settings):
+    settings.LOGIN_SESSION_BUFFER_ENABLED = True
+    user = User.objects.create_user(email="buf@example.com", username="buf", password="GoodPass123")
+    buffer = BufferedWriter(batch_size=50, start_thread=False, writer=session_buffer.write_sessions)
+    previous, session_buffer._buffer = session_buffer._buffer, buffer
+    try:
+        request = RequestFactory().post("/", REMOTE_ADDR="10.0.0.5", HTTP_USER_AGENT="pytest")
+        sessions = [session_buffer.record_login_session(user, request, geo=EMPTY) for _ in range(3)]
+        assert not UserSession.objects.filter(user=user).exists()
+        assert buffer.flush() == 3
+    finally:
+        session_buffer._buffer = previous
+    stored = UserSession.objects.filter(user=user)
+    assert {s.id for s in stored} == {s.id for s in sessions}
+    assert all(s.ip == "10.0.0.5" and s.device_info == "pytest" for s in stored)
+
+
+def test_replayed_spilled_sessions_keep_their_login_time(tmp_path):
+    user = User.objects.create_user(email="spill@example.com", username="spill", password="GoodPass123")
+    request = RequestFactory().post("/", REMOTE_ADDR="10.0.0.6")
+    session = session_buffer.build_session(user, request, geo=EMPTY)
+    session.login_at -= timedelta(hours=5)
+    store = SpillStore(tmp_path, prefix="session", writer=session_buffer.write_sessions)
+    store.spill([session_buffer.session_to_event(session, needs_geo=False)])
+
+    assert store.replay() == 1
+    stored = UserSession.objects.get(pk=session.id)
+    assert stored.login_at == session.login_at
+    assert stored.created_at == session.login_at
@@ -85,17 +85,23 @@ def test_hasrole_uses_cache_hit_and_denies_when_missing_role(django_user_model):
     assert HasRole().has_permission(req, view) is False
 
 
-def test_hasanypermission_uses_cache_hit(django_user_model):
+def test_hasanypermission_uses_role_bitset(django_user_model):
     user = django_user_model.objects.create_user(email="c2@example.com", username="c2", password="xX12345678")
+    group = Group.objects.create(name="Viewer")
+    perm = DjangoPermission.objects.filter(content_type=ContentType.objects.get_for_model(User)).first()
+    group.permissions.add(perm)
 
     class V(APIView):
         permission_classes = [HasAnyPermission]
-        required_permissions = ["students.view_student"]
+        required_permissions = [f"{perm.content_type.app_label}.{perm.codename}"]
 
-    cache.set(f"rolesperms:v2:{user.id}", {"roles": [], "permissions": ["students.view_student"]}, timeout=60)
     view = V()
-    req = _make_request(user)
-    assert HasAnyPermission().has_permission(req, view) is True
+    assert HasAnyPermission().has_permission(_make_request(user), view) is False
+    # Membership change bumps the RBAC version, so no stale denial survives
+    user.groups.add(group)
+    assert HasAnyPermission().has_permission(_make_request(user), view) is True
+    group.permissions.remove(perm)
+    assert HasAnyPermission().has_permission(_make_request(user), view) is False
 
 
 def test_hasanypermission_fallback_to_user_permissions(django_user_model):
@@ -0,0 +1,84 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import override_settings
+
+from accounts import rbac
+
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "rbac-tests"}}
+
+
+def _perm(codename):
+    perm = Permission.objects.select_related("content_type").get(codename=codename)
+    return perm, f"{perm.content_type.app_label}.{perm.codename}"
+
+
+def test_compiled_roles_bitsets_round_trip():
+    view, view_name = _perm("view_user")
+    change, change_name = _perm("change_user")
+    group = Group.objects.create(name="Registrar")
+    group.permissions.add(view, change)
+
+    compiled = rbac.get_compiled()
+    assert compiled.role_bits[group.pk] == (1 << view.pk) | (1 << change.pk)
+    assert compiled.names(compiled.role_bits[group.pk]) == sorted([view_name, change_name])
+    assert compiled.mask(["nope.nothing"]) == 0
+
+
+def test_effective_permissions_match_model_backend():
+    view, view_name = _perm("view_user")
+    _, change_name = _perm("change_user")
+    user = User.objects.create_user(email="e@example.com", username="e", password="xX12345678")
+    group = Group.objects.create(name="Staff")
+    group.permissions.add(view)
+    user.groups.add(group)
+    user.user_permissions.add(_perm("change_user")[0])
+
+    user = User.objects.get(pk=user.pk)
+    effective = rbac.resolve(user)
+    assert effective.roles == {"Staff"}
+    assert set(effective.permission_names()) == user.get_all_permissions() == {view_name, change_name}
+
+    user.is_active = False
+    user._rbac_effective = None
+    assert rbac.resolve(user).permission_names() == []
+
+
+def test_superuser_has_every_permission():
+    admin = User.objects.create_superuser(email="su@example.com", username="su", password="xX12345678")
+    assert rbac.resolve(admin).has_perm(_perm("delete_user")[1])
+
+
+@override_settings(CACHES=LOCMEM)
+def test_user_entry_is_cached_per_version(django_assert_num_queries):
+    cache.clear()
+    user = User.objects.create_user(email="v@example.com", username="v", password="xX12345678")
+    rbac.resolve(user)
+    fresh = User.objects.get(pk=user.pk)
+    with django_assert_num_queries(0):
+        assert rbac.resolve(fresh).roles == frozenset()
+
+    before = rbac.current_version()
+    Group.objects.create(name="Late")
+    assert rbac.current_version()[0] == before[0] + 1
+    fresh.groups.add(Group.objects.get(name="Late"))
+    assert rbac.resolve(User.objects.get(pk=user.pk)).roles == {"Late"}
+
+
+@override_settings(CACHES=LOCMEM)
+def test_version_never_goes_back_after_eviction():
+    cache.clear()
+    rbac.bump_version()
+    rbac.bump_version()
+    before = rbac.current_version()[0]
+    cache.delete(rbac.VERSION_KEY)
+    assert rbac.current_version()[0] > before
+    cache.delete(rbac.VERSION_KEY)
+    rbac.bump_version()
+    assert rbac.current_version()[0] > before
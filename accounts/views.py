@@ -6,9 +6,10 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+from django.contrib.auth.models import update_last_login
 from django.contrib.auth import authenticate
 from django.db.models import Q
-from .models import AuthIdentifier, IdentifierType
 from .models import UserSession
 from django.contrib.auth.models import Group
 from django.core.cache import cache
@@ -21,8 +22,11 @@ except Exception:  # Fallback if ratelimit isn't installed in the running env
         return _decorator
 from django.utils.decorators import method_decorator
 from django.conf import settings
-from students.signals import record_session
-from accounts.utils import extract_client_ip, geolocate_ip
+from accounts.utils import extract_client_ip
+from accounts.geoip import EMPTY, get_resolver
+from accounts.login_index import resolve_login_user
+from accounts.rbac import resolve as resolve_rbac
+from accounts.session_buffer import record_login_session
 
 from .serializers import RegisterSerializer, UserSerializer
 from .permissions import HasRole, HasAnyPermission
@@ -74,12 +78,8 @@ class RollOrEmailTokenSerializer(TokenObtainPairSerializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = None
-        # Try by username first, then by email
-        if username:
-            user = self._get_user_by_identifier(username)
-        elif email:
-            user = self._get_user_by_identifier(email)
+        # Single indexed lookup over email, username and roll number
+        user = resolve_login_user(username or email)
 
         if user is None:
             raise exceptions.AuthenticationFailed('Invalid credentials', code='authorization')
@@ -87,30 +87,29 @@ class RollOrEmailTokenSerializer(TokenObtainPairSerializer):
         if not user.check_password(password):
             raise exceptions.AuthenticationFailed('Invalid credentials', code='authorization')
 
-        # Create a new attrs dict with email field for parent validation
-        parent_attrs = {'email': user.email, 'password': password}
-        data = super().validate(parent_attrs)
+        if not jwt_api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed('Invalid credentials', code='authorization')
+
+        # Password already verified: issue tokens directly instead of running the
+        # authentication backends (and the password hasher) a second time
+        self.user = user
+        refresh = self.get_token(user)
+        data = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+        if jwt_api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
 
         request = self.context.get('request')
         if request:
-            # record base session
-            usession = record_session(user, request)
-            # enrich with geo info immediately when available (ignore if DB not migrated yet)
+            # geo is resolved inline only when no network call is needed
             try:
-                ip = extract_client_ip(request)
-                raw, country, region, city, lat, lon = geolocate_ip(ip)
-                if usession and (country or raw):
-                    usession.country = country
-                    usession.region = region
-                    usession.city = city
-                    usession.latitude = lat
-                    usession.longitude = lon
-                    if raw:
-                        usession.location_raw = raw
-                    usession.save(update_fields=['country','region','city','latitude','longitude','location_raw'])
+                geo = get_resolver().peek(extract_client_ip(request))
             except Exception:
-                # DB might not have new columns yet; skip enrichment
-                pass
+                geo = EMPTY
+            # record base session (batched insert off the request path)
+            try:
+                usession = record_login_session(user, request, geo=geo)
+            except Exception:
+                usession = None
 
             # Attach session/location metadata into token response (non-breaking extra fields)
             try:
@@ -140,23 +139,7 @@ class RollOrEmailTokenSerializer(TokenObtainPairSerializer):
         return data
 
     def _get_user_by_identifier(self, identifier: str):
-        # Match by email
-        try:
-            return User.objects.get(email__iexact=identifier)
-        except User.DoesNotExist:
-            pass
-        # Match by roll number via AuthIdentifier (stored as USERNAME)
-        auth_ids = AuthIdentifier.objects.filter(
-            Q(identifier__iexact=identifier),
-            Q(id_type=IdentifierType.USERNAME) | Q(id_type=IdentifierType.EMAIL)
-        ).select_related('user')
-        if auth_ids.exists():
-            return auth_ids.first().user
-        # As fallback, match username field directly
-        try:
-            return User.objects.get(username__iexact=identifier)
-        except User.DoesNotExist:
-            return None
+        return resolve_login_user(identifier)
 
 
 class RollOrEmailTokenView(TokenObtainPairView):
@@ -194,19 +177,10 @@ class RolesPermissionsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        from django.core.cache import cache
-        cache_key = f"rolesperms:v2:{request.user.id}"
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-
-        # Django Groups as roles
-        roles = list(request.user.groups.values_list('name', flat=True))
-        # Django permissions including group + user perms as app_label.codename
-        perms = sorted(list(request.user.get_all_permissions()))
-        payload = {'roles': sorted(roles), 'permissions': sorted(perms)}
-        # Cache for 1 hour (3600 seconds) for better performance
-        cache.set(cache_key, payload, timeout=3600)
+        # Django Groups as roles; group + user perms as app_label.codename,
+        # resolved from the versioned RBAC cache
+        effective = resolve_rbac(request.user)
+        payload = {'roles': sorted(effective.roles), 'permissions': effective.permission_names()}
         return Response(payload)
 
 
@@ -254,9 +228,8 @@ class AssignRoleView(APIView):
             group, _ = Group.objects.get_or_create(name=role_name)
         except User.DoesNotExist:
             return Response({'detail': 'User not found.'}, status=404)
+        # Membership changes bump the RBAC version (accounts.signals)
         target_user.groups.add(group)
-        # Invalidate cached roles/permissions for the target user
-        cache.delete(f"rolesperms:v2:{target_user.id}")
         return Response({'detail': 'Role assigned.'})
 
 
@@ -277,7 +250,6 @@ class RevokeRoleView(APIView):
         except Group.DoesNotExist:
             return Response({'detail': 'Role not found.'}, status=404)
         target_user.groups.remove(group)
-        cache.delete(f"rolesperms:v2:{target_user.id}")
         return Response({'detail': 'Role revoked.'})
 
 
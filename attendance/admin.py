@@ -9,7 +9,7 @@ from .models import (
     AttendanceSession, AttendanceRecord, AttendanceCorrectionRequest,
     LeaveApplication, TimetableSlot, AcademicCalendarHoliday,
     AttendanceConfiguration, StudentSnapshot, AttendanceStatistics,
-    BiometricDevice, BiometricTemplate, AttendanceAuditLog
+    BiometricDevice, BiometricTemplate, BiometricPunch, AttendanceAuditLog
 )
 from .forms import (
     AcademicPeriodForm, TimetableSlotForm, AttendanceSessionForm, AttendanceRecordForm
@@ -362,12 +362,12 @@ class AttendanceStatisticsAdmin(admin.ModelAdmin):
 class BiometricDeviceAdmin(admin.ModelAdmin):
     list_display = [
         'device_id', 'device_name', 'device_type', 'location', 
-        'status', 'is_enabled', 'last_seen'
+        'status', 'is_enabled', 'last_seen', 'last_punch_at', 'ingest_lag_seconds'
     ]
     list_filter = ['device_type', 'status', 'is_enabled', 'auto_sync']
     search_fields = ['device_id', 'device_name', 'location', 'room']
     ordering = ['device_id']
-    readonly_fields = ['last_seen']
+    readonly_fields = ['last_seen', 'last_punch_at', 'ingest_lag_seconds']
     
     fieldsets = (
         ('Device Information', {
@@ -380,7 +380,7 @@ class BiometricDeviceAdmin(admin.ModelAdmin):
             'fields': ('ip_address', 'port', 'api_endpoint', 'api_key')
         }),
         ('Technical Details', {
-            'fields': ('firmware_version', 'last_seen'),
+            'fields': ('firmware_version', 'last_seen', 'last_punch_at', 'ingest_lag_seconds'),
             'classes': ('collapse',)
         }),
     )
@@ -406,6 +406,28 @@ class BiometricTemplateAdmin(admin.ModelAdmin):
         )
 
 
+@admin.register(BiometricPunch)
+class BiometricPunchAdmin(admin.ModelAdmin):
+    list_display = [
+        'device', 'subject_id', 'event_type', 'punched_at', 'received_at',
+        'source', 'status', 'student', 'session'
+    ]
+    list_filter = ['status', 'source', 'event_type', 'device']
+    search_fields = ['subject_id', 'vendor_event_id', 'device__device_id', 'student__roll_number']
+    ordering = ['-punched_at']
+    raw_id_fields = ['student', 'session']
+    readonly_fields = [
+        'device', 'subject_id', 'event_type', 'punched_at', 'received_at', 'source',
+        'vendor_event_id', 'payload', 'dedupe_key', 'status', 'student', 'session', 'processed_at'
+    ]
+
+    def has_add_permission(self, request):
+        return False  # Staging is append-only via webhook / file drop
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('device', 'student')
+
+
 @admin.register(AttendanceAuditLog)
 class AttendanceAuditLogAdmin(admin.ModelAdmin):
     list_display = [
@@ -0,0 +1,337 @@
+"""Biometric punch ingestion: stage, deduplicate, then apply in bulk.
+
+Devices deliver punches in batches, either to the webhook or as files
+dropped in ``ATTENDANCE_BIOMETRIC_DROP_DIR/<device_id>/``. ``ingest``
+appends them to the ``BiometricPunch`` staging table without touching
+attendance, so a burst at the start of a period costs one insert per
+batch. A punch is a duplicate when the same device already reported the
+same subject within the dedupe window: repeated finger placements,
+device retries and re-sent files all collapse onto one unique
+``dedupe_key``.
+
+``apply_punches`` (beat task ``process_biometric_punches``) takes pending
+punches a batch at a time and resolves them with a fixed number of
+queries per batch:
+
+    subject -> student       active template on the device, else roll number
+    student -> session       enrolled section's open (or, for late
+                             deliveries, closed but unlocked) session whose
+                             window contains the punch
+    (session, student)       earliest punch wins; insert the record, or
+                             upgrade the auto-marked absent row left by
+                             close_due_sessions
+
+Records somebody already marked are left alone.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from academics.models import CourseEnrollment
+from campshub360.utils import chunked
+from students.models import Student
+
+from .models import (
+    AttendanceRecord,
+    AttendanceSession,
+    BiometricDevice,
+    BiometricPunch,
+    BiometricTemplate,
+    get_attendance_settings,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def dedupe_key(device_id: str, subject_id: str, punched_at: datetime, window_seconds: int) -> str:
+    bucket = int(punched_at.timestamp() // max(window_seconds, 1))
+    return f'{device_id}:{subject_id}:{bucket}'
+
+
+@dataclass
+class IngestReport:
+    received: int = 0
+    staged: int = 0
+    duplicates: int = 0
+
+    def as_dict(self) -> dict:
+        return {'received': self.received, 'staged': self.staged, 'duplicates': self.duplicates}
+
+
+def ingest(device: BiometricDevice, punches: Iterable[dict], source: str = 'webhook', now: Optional[datetime] = None) -> IngestReport:
+    """Append ``punches`` (subject_id, timestamp, event_type, vendor_event_id, additional_data) to staging.
+
+    Punches of one subject closer together than the dedupe window are
+    collapsed within the batch as well as against earlier batches.
+    """
+    now = now or timezone.now()
+    window = settings.ATTENDANCE_BIOMETRIC_DEDUPE_SECONDS
+    report = IngestReport()
+    rows, last_kept = [], {}
+    for punch in sorted(punches, key=lambda p: (str(p['subject_id']), p['timestamp'])):
+        report.received += 1
+        subject, at = str(punch['subject_id']), punch['timestamp']
+        previous = last_kept.get(subject)
+        if previous is not None and (at - previous).total_seconds() < window:
+            continue
+        last_kept[subject] = at
+        rows.append(BiometricPunch(
+            device=device, subject_id=subject, event_type=punch.get('event_type') or 'checkin',
+            punched_at=at, received_at=now, source=source,
+            vendor_event_id=punch.get('vendor_event_id') or '', payload=punch.get('additional_data') or {},
+            dedupe_key=dedupe_key(device.device_id, subject, at, window),
+        ))
+
+    for chunk in chunked(rows):
+        seen = set(BiometricPunch.objects.filter(dedupe_key__in=[r.dedupe_key for r in chunk]).values_list('dedupe_key', flat=True))
+        fresh = [r for r in chunk if r.dedupe_key not in seen]
+        # A concurrent batch carrying the same punch loses on the unique key
+        BiometricPunch.objects.bulk_create(fresh, batch_size=1000, ignore_conflicts=True)
+        report.staged += len(fresh)
+    report.duplicates = report.received - report.staged
+
+    if report.received:
+        newest = max(last_kept.values())
+        BiometricDevice.objects.filter(pk=device.pk).update(
+            last_seen=now,
+            last_punch_at=Greatest(Coalesce('last_punch_at', Value(newest)), Value(newest)),
+            ingest_lag_seconds=max(int((now - newest).total_seconds()), 0),
+        )
+    return report
+
+
+def read_punch_file(path) -> List[dict]:
+    """Parse a dropped CSV (subject_id,timestamp[,event_type,vendor_event_id]) or JSON-lines file."""
+    path = Path(path)
+    with path.open(newline='') as fh:
+        if path.suffix == '.jsonl':
+            raw = [json.loads(line) for line in fh if line.strip()]
+        else:
+            raw = list(csv.DictReader(fh))
+    punches = []
+    for row in raw:
+        at = parse_datetime(str(row.get('timestamp', '')))
+        if not row.get('subject_id') or at is None:
+            logger.warning("Skipping malformed punch in %s: %r", path, row)
+            continue
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+        punches.append({
+            'subject_id': row['subject_id'], 'timestamp': at,
+            'event_type': row.get('event_type') or 'checkin', 'vendor_event_id': row.get('vendor_event_id') or '',
+        })
+    return punches
+
+
+def ingest_drop_dir(device: BiometricDevice, drop_dir=None) -> IngestReport:
+    """Stage every unprocessed file in the device's drop directory, renaming each to ``*.done``."""
+    drop_dir = drop_dir or settings.ATTENDANCE_BIOMETRIC_DROP_DIR
+    report = IngestReport()
+    if not drop_dir:
+        return report
+    directory = Path(drop_dir) / device.device_id
+    if not directory.is_dir():
+        return report
+    for path in sorted(p for p in directory.iterdir() if p.suffix in ('.csv', '.jsonl')):
+        with transaction.atomic():
+            result = ingest(device, read_punch_file(path), source='file')
+        os.replace(path, path.with_name(path.name + '.done'))
+        report.received += result.received
+        report.staged += result.staged
+        report.duplicates += result.duplicates
+    return report
+
+
+@dataclass
+class ApplyRun:
+    batches: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    unmatched: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'batches': self.batches,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'unmatched': self.unmatched,
+        }
+
+
+def _students(punches) -> Dict[tuple, int]:
+    """(device_id, subject_id) -> student_id."""
+    subjects = {p.subject_id for p in punches}
+    resolved = {
+        (device_id, subject): student_id
+        for device_id, subject, student_id in BiometricTemplate.objects.filter(
+            is_active=True, device_id__in={p.device_id for p in punches}, template_hash__in=subjects,
+        ).values_list('device_id', 'template_hash', 'student_id')
+    }
+    missing = {p.subject_id for p in punches if (p.device_id, p.subject_id) not in resolved}
+    by_roll = dict(Student.objects.filter(roll_number__in=missing).values_list('roll_number', 'pk')) if missing else {}
+    for p in punches:
+        if (p.device_id, p.subject_id) not in resolved and p.subject_id in by_roll:
+            resolved[(p.device_id, p.subject_id)] = by_roll[p.subject_id]
+    return resolved
+
+
+def _sessions(student_ids, earliest, latest, early) -> Dict[int, List[dict]]:
+    """student_id -> candidate sessions (open or closed-unlocked) overlapping [earliest, latest]."""
+    sections: Dict[int, List[int]] = {}
+    for student_id, section_id in CourseEnrollment.objects.filter(
+        student_id__in=student_ids, status='ENROLLED', course_section__isnull=False,
+    ).values_list('student_id', 'course_section_id'):
+        sections.setdefault(section_id, []).append(student_id)
+    if not sections:
+        return {}
+    candidates: Dict[int, List[dict]] = {}
+    for session in AttendanceSession.objects.filter(
+        course_section_id__in=list(sections), status__in=['open', 'closed'],
+        start_datetime__lte=latest + early, end_datetime__gte=earliest,
+    ).values('pk', 'course_section_id', 'start_datetime', 'end_datetime', 'room', 'academic_period_id'):
+        for student_id in sections[session['course_section_id']]:
+            candidates.setdefault(student_id, []).append(session)
+    return candidates
+
+
+def _match(punch, sessions, room, early):
+    hits = [s for s in sessions if s['start_datetime'] - early <= punch.punched_at <= s['end_datetime']]
+    if room:
+        hits.sort(key=lambda s: (s['room'] != room, s['start_datetime']))
+    else:
+        hits.sort(key=lambda s: s['start_datetime'])
+    return hits[0] if hits else None
+
+
+def _apply_batch(punches, now, grace, devices) -> ApplyRun:
+    """``devices`` maps device pk -> (room, device_id code)."""
+    run = ApplyRun(batches=1)
+    students = _students(punches)
+    for p in punches:
+        p.student_id = students.get((p.device_id, p.subject_id))
+        p.processed_at = now
+    resolved = [p for p in punches if p.student_id]
+    sessions = _sessions(
+        {p.student_id for p in resolved},
+        min((p.punched_at for p in resolved), default=now), max((p.punched_at for p in resolved), default=now), grace,
+    ) if resolved else {}
+
+    first: Dict[tuple, tuple] = {}
+    for p in punches:
+        session = _match(p, sessions.get(p.student_id, ()), devices[p.device_id][0], grace) if p.student_id else None
+        if session is None:
+            p.status, p.session_id = 'unmatched', None
+            run.unmatched += 1
+            continue
+        p.session_id, p.status = session['pk'], 'skipped'
+        key = (session['pk'], p.student_id)
+        if key not in first or p.punched_at < first[key][0].punched_at:
+            first[key] = (p, session)
+
+    if first:
+        existing = {
+            (r.session_id, r.student_id): r
+            for r in AttendanceRecord.objects.select_for_update().filter(
+                session_id__in={k[0] for k in first}, student_id__in={k[1] for k in first},
+            ).only('pk', 'session_id', 'student_id', 'mark', 'source')
+        }
+        creates, updates = [], []
+        for key, (p, session) in first.items():
+            mark = 'late' if p.punched_at > session['start_datetime'] + grace else 'present'
+            record = existing.get(key)
+            if record is None:
+                creates.append(AttendanceRecord(
+                    session_id=key[0], student_id=key[1], academic_period_id=session['academic_period_id'],
+                    mark=mark, marked_at=p.punched_at, source='biometric', device_id=devices[p.device_id][1],
+                    device_type='biometric', vendor_event_id=p.vendor_event_id, vendor_data={'punch_id': p.pk},
+                ))
+            elif record.mark == 'absent' and record.source == 'system':
+                record.mark, record.source, record.marked_at = mark, 'biometric', p.punched_at
+                record.reason = 'Biometric punch received after auto-marking'
+                record.device_id, record.device_type = devices[p.device_id][1], 'biometric'
+                record.vendor_event_id, record.vendor_data, record.updated_at = p.vendor_event_id, {'punch_id': p.pk}, now
+                updates.append(record)
+            else:
+                continue
+            p.status = 'applied'
+        # A faculty member marking the same student concurrently wins
+        AttendanceRecord.objects.bulk_create(creates, batch_size=1000, ignore_conflicts=True)
+        AttendanceRecord.objects.bulk_update(
+            updates,
+            ['mark', 'source', 'marked_at', 'reason', 'device_id', 'device_type', 'vendor_event_id', 'vendor_data', 'updated_at'],
+            batch_size=500,
+        )
+        run.created, run.updated = len(creates), len(updates)
+    run.skipped = sum(1 for p in punches if p.status == 'skipped')
+    _record_resolution(punches, now)
+    return run
+
+
+def _record_resolution(punches, now) -> None:
+    """Write each punch's outcome with one parameterised UPDATE run for the whole batch.
+
+    ``bulk_update`` would build a CASE expression per column and row, which
+    costs more than the rest of the batch put together.
+    """
+    meta = BiometricPunch._meta
+    qn = connection.ops.quote_name
+    fields = [meta.get_field(name) for name in ('status', 'student', 'session', 'processed_at')]
+    sql = (
+        f"UPDATE {qn(meta.db_table)} SET {', '.join(f'{qn(f.column)} = %s' for f in fields)} "
+        f"WHERE {qn(meta.pk.column)} = %s"
+    )
+    status, student, session, processed = fields
+    processed_at = processed.get_db_prep_save(now, connection)
+    rows = [
+        (
+            p.status, student.get_db_prep_save(p.student_id, connection),
+            session.get_db_prep_save(p.session_id, connection), processed_at, p.pk,
+        )
+        for p in punches
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def apply_punches(batch_size: int = 1000, now: Optional[datetime] = None, max_batches: Optional[int] = None) -> ApplyRun:
+    """Resolve pending punches to sessions and upsert their attendance records, batch by batch."""
+    now = now or timezone.now()
+    grace = timedelta(minutes=get_attendance_settings().get('GRACE_PERIOD_MINUTES', 5))
+    total = ApplyRun()
+    while max_batches is None or total.batches < max_batches:
+        with transaction.atomic():
+            pending = BiometricPunch.objects.filter(status='pending').order_by('pk')
+            if connection.features.has_select_for_update_skip_locked:
+                pending = pending.select_for_update(skip_locked=True, of=('self',))
+            punches = list(pending.only(
+                'pk', 'device_id', 'subject_id', 'punched_at', 'vendor_event_id', 'status',
+            )[:batch_size])
+            if not punches:
+                break
+            devices = {
+                pk: (room, code) for pk, room, code in
+                BiometricDevice.objects.filter(pk__in={p.device_id for p in punches}).values_list('pk', 'room', 'device_id')
+            }
+            run = _apply_batch(punches, now, grace, devices)
+        for name in ('batches', 'created', 'updated', 'skipped', 'unmatched'):
+            setattr(total, name, getattr(total, name) + getattr(run, name))
+        if len(punches) < batch_size:
+            break
+    return total
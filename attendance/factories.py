@@ -1,14 +1,14 @@
 import factory
 from django.utils import timezone
 from faker import Faker
-from datetime import date
+from datetime import date, timedelta
 
 from attendance.models import (
     AcademicCalendarHoliday, TimetableSlot, AttendanceSession, AttendanceRecord,
     AttendanceCorrectionRequest, LeaveApplication, StudentSnapshot, AttendanceConfiguration,
     AttendanceAuditLog
 )
-from academics.models import CourseSection, Course
+from academics.models import CourseEnrollment, CourseSection, Course
 from students.models import Student, StudentBatch, AcademicYear
 from faculty.models import Faculty
 from departments.models import Department
@@ -484,4 +484,33 @@ class AttendanceScenarioFactory:
         return session, student, biometric_record
 
 
+class TimedSessionMixin:
+    """TestCase mixin: a course section, a fixed ``self.now`` and sessions of the
+    section scheduled relative to it."""
 
+    # Per test class field defaults for ``_session`` (e.g. status, room)
+    session_defaults = {}
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now().replace(microsecond=0)
+        self.section = CourseSectionFactory()
+
+    def _enroll(self, count):
+        """``count`` new students of the section's batch, enrolled in the section."""
+        students = [StudentFactory(student_batch=self.section.student_batch) for _ in range(count)]
+        for student in students:
+            CourseEnrollment.objects.create(student=student, course_section=self.section)
+        return students
+
+    def _session(self, starts_in, minutes=60, **fields):
+        """A session starting ``starts_in`` from ``self.now`` (negative: in the past), with
+        none of the records created for it on save, so tests mark attendance themselves."""
+        start = self.now + starts_in
+        fields = {'status': 'scheduled', **self.session_defaults, **fields}
+        session = AttendanceSessionFactory(
+            course_section=self.section, scheduled_date=start.date(), start_datetime=start,
+            end_datetime=start + timedelta(minutes=minutes), **fields,
+        )
+        AttendanceRecord.objects.filter(session=session).delete()
+        return session
@@ -0,0 +1,488 @@
+"""Attendance data integrity rules: set-based detection, dry-run plans, chunked repair.
+
+Each rule finds its violations with a fixed number of queries, whatever
+the table size, and reports them without changing anything unless asked
+to repair. Repairs walk the violations in keyset-paginated chunks (one
+transaction per chunk), so a large backlog never holds long locks and an
+interrupted run can simply be started again.
+
+Rules register themselves with ``@register``; deployments can add their
+own by listing dotted paths in ``ATTENDANCE_INTEGRITY_RULES``. Only rules
+with ``auto_repair = True`` (derived data that can be rebuilt from raw
+records) are repaired by the weekly task; the destructive ones are
+repaired on request through ``manage.py check_attendance_integrity``.
+"""
+
+from __future__ import annotations
+
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from academics.models import CourseEnrollment
+from students.models import Student
+
+from .models import (
+    AttendanceAuditLog,
+    AttendanceRecord,
+    AttendanceSession,
+    AttendanceStatistics,
+    StudentSnapshot,
+    get_attendance_settings,
+)
+from .transitions import close_due_sessions
+
+logger = logging.getLogger(__name__)
+
+# Enrollment states in which a student attended the section at some point
+ATTENDED_ENROLLMENT_STATUSES = ('ENROLLED', 'COMPLETED', 'DROPPED', 'WITHDRAWN')
+
+# Which duplicate survives a merge: deliberate marks beat device marks beat generated ones
+SOURCE_PRIORITY = {'manual': 0, 'rfid': 1, 'qr': 1, 'biometric': 1, 'offline': 2, 'import': 2, 'system': 3}
+
+
+def keyset(queryset, field_name: str, chunk_size: int) -> Iterator[list]:
+    """Yield lists of ``field_name`` values from ``queryset`` in ascending, non-overlapping chunks."""
+    last = None
+    while True:
+        page = queryset.order_by(field_name)
+        if last is not None:
+            page = page.filter(**{f'{field_name}__gt': last})
+        values = list(page.values_list(field_name, flat=True).distinct()[:chunk_size])
+        if not values:
+            return
+        yield values
+        last = values[-1]
+        if len(values) < chunk_size:
+            return
+
+
+@dataclass
+class RuleReport:
+    rule: str
+    description: str
+    found: int = 0
+    plan: Dict[str, int] = field(default_factory=dict)
+    sample: List[dict] = field(default_factory=list)
+    repaired: bool = False
+    fixed: int = 0
+    chunks: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'rule': self.rule,
+            'description': self.description,
+            'found': self.found,
+            'plan': self.plan,
+            'sample': self.sample,
+            'repaired': self.repaired,
+            'fixed': self.fixed,
+            'chunks': self.chunks,
+        }
+
+
+class IntegrityRule(ABC):
+    """Base class: subclasses provide ``count``, ``plan``, ``sample`` and ``repair_chunks``."""
+    name = ''
+    description = ''
+    auto_repair = False
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or timezone.now()
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def plan(self) -> Dict[str, int]:
+        """What ``repair`` would do, as counts."""
+
+    @abstractmethod
+    def sample(self, limit: int) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def repair_chunks(self, chunk_size: int) -> Iterator[int]:
+        """Repair chunk by chunk, yielding the number of rows fixed in each."""
+
+    def check(self, repair: bool = False, chunk_size: int = 1000, sample_size: int = 10) -> RuleReport:
+        report = RuleReport(rule=self.name, description=self.description, found=self.count())
+        if report.found:
+            report.plan = self.plan()
+            report.sample = self.sample(sample_size)
+        if repair and report.found:
+            report.repaired = True
+            for fixed in self.repair_chunks(chunk_size):
+                report.fixed += fixed
+                report.chunks += 1
+        return report
+
+
+RULES: Dict[str, type] = {}
+
+
+def register(rule_class):
+    RULES[rule_class.name] = rule_class
+    return rule_class
+
+
+def get_rules(names: Optional[Sequence[str]] = None) -> Dict[str, type]:
+    """Built-in rules plus ATTENDANCE_INTEGRITY_RULES, optionally narrowed to ``names``."""
+    rules = dict(RULES)
+    for path in getattr(settings, 'ATTENDANCE_INTEGRITY_RULES', []):
+        rule_class = import_string(path)
+        rules[rule_class.name] = rule_class
+    if names:
+        unknown = set(names) - set(rules)
+        if unknown:
+            raise KeyError(f"Unknown integrity rule(s): {', '.join(sorted(unknown))}")
+        rules = {name: rules[name] for name in names}
+    return rules
+
+
+def _audit(entries: Iterable[AttendanceAuditLog]) -> None:
+    AttendanceAuditLog.objects.bulk_create(list(entries), batch_size=1000)
+
+
+def _record_state(record) -> dict:
+    return {
+        'id': record.pk, 'mark': record.mark, 'source': record.source,
+        'marked_at': record.marked_at.isoformat() if record.marked_at else None, 'reason': record.reason,
+    }
+
+
+# --- duplicates ------------------------------------------------------------------
+
+
+def plan_duplicate_merge(records: Sequence) -> tuple:
+    """Pick the record to keep from one (session, student) group; returns (keep, drop)."""
+    ranked = sorted(
+        records,
+        key=lambda r: (SOURCE_PRIORITY.get(r.source, 2), -(r.updated_at.timestamp() if r.updated_at else 0), -r.pk),
+    )
+    return ranked[0], ranked[1:]
+
+
+@register
+class DuplicateRecordsRule(IntegrityRule):
+    name = 'duplicate_records'
+    description = 'More than one attendance record for the same session and student'
+
+    def groups(self):
+        return (
+            AttendanceRecord.objects.values('session_id', 'student_id')
+            .annotate(n=Count('pk')).filter(n__gt=1).order_by()
+        )
+
+    def count(self) -> int:
+        return self.groups().count()
+
+    def plan(self) -> Dict[str, int]:
+        rows = self.groups().aggregate(rows=Sum('n'))['rows'] or 0
+        groups = self.count()
+        return {'groups': groups, 'keep': groups, 'delete': rows - groups}
+
+    def sample(self, limit: int) -> List[dict]:
+        return [
+            {'session_id': g['session_id'], 'student_id': str(g['student_id']), 'records': g['n']}
+            for g in self.groups().order_by('session_id')[:limit]
+        ]
+
+    def repair_chunks(self, chunk_size: int) -> Iterator[int]:
+        for session_ids in keyset(self.groups(), 'session_id', chunk_size):
+            with transaction.atomic():
+                groups: Dict[tuple, list] = {}
+                for record in AttendanceRecord.objects.select_for_update().filter(session_id__in=session_ids).only(
+                    'pk', 'session_id', 'student_id', 'mark', 'source', 'marked_at', 'reason', 'updated_at',
+                ):
+                    groups.setdefault((record.session_id, record.student_id), []).append(record)
+                drop, audits = [], []
+                for (session_id, student_id), records in groups.items():
+                    if len(records) < 2:
+                        continue
+                    keep, losers = plan_duplicate_merge(records)
+                    drop.extend(r.pk for r in losers)
+                    audits.extend(
+                        AttendanceAuditLog(
+                            entity_type='AttendanceRecord', entity_id=str(r.pk), action='integrity_merge',
+                            before=_record_state(r), after={'merged_into': keep.pk},
+                            reason='Duplicate record for session and student', session_id=str(session_id),
+                            student_id=str(student_id),
+                        )
+                        for r in losers
+                    )
+                AttendanceRecord.objects.filter(pk__in=drop).delete()
+                _audit(audits)
+            yield len(drop)
+
+
+# --- records outside the section ---------------------------------------------------
+
+
+@register
+class UnenrolledRecordsRule(IntegrityRule):
+    name = 'unenrolled_records'
+    description = "Attendance records for students who were never enrolled in the session's section"
+
+    def violations(self):
+        return AttendanceRecord.objects.exclude(Exists(CourseEnrollment.objects.filter(
+            student_id=OuterRef('student_id'), course_section_id=OuterRef('session__course_section_id'),
+            status__in=ATTENDED_ENROLLMENT_STATUSES,
+        )))
+
+    def count(self) -> int:
+        return self.violations().count()
+
+    def plan(self) -> Dict[str, int]:
+        counts = self.violations().aggregate(
+            generated=Count('pk', filter=Q(source='system')), marked=Count('pk', filter=~Q(source='system')),
+        )
+        # Marks somebody actually took are evidence; only generated absences are removed
+        return {'delete': counts['generated'], 'needs_review': counts['marked']}
+
+    def sample(self, limit: int) -> List[dict]:
+        return [
+            {'record_id': pk, 'session_id': session_id, 'student_id': str(student_id), 'mark': mark, 'source': source}
+            for pk, session_id, student_id, mark, source in self.violations().order_by('pk').values_list(
+                'pk', 'session_id', 'student_id', 'mark', 'source',
+            )[:limit]
+        ]
+
+    def repair_chunks(self, chunk_size: int) -> Iterator[int]:
+        for ids in keyset(self.violations().filter(source='system'), 'pk', chunk_size):
+            with transaction.atomic():
+                records = list(AttendanceRecord.objects.filter(pk__in=ids, source='system'))
+                AttendanceRecord.objects.filter(pk__in=[r.pk for r in records]).delete()
+                _audit(
+                    AttendanceAuditLog(
+                        entity_type='AttendanceRecord', entity_id=str(r.pk), action='integrity_delete',
+                        before=_record_state(r), reason='Generated record for a student not enrolled in the section',
+                        session_id=str(r.session_id), student_id=str(r.student_id),
+                    )
+                    for r in records
+                )
+            yield len(records)
+
+
+# --- snapshots -------------------------------------------------------------------
+
+
+@register
+class MissingSnapshotsRule(IntegrityRule):
+    name = 'missing_snapshots'
+    description = 'Sessions missing the student snapshot of an enrolled student'
+    auto_repair = True
+
+    def sessions(self):
+        return AttendanceSession.objects.exclude(status='cancelled').filter(Exists(
+            CourseEnrollment.objects.filter(course_section_id=OuterRef('course_section_id'), status='ENROLLED')
+            .exclude(Exists(StudentSnapshot.objects.filter(session_id=OuterRef(OuterRef('pk')), student_id=OuterRef('student_id'))))
+        ))
+
+    def missing(self, session_ids):
+        return (
+            CourseEnrollment.objects.annotate(session_id=F('course_section__attendance_sessions'))
+            .filter(status='ENROLLED', session_id__in=session_ids)
+            .exclude(Exists(StudentSnapshot.objects.filter(session_id=OuterRef('session_id'), student_id=OuterRef('student_id'))))
+            .values_list('session_id', 'student_id', 'course_section_id')
+            .order_by()
+            .distinct()
+        )
+
+    def count(self) -> int:
+        return self.sessions().count()
+
+    def plan(self) -> Dict[str, int]:
+        return {'create': self.missing(self.sessions().values('pk')).count()}
+
+    def sample(self, limit: int) -> List[dict]:
+        return [
+            {'session_id': pk, 'course_section_id': section_id, 'scheduled_date': str(day)}
+            for pk, section_id, day in self.sessions().order_by('pk').values_list('pk', 'course_section_id', 'scheduled_date')[:limit]
+        ]
+
+    def repair_chunks(self, chunk_size: int) -> Iterator[int]:
+        for session_ids in keyset(self.sessions(), 'pk', chunk_size):
+            with transaction.atomic():
+                pairs = list(self.missing(session_ids))
+                students = {
+                    row['pk']: row for row in Student.objects.filter(pk__in={p[1] for p in pairs}).values(
+                        'pk', 'roll_number', 'first_name', 'middle_name', 'last_name', 'email', 'student_mobile',
+                        'student_batch_id', 'student_batch__academic_year__year', 'student_batch__semester',
+                        'student_batch__year_of_study', 'student_batch__section',
+                    )
+                }
+                # Backfilled from current student data: the best record left of who was enrolled
+                snapshots = [
+                    StudentSnapshot(
+                        session_id=session_id, student_id=student_id, course_section_id=section_id,
+                        student_batch_id=s['student_batch_id'], roll_number=(s['roll_number'] or '')[:20],
+                        full_name=' '.join(n for n in (s['first_name'], s['middle_name'], s['last_name']) if n)[:255],
+                        email=s['email'] or '', phone=(s['student_mobile'] or '')[:15],
+                        academic_year=s['student_batch__academic_year__year'] or '',
+                        semester=s['student_batch__semester'] or '',
+                        year_of_study=s['student_batch__year_of_study'] or '', section=s['student_batch__section'] or '',
+                    )
+                    for session_id, student_id, section_id in pairs
+                    for s in (students[student_id],)
+                ]
+                StudentSnapshot.objects.bulk_create(snapshots, batch_size=1000, ignore_conflicts=True)
+            yield len(snapshots)
+
+
+# --- statistics ------------------------------------------------------------------
+
+
+def _raw_count(mark: Optional[str] = None):
+    records = AttendanceRecord.objects.filter(
+        student_id=OuterRef('student_id'), session__course_section_id=OuterRef('course_section_id'),
+        session__scheduled_date__gte=OuterRef('period_start'), session__scheduled_date__lte=OuterRef('period_end'),
+    )
+    if mark:
+        records = records.filter(mark=mark)
+    return Coalesce(Subquery(records.order_by().values('student_id').annotate(n=Count('pk')).values('n')[:1]), 0)
+
+
+def attendance_percentage(total: int, present: int, excused: int) -> Decimal:
+    """Same formula as calculate_attendance_statistics: excused sessions leave the denominator,
+    and a student with no effective sessions stands at 100%."""
+    effective = total - excused
+    if effective <= 0:
+        return Decimal('100.00')
+    return (Decimal(present) * 100 / effective).quantize(Decimal('0.01'))
+
+
+@register
+class StatisticsDriftRule(IntegrityRule):
+    name = 'statistics_drift'
+    description = 'Attendance statistics whose counts no longer match the raw records'
+    auto_repair = True
+
+    COUNTS = {
+        'total_sessions': None, 'present_count': 'present', 'absent_count': 'absent',
+        'late_count': 'late', 'excused_count': 'excused',
+    }
+
+    def drifted(self):
+        raw = {f'raw_{name}': _raw_count(mark) for name, mark in self.COUNTS.items()}
+        return AttendanceStatistics.objects.annotate(**raw).exclude(
+            **{name: F(f'raw_{name}') for name in self.COUNTS}
+        )
+
+    def count(self) -> int:
+        return self.drifted().count()
+
+    def plan(self) -> Dict[str, int]:
+        return {'recalculate': self.count()}
+
+    def sample(self, limit: int) -> List[dict]:
+        fields = list(self.COUNTS)
+        return [
+            {
+                'statistics_id': row['pk'],
+                **{name: {'stored': row[name], 'actual': row[f'raw_{name}']} for name in fields if row[name] != row[f'raw_{name}']},
+            }
+            for row in self.drifted().order_by('pk').values('pk', *fields, *(f'raw_{n}' for n in fields))[:limit]
+        ]
+
+    def repair_chunks(self, chunk_size: int) -> Iterator[int]:
+        threshold = get_attendance_settings().get('THRESHOLD_PERCENT', 75)
+        for ids in keyset(self.drifted(), 'pk', chunk_size):
+            with transaction.atomic():
+                stats = list(self.drifted().filter(pk__in=ids))
+                for s in stats:
+                    for name in self.COUNTS:
+                        setattr(s, name, getattr(s, f'raw_{name}'))
+                    s.attendance_percentage = attendance_percentage(s.total_sessions, s.present_count, s.excused_count)
+                    s.is_eligible_for_exam = s.attendance_percentage >= threshold
+                    s.last_calculated = self.now
+                AttendanceStatistics.objects.bulk_update(
+                    stats, [*self.COUNTS, 'attendance_percentage', 'is_eligible_for_exam', 'last_calculated'],
+                    batch_size=500,
+                )
+            yield len(stats)
+
+
+# --- sessions left open ------------------------------------------------------------
+
+
+@register
+class StaleOpenSessionsRule(IntegrityRule):
+    name = 'stale_open_sessions'
+    description = 'Sessions still open more than an hour after they ended'
+    auto_repair = True
+    overdue = timedelta(hours=1)
+
+    def sessions(self):
+        return AttendanceSession.objects.filter(status='open', end_datetime__lt=self.now - self.overdue)
+
+    def count(self) -> int:
+        return self.sessions().count()
+
+    def plan(self) -> Dict[str, int]:
+        return {'close': self.count()}
+
+    def sample(self, limit: int) -> List[dict]:
+        return [
+            {'session_id': pk, 'end_datetime': end.isoformat()}
+            for pk, end in self.sessions().order_by('pk').values_list('pk', 'end_datetime')[:limit]
+        ]
+
+    def repair_chunks(self, chunk_size: int) -> Iterator[int]:
+        # The same set-based close (and absent marking) the beat task uses
+        run = close_due_sessions(now=self.now, grace_minutes=int(self.overdue.total_seconds() // 60), batch_size=chunk_size)
+        for start in range(0, run.count, chunk_size):
+            yield len(run.session_ids[start:start + chunk_size])
+
+
+@dataclass
+class IntegrityReport:
+    dry_run: bool
+    rules: List[RuleReport] = field(default_factory=list)
+
+    @property
+    def found(self) -> int:
+        return sum(r.found for r in self.rules)
+
+    @property
+    def fixed(self) -> int:
+        return sum(r.fixed for r in self.rules)
+
+    def as_dict(self) -> dict:
+        return {
+            'dry_run': self.dry_run,
+            'found': self.found,
+            'fixed': self.fixed,
+            'rules': [r.as_dict() for r in self.rules],
+        }
+
+
+def check_integrity(
+    rules: Optional[Sequence[str]] = None,
+    repair: bool = False,
+    auto_only: bool = False,
+    chunk_size: int = 1000,
+    sample_size: int = 10,
+    now: Optional[datetime] = None,
+) -> IntegrityReport:
+    """Run ``rules`` (default: all); repairs only when ``repair`` is set, and with ``auto_only`` only the safe ones."""
+    report = IntegrityReport(dry_run=not repair)
+    for name, rule_class in get_rules(rules).items():
+        rule = rule_class(now=now)
+        fix = repair and (rule.auto_repair or not auto_only)
+        result = rule.check(repair=fix, chunk_size=chunk_size, sample_size=sample_size)
+        if result.found:
+            logger.warning("Integrity rule %s: %s found, %s fixed", name, result.found, result.fixed)
+        report.rules.append(result)
+    return report
@@ -0,0 +1,159 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from academics.models import Course, CourseEnrollment, CourseSection
+from attendance.biometric import apply_punches, ingest
+from attendance.models import AttendanceRecord, AttendanceSession, BiometricDevice, BiometricPunch
+from departments.models import Department
+from faculty.models import Faculty
+from students.models import AcademicYear, Student, StudentBatch
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _per_punch(device, punches):
+    """One punch per request, resolved and recorded with single-row lookups."""
+    marked = 0
+    for punch in punches:
+        with transaction.atomic():
+            student = Student.objects.filter(roll_number=punch['subject_id']).first()
+            if student is None:
+                continue
+            session = AttendanceSession.objects.filter(
+                course_section__enrollments__student=student, course_section__enrollments__status='ENROLLED',
+                status='open', start_datetime__lte=punch['timestamp'] + timedelta(minutes=5),
+                end_datetime__gte=punch['timestamp'],
+            ).first()
+            if session is None:
+                continue
+            _, created = AttendanceRecord.objects.get_or_create(
+                session=session, student=student,
+                defaults={'mark': 'present', 'source': 'biometric', 'marked_at': punch['timestamp'], 'device_id': device.device_id},
+            )
+            BiometricDevice.objects.filter(pk=device.pk).update(last_seen=timezone.now())
+            marked += created
+    return marked
+
+
+class Command(BaseCommand):
+    help = 'Benchmark biometric punch ingestion (per-punch handling vs staged batches + bulk apply)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20000, help='Students punching in (rolled back)')
+        parser.add_argument('--sections', type=int, default=500)
+        parser.add_argument('--devices', type=int, default=10)
+        parser.add_argument('--duplicates', type=float, default=0.25, help='Share of students who punch twice')
+        parser.add_argument('--webhook-batch', type=int, default=500, help='Punches per device delivery')
+        parser.add_argument('--legacy-sample', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _timed(self, label, fn, scale=1):
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+            t0 = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - t0
+        note = f'  (x{scale:.0f} extrapolated: {elapsed * scale:.1f} s, {len(queries) * scale:.0f} queries)' if scale > 1 else ''
+        self.stdout.write(f'{label:28s} {elapsed * 1000:9.1f} ms  {len(queries):6d} queries  -> {result}{note}')
+
+    def _run(self, options):
+        t0 = time.perf_counter()
+        devices, rolls, start = self._seed(options['students'], options['sections'], options['devices'])
+        self.stdout.write(f"seeded {len(rolls)} students in {options['sections']} open sessions in {time.perf_counter() - t0:.1f} s")
+
+        rng = random.Random(45)
+        punches = []
+        for roll in rolls:
+            at = start + timedelta(seconds=rng.randint(-300, 900))
+            punches.append({'subject_id': roll, 'timestamp': at, 'event_type': 'checkin'})
+            if rng.random() < options['duplicates']:
+                punches.append({'subject_id': roll, 'timestamp': at + timedelta(seconds=rng.randint(1, 20)), 'event_type': 'checkin'})
+        rng.shuffle(punches)
+        by_device = {}
+        for i, punch in enumerate(punches):
+            by_device.setdefault(devices[i % len(devices)], []).append(punch)
+
+        sample = punches[:options['legacy_sample']]
+        self._timed(f'per-punch ({len(sample)})', lambda: _per_punch(devices[0], sample), scale=len(punches) / max(len(sample), 1))
+        AttendanceRecord.objects.all().delete()
+
+        size = options['webhook_batch']
+
+        def stage():
+            total = {'received': 0, 'staged': 0, 'duplicates': 0}
+            for device, rows in by_device.items():
+                for i in range(0, len(rows), size):
+                    with transaction.atomic():
+                        for key, value in ingest(device, rows[i:i + size]).as_dict().items():
+                            total[key] += value
+            return total
+
+        self._timed(f'stage ({len(punches)} punches)', stage)
+        self._timed('apply (batch 1000)', lambda: apply_punches(batch_size=1000).as_dict())
+        self._timed('re-deliver everything', lambda: stage()['staged'])
+        self.stdout.write(
+            f'records: {AttendanceRecord.objects.count()}, punches staged: {BiometricPunch.objects.count()}'
+        )
+
+    def _seed(self, students, sections, device_count):
+        department = Department.objects.create(
+            name='Bench Biometric', short_name='BB', code='BB', email='bb@example.com', phone='+911234567890',
+            building='B', established_date=date(2000, 1, 1), description='benchmark',
+        )
+        year = AcademicYear.objects.create(year='2094-2095', start_date=date(2094, 6, 1), end_date=date(2095, 5, 31))
+        batch = StudentBatch.objects.create(
+            department=department, academic_year=year, year_of_study='1', section='A',
+            batch_name='BB-1-A', batch_code='BENCH-BB-1-A',
+        )
+        faculty = Faculty.objects.create(
+            name='Bench Faculty', email='bb-faculty@example.com', employee_id='BB-F1',
+            apaar_faculty_id='BB-APAAR-1', department_ref=department,
+        )
+        courses = Course.objects.bulk_create([
+            Course(code=f'BB{i:04d}', title=f'Bench {i}', description='benchmark') for i in range(sections)
+        ])
+        section_rows = CourseSection.objects.bulk_create([
+            CourseSection(course=course, student_batch=batch, faculty=faculty) for course in courses
+        ])
+        student_rows = Student.objects.bulk_create([
+            Student(
+                roll_number=f'BB{i:06d}', first_name='Bench', last_name=str(i), date_of_birth=date(2005, 1, 1),
+                gender='M', student_batch=batch, status='ACTIVE',
+            )
+            for i in range(students)
+        ], batch_size=1000)
+        CourseEnrollment.objects.bulk_create([
+            CourseEnrollment(student=s, course_section=section_rows[i % sections])
+            for i, s in enumerate(student_rows)
+        ], batch_size=2000)
+
+        start = timezone.now().replace(second=0, microsecond=0) - timedelta(minutes=20)
+        AttendanceSession.objects.bulk_create([
+            AttendanceSession(
+                course_section=section, faculty=faculty, scheduled_date=start.date(),
+                start_datetime=start, end_datetime=start + timedelta(hours=1), status='open',
+            )
+            for section in section_rows
+        ], batch_size=1000)
+        devices = BiometricDevice.objects.bulk_create([
+            BiometricDevice(
+                device_id=f'BB-GATE-{i}', device_name=f'Gate {i}', device_type='fingerprint',
+                location='Bench', ip_address='10.0.0.1',
+            )
+            for i in range(device_count)
+        ])
+        return devices, [s.roll_number for s in student_rows], start
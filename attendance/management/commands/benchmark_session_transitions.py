@@ -0,0 +1,147 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from academics.models import Course, CourseEnrollment, CourseSection
+from attendance.models import AttendanceAuditLog, AttendanceRecord, AttendanceSession
+from attendance.transitions import close_due_sessions, open_due_sessions
+from departments.models import Department
+from faculty.models import Faculty
+from students.models import AcademicYear, Student, StudentBatch
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_open(now, grace):
+    """The per-session loop auto_open_sessions ran before attendance.transitions."""
+    opened = 0
+    for session in AttendanceSession.objects.filter(
+        status='scheduled', start_datetime__lte=now + grace, start_datetime__gte=now - grace,
+    ):
+        with transaction.atomic():
+            session.open_session()
+            session.auto_opened = True
+            session.save(update_fields=['auto_opened'])
+            opened += 1
+            AttendanceAuditLog.objects.create(
+                entity_type='AttendanceSession', entity_id=str(session.id), action='auto_open', performed_by=None,
+                after={'status': 'open', 'auto_opened': True}, reason='Automatically opened based on schedule',
+            )
+    return opened
+
+
+def _legacy_close(now, grace):
+    """The per-session loop auto_close_sessions ran, including the per-session absent marking."""
+    closed = 0
+    for session in AttendanceSession.objects.filter(status='open', end_datetime__lt=now - grace):
+        with transaction.atomic():
+            session.close_session()
+            session.auto_closed = True
+            session.save(update_fields=['auto_closed'])
+            closed += 1
+            existing = set(session.records.values_list('student_id', flat=True))
+            AttendanceRecord.objects.bulk_create([
+                AttendanceRecord(session=session, student=e.student, mark='absent', source='system',
+                                 reason='Auto-marked absent - no attendance recorded')
+                for e in session.course_section.enrollments.filter(status='ENROLLED').select_related('student')
+                if e.student.id not in existing
+            ])
+            AttendanceAuditLog.objects.create(
+                entity_type='AttendanceSession', entity_id=str(session.id), action='auto_close', performed_by=None,
+                after={'status': 'closed', 'auto_closed': True}, reason='Automatically closed after session ended',
+            )
+    return closed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark automatic session open/close (per-session loop vs set-based transitions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=5000, help='Sessions starting at the same minute (rolled back)')
+        parser.add_argument('--students', type=int, default=20, help='Enrolled students per section')
+        parser.add_argument('--sections', type=int, default=250)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['sessions'], options['students'], options['sections'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _timed(self, label, fn):
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+            t0 = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - t0
+        self.stdout.write(f'{label:24s} {elapsed * 1000:9.1f} ms  {len(queries):6d} queries  -> {result}')
+
+    def _reset(self):
+        AttendanceSession.objects.update(
+            status='scheduled', auto_opened=False, auto_closed=False, actual_start_datetime=None, actual_end_datetime=None,
+        )
+        AttendanceRecord.objects.all().delete()
+        AttendanceAuditLog.objects.filter(entity_type='AttendanceSession').delete()
+
+    def _run(self, n, students, sections):
+        t0 = time.perf_counter()
+        start = self._seed(n, students, sections)
+        self.stdout.write(f'seeded {n} sessions over {sections} sections in {time.perf_counter() - t0:.1f} s')
+        grace = timedelta(minutes=5)
+        after_end = start + timedelta(hours=2)
+
+        self._reset()
+        self._timed(f'per-session open ({n})', lambda: _legacy_open(start, grace))
+        self._timed(f'per-session close ({n})', lambda: _legacy_close(after_end, grace))
+        self._reset()
+        self._timed(f'set-based open ({n})', lambda: open_due_sessions(now=start, grace_minutes=5).as_dict())
+        self._timed(f'set-based close ({n})', lambda: close_due_sessions(now=after_end, grace_minutes=5).as_dict())
+        self._timed('overlapping re-run', lambda: open_due_sessions(now=start, grace_minutes=5).as_dict())
+
+    def _seed(self, n, students, sections):
+        department = Department.objects.create(
+            name='Bench Sessions', short_name='BS', code='BS', email='bs@example.com', phone='+911234567890',
+            building='B', established_date=date(2000, 1, 1), description='benchmark',
+        )
+        year = AcademicYear.objects.create(year='2092-2093', start_date=date(2092, 6, 1), end_date=date(2093, 5, 31))
+        batch = StudentBatch.objects.create(
+            department=department, academic_year=year, year_of_study='1', section='A',
+            batch_name='BS-1-A', batch_code='BENCH-BS-1-A',
+        )
+        faculty = Faculty.objects.create(
+            name='Bench Faculty', email='bs-faculty@example.com', employee_id='BS-F1',
+            apaar_faculty_id='BS-APAAR-1', department_ref=department,
+        )
+        courses = Course.objects.bulk_create([
+            Course(code=f'BS{i:04d}', title=f'Bench {i}', description='benchmark') for i in range(sections)
+        ])
+        section_rows = CourseSection.objects.bulk_create([
+            CourseSection(course=course, student_batch=batch, faculty=faculty) for course in courses
+        ])
+        student_rows = Student.objects.bulk_create([
+            Student(
+                roll_number=f'BS{i:06d}', first_name='Bench', last_name=str(i), date_of_birth=date(2005, 1, 1),
+                gender='M', student_batch=batch, status='ACTIVE',
+            )
+            for i in range(students * sections)
+        ], batch_size=1000)
+        CourseEnrollment.objects.bulk_create([
+            CourseEnrollment(student=s, course_section=section_rows[i // students])
+            for i, s in enumerate(student_rows)
+        ], batch_size=2000)
+
+        start = timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+        AttendanceSession.objects.bulk_create([
+            AttendanceSession(
+                course_section=section_rows[i % sections], faculty=faculty, scheduled_date=start.date(),
+                start_datetime=start, end_datetime=start + timedelta(hours=1),
+            )
+            for i in range(n)
+        ], batch_size=1000)
+        return start
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.integrity import check_integrity, get_rules
+
+
+class Command(BaseCommand):
+    help = "Check attendance data integrity (dry run by default); --repair applies each rule's repair plan in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule', action='append', dest='rules', help='Rule to run (repeatable); default all')
+        parser.add_argument('--repair', action='store_true', help='Apply the repair plans instead of only reporting')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sample', type=int, default=10, help='Violations to show per rule')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--list', action='store_true', help='List the available rules and exit')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, rule_class in get_rules().items():
+                auto = ' (auto-repaired weekly)' if rule_class.auto_repair else ''
+                self.stdout.write(f'{name:22s} {rule_class.description}{auto}')
+            return
+        try:
+            report = check_integrity(
+                rules=options['rules'], repair=options['repair'],
+                chunk_size=options['chunk_size'], sample_size=options['sample'],
+            )
+        except KeyError as exc:
+            raise CommandError(exc.args[0])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report.as_dict(), indent=2, default=str))
+            return
+        for rule in report.rules:
+            style = self.style.WARNING if rule.found else self.style.SUCCESS
+            self.stdout.write(style(f'{rule.rule}: {rule.found} found'))
+            if rule.plan:
+                self.stdout.write(f"  plan: {', '.join(f'{k}={v}' for k, v in rule.plan.items())}")
+            for item in rule.sample:
+                self.stdout.write(f'  - {item}')
+            if rule.repaired:
+                self.stdout.write(self.style.SUCCESS(f'  fixed {rule.fixed} in {rule.chunks} chunk(s)'))
+        mode = 'repaired' if options['repair'] else 'dry run, nothing changed'
+        self.stdout.write(f'{report.found} issue(s) found, {report.fixed} fixed ({mode})')
@@ -0,0 +1,50 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_session_due_indexes'),
+        ('students', '0020_merge_0002_initial_0019_add_missing_fields_to_caste'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='biometricdevice',
+            name='ingest_lag_seconds',
+            field=models.PositiveIntegerField(blank=True, help_text='Delay between the newest punch and its arrival, for the last batch', null=True),
+        ),
+        migrations.AddField(
+            model_name='biometricdevice',
+            name='last_punch_at',
+            field=models.DateTimeField(blank=True, help_text='Newest punch received from the device', null=True),
+        ),
+        migrations.CreateModel(
+            name='BiometricPunch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_id', models.CharField(help_text='Template hash or roll number sent by the device', max_length=64)),
+                ('event_type', models.CharField(choices=[('checkin', 'Check-in'), ('checkout', 'Check-out')], default='checkin', max_length=10)),
+                ('punched_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(choices=[('webhook', 'Webhook'), ('file', 'File Drop')], default='webhook', max_length=10)),
+                ('vendor_event_id', models.CharField(blank=True, max_length=128)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('dedupe_key', models.CharField(help_text='device:subject:time window', max_length=200, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('applied', 'Applied'), ('skipped', 'Already Marked'), ('unmatched', 'Unmatched')], default='pending', max_length=10)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punches', to='attendance.biometricdevice')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='biometric_punches', to='attendance.attendancesession')),
+                ('student', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='biometric_punches', to='students.student')),
+            ],
+            options={
+                'db_table': 'attendance_biometric_punch',
+                'indexes': [
+                    models.Index(fields=['status', 'id'], name='attendance__status_7ffe1b_idx'),
+                    models.Index(fields=['device', 'punched_at'], name='attendance__device__c2d27f_idx'),
+                ],
+            },
+        ),
+    ]
@@ -445,6 +445,9 @@ class AttendanceSession(TimeStampedModel):
         indexes = [
             models.Index(fields=["course_section", "scheduled_date"]),
             models.Index(fields=["status"]),
+            # Due-session scans of attendance.transitions
+            models.Index(fields=["status", "start_datetime"]),
+            models.Index(fields=["status", "end_datetime"]),
             models.Index(fields=["faculty", "scheduled_date"]),
             models.Index(fields=["qr_token"]),
             models.Index(fields=["offline_sync_token"]),
@@ -1276,6 +1279,12 @@ class BiometricDevice(TimeStampedModel):
     api_endpoint = models.URLField(blank=True)
     api_key = models.CharField(max_length=255, blank=True)
 
+    # Ingestion health, updated per staged batch
+    last_punch_at = models.DateTimeField(null=True, blank=True, help_text="Newest punch received from the device")
+    ingest_lag_seconds = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Delay between the newest punch and its arrival, for the last batch"
+    )
+
     class Meta:
         db_table = "attendance_biometric_device"
 
@@ -1323,6 +1332,61 @@ class BiometricTemplate(TimeStampedModel):
         return f"{self.student.roll_number} - {self.device.device_name}"
 
 
+class BiometricPunch(models.Model):
+    """
+    Append-only staging row for one punch received from a device.
+    Punches are written as they arrive (webhook or file drop) and applied to
+    attendance records later by ``attendance.biometric.apply_punches``, which
+    only fills in the resolution columns.
+    """
+    EVENT_TYPES = [
+        ("checkin", "Check-in"),
+        ("checkout", "Check-out"),
+    ]
+
+    SOURCE_CHOICES = [
+        ("webhook", "Webhook"),
+        ("file", "File Drop"),
+    ]
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("applied", "Applied"),
+        ("skipped", "Already Marked"),
+        ("unmatched", "Unmatched"),
+    ]
+
+    device = models.ForeignKey(BiometricDevice, on_delete=models.CASCADE, related_name="punches")
+    subject_id = models.CharField(max_length=64, help_text="Template hash or roll number sent by the device")
+    event_type = models.CharField(max_length=10, choices=EVENT_TYPES, default="checkin")
+    punched_at = models.DateTimeField()
+    received_at = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default="webhook")
+    vendor_event_id = models.CharField(max_length=128, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    dedupe_key = models.CharField(max_length=200, unique=True, help_text="device:subject:time window")
+
+    # Resolution
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    student = models.ForeignKey(
+        'students.Student', on_delete=models.SET_NULL, null=True, blank=True, related_name="biometric_punches"
+    )
+    session = models.ForeignKey(
+        AttendanceSession, on_delete=models.SET_NULL, null=True, blank=True, related_name="biometric_punches"
+    )
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"]),
+            models.Index(fields=["device", "punched_at"]),
+        ]
+        db_table = "attendance_biometric_punch"
+
+    def __str__(self):
+        return f"{self.device_id}:{self.subject_id} @ {self.punched_at} [{self.status}]"
+
+
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
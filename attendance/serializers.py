@@ -4,6 +4,7 @@ DRF serializers for production-ready attendance system
 """
 
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils import timezone
@@ -760,19 +761,26 @@ class AttendanceExportSerializer(serializers.Serializer):
         return data
 
 
-class BiometricWebhookSerializer(serializers.Serializer):
-    """Serializer for biometric device webhook data"""
-    device_id = serializers.CharField()
-    subject_id = serializers.CharField()
-    event_type = serializers.ChoiceField(choices=['checkin', 'checkout'])
+class BiometricPunchSerializer(serializers.Serializer):
+    """One punch inside a device batch"""
+    subject_id = serializers.CharField(max_length=64)
+    event_type = serializers.ChoiceField(choices=['checkin', 'checkout'], default='checkin')
     timestamp = serializers.DateTimeField()
-    vendor_event_id = serializers.CharField()
-    location = serializers.CharField(required=False)
+    vendor_event_id = serializers.CharField(max_length=128, required=False, allow_blank=True)
     additional_data = serializers.JSONField(required=False)
 
     def validate_timestamp(self, value):
-        """Validate timestamp is not too old"""
+        """Validate timestamp is neither in the future nor too old"""
         now = timezone.now()
-        if (now - value).total_seconds() > 3600:  # 1 hour
+        if value > now + timedelta(minutes=5):
+            raise serializers.ValidationError("Timestamp is in the future")
+        max_age = getattr(settings, 'ATTENDANCE_BIOMETRIC_MAX_PUNCH_AGE_MINUTES', 60)
+        if now - value > timedelta(minutes=max_age):
             raise serializers.ValidationError("Timestamp is too old")
         return value
+
+
+class BiometricPunchBatchSerializer(serializers.Serializer):
+    """Batch of punches from one device (webhook payload)"""
+    device_id = serializers.CharField(max_length=100)
+    punches = BiometricPunchSerializer(many=True, allow_empty=False, max_length=5000)
@@ -4,12 +4,15 @@ Background tasks for attendance system automation
 """
 
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Q, Count, Avg, F
+from django.db.models import Q, Avg, F
 from datetime import datetime, timedelta, date
 import logging
 
+from notifications.outbox import Message, enqueue
+
 from .models import (
     AttendanceConfiguration,
     TimetableSlot,
@@ -20,6 +23,9 @@ from .models import (
     get_attendance_settings,
     generate_sessions_from_timetable,
 )
+from .biometric import apply_punches, ingest_drop_dir
+from .integrity import check_integrity
+from .transitions import close_due_sessions, open_due_sessions
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +34,8 @@ logger = logging.getLogger(__name__)
 def auto_open_sessions(self):
     """
     Automatically open attendance sessions based on timetable.
-    Runs every minute to check for sessions that should be opened.
+    Runs every minute; due sessions are opened in set-based batches
+    (see attendance.transitions), so overlapping runs are harmless.
     """
     try:
         settings_dict = get_attendance_settings()
@@ -36,41 +43,9 @@ def auto_open_sessions(self):
             logger.info("Auto-open sessions is disabled")
             return
         
-        now = timezone.now()
-        grace_minutes = settings_dict.get('GRACE_PERIOD_MINUTES', 5)
-        
-        # Find sessions that should be opened (scheduled and within grace period)
-        sessions_to_open = AttendanceSession.objects.filter(
-            status='scheduled',
-            start_datetime__lte=now + timedelta(minutes=grace_minutes),
-            start_datetime__gte=now - timedelta(minutes=grace_minutes)
-        )
-        
-        opened_count = 0
-        for session in sessions_to_open:
-            try:
-                with transaction.atomic():
-                    session.open_session()
-                    session.auto_opened = True
-                    session.save(update_fields=['auto_opened'])
-                    opened_count += 1
-                    
-                    # Log the action
-                    AttendanceAuditLog.objects.create(
-                        entity_type="AttendanceSession",
-                        entity_id=str(session.id),
-                        action="auto_open",
-                        performed_by=None,
-                        after={"status": "open", "auto_opened": True},
-                        reason="Automatically opened based on schedule"
-                    )
-                    
-            except Exception as e:
-                logger.error(f"Failed to auto-open session {session.id}: {str(e)}")
-                continue
-        
-        logger.info(f"Auto-opened {opened_count} attendance sessions")
-        return f"Opened {opened_count} sessions"
+        run = open_due_sessions(grace_minutes=settings_dict.get('GRACE_PERIOD_MINUTES', 5))
+        logger.info(f"Auto-opened {run.count} attendance sessions")
+        return f"Opened {run.count} sessions"
         
     except Exception as exc:
         logger.error(f"Auto-open sessions task failed: {str(exc)}")
@@ -81,7 +56,8 @@ def auto_open_sessions(self):
 def auto_close_sessions(self):
     """
     Automatically close attendance sessions that have ended.
-    Runs every minute to check for sessions that should be closed.
+    Runs every minute; closes due sessions in set-based batches and
+    auto-marks missing students absent when AUTO_MARK_ABSENT is on.
     """
     try:
         settings_dict = get_attendance_settings()
@@ -89,79 +65,20 @@ def auto_close_sessions(self):
             logger.info("Auto-close sessions is disabled")
             return
         
-        now = timezone.now()
-        grace_minutes = settings_dict.get('GRACE_PERIOD_MINUTES', 5)
-        
-        # Find sessions that should be closed (open and past end time + grace period)
-        sessions_to_close = AttendanceSession.objects.filter(
-            status='open',
-            end_datetime__lt=now - timedelta(minutes=grace_minutes)
+        run = close_due_sessions(
+            grace_minutes=settings_dict.get('GRACE_PERIOD_MINUTES', 5),
+            mark_absent_students=settings_dict.get('AUTO_MARK_ABSENT', True),
         )
-        
-        closed_count = 0
-        for session in sessions_to_close:
-            try:
-                with transaction.atomic():
-                    session.close_session()
-                    session.auto_closed = True
-                    session.save(update_fields=['auto_closed'])
-                    closed_count += 1
-                    
-                    # Auto-mark absent students if enabled
-                    if settings_dict.get('AUTO_MARK_ABSENT', True):
-                        _auto_mark_absent_students(session)
-                    
-                    # Log the action
-                    AttendanceAuditLog.objects.create(
-                        entity_type="AttendanceSession",
-                        entity_id=str(session.id),
-                        action="auto_close",
-                        performed_by=None,
-                        after={"status": "closed", "auto_closed": True},
-                        reason="Automatically closed after session ended"
-                    )
-                    
-            except Exception as e:
-                logger.error(f"Failed to auto-close session {session.id}: {str(e)}")
-                continue
-        
-        logger.info(f"Auto-closed {closed_count} attendance sessions")
-        return f"Closed {closed_count} sessions"
+        if run.absent_marked:
+            logger.info(f"Auto-marked {run.absent_marked} students as absent")
+        logger.info(f"Auto-closed {run.count} attendance sessions")
+        return f"Closed {run.count} sessions"
         
     except Exception as exc:
         logger.error(f"Auto-close sessions task failed: {str(exc)}")
         raise self.retry(exc=exc, countdown=60)
 
 
-def _auto_mark_absent_students(session):
-    """Helper function to auto-mark absent students"""
-    # Get enrolled students who don't have attendance records
-    enrolled_students = session.course_section.enrollments.filter(
-        status='ENROLLED'
-    ).select_related('student')
-    
-    existing_records = set(
-        session.records.values_list('student_id', flat=True)
-    )
-    
-    absent_records = []
-    for enrollment in enrolled_students:
-        if enrollment.student.id not in existing_records:
-            absent_records.append(
-                AttendanceRecord(
-                    session=session,
-                    student=enrollment.student,
-                    mark='absent',
-                    source='system',
-                    reason='Auto-marked absent - no attendance recorded'
-                )
-            )
-    
-    if absent_records:
-        AttendanceRecord.objects.bulk_create(absent_records)
-        logger.info(f"Auto-marked {len(absent_records)} students as absent for session {session.id}")
-
-
 @shared_task(bind=True, max_retries=3)
 def generate_sessions_for_range(self, start_date=None, end_date=None, course_sections=None):
     """
@@ -380,31 +297,37 @@ def send_attendance_notifications(self):
             attendance_percentage__lt=warning_threshold,
             attendance_percentage__gte=warning_threshold - 20,  # Only warn if not too low
             is_eligible_for_exam=False
-        ).select_related('student', 'course_section')
+        ).select_related('student', 'course_section__course', 'course_section__student_batch')
         
-        notification_count = 0
-        for stats in low_attendance_students:
-            try:
-                # Send notification (placeholder - implement actual notification logic)
-                _send_low_attendance_warning(stats.student, stats.course_section, stats.attendance_percentage)
-                notification_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send notification to student {stats.student.id}: {str(e)}")
-                continue
+        today = timezone.localdate().isoformat()
+        messages = [
+            _low_attendance_message(stats, today)
+            for stats in low_attendance_students
+            if stats.student.user_id
+        ]
+        fan_out = enqueue('attendance', messages)
         
-        logger.info(f"Sent {notification_count} low attendance warnings")
-        return f"Sent {notification_count} notifications"
+        logger.info(f"Queued {len(messages)} low attendance warnings: {fan_out.as_dict()}")
+        return f"Sent {len(messages)} notifications"
         
     except Exception as exc:
         logger.error(f"Send attendance notifications task failed: {str(exc)}")
         raise self.retry(exc=exc, countdown=3600)
 
 
-def _send_low_attendance_warning(student, course_section, attendance_percentage):
-    """Helper function to send low attendance warning"""
-    # Placeholder for actual notification implementation
-    # This could send email, SMS, push notification, etc.
-    logger.info(f"Low attendance warning for {student.roll_number}: {attendance_percentage}% in {course_section}")
+def _low_attendance_message(stats, day):
+    """Low attendance warning for the notification outbox (one per statistics row per day)"""
+    percentage = stats.attendance_percentage
+    return Message(
+        recipient=stats.student.user_id,
+        subject=f"Low attendance warning: {stats.course_section}",
+        body=(
+            f"Your attendance in {stats.course_section} is {percentage}%, "
+            f"below the level required for exam eligibility."
+        ),
+        context={'course_section_id': stats.course_section_id, 'attendance_percentage': float(percentage)},
+        dedupe_key=f"low-attendance:{stats.pk}:{day}",
+    )
 
 
 @shared_task(bind=True, max_retries=3)
@@ -412,9 +335,10 @@ def sync_biometric_data(self, device_id=None):
     """
     Sync biometric attendance data from devices.
     Can be run for specific devices or all active devices.
+    Stages each device's dropped punch files, then applies everything pending.
     """
     try:
-        from .models_enhanced import BiometricDevice
+        from .models import BiometricDevice
         
         if device_id:
             devices = BiometricDevice.objects.filter(id=device_id, is_enabled=True)
@@ -424,15 +348,14 @@ def sync_biometric_data(self, device_id=None):
         synced_count = 0
         for device in devices:
             try:
-                # Placeholder for actual biometric sync logic
-                # This would connect to the biometric device API and sync data
                 _sync_device_data(device)
                 synced_count += 1
             except Exception as e:
                 logger.error(f"Failed to sync device {device.device_id}: {str(e)}")
                 continue
         
-        logger.info(f"Synced data from {synced_count} biometric devices")
+        run = apply_punches()
+        logger.info(f"Synced data from {synced_count} biometric devices: {run.as_dict()}")
         return f"Synced {synced_count} devices"
         
     except Exception as exc:
@@ -441,14 +364,27 @@ def sync_biometric_data(self, device_id=None):
 
 
 def _sync_device_data(device):
-    """Helper function to sync data from a biometric device"""
-    # Placeholder for actual device sync implementation
-    # This would:
-    # 1. Connect to device API
-    # 2. Fetch attendance records
-    # 3. Create AttendanceRecord objects
-    # 4. Update device last_seen timestamp
-    logger.info(f"Syncing data from device {device.device_id}")
+    """Stage the punch files the device dropped in ATTENDANCE_BIOMETRIC_DROP_DIR/<device_id>/"""
+    report = ingest_drop_dir(device)
+    logger.info(f"Syncing data from device {device.device_id}: {report.as_dict()}")
+    return report
+
+
+@shared_task(bind=True, max_retries=3)
+def process_biometric_punches(self):
+    """
+    Apply staged biometric punches to attendance records.
+    Runs every few seconds; pending punches are claimed in batches
+    (see attendance.biometric), so overlapping runs are harmless.
+    """
+    try:
+        run = apply_punches(batch_size=getattr(settings, 'ATTENDANCE_BIOMETRIC_BATCH_SIZE', 1000))
+        if run.created or run.updated or run.unmatched:
+            logger.info(f"Applied biometric punches: {run.as_dict()}")
+        return run.as_dict()
+    except Exception as exc:
+        logger.error(f"Process biometric punches task failed: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
 
 
 @shared_task(bind=True, max_retries=3)
@@ -549,56 +485,18 @@ def process_offline_attendance_sync(self, sync_data):
 
 
 @shared_task(bind=True, max_retries=3)
-def validate_attendance_data_integrity(self):
+def validate_attendance_data_integrity(self, repair=True):
     """
     Validate attendance data integrity and fix inconsistencies.
-    Runs weekly to check for data integrity issues.
+    Runs weekly; every rule in attendance.integrity is checked and the ones
+    safe to fix unattended (derived data, stale sessions) are repaired.
+    Duplicates and records outside the section are only reported here -
+    repair them with `manage.py check_attendance_integrity --repair`.
     """
     try:
-        issues_found = 0
-        issues_fixed = 0
-        
-        # Check for orphaned records
-        orphaned_records = AttendanceRecord.objects.filter(
-            session__isnull=True
-        )
-        orphaned_count = orphaned_records.count()
-        if orphaned_count > 0:
-            logger.warning(f"Found {orphaned_count} orphaned attendance records")
-            issues_found += orphaned_count
-        
-        # Check for duplicate records
-        duplicates = AttendanceRecord.objects.values('session', 'student').annotate(
-            count=Count('id')
-        ).filter(count__gt=1)
-        
-        duplicate_count = duplicates.count()
-        if duplicate_count > 0:
-            logger.warning(f"Found {duplicate_count} duplicate attendance records")
-            issues_found += duplicate_count
-        
-        # Check for invalid session statuses
-        invalid_sessions = AttendanceSession.objects.filter(
-            status='open',
-            end_datetime__lt=timezone.now() - timedelta(hours=1)
-        )
-        invalid_count = invalid_sessions.count()
-        if invalid_count > 0:
-            logger.warning(f"Found {invalid_count} sessions that should be closed")
-            issues_found += invalid_count
-            
-            # Auto-close invalid sessions
-            for session in invalid_sessions:
-                try:
-                    session.close_session()
-                    session.auto_closed = True
-                    session.save(update_fields=['auto_closed'])
-                    issues_fixed += 1
-                except Exception as e:
-                    logger.error(f"Failed to close invalid session {session.id}: {str(e)}")
-        
-        logger.info(f"Data integrity check: {issues_found} issues found, {issues_fixed} fixed")
-        return f"Found {issues_found} issues, fixed {issues_fixed}"
+        report = check_integrity(repair=repair, auto_only=True)
+        logger.info(f"Data integrity check: {report.found} issues found, {report.fixed} fixed")
+        return report.as_dict()
         
     except Exception as exc:
         logger.error(f"Validate attendance data integrity task failed: {str(exc)}")
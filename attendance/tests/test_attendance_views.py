@@ -13,7 +13,7 @@ from unittest.mock import patch
 
 from attendance.models import (
     AttendanceSession, AttendanceRecord, AttendanceCorrectionRequest,
-    LeaveApplication, get_attendance_settings
+    LeaveApplication, BiometricDevice, get_attendance_settings
 )
 from attendance.factories import (
     AttendanceSessionFactory, AttendanceRecordFactory,
@@ -887,6 +887,9 @@ class TestBiometricWebhookView(APITestCase):
 
     def test_biometric_webhook_success(self):
         """Test successful biometric webhook"""
+        BiometricDevice.objects.create(
+            device_id='DEV001', device_name='Gate 1', device_type='fingerprint', location='Main gate', ip_address='10.0.0.1'
+        )
         url = reverse('biometric-webhook')
         
         data = {
@@ -0,0 +1,118 @@
+"""
+Tests for biometric punch staging and bulk application (attendance.biometric).
+"""
+
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from attendance.biometric import apply_punches, ingest, ingest_drop_dir
+from attendance.factories import TimedSessionMixin
+from attendance.models import AttendanceRecord, BiometricDevice, BiometricPunch, BiometricTemplate
+
+
+class TestBiometricPunches(TimedSessionMixin, TestCase):
+    session_defaults = {'status': 'open', 'room': 'A101'}
+
+    def setUp(self):
+        super().setUp()
+        self.device = BiometricDevice.objects.create(
+            device_id='GATE-1', device_name='Gate 1', device_type='fingerprint', location='Block A',
+            room='A101', ip_address='10.0.0.1', api_key='secret',
+        )
+        self.students = self._enroll(4)
+
+    def _punch(self, subject, at):
+        return {'subject_id': subject, 'timestamp': at, 'event_type': 'checkin', 'vendor_event_id': f'v-{subject}-{at:%H%M%S}'}
+
+    def test_ingest_deduplicates_within_window_and_tracks_device_lag(self):
+        roll = self.students[0].roll_number
+        batch = [
+            self._punch(roll, self.now - timedelta(minutes=2)),
+            self._punch(roll, self.now - timedelta(minutes=2) + timedelta(seconds=10)),  # same finger twice
+            self._punch(self.students[1].roll_number, self.now - timedelta(minutes=1)),
+        ]
+        report = ingest(self.device, batch, now=self.now)
+        self.assertEqual(report.as_dict(), {'received': 3, 'staged': 2, 'duplicates': 1})
+
+        # The device retries the same batch
+        self.assertEqual(ingest(self.device, batch, now=self.now).staged, 0)
+        self.assertEqual(BiometricPunch.objects.count(), 2)
+
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.last_punch_at, self.now - timedelta(minutes=1))
+        self.assertEqual(self.device.ingest_lag_seconds, 60)
+        self.assertEqual(self.device.last_seen, self.now)
+
+    def test_apply_upserts_records_for_the_matching_session(self):
+        session = self._session(-timedelta(minutes=20))
+        closed = self._session(-timedelta(hours=3), status='closed')
+        on_time, late, template_user, marked = self.students
+        BiometricTemplate.objects.create(student=template_user, device=self.device, template_data='x', template_hash='hash-3')
+        AttendanceRecord.objects.create(session=session, student=marked, mark='excused', source='manual')
+        AttendanceRecord.objects.create(session=closed, student=on_time, mark='absent', source='system')
+
+        ingest(self.device, [
+            self._punch(on_time.roll_number, session.start_datetime - timedelta(minutes=3)),
+            self._punch(on_time.roll_number, session.start_datetime + timedelta(minutes=10)),
+            self._punch(late.roll_number, session.start_datetime + timedelta(minutes=12)),
+            self._punch('hash-3', session.start_datetime + timedelta(minutes=1)),
+            self._punch(marked.roll_number, session.start_datetime),
+            self._punch('unknown-finger', session.start_datetime),
+            # Delivered late for a session that has since been auto-closed
+            self._punch(on_time.roll_number, closed.start_datetime + timedelta(minutes=2)),
+        ], now=self.now)
+
+        run = apply_punches(batch_size=4, now=self.now)
+        self.assertEqual(run.as_dict(), {'batches': 2, 'created': 3, 'updated': 1, 'skipped': 2, 'unmatched': 1})
+
+        marks = dict(AttendanceRecord.objects.filter(session=session).values_list('student_id', 'mark'))
+        self.assertEqual(marks, {on_time.pk: 'present', late.pk: 'late', template_user.pk: 'present', marked.pk: 'excused'})
+        upgraded = AttendanceRecord.objects.get(session=closed, student=on_time)
+        self.assertEqual((upgraded.mark, upgraded.source, upgraded.device_id), ('present', 'biometric', 'GATE-1'))
+        self.assertEqual(BiometricPunch.objects.get(subject_id='unknown-finger').status, 'unmatched')
+        self.assertFalse(BiometricPunch.objects.filter(status='pending').exists())
+
+        # Nothing left to apply
+        self.assertEqual(apply_punches(now=self.now).as_dict()['created'], 0)
+
+    def test_drop_dir_files_are_staged_once(self):
+        roll = self.students[0].roll_number
+        with tempfile.TemporaryDirectory() as drop:
+            directory = Path(drop) / 'GATE-1'
+            directory.mkdir()
+            (directory / 'punches.csv').write_text(
+                'subject_id,timestamp,event_type\n'
+                f'{roll},{(self.now - timedelta(hours=5)).isoformat()},checkin\n'
+                'broken-row,,checkin\n'
+            )
+            report = ingest_drop_dir(self.device, drop)
+            self.assertEqual((report.received, report.staged), (1, 1))
+            self.assertTrue((directory / 'punches.csv.done').exists())
+            self.assertEqual(ingest_drop_dir(self.device, drop).received, 0)
+        self.assertEqual(BiometricPunch.objects.get().source, 'file')
+
+    @override_settings(ATTENDANCE_BIOMETRIC_MAX_PUNCH_AGE_MINUTES=60)
+    def test_webhook_accepts_batches_from_authenticated_devices(self):
+        client = APIClient()
+        url = reverse('biometric-webhook')
+        payload = {
+            'device_id': 'GATE-1',
+            'punches': [
+                {'subject_id': s.roll_number, 'timestamp': (self.now - timedelta(minutes=1)).isoformat()}
+                for s in self.students
+            ],
+        }
+        self.assertEqual(client.post(url, payload, format='json').status_code, status.HTTP_403_FORBIDDEN)
+        response = client.post(url, payload, format='json', HTTP_X_DEVICE_KEY='secret')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['staged'], 4)
+        self.assertEqual(BiometricPunch.objects.filter(status='pending').count(), 4)
+
+        payload['device_id'] = 'GATE-404'
+        self.assertEqual(client.post(url, payload, format='json').status_code, status.HTTP_404_NOT_FOUND)
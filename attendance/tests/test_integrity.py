@@ -0,0 +1,142 @@
+"""
+Tests for the attendance integrity rules (attendance.integrity).
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from attendance.factories import StudentFactory, TimedSessionMixin
+from attendance.integrity import IntegrityRule, attendance_percentage, check_integrity, plan_duplicate_merge
+from attendance.models import AttendanceAuditLog, AttendanceRecord, AttendanceSession, AttendanceStatistics, StudentSnapshot
+
+
+class TestIntegrityRules(TimedSessionMixin, TestCase):
+    session_defaults = {'status': 'closed'}
+
+    def setUp(self):
+        super().setUp()
+        self.enrolled = self._enroll(3)
+        self.outsider = StudentFactory(student_batch=self.section.student_batch)
+
+    def _rule(self, report, name):
+        return next(r for r in report.rules if r.rule == name)
+
+    def test_dry_run_reports_without_changing_anything(self):
+        session = self._session(-timedelta(hours=3))
+        AttendanceRecord.objects.create(session=session, student=self.outsider, mark='absent', source='system')
+        before = AttendanceRecord.objects.count()
+
+        report = check_integrity(rules=['unenrolled_records', 'missing_snapshots'], now=self.now)
+        self.assertTrue(report.dry_run)
+        self.assertEqual(self._rule(report, 'unenrolled_records').plan, {'delete': 1, 'needs_review': 0})
+        self.assertEqual(self._rule(report, 'missing_snapshots').plan, {'create': 3})
+        self.assertEqual(report.fixed, 0)
+        self.assertEqual(AttendanceRecord.objects.count(), before)
+        self.assertFalse(StudentSnapshot.objects.exists())
+
+    def test_unenrolled_repair_only_removes_generated_records(self):
+        session = self._session(-timedelta(hours=3))
+        generated = AttendanceRecord.objects.create(session=session, student=self.outsider, mark='absent', source='system')
+        taken = AttendanceRecord.objects.create(
+            session=self._session(-timedelta(days=1)), student=self.outsider, mark='present', source='manual',
+        )
+        kept = AttendanceRecord.objects.create(session=session, student=self.enrolled[0], mark='absent', source='system')
+
+        rule = self._rule(check_integrity(rules=['unenrolled_records'], repair=True, chunk_size=1, now=self.now), 'unenrolled_records')
+        self.assertEqual((rule.found, rule.fixed), (2, 1))
+        self.assertFalse(AttendanceRecord.objects.filter(pk=generated.pk).exists())
+        self.assertEqual(AttendanceRecord.objects.filter(pk__in=[taken.pk, kept.pk]).count(), 2)
+        audit = AttendanceAuditLog.objects.get(action='integrity_delete')
+        self.assertEqual(audit.before['id'], generated.pk)
+
+    def test_missing_snapshots_are_backfilled_in_chunks(self):
+        sessions = [self._session(-timedelta(days=d)) for d in (1, 2, 3)]
+        cancelled = self._session(-timedelta(days=4), status='cancelled')
+        StudentSnapshot.create_snapshot(sessions[0], self.enrolled[0])
+
+        rule = self._rule(check_integrity(rules=['missing_snapshots'], repair=True, chunk_size=2, now=self.now), 'missing_snapshots')
+        self.assertEqual((rule.found, rule.fixed, rule.chunks), (3, 8, 2))
+        for session in sessions:
+            self.assertEqual(StudentSnapshot.objects.filter(session=session).count(), 3)
+        self.assertFalse(StudentSnapshot.objects.filter(session=cancelled).exists())
+        snapshot = StudentSnapshot.objects.get(session=sessions[1], student=self.enrolled[1])
+        self.assertEqual(snapshot.roll_number, self.enrolled[1].roll_number)
+        self.assertEqual(snapshot.full_name, self.enrolled[1].full_name)
+
+    def test_statistics_drift_is_recalculated_from_raw_records(self):
+        student = self.enrolled[0]
+        marks = ['present', 'present', 'late', 'absent', 'excused']
+        sessions = [self._session(-timedelta(days=d + 1)) for d in range(len(marks))]
+        for session, mark in zip(sessions, marks):
+            AttendanceRecord.objects.create(session=session, student=student, mark=mark, source='manual')
+        period = {'period_start': date(2000, 1, 1), 'period_end': self.now.date()}
+        drifted = AttendanceStatistics.objects.create(
+            student=student, course_section=self.section, academic_year='2025-2026', semester='1',
+            total_sessions=2, present_count=2, **period,
+        )
+        accurate = AttendanceStatistics.objects.create(
+            student=self.enrolled[1], course_section=self.section, academic_year='2025-2026', semester='1', **period,
+        )
+
+        rule = self._rule(check_integrity(rules=['statistics_drift'], repair=True, now=self.now), 'statistics_drift')
+        self.assertEqual((rule.found, rule.fixed), (1, 1))
+        self.assertEqual(rule.sample[0]['total_sessions'], {'stored': 2, 'actual': 5})
+        drifted.refresh_from_db()
+        self.assertEqual(
+            (drifted.total_sessions, drifted.present_count, drifted.absent_count, drifted.late_count, drifted.excused_count),
+            (5, 2, 1, 1, 1),
+        )
+        self.assertEqual(drifted.attendance_percentage, Decimal('50.00'))
+        self.assertFalse(drifted.is_eligible_for_exam)
+        self.assertEqual(check_integrity(rules=['statistics_drift'], now=self.now).found, 0)
+        accurate.refresh_from_db()
+        self.assertEqual(accurate.total_sessions, 0)
+
+    def test_weekly_task_mode_repairs_only_safe_rules(self):
+        stale = self._session(-timedelta(hours=4), status='open')
+        session = self._session(-timedelta(hours=3))
+        AttendanceRecord.objects.create(session=session, student=self.outsider, mark='absent', source='system')
+
+        report = check_integrity(repair=True, auto_only=True, now=self.now)
+        self.assertEqual(self._rule(report, 'stale_open_sessions').fixed, 1)
+        self.assertFalse(self._rule(report, 'unenrolled_records').repaired)
+        self.assertEqual(AttendanceSession.objects.get(pk=stale.pk).status, 'closed')
+        self.assertTrue(AttendanceRecord.objects.filter(student=self.outsider).exists())
+
+    def test_duplicate_merge_keeps_the_deliberate_mark(self):
+        then = self.now - timedelta(hours=1)
+        records = [
+            SimpleNamespace(pk=1, source='system', updated_at=self.now),
+            SimpleNamespace(pk=2, source='manual', updated_at=then),
+            SimpleNamespace(pk=3, source='biometric', updated_at=self.now),
+            SimpleNamespace(pk=4, source='manual', updated_at=self.now),
+        ]
+        keep, drop = plan_duplicate_merge(records)
+        self.assertEqual(keep.pk, 4)
+        self.assertEqual(sorted(r.pk for r in drop), [1, 2, 3])
+
+    def test_percentage_matches_the_statistics_task(self):
+        self.assertEqual(attendance_percentage(4, 3, 0), Decimal('75.00'))
+        self.assertEqual(attendance_percentage(4, 1, 2), Decimal('50.00'))
+        # No effective sessions: 100%, as calculate_attendance_statistics has it
+        self.assertEqual(attendance_percentage(2, 0, 2), Decimal('100.00'))
+        self.assertEqual(attendance_percentage(0, 0, 0), Decimal('100.00'))
+        with self.assertRaises(TypeError):
+            IntegrityRule()
+
+    def test_management_command_lists_rules_and_rejects_unknown_ones(self):
+        out = StringIO()
+        call_command('check_attendance_integrity', '--list', stdout=out)
+        for name in ('duplicate_records', 'unenrolled_records', 'missing_snapshots', 'statistics_drift', 'stale_open_sessions'):
+            self.assertIn(name, out.getvalue())
+        out = StringIO()
+        call_command('check_attendance_integrity', '--rule', 'duplicate_records', stdout=out)
+        self.assertIn('dry run, nothing changed', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('check_attendance_integrity', '--rule', 'nope', stdout=StringIO())
@@ -0,0 +1,86 @@
+"""
+Tests for the set-based session open/close engine (attendance.transitions).
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from attendance.factories import TimedSessionMixin
+from attendance.models import AttendanceAuditLog, AttendanceRecord, AttendanceSession
+from attendance.transitions import close_due_sessions, open_due_sessions
+
+
+class TestSessionTransitions(TimedSessionMixin, TestCase):
+
+    def _audits(self, action):
+        return AttendanceAuditLog.objects.filter(entity_type='AttendanceSession', action=action)
+
+    def test_open_due_sessions_is_batched_and_idempotent(self):
+        due = [self._session(timedelta(minutes=m)) for m in (-4, 0, 2, 4)]
+        early = self._session(timedelta(minutes=30))
+        stale = self._session(timedelta(minutes=-20))
+        already_open = self._session(timedelta(minutes=1), status='open')
+
+        run = open_due_sessions(now=self.now, grace_minutes=5, batch_size=3)
+        self.assertEqual(sorted(run.session_ids), sorted(s.pk for s in due))
+        self.assertEqual(run.batches, 2)
+        for session in due:
+            session.refresh_from_db()
+            self.assertEqual(session.status, 'open')
+            self.assertTrue(session.auto_opened)
+            self.assertEqual(session.actual_start_datetime, self.now)
+        for session in (early, stale):
+            session.refresh_from_db()
+            self.assertEqual(session.status, 'scheduled')
+        self.assertEqual(self._audits('auto_open').count(), 4)
+        self.assertFalse(self._audits('auto_open').filter(entity_id=str(already_open.pk)).exists())
+
+        # An overlapping beat run finds nothing left to do
+        self.assertEqual(open_due_sessions(now=self.now, grace_minutes=5).count, 0)
+        self.assertEqual(self._audits('auto_open').count(), 4)
+
+    def test_backends_without_update_returning_lock_then_update(self):
+        due = [self._session(timedelta(minutes=m)) for m in (-2, 0, 2)]
+        with mock.patch('attendance.transitions.RETURNING_VENDORS', ()):
+            with CaptureQueriesContext(connection) as ctx:
+                run = open_due_sessions(now=self.now, grace_minutes=5, batch_size=2)
+            self.assertEqual(sorted(run.session_ids), sorted(s.pk for s in due))
+            self.assertFalse(any(q['sql'].startswith('UPDATE') and 'RETURNING' in q['sql'] for q in ctx.captured_queries))
+            self.assertEqual(open_due_sessions(now=self.now, grace_minutes=5).count, 0)
+        self.assertEqual(AttendanceSession.objects.filter(pk__in=[s.pk for s in due], status='open').count(), 3)
+        self.assertEqual(self._audits('auto_open').count(), 3)
+
+    def test_open_query_count_does_not_grow_with_sessions(self):
+        for m in range(-3, 4):
+            self._session(timedelta(minutes=m))
+        with CaptureQueriesContext(connection) as ctx:
+            run = open_due_sessions(now=self.now, grace_minutes=5)
+        self.assertEqual(run.count, 7)
+        writes = [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(writes), 2)
+
+    def test_close_due_sessions_marks_missing_students_absent(self):
+        ended = self._session(timedelta(hours=-2), status='open')
+        running = self._session(timedelta(minutes=-10), status='open')
+        students = self._enroll(3)
+        AttendanceRecord.objects.filter(session=ended).delete()
+        AttendanceRecord.objects.create(session=ended, student=students[0], mark='present', source='manual')
+
+        run = close_due_sessions(now=self.now, grace_minutes=5)
+        self.assertEqual(run.session_ids, [ended.pk])
+        self.assertEqual(run.absent_marked, 2)
+        ended.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((ended.status, ended.auto_closed), ('closed', True))
+        self.assertEqual(running.status, 'open')
+        marks = dict(AttendanceRecord.objects.filter(session=ended).values_list('student_id', 'mark'))
+        self.assertEqual(marks, {students[0].pk: 'present', students[1].pk: 'absent', students[2].pk: 'absent'})
+        self.assertEqual(self._audits('auto_close').count(), 1)
+
+        again = close_due_sessions(now=self.now, grace_minutes=5)
+        self.assertEqual((again.count, again.absent_marked), (0, 0))
+        self.assertEqual(AttendanceSession.objects.get(pk=ended.pk).status, 'closed')
@@ -0,0 +1,169 @@
+"""Set-based automatic open/close of attendance sessions.
+
+The beat tasks used to walk every due session, calling ``open_session`` /
+``close_session`` plus another save and an audit insert per session (and
+the ``post_save`` audit signal on each save). Here each batch of due
+sessions is moved with one conditional UPDATE that returns the ids it
+actually changed:
+
+    UPDATE attendance_session SET status = 'open', ...
+    WHERE status = 'scheduled' AND id IN (<due ids, FOR UPDATE SKIP LOCKED>)
+    RETURNING id
+
+Only the returned ids get an audit row (one ``bulk_create`` per batch), so
+overlapping beat runs never open, close or audit a session twice: a row
+already moved by another run no longer matches ``status = 'scheduled'``,
+and on Postgres rows locked by a concurrent run are skipped rather than
+waited on. Other backends (UPDATE ... RETURNING is only relied on for
+Postgres and sqlite) lock the due rows, then update exactly those.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from academics.models import CourseEnrollment
+
+from .models import AttendanceAuditLog, AttendanceRecord, AttendanceSession, get_attendance_settings
+
+
+# Vendors whose UPDATE ... RETURNING this module relies on (Django's feature flags only
+# describe INSERT ... RETURNING, and MySQL/MariaDB/Oracle differ on UPDATE)
+RETURNING_VENDORS = ('postgresql', 'sqlite')
+
+
+@dataclass
+class TransitionRun:
+    action: str
+    session_ids: List[int] = field(default_factory=list)
+    batches: int = 0
+    absent_marked: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.session_ids)
+
+    def as_dict(self) -> dict:
+        return {
+            'action': self.action,
+            'sessions': self.count,
+            'batches': self.batches,
+            'absent_marked': self.absent_marked,
+        }
+
+
+def _transition(due, from_status: str, assignments: dict, batch_size: int) -> List[int]:
+    """Move up to ``batch_size`` rows of ``due`` out of ``from_status``; returns the ids this call changed.
+
+    Must run inside a transaction (the candidate rows are locked on Postgres).
+    """
+    meta = AttendanceSession._meta
+    qn = connection.ops.quote_name
+    columns = dict(assignments, updated_at=timezone.now())
+    candidates = due.filter(status=from_status).order_by('pk').values('pk')[:batch_size]
+    if connection.features.has_select_for_update_skip_locked:
+        candidates = candidates.select_for_update(skip_locked=True)
+
+    if connection.vendor not in RETURNING_VENDORS:
+        locked = candidates if connection.features.has_select_for_update_skip_locked else candidates.select_for_update()
+        ids = sorted(locked.values_list('pk', flat=True))
+        if ids:
+            AttendanceSession.objects.filter(pk__in=ids, status=from_status).update(**columns)
+        return ids
+
+    set_sql = ', '.join(f'{qn(meta.get_field(name).column)} = %s' for name in columns)
+    values = [meta.get_field(name).get_db_prep_save(value, connection) for name, value in columns.items()]
+    subquery, sub_params = candidates.query.sql_with_params()
+    pk, status = qn(meta.pk.column), qn(meta.get_field('status').column)
+    sql = (
+        f'UPDATE {qn(meta.db_table)} SET {set_sql} '
+        f'WHERE {status} = %s AND {pk} IN ({subquery}) RETURNING {pk}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*values, from_status, *sub_params])
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def _audit(ids, action: str, after: dict, reason: str) -> None:
+    AttendanceAuditLog.objects.bulk_create([
+        AttendanceAuditLog(
+            entity_type='AttendanceSession', entity_id=str(pk), session_id=str(pk), action=action,
+            performed_by=None, after=after, reason=reason,
+        )
+        for pk in ids
+    ])
+
+
+def mark_absent(session_ids) -> int:
+    """Insert an 'absent' record for every enrolled student with no record in these sessions."""
+    missing = (
+        CourseEnrollment.objects.annotate(session_id=F('course_section__attendance_sessions'))
+        .filter(status='ENROLLED', session_id__in=session_ids)
+        .exclude(Exists(AttendanceRecord.objects.filter(session_id=OuterRef('session_id'), student_id=OuterRef('student_id'))))
+        .values_list('session_id', 'student_id')
+        .order_by()
+        .distinct()
+    )
+    records = [
+        AttendanceRecord(
+            session_id=session_id, student_id=student_id, mark='absent', source='system',
+            reason='Auto-marked absent - no attendance recorded',
+        )
+        for session_id, student_id in missing
+    ]
+    # A faculty member marking the session at the same moment wins
+    AttendanceRecord.objects.bulk_create(records, batch_size=2000, ignore_conflicts=True)
+    return len(records)
+
+
+def open_due_sessions(
+    now: Optional[datetime] = None, grace_minutes: Optional[int] = None, batch_size: int = 1000,
+) -> TransitionRun:
+    """Open every scheduled session starting within the grace window around ``now``."""
+    now = now or timezone.now()
+    if grace_minutes is None:
+        grace_minutes = get_attendance_settings().get('GRACE_PERIOD_MINUTES', 5)
+    grace = timedelta(minutes=grace_minutes)
+    due = AttendanceSession.objects.filter(start_datetime__gte=now - grace, start_datetime__lte=now + grace)
+    run = TransitionRun(action='auto_open')
+    while True:
+        with transaction.atomic():
+            ids = _transition(due, 'scheduled', {'status': 'open', 'actual_start_datetime': now, 'auto_opened': True}, batch_size)
+            _audit(ids, 'auto_open', {'status': 'open', 'auto_opened': True}, 'Automatically opened based on schedule')
+        run.session_ids.extend(ids)
+        run.batches += 1
+        if len(ids) < batch_size:
+            return run
+
+
+def close_due_sessions(
+    now: Optional[datetime] = None,
+    grace_minutes: Optional[int] = None,
+    mark_absent_students: Optional[bool] = None,
+    batch_size: int = 1000,
+) -> TransitionRun:
+    """Close every open session that ended more than the grace period before ``now``."""
+    now = now or timezone.now()
+    settings_dict = get_attendance_settings()
+    if grace_minutes is None:
+        grace_minutes = settings_dict.get('GRACE_PERIOD_MINUTES', 5)
+    if mark_absent_students is None:
+        mark_absent_students = settings_dict.get('AUTO_MARK_ABSENT', True)
+    due = AttendanceSession.objects.filter(end_datetime__lt=now - timedelta(minutes=grace_minutes))
+    run = TransitionRun(action='auto_close')
+    while True:
+        with transaction.atomic():
+            ids = _transition(due, 'open', {'status': 'closed', 'actual_end_datetime': now, 'auto_closed': True}, batch_size)
+            if ids and mark_absent_students:
+                run.absent_marked += mark_absent(ids)
+            _audit(ids, 'auto_close', {'status': 'closed', 'auto_closed': True}, 'Automatically closed after session ended')
+        run.session_ids.extend(ids)
+        run.batches += 1
+        if len(ids) < batch_size:
+            return run
@@ -34,6 +34,7 @@ from .permissions import (
 )
 from django.db import transaction
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.db.models import Q, Count, Avg, F
 from datetime import datetime, timedelta
 import csv
@@ -901,17 +902,31 @@ class AttendanceExportViewSet(viewsets.ViewSet):
 
 
 class BiometricWebhookView(APIView):
-    """View for receiving biometric device webhooks"""
-    permission_classes = []  # No authentication for webhooks
+    """
+    View for receiving biometric device webhooks.
+    Accepts a batch ({"device_id", "punches": [...]}) or a single punch; punches are
+    staged and deduplicated here and applied to attendance by process_biometric_punches.
+    """
+    permission_classes = []  # Devices authenticate with their API key
     
     def post(self, request):
-        from .serializers import BiometricWebhookSerializer
-        serializer = BiometricWebhookSerializer(data=request.data)
-        if serializer.is_valid():
-            # For now, return a simple response - we'll implement the task later
-            return Response({
-                'status': 'accepted',
-                'message': 'Webhook received'
-            }, status=status.HTTP_202_ACCEPTED)
+        from .biometric import ingest
+        from .serializers import BiometricPunchBatchSerializer
+        data = request.data
+        if 'punches' not in data:
+            data = {'device_id': data.get('device_id'), 'punches': [data]}
+        serializer = BiometricPunchBatchSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        device = BiometricDevice.objects.filter(
+            device_id=serializer.validated_data['device_id'], is_enabled=True
+        ).first()
+        if device is None:
+            return Response({'detail': 'Unknown or disabled device.'}, status=status.HTTP_404_NOT_FOUND)
+        if device.api_key and not constant_time_compare(request.headers.get('X-Device-Key', ''), device.api_key):
+            return Response({'detail': 'Invalid device key.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        with transaction.atomic():
+            report = ingest(device, serializer.validated_data['punches'], source='webhook')
+        return Response({'status': 'accepted', **report.as_dict()}, status=status.HTTP_202_ACCEPTED)
@@ -10,5 +10,29 @@ class CoreConfig(AppConfig):
             import django_prometheus  # noqa: F401
         except Exception:
             pass
+        self._connect_task_pinning()
+
+    def _connect_task_pinning(self):
+        """Give every Celery task its own primary-pinning scope."""
+        try:
+            from celery.signals import task_postrun, task_prerun
+        except Exception:
+            return
+        from .db_routers import primary_pinning_scope
+
+        scopes = {}
+
+        def _enter(task_id=None, **kwargs):
+            scope = primary_pinning_scope()
+            scope.__enter__()
+            scopes[task_id] = scope
+
+        def _exit(task_id=None, **kwargs):
+            scope = scopes.pop(task_id, None)
+            if scope is not None:
+                scope.__exit__(None, None, None)
+
+        task_prerun.connect(_enter, weak=False, dispatch_uid='campshub360_task_pinning_enter')
+        task_postrun.connect(_exit, weak=False, dispatch_uid='campshub360_task_pinning_exit')
 
 
@@ -5,8 +5,9 @@ import uuid
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
-from accounts.models import AuditLog, UserSession
-from accounts.utils import extract_client_ip, geolocate_ip
+from accounts.geoip import enrich_latest_session
+from accounts.utils import extract_client_ip
+from .audit_buffer import record_audit_event
 
 
 User = get_user_model()
@@ -19,6 +20,7 @@ class AuditLogMiddleware(MiddlewareMixin):
     """Middleware to record audit logs for mutating requests and enrich session geo info.
 
     - Logs: user, action (method + path), object_type (app_label), ip, ua, meta (status, query params)
+    - Audit rows are buffered and bulk-inserted off the request path (see audit_buffer)
     - Enriches latest UserSession (if any) with geolocation on first hit from that IP.
     """
 
@@ -38,8 +40,8 @@ class AuditLogMiddleware(MiddlewareMixin):
 
             # Mutations only for audit record
             if request.method not in SAFE_METHODS:
-                AuditLog.objects.create(
-                    user=user if getattr(user, 'is_authenticated', False) else None,
+                record_audit_event(
+                    user_id=user.pk if getattr(user, 'is_authenticated', False) else None,
                     action=f"{request.method} {request.path}",
                     object_type=request.resolver_match.app_name if getattr(request, 'resolver_match', None) else '',
                     object_id=None,
@@ -52,28 +54,10 @@ class AuditLogMiddleware(MiddlewareMixin):
                     },
                 )
 
-            # Enrich geo on session once
+            # Enrich geo on session once (resolved off the request path)
             if getattr(user, 'is_authenticated', False) and ip:
                 try:
-                    latest = UserSession.objects.filter(user=user, ip=ip).order_by('-created_at').first()
-                    if latest and not getattr(latest, 'country', None):
-                        raw, country, region, city, lat, lon = geolocate_ip(ip)
-                        if hasattr(latest, 'country'):
-                            latest.country = country
-                        if hasattr(latest, 'region'):
-                            latest.region = region
-                        if hasattr(latest, 'city'):
-                            latest.city = city
-                        if hasattr(latest, 'latitude'):
-                            latest.latitude = lat
-                        if hasattr(latest, 'longitude'):
-                            latest.longitude = lon
-                        if raw and hasattr(latest, 'location_raw'):
-                            latest.location_raw = raw
-                        try:
-                            latest.save(update_fields=['country', 'region', 'city', 'latitude', 'longitude', 'location_raw'])
-                        except Exception:
-                            pass
+                    enrich_latest_session(user, ip)
                 except Exception:
                     pass
         except Exception:
@@ -0,0 +1,446 @@
+"""Buffered audit log pipeline.
+
+Mutating requests enqueue an audit event instead of inserting an ``AuditLog``
+row inline. A background flusher drains the queue with ``bulk_create`` once a
+batch fills up or the flush interval elapses. Events that cannot be written
+(queue full, database unavailable) are spilled to JSON-lines files on local
+disk and replayed later by ``manage.py flush_audit_spill``.
+
+Backends:
+- ``memory`` (default): per-process deque + daemon flusher thread
+- ``redis``: events are XADDed to a local Redis stream and drained through a
+  consumer group by the same flusher (or the management command), so several
+  workers share a queue; entries are acknowledged only once written
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+logger = logging.getLogger(__name__)
+
+
+STREAM_KEY = "audit:events"
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, name, default)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def build_event(
+    user_id: Optional[Any],
+    action: str,
+    object_type: str = "",
+    object_id: Optional[Any] = None,
+    ip: Optional[str] = None,
+    user_agent: str = "",
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Return a JSON-serialisable audit event (the unit that is queued and spilled)."""
+    return {
+        "id": str(uuid.uuid4()),
+        "created_at": timezone.now().isoformat(),
+        "user_id": str(user_id) if user_id else None,
+        "action": action[:150],
+        "object_type": (object_type or "")[:100],
+        "object_id": str(object_id) if object_id else None,
+        "ip": ip,
+        "user_agent": user_agent or "",
+        "meta": meta or {},
+    }
+
+
+def events_to_rows(events: Iterable[Dict[str, Any]]) -> List[Any]:
+    """Convert queued events into unsaved ``AuditLog`` instances.
+
+    The event's own id/created_at are kept so a replay after a partial failure
+    cannot produce duplicate rows (``ignore_conflicts`` skips them).
+    """
+    from accounts.models import AuditLog
+
+    rows = []
+    for event in events:
+        row = AuditLog(
+            id=uuid.UUID(event["id"]),
+            user_id=event.get("user_id"),
+            action=event.get("action", ""),
+            object_type=event.get("object_type", ""),
+            object_id=event.get("object_id"),
+            ip=event.get("ip"),
+            user_agent=event.get("user_agent", ""),
+            meta=event.get("meta") or {},
+        )
+        created_at = parse_datetime(event["created_at"]) if event.get("created_at") else None
+        row.created_at = created_at or timezone.now()
+        row.updated_at = row.created_at
+        rows.append(row)
+    return rows
+
+
+def write_events(events: List[Dict[str, Any]], batch_size: int = 500) -> int:
+    """Insert events with ``bulk_create``; returns the number of rows submitted."""
+    if not events:
+        return 0
+    from accounts.models import AuditLog
+
+    rows = events_to_rows(events)
+    AuditLog.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    _restore_event_times(events, batch_size)
+    return len(rows)
+
+
+def _restore_event_times(events: List[Dict[str, Any]], batch_size: int) -> None:
+    """Stamp rows with the time of the event rather than of the flush (or spill replay).
+
+    ``created_at`` is ``auto_now_add``, which ``bulk_create`` applies over the
+    value given, so it is set by one UPDATE per batch.
+    """
+    from accounts.models import AuditLog
+
+    stamped = [(uuid.UUID(e["id"]), parse_datetime(e["created_at"])) for e in events if e.get("created_at")]
+    for start in range(0, len(stamped), batch_size):
+        batch = stamped[start:start + batch_size]
+        created_at = Case(*[When(pk=pk, then=Value(at)) for pk, at in batch], output_field=DateTimeField())
+        AuditLog.objects.filter(pk__in=[pk for pk, _ in batch]).update(created_at=created_at, updated_at=created_at)
+
+
+class SpillStore:
+    """Append-only JSON-lines files holding events that could not be written."""
+
+    def __init__(
+        self,
+        directory: Optional[os.PathLike] = None,
+        prefix: str = "audit",
+        writer: Callable[..., int] = write_events,
+    ):
+        default_dir = Path(_setting("BASE_DIR", ".")) / "var" / "audit_spill"
+        self.directory = Path(directory or _setting("AUDIT_SPILL_DIR", default_dir))
+        self.prefix = prefix
+        self.writer = writer
+        self._lock = threading.Lock()
+
+    def spill(self, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{self.prefix}-{os.getpid()}-{time.strftime('%Y%m%d%H')}.jsonl"
+        payload = "".join(json.dumps(e, default=_json_default) + "\n" for e in events)
+        with self._lock:
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(payload)
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"{self.prefix}-*.jsonl"))
+
+    def replay(self, batch_size: int = 500) -> int:
+        """Write every spilled event to the database, deleting files that succeed."""
+        replayed = 0
+        for path in self.files():
+            # Rename first so a concurrent spill from this pid opens a fresh file
+            claimed = path.with_suffix(".replaying")
+            try:
+                path.rename(claimed)
+            except OSError:
+                continue
+            events: List[Dict[str, Any]] = []
+            with open(claimed, encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        logger.warning("Skipping corrupt audit spill line in %s", claimed)
+            try:
+                for start in range(0, len(events), batch_size):
+                    replayed += self.writer(events[start:start + batch_size], batch_size=batch_size)
+            except Exception:
+                claimed.rename(path)
+                raise
+            claimed.unlink()
+        return replayed
+
+
+class BufferedWriter:
+    """Thread-safe in-process queue flushed in batches by size or time.
+
+    ``writer(events, batch_size=...)`` persists a batch of JSON-serialisable
+    events; the default writes ``AuditLog`` rows.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        spill: Optional[SpillStore] = None,
+        start_thread: bool = True,
+        writer: Optional[Callable[..., int]] = None,
+        name: str = "audit-flusher",
+    ):
+        self.batch_size = int(batch_size or _setting("AUDIT_BUFFER_BATCH_SIZE", 200))
+        self.flush_interval = float(flush_interval or _setting("AUDIT_BUFFER_FLUSH_INTERVAL", 2.0))
+        self.max_queue = int(max_queue or _setting("AUDIT_BUFFER_MAX_QUEUE", 50000))
+        self.writer = writer or write_events
+        self.spill_store = spill or SpillStore(writer=self.writer)
+        self.name = name
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_thread = start_thread
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, event: Dict[str, Any]) -> None:
+        overflow = False
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                overflow = True
+            else:
+                self._queue.append(event)
+                full = len(self._queue) >= self.batch_size
+        if overflow:
+            # Flusher is down or too slow: keep the event on disk instead of dropping it
+            self.spill_store.spill([event])
+            return
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            count = min(limit, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def flush(self) -> int:
+        """Write everything currently queued; failed batches are spilled to disk."""
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            try:
+                written += self.writer(batch, batch_size=self.batch_size)
+            except Exception:
+                logger.exception("%s: flush failed; spilling %d events", self.name, len(batch))
+                self.spill_store.spill(batch)
+            finally:
+                _close_thread_connections()
+            self._settle(batch)
+
+    def _settle(self, batch: List[Dict[str, Any]]) -> None:
+        """Called once a drained batch is written or spilled; the memory queue has nothing to release."""
+
+    def _ensure_thread(self) -> None:
+        if not self._start_thread or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - flush already spills on errors
+                logger.exception("%s: flusher iteration failed", self.name)
+
+    def stop(self) -> None:
+        """Stop the flusher thread and write (or spill) whatever is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+
+AuditBuffer = BufferedWriter
+
+
+class RedisStreamAuditBuffer(BufferedWriter):
+    """Queue events on a local Redis stream shared by all workers on the host.
+
+    Workers read through one consumer group, and an entry is acknowledged and
+    deleted only after its batch is written (or spilled to disk), so a crash or
+    database error in between leaves it pending. Entries another consumer left
+    pending for ``claim_idle`` seconds are claimed and retried. A retried
+    event that did reach the database is skipped by its id.
+    """
+
+    group = "audit-writers"
+
+    def __init__(self, redis_client: Any = None, stream_key: str = STREAM_KEY, claim_idle: Optional[float] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._client = redis_client
+        self.stream_key = stream_key
+        self.claim_idle = float(_setting("AUDIT_STREAM_CLAIM_IDLE", 60.0) if claim_idle is None else claim_idle)
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        self._entry_ids: Dict[str, Any] = {}
+
+    def _redis(self) -> Any:
+        if self._client is not None:
+            return self._client
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    def enqueue(self, event: Dict[str, Any]) -> None:
+        try:
+            self._redis().xadd(
+                self.stream_key,
+                {"event": json.dumps(event, default=_json_default)},
+                maxlen=self.max_queue,
+                approximate=True,
+            )
+        except Exception:
+            self.spill_store.spill([event])
+            return
+        self._ensure_thread()
+
+    def _ensure_group(self, r: Any) -> None:
+        if self._group_ready:
+            return
+        try:
+            r.xgroup_create(self.stream_key, self.group, id="0", mkstream=True)
+        except Exception as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+        self._group_ready = True
+
+    def _read(self, r: Any, limit: int) -> List[Any]:
+        # Our own unacknowledged entries first, then ones a dead consumer left behind, then new ones
+        for start in ("0", None, ">"):
+            if start is None:
+                claimed = r.xautoclaim(
+                    self.stream_key, self.group, self.consumer, int(self.claim_idle * 1000), start_id="0-0", count=limit,
+                )
+                entries = claimed[1] if claimed else []
+            else:
+                response = r.xreadgroup(self.group, self.consumer, {self.stream_key: start}, count=limit)
+                entries = response[0][1] if response else []
+            if entries:
+                return entries
+        return []
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        try:
+            r = self._redis()
+            self._ensure_group(r)
+            entries = self._read(r, limit)
+        except Exception:
+            logger.exception("Could not read audit stream")
+            return []
+        events, unreadable = [], []
+        for entry_id, fields in entries:
+            raw = (fields or {}).get(b"event") or (fields or {}).get("event")
+            if isinstance(raw, bytes):
+                raw = raw.decode("utf-8")
+            try:
+                event = json.loads(raw)
+            except (TypeError, ValueError):
+                # Trimmed from the stream or corrupt: nothing to retry
+                unreadable.append(entry_id)
+                continue
+            self._entry_ids[event["id"]] = entry_id
+            events.append(event)
+        if unreadable:
+            try:
+                self._release(r, unreadable)
+            except Exception:
+                logger.exception("Could not drop %d unreadable audit stream entries", len(unreadable))
+        return events
+
+    def _release(self, r: Any, entry_ids: List[Any]) -> None:
+        r.xack(self.stream_key, self.group, *entry_ids)
+        r.xdel(self.stream_key, *entry_ids)
+
+    def _settle(self, batch: List[Dict[str, Any]]) -> None:
+        entry_ids = [self._entry_ids.pop(event["id"]) for event in batch if event["id"] in self._entry_ids]
+        if not entry_ids:
+            return
+        try:
+            self._release(self._redis(), entry_ids)
+        except Exception:
+            # Still pending: the batch is retried later and its already-written rows skipped
+            logger.exception("Could not acknowledge %d audit stream entries", len(entry_ids))
+
+
+def _close_thread_connections() -> None:
+    # The flusher runs outside the request cycle, so release its connection explicitly
+    if threading.current_thread() is threading.main_thread():
+        return
+    from django.db import connections
+
+    connections.close_all()
+
+
+_buffer: Optional[BufferedWriter] = None
+_buffer_lock = threading.Lock()
+
+
+def get_audit_buffer() -> BufferedWriter:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                backend = _setting("AUDIT_BUFFER_BACKEND", "memory")
+                _buffer = RedisStreamAuditBuffer() if backend == "redis" else AuditBuffer()
+                atexit.register(_buffer.stop)
+    return _buffer
+
+
+def reset_audit_buffer() -> None:
+    """Drop the process-wide buffer (used by tests and after fork)."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer._stopped.set()
+            _buffer._wakeup.set()
+        _buffer = None
+
+
+def record_audit_event(**kwargs: Any) -> None:
+    """Record an audit event, buffered when ``AUDIT_BUFFER_ENABLED`` is on."""
+    event = build_event(**kwargs)
+    if not _setting("AUDIT_BUFFER_ENABLED", True):
+        write_events([event])
+        return
+    get_audit_buffer().enqueue(event)
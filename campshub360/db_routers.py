@@ -1,25 +1,184 @@
+"""Primary/replica routing with per-context primary pinning and lag awareness.
+
+State lives in contextvars, so pinning is scoped to the current request (via
+``PrimaryPinningMiddleware``) or task (via ``primary_pinning_scope``) instead
+of being shared by every thread of the process.
+
+- Any write pins the rest of the request/task to the primary, giving
+  read-after-write consistency.
+- Replica lag is sampled at most every ``REPLICA_LAG_SAMPLE_INTERVAL`` seconds
+  by comparing the primary's current WAL LSN with the replica's replay LSN;
+  above ``REPLICA_MAX_LAG_BYTES`` (or ``REPLICA_MAX_LAG_SECONDS``) reads fall
+  back to the primary.
+- Routing decisions are counted in the metrics registry as
+  ``db_reads_routed_total{target=...,reason=...}``.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+REPLICA = 'read_replica'
+
+_force_primary: ContextVar[bool] = ContextVar('db_force_primary', default=False)
+_pinned: ContextVar[bool] = ContextVar('db_pinned_to_primary', default=False)
+
+
+def _record_route(target: str, reason: str) -> None:
+    try:
+        from .metrics import registry
+
+        registry.inc('db_reads_routed_total', (('reason', reason), ('target', target)))
+    except Exception:
+        pass
+
+
+def parse_lsn(lsn: str) -> int:
+    """Convert a Postgres LSN ('16/B374D848') into an absolute byte position."""
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class ReplicaLagMonitor:
+    """Caches the replica's lag and resamples it when the sample is stale."""
+
+    def __init__(self, primary: str = PRIMARY, replica: str = REPLICA):
+        self.primary = primary
+        self.replica = replica
+        self.lag_bytes: Optional[int] = None
+        self.lag_seconds: Optional[float] = None
+        self.healthy = True
+        self._sampled_at = 0.0
+        self._lock = threading.Lock()
+
+    def _sample(self) -> None:
+        with connections[self.primary].cursor() as cur:
+            cur.execute('SELECT pg_current_wal_lsn()::text')
+            primary_lsn = cur.fetchone()[0]
+        with connections[self.replica].cursor() as cur:
+            cur.execute(
+                'SELECT pg_last_wal_replay_lsn()::text, '
+                'EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp()))'
+            )
+            replay_lsn, lag_seconds = cur.fetchone()
+        if replay_lsn is None:
+            # Not a standby (e.g. both aliases point at the same server): no lag
+            self.lag_bytes, self.lag_seconds = 0, 0.0
+            return
+        self.lag_bytes = max(0, parse_lsn(primary_lsn) - parse_lsn(replay_lsn))
+        # Replay timestamp only advances with traffic; zero byte lag means caught up
+        self.lag_seconds = 0.0 if self.lag_bytes == 0 else float(lag_seconds or 0.0)
+
+    def refresh(self, force: bool = False) -> None:
+        interval = getattr(settings, 'REPLICA_LAG_SAMPLE_INTERVAL', 5.0)
+        now = time.monotonic()
+        if not force and now - self._sampled_at < interval:
+            return
+        # Only one thread samples; the others keep using the previous value
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._sampled_at = now
+            self._sample()
+            self.healthy = self.is_within_threshold()
+        except Exception:
+            logger.warning('Replica lag sample failed; routing reads to primary', exc_info=True)
+            self.healthy = False
+        finally:
+            self._lock.release()
+
+    def is_within_threshold(self) -> bool:
+        max_bytes = getattr(settings, 'REPLICA_MAX_LAG_BYTES', 16 * 1024 * 1024)
+        max_seconds = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5.0)
+        if self.lag_bytes is None:
+            return False
+        if max_bytes is not None and self.lag_bytes > max_bytes:
+            return False
+        if max_seconds is not None and (self.lag_seconds or 0.0) > max_seconds:
+            return False
+        return True
+
+
 class ReadReplicaRouter:
+    lag_monitor = ReplicaLagMonitor()
+
+    def _replica_configured(self) -> bool:
+        return REPLICA in settings.DATABASES
+
     def db_for_read(self, model, **hints):
-        # Allow forcing primary reads via hint or thread-local flag
-        force_primary = hints.get('force_primary') or getattr(ReadReplicaRouter, '_force_primary', False)
-        return 'default' if force_primary else 'read_replica'
+        if hints.get('force_primary') or _force_primary.get():
+            _record_route(PRIMARY, 'forced')
+            return PRIMARY
+        if _pinned.get():
+            _record_route(PRIMARY, 'pinned')
+            return PRIMARY
+        if not self._replica_configured():
+            return PRIMARY
+        self.lag_monitor.refresh()
+        if not self.lag_monitor.healthy:
+            _record_route(PRIMARY, 'lag')
+            return PRIMARY
+        _record_route(REPLICA, 'replica')
+        return REPLICA
 
     def db_for_write(self, model, **hints):
-        return 'default'
+        # Later reads in this request/task must see the write
+        _pinned.set(True)
+        return PRIMARY
 
     def allow_relation(self, obj1, obj2, **hints):
         return True
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
-        return db == 'default'
+        return db == PRIMARY
+
+
+def is_pinned_to_primary() -> bool:
+    return _pinned.get() or _force_primary.get()
+
+
+@contextmanager
+def primary_pinning_scope():
+    """Start a fresh pinning scope (one request or background task)."""
+    pinned_token = _pinned.set(False)
+    forced_token = _force_primary.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(pinned_token)
+        _force_primary.reset(forced_token)
 
 
 class UsePrimaryReads:
     def __enter__(self):
-        ReadReplicaRouter._force_primary = True
+        self._token = _force_primary.set(True)
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        ReadReplicaRouter._force_primary = False
+        _force_primary.reset(self._token)
         return False
 
+
+class PrimaryPinningMiddleware:
+    """Scope primary pinning to a single request.
+
+    Sync workers reuse a thread (and therefore its context) across requests, so
+    the pin set by a write must be cleared when the request finishes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with primary_pinning_scope():
+            return self.get_response(request)
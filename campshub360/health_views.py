@@ -3,12 +3,12 @@ Health check views for the CampsHub360 application.
 These views provide endpoints for monitoring application health, readiness, and liveness.
 """
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.db import connection
 from django.core.cache import cache
 from django.conf import settings
 import logging
-from .metrics import collect_app_metrics
+from .metrics import collect_app_metrics, render_prometheus
 
 logger = logging.getLogger(__name__)
 
@@ -157,3 +157,8 @@ def app_metrics(request):
     """Lightweight JSON metrics for RPS and latency percentiles."""
     data = collect_app_metrics()
     return JsonResponse(data)
+
+
+def app_metrics_prometheus(request):
+    """Merged per-worker metrics in Prometheus text exposition format."""
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
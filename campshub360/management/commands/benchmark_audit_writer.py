@@ -0,0 +1,80 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import AuditLog
+from campshub360.audit_buffer import AuditBuffer, SpillStore, build_event
+
+
+class Command(BaseCommand):
+    help = "Compare synchronous AuditLog inserts with the buffered bulk writer (rows are rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=5000, help="Number of audit events to write")
+        parser.add_argument("--batch-size", type=int, default=200, help="Buffered writer batch size")
+
+    def handle(self, *args, **options):
+        n = options["events"]
+        events = [
+            build_event(
+                user_id=None,
+                action=f"POST /api/v1/bench/{i}/",
+                object_type="bench",
+                ip="127.0.0.1",
+                user_agent="benchmark",
+                meta={"status_code": 201, "GET": {}, "request_id": str(i)},
+            )
+            for i in range(n)
+        ]
+
+        sync_s = self._timed(lambda: [
+            AuditLog.objects.create(
+                action=e["action"], object_type=e["object_type"], ip=e["ip"],
+                user_agent=e["user_agent"], meta=e["meta"],
+            )
+            for e in events
+        ])
+
+        with tempfile.TemporaryDirectory() as spill_dir:
+            buffer = AuditBuffer(
+                batch_size=options["batch_size"],
+                max_queue=n + 1,
+                spill=SpillStore(spill_dir),
+                start_thread=False,
+            )
+
+            def buffered():
+                for e in events:
+                    buffer.enqueue(e)
+                buffer.flush()
+
+            enqueue_start = time.perf_counter()
+            for e in events:
+                buffer.enqueue(dict(e))
+            enqueue_s = time.perf_counter() - enqueue_start
+            buffer._queue.clear()
+            buffered_s = self._timed(buffered)
+
+        self.stdout.write(f"events: {n}")
+        self.stdout.write(f"sync create:       {sync_s:8.3f}s  {n / sync_s:10.0f} events/s")
+        self.stdout.write(f"request-path enqueue: {enqueue_s:5.3f}s  {n / max(enqueue_s, 1e-9):10.0f} events/s")
+        self.stdout.write(f"buffered bulk:     {buffered_s:8.3f}s  {n / buffered_s:10.0f} events/s")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {sync_s / buffered_s:.1f}x"))
+
+    def _timed(self, fn):
+        # Run inside a rolled-back transaction so the benchmark leaves no rows behind
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                fn()
+                elapsed = time.perf_counter() - start
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return elapsed
+
+
+class _Rollback(Exception):
+    pass
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from campshub360.metrics import MetricsMiddleware, registry, render_prometheus
+
+
+class Command(BaseCommand):
+    help = "Measure per-request overhead of MetricsMiddleware (no database access)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000, help="Number of simulated requests")
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        factory = RequestFactory()
+        middleware = MetricsMiddleware(lambda r: HttpResponse())
+        response = HttpResponse(status=200)
+        requests = [factory.get(f"/api/v1/bench/{i % 50}/") for i in range(n)]
+        registry.reset()
+
+        start = time.perf_counter()
+        for request in requests:
+            middleware.process_view(request, None, (), {})
+            middleware.process_response(request, response)
+        elapsed = time.perf_counter() - start
+
+        render_start = time.perf_counter()
+        body = render_prometheus()
+        render_ms = (time.perf_counter() - render_start) * 1000.0
+
+        self.stdout.write(f"requests: {n}")
+        self.stdout.write(f"middleware overhead: {elapsed / n * 1e6:.1f} us/request ({n / elapsed:.0f} req/s)")
+        self.stdout.write(f"prometheus render: {render_ms:.2f} ms, {len(body.splitlines())} lines")
+        registry.reset()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from accounts.session_buffer import write_sessions
+from campshub360.audit_buffer import RedisStreamAuditBuffer, SpillStore
+
+
+class Command(BaseCommand):
+    help = "Replay audit events and login sessions spilled to disk (and drain the Redis audit stream) into accounts_auditlog"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows per bulk_create batch")
+        parser.add_argument("--spill-dir", type=str, default=None, help="Override AUDIT_SPILL_DIR")
+        parser.add_argument("--drain-stream", action="store_true", help="Also drain the Redis audit stream")
+
+    def handle(self, *args, **options):
+        store = SpillStore(options["spill_dir"])
+        replayed = store.replay(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} spilled audit events from {store.directory}"))
+
+        sessions = SpillStore(options["spill_dir"], prefix="session", writer=write_sessions)
+        replayed = sessions.replay(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} spilled login sessions"))
+
+        if options["drain_stream"]:
+            buffer = RedisStreamAuditBuffer(spill=store, batch_size=options["batch_size"], start_thread=False)
+            drained = buffer.flush()
+            self.stdout.write(self.style.SUCCESS(f"Drained {drained} audit events from Redis stream"))
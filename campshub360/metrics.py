@@ -1,155 +1,357 @@
+"""In-process request/DB metrics with fixed-bucket histograms.
+
+Each thread records into its own shard (no locks on the hot path); readers
+merge the shards. Every ``METRICS_PUBLISH_INTERVAL`` seconds a worker
+publishes its merged snapshot to the cache so ``collect_app_metrics`` and the
+Prometheus endpoint can aggregate across gunicorn workers without a Redis
+round-trip per request.
+"""
+
+import bisect
+import os
+import threading
 import time
-from typing import Callable, Any, Dict, List
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-from django.utils.deprecation import MiddlewareMixin
-from django_redis import get_redis_connection
+from django.conf import settings
 from django.core.cache import cache
 from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+
+# Upper bounds in milliseconds; the implicit last bucket is +Inf
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+RPS_WINDOW = 60
+WORKER_KEY_PREFIX = "metrics:worker:"
+WORKER_INDEX_KEY = "metrics:workers"
+
+Labels = Tuple[Tuple[str, str], ...]
 
 
 def _now_seconds() -> int:
     return int(time.time())
 
 
-def _redis() -> Any:
-    try:
-        return get_redis_connection("default")
-    except Exception:
-        return None
+def _labels(**kwargs: Any) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in kwargs.items()))
+
+
+def _bucket_index(value_ms: float) -> int:
+    return bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)
+
+
+class _Shard:
+    """Per-thread metric storage; only the owning thread writes to it."""
+
+    __slots__ = ("counters", "histograms", "rps_slots", "rps_ts")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # value: [bucket counts..., +Inf count, sum, count]
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self.rps_slots = [0] * RPS_WINDOW
+        self.rps_ts = [0] * RPS_WINDOW
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._last_publish = 0.0
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    # -- recording (hot path) --
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, value_ms: float, labels: Labels = ()) -> None:
+        histograms = self._shard().histograms
+        key = (name, labels)
+        h = histograms.get(key)
+        if h is None:
+            h = [0.0] * (len(LATENCY_BUCKETS_MS) + 3)
+            histograms[key] = h
+        h[_bucket_index(value_ms)] += 1
+        h[-2] += value_ms
+        h[-1] += 1
+
+    def tick_rps(self) -> None:
+        shard = self._shard()
+        ts = _now_seconds()
+        slot = ts % RPS_WINDOW
+        if shard.rps_ts[slot] != ts:
+            shard.rps_ts[slot] = ts
+            shard.rps_slots[slot] = 0
+        shard.rps_slots[slot] += 1
+
+    # -- reading --
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Merge all thread shards into a JSON-serialisable snapshot."""
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        rps: Dict[int, int] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, value in list(shard.histograms.items()):
+                merged = histograms.setdefault(key, [0.0] * len(value))
+                for i, v in enumerate(value):
+                    merged[i] += v
+            for ts, count in zip(list(shard.rps_ts), list(shard.rps_slots)):
+                if ts:
+                    rps[ts] = rps.get(ts, 0) + count
+        return {
+            "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, list(labels), value] for (name, labels), value in histograms.items()],
+            "rps": {str(ts): count for ts, count in rps.items()},
+        }
 
+    def reset(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+                shard.rps_slots[:] = [0] * RPS_WINDOW
+                shard.rps_ts[:] = [0] * RPS_WINDOW
 
-def record_rps() -> None:
-    ts = _now_seconds()
-    r = _redis()
-    key = f"metrics:rps:{ts}"
-    if r is not None:
-        r.incr(key, 1)
-        r.expire(key, 120)
-    else:
-        cache_key = key
+    def maybe_publish(self, interval: Optional[float] = None) -> None:
+        """Publish this worker's snapshot to the shared cache at most once per interval."""
+        interval = interval if interval is not None else getattr(settings, "METRICS_PUBLISH_INTERVAL", 10.0)
+        now = time.monotonic()
+        if now - self._last_publish < interval:
+            return
+        self._last_publish = now
+        self.publish()
+
+    def publish(self) -> None:
+        worker = str(os.getpid())
         try:
-            cache.incr(cache_key)
+            cache.set(f"{WORKER_KEY_PREFIX}{worker}", self.snapshot(), 300)
+            workers = set(cache.get(WORKER_INDEX_KEY) or [])
+            if worker not in workers:
+                workers.add(worker)
+                cache.set(WORKER_INDEX_KEY, sorted(workers), 3600)
         except Exception:
-            cache.set(cache_key, 1, 120)
-
-
-def push_latency(key: str, ms: float, max_len: int = 5000) -> None:
-    r = _redis()
-    list_key = f"metrics:{key}:latencies"
-    if r is not None:
-        r.lpush(list_key, f"{ms:.3f}")
-        r.ltrim(list_key, 0, max_len - 1)
-        r.expire(list_key, 3600)
-    else:
-        # Fallback: keep rolling sample in cache
-        sample: List[float] = cache.get(list_key) or []
-        sample.insert(0, ms)
-        if len(sample) > max_len:
-            sample = sample[:max_len]
-        cache.set(list_key, sample, 3600)
-
-
-def get_rps_window(window_seconds: int = 60) -> float:
-    now = _now_seconds()
-    r = _redis()
-    total = 0
-    for t in range(now - window_seconds + 1, now + 1):
-        key = f"metrics:rps:{t}"
-        if r is not None:
-            val = r.get(key)
-            total += int(val or 0)
-        else:
-            val = cache.get(key)
-            total += int(val or 0)
-    return total / float(window_seconds)
+            pass
+
+
+registry = MetricsRegistry()
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    counters: Dict[Tuple[str, Labels], float] = {}
+    histograms: Dict[Tuple[str, Labels], List[float]] = {}
+    rps: Dict[int, int] = {}
+    for snap in snapshots:
+        for name, labels, value in snap.get("counters", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snap.get("histograms", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [0.0] * len(value))
+            for i, v in enumerate(value):
+                merged[i] += v
+        for ts, count in snap.get("rps", {}).items():
+            rps[int(ts)] = rps.get(int(ts), 0) + count
+    return {"counters": counters, "histograms": histograms, "rps": rps}
+
+
+def cluster_snapshot() -> Dict[str, Any]:
+    """Merge published snapshots of every worker (this worker's is always live)."""
+    own = str(os.getpid())
+    snapshots = [registry.snapshot()]
+    try:
+        keys = [f"{WORKER_KEY_PREFIX}{w}" for w in cache.get(WORKER_INDEX_KEY) or [] if w != own]
+        if keys:
+            snapshots.extend(snap for snap in cache.get_many(keys).values() if snap)
+    except Exception:
+        pass
+    return merge_snapshots(snapshots)
+
+
+def _sum_histograms(histograms: Dict[Tuple[str, Labels], List[float]], name: str,
+                    match: Optional[Dict[str, str]] = None) -> List[float]:
+    total = [0.0] * (len(LATENCY_BUCKETS_MS) + 3)
+    for (hname, labels), value in histograms.items():
+        if hname != name:
+            continue
+        if match and any(dict(labels).get(k) != v for k, v in match.items()):
+            continue
+        for i, v in enumerate(value):
+            total[i] += v
+    return total
 
 
-def _compute_percentiles(values: List[float], percentiles: List[float]) -> Dict[str, float]:
-    if not values:
-        return {f"p{int(p*100)}": 0.0 for p in percentiles}
-    sorted_vals = sorted(values)
-    n = len(sorted_vals)
+def histogram_percentiles(hist: List[float], percentiles: List[float]) -> Dict[str, float]:
+    """Estimate percentiles by linear interpolation inside the matching bucket."""
+    count = hist[-1]
+    if not count:
+        return {f"p{int(p * 100)}": 0.0 for p in percentiles}
     results: Dict[str, float] = {}
+    buckets = hist[:len(LATENCY_BUCKETS_MS) + 1]
     for p in percentiles:
-        if n == 1:
-            idx = 0
-        else:
-            idx = min(n - 1, max(0, int(round(p * (n - 1)))))
-        results[f"p{int(p*100)}"] = float(sorted_vals[idx])
+        rank = p * count
+        cumulative = 0.0
+        value = float(LATENCY_BUCKETS_MS[-1])
+        for i, bucket_count in enumerate(buckets):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else LATENCY_BUCKETS_MS[-1]
+                value = lower + (upper - lower) * ((rank - cumulative) / bucket_count)
+                break
+            cumulative += bucket_count
+        results[f"p{int(p * 100)}"] = round(float(value), 3)
     return results
 
 
+def get_rps_window(window_seconds: int = RPS_WINDOW) -> float:
+    window_seconds = min(window_seconds, RPS_WINDOW)
+    now = _now_seconds()
+    rps = cluster_snapshot()["rps"]
+    total = sum(count for ts, count in rps.items() if now - window_seconds < ts <= now)
+    return total / float(window_seconds)
+
+
 def get_latency_percentiles(key: str, percentiles: List[float]) -> Dict[str, float]:
-    r = _redis()
-    list_key = f"metrics:{key}:latencies"
-    values: List[float] = []
-    if r is not None:
-        try:
-            raw = r.lrange(list_key, 0, 4999)
-            values = [float(x) for x in raw]
-        except Exception:
-            values = []
-    else:
-        values = cache.get(list_key) or []
-    return _compute_percentiles(values, percentiles)
+    name = {"request": "http_request_duration_ms", "db": "db_request_duration_ms"}.get(key, key)
+    hist = _sum_histograms(cluster_snapshot()["histograms"], name)
+    return histogram_percentiles(hist, percentiles)
 
 
 class MetricsMiddleware(MiddlewareMixin):
-    """Records per-request metrics: RPS, request latency, and DB latency percentiles.
+    """Records per-request metrics into the in-process registry.
 
-    - RPS: increments a per-second counter
-    - Request latency: wall clock from view start to response end
-    - DB latency: sums SQL execution time per request using execute_wrapper
+    - RPS: per-second ring buffer per thread
+    - Request latency: histogram labelled by route, method and status class
+    - DB: query count and duration per database alias (all aliases are wrapped)
     """
 
     def process_view(self, request, view_func: Callable, view_args, view_kwargs):
         request._metrics_start = time.perf_counter()
         request._db_time_ms = 0.0
+        db_stats: Dict[str, List[float]] = {}
+        request._db_stats = db_stats
 
-        def wrapper_execute(execute, sql, params, many, context):
-            start = time.perf_counter()
-            try:
-                return execute(sql, params, many, context)
-            finally:
-                elapsed_ms = (time.perf_counter() - start) * 1000.0
-                request._db_time_ms += elapsed_ms
-
-        # Wrap default connection for the duration of the request
-        request._execute_wrapper_cm = connections["default"].execute_wrapper(wrapper_execute)
-        request._execute_wrapper_cm.__enter__()
+        def make_wrapper(alias: str):
+            def wrapper_execute(execute, sql, params, many, context):
+                start = time.perf_counter()
+                try:
+                    return execute(sql, params, many, context)
+                finally:
+                    elapsed_ms = (time.perf_counter() - start) * 1000.0
+                    stats = db_stats.setdefault(alias, [0, 0.0])
+                    stats[0] += 1
+                    stats[1] += elapsed_ms
+                    request._db_time_ms += elapsed_ms
+            return wrapper_execute
+
+        stack = ExitStack()
+        for alias in settings.DATABASES:
+            stack.enter_context(connections[alias].execute_wrapper(make_wrapper(alias)))
+        request._execute_wrapper_cm = stack
         return None
 
     def process_response(self, request, response):
         try:
-            record_rps()
+            registry.tick_rps()
             if hasattr(request, "_metrics_start"):
                 req_ms = (time.perf_counter() - request._metrics_start) * 1000.0
-                push_latency("request", req_ms)
-                db_ms = getattr(request, "_db_time_ms", 0.0)
-                push_latency("db", db_ms)
+                match = getattr(request, "resolver_match", None)
+                route = (getattr(match, "route", None) or "unmatched") if match else "unmatched"
+                labels = _labels(route=route, method=request.method, status=f"{response.status_code // 100}xx")
+                registry.observe("http_request_duration_ms", req_ms, labels)
+                registry.observe("db_request_duration_ms", getattr(request, "_db_time_ms", 0.0))
+                for alias, (count, duration_ms) in getattr(request, "_db_stats", {}).items():
+                    alias_labels = _labels(alias=alias)
+                    registry.inc("db_queries_total", alias_labels, count)
+                    registry.inc("db_query_duration_ms_total", alias_labels, duration_ms)
+            registry.maybe_publish()
         finally:
             cm = getattr(request, "_execute_wrapper_cm", None)
             if cm is not None:
                 try:
-                    cm.__exit__(None, None, None)
+                    cm.close()
                 except Exception:
                     pass
         return response
 
 
 def collect_app_metrics() -> Dict[str, Any]:
-    rps_1m = get_rps_window(60)
-    req_p = get_latency_percentiles("request", [0.5, 0.9, 0.95, 0.99])
-    db_p = get_latency_percentiles("db", [0.5, 0.9, 0.95, 0.99])
+    snap = cluster_snapshot()
+    percentiles = [0.5, 0.9, 0.95, 0.99]
+    req_hist = _sum_histograms(snap["histograms"], "http_request_duration_ms")
+    db_hist = _sum_histograms(snap["histograms"], "db_request_duration_ms")
+    now = _now_seconds()
+    rps_1m = sum(c for ts, c in snap["rps"].items() if now - RPS_WINDOW < ts <= now) / float(RPS_WINDOW)
+    db_by_alias: Dict[str, Dict[str, float]] = {}
+    for (name, labels), value in snap["counters"].items():
+        alias = dict(labels).get("alias")
+        if alias is None:
+            continue
+        key = "queries" if name == "db_queries_total" else "duration_ms"
+        db_by_alias.setdefault(alias, {"queries": 0, "duration_ms": 0.0})[key] = round(value, 3)
     return {
         "rps_60s": round(rps_1m, 2),
-        "request_ms": req_p,
-        "db_ms": db_p,
+        "request_ms": histogram_percentiles(req_hist, percentiles),
+        "db_ms": histogram_percentiles(db_hist, percentiles),
+        "db_by_alias": db_by_alias,
         "sample_sizes": {
-            # Provide rough visibility into sample windows
-            "request": len(cache.get("metrics:request:latencies") or []),
-            "db": len(cache.get("metrics:db:latencies") or []),
+            "request": int(req_hist[-1]),
+            "db": int(db_hist[-1]),
         },
     }
 
 
+def _format_labels(labels: Iterable[Tuple[str, str]], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """Render the merged snapshot in Prometheus text exposition format (0.0.4)."""
+    snap = cluster_snapshot()
+    lines: List[str] = []
+    seen = set()
+    for (name, labels), value in sorted(snap["counters"].items()):
+        metric = f"campshub_{name}"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} counter")
+            seen.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+    for (name, labels), value in sorted(snap["histograms"].items()):
+        metric = f"campshub_{name}"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} histogram")
+            seen.add(metric)
+        cumulative = 0.0
+        for bound, count in zip(LATENCY_BUCKETS_MS, value):
+            cumulative += count
+            lines.append(f"{metric}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative:g}")
+        cumulative += value[len(LATENCY_BUCKETS_MS)]
+        lines.append(f"{metric}_bucket{_format_labels(labels, ('le', '+Inf'))} {cumulative:g}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {value[-2]:g}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {value[-1]:g}")
+    now = _now_seconds()
+    rps_1m = sum(c for ts, c in snap["rps"].items() if now - RPS_WINDOW < ts <= now) / float(RPS_WINDOW)
+    lines.append("# TYPE campshub_rps_60s gauge")
+    lines.append(f"campshub_rps_60s {rps_1m:g}")
+    return "\n".join(lines) + "\n"
@@ -141,6 +141,7 @@ INSTALLED_APPS = [
     'campshub360',
     'achievements',
     'events',
+    'notifications',
     # API schema
     'drf_spectacular',
 ]
@@ -156,6 +157,7 @@ except Exception:
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'campshub360.db_routers.PrimaryPinningMiddleware',  # Per-request read-after-write pinning
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -464,6 +466,10 @@ if DATABASES['default']['ENGINE'].endswith('postgresql'):
 
 # Optional: route reads to replica
 DATABASE_ROUTERS = ['campshub360.db_routers.ReadReplicaRouter']
+# Replica lag thresholds: above either limit reads fall back to the primary
+REPLICA_MAX_LAG_BYTES = int(os.getenv('REPLICA_MAX_LAG_BYTES', str(16 * 1024 * 1024)))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_LAG_SAMPLE_INTERVAL = float(os.getenv('REPLICA_LAG_SAMPLE_INTERVAL', '5'))
 
 # Force SQLite for pytest runs to keep tests fast and isolated
 _running_pytest = bool(os.getenv('PYTEST_CURRENT_TEST'))
@@ -564,6 +570,77 @@ AUTH_RATE_LIMIT_REFRESH = os.getenv('AUTH_RATE_LIMIT_REFRESH', '10/m')
 # Redis Configuration
 REDIS_URL = os.getenv('REDIS_URL')
 
+# Buffered audit log writer (see campshub360/audit_buffer.py)
+AUDIT_BUFFER_ENABLED = os.getenv('AUDIT_BUFFER_ENABLED', 'True').lower() == 'true'
+AUDIT_BUFFER_BACKEND = os.getenv('AUDIT_BUFFER_BACKEND', 'memory')  # memory | redis
+AUDIT_BUFFER_BATCH_SIZE = int(os.getenv('AUDIT_BUFFER_BATCH_SIZE', '200'))
+AUDIT_BUFFER_FLUSH_INTERVAL = float(os.getenv('AUDIT_BUFFER_FLUSH_INTERVAL', '2.0'))
+AUDIT_BUFFER_MAX_QUEUE = int(os.getenv('AUDIT_BUFFER_MAX_QUEUE', '50000'))
+# Redis backend: seconds before another worker's unacknowledged stream entries are claimed and retried
+AUDIT_STREAM_CLAIM_IDLE = float(os.getenv('AUDIT_STREAM_CLAIM_IDLE', '60'))
+AUDIT_SPILL_DIR = os.getenv('AUDIT_SPILL_DIR', str(BASE_DIR / 'var' / 'audit_spill'))
+
+# IP geolocation (see accounts/geoip.py). Set GEOIP_DATABASE to resolve offline.
+GEOIP_PROVIDER = os.getenv('GEOIP_PROVIDER', 'auto')  # auto | local | ipapi | none
+GEOIP_DATABASE = os.getenv('GEOIP_DATABASE') or None
+GEOIP_LOCATIONS = os.getenv('GEOIP_LOCATIONS') or None
+GEOIP_CACHE_SIZE = int(os.getenv('GEOIP_CACHE_SIZE', '10000'))
+GEOIP_ENRICH_ASYNC = os.getenv('GEOIP_ENRICH_ASYNC', 'True').lower() == 'true'
+GEOIP_ENRICH_WORKERS = int(os.getenv('GEOIP_ENRICH_WORKERS', '2'))
+
+# Login path: LoginIdentifier index fallback (disable once backfilled) and batched session writes
+LOGIN_IDENTIFIER_FALLBACK = os.getenv('LOGIN_IDENTIFIER_FALLBACK', 'True').lower() == 'true'
+LOGIN_SESSION_BUFFER_ENABLED = os.getenv('LOGIN_SESSION_BUFFER_ENABLED', 'True').lower() == 'true'
+LOGIN_SESSION_BUFFER_BATCH_SIZE = int(os.getenv('LOGIN_SESSION_BUFFER_BATCH_SIZE', '200'))
+LOGIN_SESSION_BUFFER_FLUSH_INTERVAL = float(os.getenv('LOGIN_SESSION_BUFFER_FLUSH_INTERVAL', '1.0'))
+
+# Per-user RBAC entries (accounts/rbac.py); role edits invalidate them via a version bump
+RBAC_USER_CACHE_TTL = int(os.getenv('RBAC_USER_CACHE_TTL', '3600'))
+
+# Room booking: cap on occurrences a recurring series may expand to
+BOOKING_SERIES_MAX_OCCURRENCES = int(os.getenv('BOOKING_SERIES_MAX_OCCURRENCES', '520'))
+# Free/busy availability index (facilities/availability.py)
+FACILITIES_SLOT_MINUTES = int(os.getenv('FACILITIES_SLOT_MINUTES', '15'))
+FACILITIES_AVAILABILITY_HORIZON_DAYS = int(os.getenv('FACILITIES_AVAILABILITY_HORIZON_DAYS', '28'))
+FACILITIES_MAINTENANCE_DEFAULT_HOURS = int(os.getenv('FACILITIES_MAINTENANCE_DEFAULT_HOURS', '4'))
+# Utilization summaries (facilities/utilization.py): bookable hours and days (0 = Monday)
+FACILITIES_OPERATING_HOURS = tuple(os.getenv('FACILITIES_OPERATING_HOURS', '08:00-20:00').split('-', 1))
+FACILITIES_OPERATING_WEEKDAYS = [int(d) for d in os.getenv('FACILITIES_OPERATING_WEEKDAYS', '0,1,2,3,4,5').split(',') if d.strip()]
+# Days ending yesterday that the materialize_facility_utilization task keeps filled (older ones: the command)
+FACILITIES_UTILIZATION_BACKFILL_DAYS = int(os.getenv('FACILITIES_UTILIZATION_BACKFILL_DAYS', '366'))
+
+# R&D search (rnd/search.py): 'auto' uses Postgres full-text when available, else the inverted index
+RND_SEARCH_BACKEND = os.getenv('RND_SEARCH_BACKEND', 'auto')
+RND_SEARCH_MAX_PAGE_SIZE = int(os.getenv('RND_SEARCH_MAX_PAGE_SIZE', '100'))
+# Student search (students/search.py): 'auto' uses pg_trgm on Postgres, else the n-gram index
+STUDENTS_SEARCH_BACKEND = os.getenv('STUDENTS_SEARCH_BACKEND', 'auto')
+STUDENTS_SEARCH_MIN_SIMILARITY = float(os.getenv('STUDENTS_SEARCH_MIN_SIMILARITY', '0.3'))
+# Cap on students ranked by name similarity; roll number prefix searches return every match
+STUDENTS_SEARCH_MAX_RESULTS = int(os.getenv('STUDENTS_SEARCH_MAX_RESULTS', '500'))
+
+# Notification outbox (notifications/outbox.py)
+NOTIFICATIONS_DEFAULT_CHANNELS = [c.strip() for c in os.getenv('NOTIFICATIONS_DEFAULT_CHANNELS', 'inapp,email').split(',') if c.strip()]
+# Empty uses EMAIL_BACKEND; e.g. django.core.mail.backends.console.EmailBackend or .filebased.EmailBackend
+NOTIFICATIONS_EMAIL_BACKEND = os.getenv('NOTIFICATIONS_EMAIL_BACKEND', '')
+# Per recipient and channel, per hour (0 = unlimited)
+NOTIFICATIONS_RATE_LIMITS = {
+    'email': int(os.getenv('NOTIFICATIONS_EMAIL_PER_HOUR', '30')),
+    'sms': int(os.getenv('NOTIFICATIONS_SMS_PER_HOUR', '5')),
+    'inapp': int(os.getenv('NOTIFICATIONS_INAPP_PER_HOUR', '0')),
+}
+NOTIFICATIONS_BATCH_SIZE = int(os.getenv('NOTIFICATIONS_BATCH_SIZE', '500'))
+NOTIFICATIONS_MAX_ATTEMPTS = int(os.getenv('NOTIFICATIONS_MAX_ATTEMPTS', '5'))
+NOTIFICATIONS_RETRY_BACKOFF_SECONDS = int(os.getenv('NOTIFICATIONS_RETRY_BACKOFF_SECONDS', '60'))
+
+# Materialized dashboard statistics (dashboard/snapshots.py): snapshot history retention
+DASHBOARD_STATS_HISTORY_DAYS = int(os.getenv('DASHBOARD_STATS_HISTORY_DAYS', '90'))
+
+# Introspected schema for the admin schema pages (dashboard/schema.py); also re-read after migrate
+DASHBOARD_SCHEMA_CACHE_SECONDS = int(os.getenv('DASHBOARD_SCHEMA_CACHE_SECONDS', '3600'))
+
+# In-process metrics: how often each worker publishes its snapshot to the cache
+METRICS_PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', '10'))
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
@@ -688,6 +765,15 @@ ATTENDANCE_AUTO_OPEN_SESSIONS = os.getenv('ATTENDANCE_AUTO_OPEN_SESSIONS', 'True
 ATTENDANCE_AUTO_CLOSE_SESSIONS = os.getenv('ATTENDANCE_AUTO_CLOSE_SESSIONS', 'True').lower() == 'true'
 ATTENDANCE_QR_TOKEN_EXPIRY_MINUTES = int(os.getenv('ATTENDANCE_QR_TOKEN_EXPIRY_MINUTES', '60'))
 ATTENDANCE_MAX_CORRECTION_DAYS = int(os.getenv('ATTENDANCE_MAX_CORRECTION_DAYS', '7'))
+# Biometric punches: files dropped in <DROP_DIR>/<device_id>/ are staged by sync_biometric_data;
+# punches of one subject on one device within DEDUPE_SECONDS count once
+ATTENDANCE_BIOMETRIC_DROP_DIR = os.getenv('ATTENDANCE_BIOMETRIC_DROP_DIR', '')
+ATTENDANCE_BIOMETRIC_DEDUPE_SECONDS = int(os.getenv('ATTENDANCE_BIOMETRIC_DEDUPE_SECONDS', '60'))
+# Webhook punches older than this are rejected; backlogs come in through the drop dir
+ATTENDANCE_BIOMETRIC_MAX_PUNCH_AGE_MINUTES = int(os.getenv('ATTENDANCE_BIOMETRIC_MAX_PUNCH_AGE_MINUTES', '60'))
+ATTENDANCE_BIOMETRIC_BATCH_SIZE = int(os.getenv('ATTENDANCE_BIOMETRIC_BATCH_SIZE', '1000'))
+# Extra attendance.integrity rules (dotted paths to IntegrityRule subclasses)
+ATTENDANCE_INTEGRITY_RULES = []
 
 # Celery settings for attendance tasks
 CELERY_BEAT_SCHEDULE = {
@@ -704,6 +790,18 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': 0.0,  # Run at midnight (configure via crontab)
         'args': (),  # Will be called with default date range
     },
+    'process-biometric-punches': {
+        'task': 'attendance.tasks.process_biometric_punches',
+        'schedule': 15.0,
+    },
+    'sync-biometric-devices': {
+        'task': 'attendance.tasks.sync_biometric_data',
+        'schedule': 300.0,  # Run every 5 minutes
+    },
+    'validate-attendance-data-integrity': {
+        'task': 'attendance.tasks.validate_attendance_data_integrity',
+        'schedule': 604800.0,  # Run weekly
+    },
     'cleanup-old-attendance-data': {
         'task': 'attendance.tasks.cleanup_old_attendance_data',
         'schedule': 86400.0,  # Run daily
@@ -712,4 +810,33 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'attendance.tasks.calculate_attendance_statistics',
         'schedule': 3600.0,  # Run hourly
     },
+    'score-mentee-risk': {
+        'task': 'mentoring.tasks.score_mentee_risk',
+        'schedule': 86400.0,  # Run daily
+    },
+    'drain-notification-outbox': {
+        'task': 'notifications.tasks.drain_notification_outbox',
+        'schedule': 10.0,
+    },
+    'send-notification-digests': {
+        'task': 'notifications.tasks.send_notification_digests',
+        'schedule': 86400.0,  # Run daily
+    },
+    'refresh-dashboard-stats': {
+        'task': 'dashboard.tasks.refresh_dashboard_stats',
+        'schedule': 900.0,  # Run every 15 minutes
+    },
+    'refresh-dirty-dashboard-stats': {
+        'task': 'dashboard.tasks.refresh_dashboard_stats',
+        'schedule': 60.0,
+        'kwargs': {'dirty_only': True},
+    },
+    'reconcile-department-headcounts': {
+        'task': 'departments.tasks.reconcile_department_headcounts',
+        'schedule': 86400.0,  # Run daily
+    },
+    'materialize-facility-utilization': {
+        'task': 'facilities.tasks.materialize_facility_utilization',
+        'schedule': 900.0,  # Run every 15 minutes; rebuilds days invalidated by booking changes
+    },
 }
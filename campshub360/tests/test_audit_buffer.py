@@ -0,0 +1,168 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import AuditLog
+from campshub360.audit import AuditLogMiddleware
+from campshub360.audit_buffer import AuditBuffer, SpillStore, build_event, record_audit_event
+
+
+pytestmark = pytest.mark.django_db
+
+
+def _buffer(tmp_path, **kwargs):
+    kwargs.setdefault("batch_size", 3)
+    return AuditBuffer(spill=SpillStore(tmp_path), start_thread=False, **kwargs)
+
+
+def test_flush_writes_queued_events_in_batches(tmp_path, django_user_model):
+    user = django_user_model.objects.create_user(email="a@example.com", username="a", password="xX12345678")
+    buf = _buffer(tmp_path)
+    for i in range(7):
+        buf.enqueue(build_event(user_id=user.pk, action=f"POST /x/{i}", ip="10.0.0.1", meta={"i": i}))
+    logs = AuditLog.objects.filter(action__startswith="POST /x/")
+    assert logs.count() == 0
+
+    assert buf.flush() == 7
+    assert len(buf) == 0
+    assert logs.filter(user=user).count() == 7
+    assert sorted(logs.values_list("meta__i", flat=True)) == list(range(7))
+
+
+def test_overflow_spills_to_disk_and_replays(tmp_path):
+    buf = _buffer(tmp_path, max_queue=2)
+    for i in range(5):
+        buf.enqueue(build_event(user_id=None, action=f"DELETE /y/{i}"))
+    assert len(buf) == 2
+    spilled = [json.loads(line) for path in buf.spill_store.files() for line in path.read_text().splitlines()]
+    assert [e["action"] for e in spilled] == ["DELETE /y/2", "DELETE /y/3", "DELETE /y/4"]
+
+    assert buf.spill_store.replay() == 3
+    assert buf.spill_store.files() == []
+    # Replaying the same events again must not duplicate rows
+    buf.spill_store.spill(spilled)
+    buf.spill_store.replay()
+    assert AuditLog.objects.count() == 3
+
+
+def test_rows_keep_the_event_time(tmp_path):
+    buf = _buffer(tmp_path)
+    event = build_event(user_id=None, action="PUT /t")
+    event["created_at"] = (timezone.now() - timedelta(hours=3)).isoformat()
+    buf.enqueue(event)
+    buf.flush()
+    assert AuditLog.objects.get(action="PUT /t").created_at == parse_datetime(event["created_at"])
+
+    # Spilled and replayed later: still the event's time
+    spilled = build_event(user_id=None, action="PUT /u")
+    spilled["created_at"] = (timezone.now() - timedelta(days=1)).isoformat()
+    buf.spill_store.spill([spilled])
+    buf.spill_store.replay()
+    assert AuditLog.objects.get(action="PUT /u").created_at == parse_datetime(spilled["created_at"])
+
+
+def test_failed_flush_spills_batch(tmp_path):
+    buf = _buffer(tmp_path)
+    buf.enqueue(build_event(user_id=None, action="PATCH /z"))
+    with patch.object(buf, "writer", side_effect=RuntimeError("db down")):
+        assert buf.flush() == 0
+    assert AuditLog.objects.count() == 0
+    assert buf.spill_store.replay() == 1
+    assert AuditLog.objects.get().action == "PATCH /z"
+
+
+@override_settings(AUDIT_BUFFER_ENABLED=False)
+def test_record_audit_event_writes_synchronously_when_disabled():
+    record_audit_event(user_id=None, action="PUT /sync")
+    assert AuditLog.objects.filter(action="PUT /sync").exists()
+
+
+def test_middleware_records_mutations_only(django_user_model):
+    user = django_user_model.objects.create_user(email="m@example.com", username="m", password="xX12345678")
+    mw = AuditLogMiddleware(lambda r: None)
+    rf = RequestFactory()
+    from django.http import HttpResponse
+
+    for method in ("get", "post"):
+        request = getattr(rf, method)("/api/things/")
+        request.user = user
+        mw.process_request(request)
+        with patch("campshub360.audit.enrich_latest_session"):
+            response = mw.process_response(request, HttpResponse(status=201))
+        assert response["X-Request-ID"] == request.request_id
+
+    log = AuditLog.objects.get(action__endswith=" /api/things/")
+    assert log.action == "POST /api/things/"
+    assert log.user_id == user.pk
+    assert log.meta["status_code"] == 201
+
+
+class FakeStream:
+    """Just enough of a Redis stream with one consumer group for RedisStreamAuditBuffer."""
+
+    def __init__(self):
+        self.entries = {}
+        self.pending = {}
+        self.seq = 0
+        self.has_group = False
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        entry_id = f"{self.seq}-0".encode()
+        self.entries[entry_id] = {k.encode(): v.encode() for k, v in fields.items()}
+        return entry_id
+
+    def xgroup_create(self, key, group, id="0", mkstream=False):
+        if self.has_group:
+            raise RuntimeError("BUSYGROUP Consumer Group name already exists")
+        self.has_group = True
+
+    def xreadgroup(self, group, consumer, streams, count=None):
+        if streams[next(iter(streams))] == ">":
+            ids = [i for i in self.entries if i not in self.pending][:count]
+            self.pending.update({i: consumer for i in ids})
+        else:
+            ids = [i for i, owner in self.pending.items() if owner == consumer][:count]
+        return [[b"audit:events", [(i, self.entries.get(i)) for i in ids]]] if ids else []
+
+    def xautoclaim(self, key, group, consumer, min_idle_time, start_id="0-0", count=None):
+        ids = [i for i, owner in self.pending.items() if owner != consumer][:count]
+        self.pending.update({i: consumer for i in ids})
+        return [b"0-0", [(i, self.entries.get(i)) for i in ids], []]
+
+    def xack(self, key, group, *ids):
+        for i in ids:
+            self.pending.pop(i, None)
+
+    def xdel(self, key, *ids):
+        for i in ids:
+            self.entries.pop(i, None)
+
+
+def test_redis_stream_entries_survive_a_failed_write_until_acknowledged(tmp_path):
+    from campshub360.audit_buffer import RedisStreamAuditBuffer
+
+    stream = FakeStream()
+    crashed = RedisStreamAuditBuffer(redis_client=stream, spill=SpillStore(tmp_path), start_thread=False, batch_size=10)
+    for i in range(3):
+        crashed.enqueue(build_event(user_id=None, action=f"POST /stream/{i}"))
+
+    # The database write fails and so does the spill: nothing may be acknowledged
+    with patch.object(crashed, "writer", side_effect=RuntimeError("db down")), \
+            patch.object(crashed.spill_store, "spill", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            crashed.flush()
+    assert len(stream.entries) == 3 and len(stream.pending) == 3
+    assert AuditLog.objects.count() == 0
+
+    # Another worker claims the abandoned entries, writes them, then acknowledges and deletes them
+    other = RedisStreamAuditBuffer(redis_client=stream, spill=SpillStore(tmp_path), start_thread=False, claim_idle=0)
+    other.consumer = "other-worker"
+    assert other.flush() == 3
+    assert sorted(AuditLog.objects.values_list("action", flat=True)) == [f"POST /stream/{i}" for i in range(3)]
+    assert stream.entries == {} and stream.pending == {}
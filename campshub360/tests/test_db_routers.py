@@ -0,0 +1,118 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from campshub360.db_routers import (
+    PRIMARY,
+    REPLICA,
+    PrimaryPinningMiddleware,
+    ReadReplicaRouter,
+    ReplicaLagMonitor,
+    UsePrimaryReads,
+    is_pinned_to_primary,
+    parse_lsn,
+    primary_pinning_scope,
+)
+from campshub360.metrics import merge_snapshots, registry
+
+
+DATABASES_WITH_REPLICA = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    'read_replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+}
+
+
+@pytest.fixture
+def router():
+    r = ReadReplicaRouter()
+    r.lag_monitor = ReplicaLagMonitor()
+    r.lag_monitor.healthy = True
+    r.lag_monitor._sampled_at = float('inf')  # never resample unless asked
+    return r
+
+
+def test_parse_lsn():
+    assert parse_lsn('0/0') == 0
+    assert parse_lsn('16/B374D848') == (0x16 << 32) + 0xB374D848
+
+
+@override_settings(DATABASES=DATABASES_WITH_REPLICA)
+def test_write_pins_reads_to_primary_within_scope_only(router):
+    with primary_pinning_scope():
+        assert router.db_for_read(None) == REPLICA
+        assert router.db_for_write(None) == PRIMARY
+        assert is_pinned_to_primary()
+        assert router.db_for_read(None) == PRIMARY
+    with primary_pinning_scope():
+        assert router.db_for_read(None) == REPLICA
+
+
+@override_settings(DATABASES=DATABASES_WITH_REPLICA)
+def test_pinning_is_not_shared_between_threads(router):
+    seen = {}
+
+    def other_thread():
+        with primary_pinning_scope():
+            seen['other'] = router.db_for_read(None)
+
+    with primary_pinning_scope():
+        router.db_for_write(None)
+        t = threading.Thread(target=other_thread)
+        t.start()
+        t.join()
+        assert router.db_for_read(None) == PRIMARY
+    assert seen['other'] == REPLICA
+
+
+@override_settings(DATABASES=DATABASES_WITH_REPLICA)
+def test_force_primary_context_manager_and_hint(router):
+    with primary_pinning_scope():
+        with UsePrimaryReads():
+            assert router.db_for_read(None) == PRIMARY
+        assert router.db_for_read(None) == REPLICA
+        assert router.db_for_read(None, force_primary=True) == PRIMARY
+
+
+@override_settings(DATABASES=DATABASES_WITH_REPLICA, REPLICA_MAX_LAG_BYTES=1000, REPLICA_MAX_LAG_SECONDS=None)
+def test_lag_above_threshold_falls_back_to_primary(router):
+    monitor = router.lag_monitor
+
+    def lagging():
+        monitor.lag_bytes, monitor.lag_seconds = 5000, 0.0
+
+    def caught_up():
+        monitor.lag_bytes, monitor.lag_seconds = 10, 0.0
+
+    registry.reset()
+    with primary_pinning_scope():
+        with patch.object(monitor, '_sample', side_effect=lagging):
+            monitor.refresh(force=True)
+        assert router.db_for_read(None) == PRIMARY
+        with patch.object(monitor, '_sample', side_effect=caught_up):
+            monitor.refresh(force=True)
+        assert router.db_for_read(None) == REPLICA
+        with patch.object(monitor, '_sample', side_effect=RuntimeError('replica down')):
+            monitor.refresh(force=True)
+        assert router.db_for_read(None) == PRIMARY
+
+    counters = merge_snapshots([registry.snapshot()])['counters']
+    assert counters[('db_reads_routed_total', (('reason', 'lag'), ('target', PRIMARY)))] == 2
+    assert counters[('db_reads_routed_total', (('reason', 'replica'), ('target', REPLICA)))] == 1
+    registry.reset()
+
+
+def test_reads_use_primary_without_replica(router):
+    assert router.db_for_read(None) == PRIMARY
+
+
+@override_settings(DATABASES=DATABASES_WITH_REPLICA)
+def test_middleware_clears_pin_after_request(router):
+    def view(request):
+        router.db_for_write(None)
+        return router.db_for_read(None)
+
+    mw = PrimaryPinningMiddleware(view)
+    assert mw(object()) == PRIMARY
+    assert not is_pinned_to_primary()
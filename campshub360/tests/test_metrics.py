@@ -0,0 +1,76 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from campshub360.metrics import (
+    LATENCY_BUCKETS_MS,
+    MetricsMiddleware,
+    MetricsRegistry,
+    collect_app_metrics,
+    histogram_percentiles,
+    merge_snapshots,
+    registry,
+    render_prometheus,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def test_histogram_buckets_and_percentiles():
+    reg = MetricsRegistry()
+    for ms in [0.5] * 50 + [7] * 40 + [400] * 10:
+        reg.observe("lat", ms)
+    merged = merge_snapshots([reg.snapshot()])
+    hist = merged["histograms"][("lat", ())]
+    assert hist[-1] == 100
+    assert hist[0] == 50  # <= 1ms
+    assert hist[LATENCY_BUCKETS_MS.index(10)] == 40
+    p = histogram_percentiles(hist, [0.5, 0.9, 0.99])
+    assert p["p50"] <= 1.0
+    assert 5 <= p["p90"] <= 10
+    assert 250 <= p["p99"] <= 500
+    assert histogram_percentiles([0.0] * len(hist), [0.5]) == {"p50": 0.0}
+
+
+def test_snapshots_merge_across_workers():
+    a, b = MetricsRegistry(), MetricsRegistry()
+    a.inc("db_queries_total", (("alias", "default"),), 3)
+    b.inc("db_queries_total", (("alias", "default"),), 4)
+    b.inc("db_queries_total", (("alias", "read_replica"),), 2)
+    merged = merge_snapshots([a.snapshot(), b.snapshot()])
+    assert merged["counters"][("db_queries_total", (("alias", "default"),))] == 7
+    assert merged["counters"][("db_queries_total", (("alias", "read_replica"),))] == 2
+
+
+@pytest.mark.django_db
+@override_settings(METRICS_PUBLISH_INTERVAL=3600)
+def test_middleware_records_route_and_per_alias_db_stats(django_user_model):
+    mw = MetricsMiddleware(lambda r: HttpResponse())
+    request = RequestFactory().get("/x/")
+    mw.process_view(request, None, (), {})
+    django_user_model.objects.count()
+    mw.process_response(request, HttpResponse(status=404))
+
+    data = collect_app_metrics()
+    assert data["sample_sizes"]["request"] == 1
+    assert data["db_by_alias"]["default"]["queries"] >= 1
+    assert data["rps_60s"] > 0
+
+    body = render_prometheus()
+    assert 'campshub_db_queries_total{alias="default"}' in body
+    assert 'campshub_http_request_duration_ms_bucket{method="GET",route="unmatched",status="4xx",le="+Inf"} 1' in body
+    assert "# TYPE campshub_http_request_duration_ms histogram" in body
+
+
+def test_publish_is_rate_limited(monkeypatch):
+    calls = []
+    reg = MetricsRegistry()
+    monkeypatch.setattr(reg, "publish", lambda: calls.append(1))
+    reg.maybe_publish(interval=60)
+    reg.maybe_publish(interval=60)
+    assert calls == [1]
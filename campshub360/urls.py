@@ -24,7 +24,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from accounts.views import RateLimitedTokenView, RateLimitedRefreshView
-from .health_views import health_check, detailed_health_check, readiness_check, liveness_check, app_metrics
+from .health_views import health_check, detailed_health_check, readiness_check, liveness_check, app_metrics, app_metrics_prometheus
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
 urlpatterns = [
@@ -34,6 +34,7 @@ urlpatterns = [
     path('health/ready/', readiness_check, name='readiness_check'),
     path('health/alive/', liveness_check, name='liveness_check'),
     path('metrics/app', app_metrics, name='app_metrics'),
+    path('metrics/app/prometheus', app_metrics_prometheus, name='app_metrics_prometheus'),
     
     path('admin/', admin.site.urls),
     # Standardized JWT endpoints (rate limited)
@@ -60,6 +61,7 @@ urlpatterns = [
     path('api/assignments/', include('assignments.urls', namespace='assignments')),
     path('api/v1/achievements/', include('achievements.urls')),
     path('api/v1/events/', include('events.urls', namespace='events')),
+    path('api/v1/notifications/', include('notifications.urls', namespace='notifications')),
     # Prometheus metrics (conditionally added below if installed)
     # Docs and API schema routes removed
     # API schema and docs
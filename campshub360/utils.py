@@ -1,9 +1,18 @@
 from contextlib import contextmanager
+from typing import Iterator, Sequence
+
 from .db_routers import UsePrimaryReads
 
+# Rows per IN (...) lookup or bulk write in the set-based jobs; well under sqlite's 32766 parameters
+CHUNK = 2000
+
 
 @contextmanager
 def use_primary_reads():
     with UsePrimaryReads():
         yield
 
+
+def chunked(items: Sequence, size: int = CHUNK) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import uuid
 import json
 from datetime import datetime
@@ -27,3 +28,25 @@ class TimeStampedUUIDModel(models.Model):
 #
 
 #
+
+
+class StatsSnapshot(models.Model):
+    """Materialized dashboard statistics for one group (see dashboard/snapshots.py).
+
+    A row holds from ``created_at`` until the next row of its group; refreshes that
+    find the same values only move ``computed_at`` forward.
+    """
+    group = models.CharField(max_length=64)
+    values = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    computed_at = models.DateTimeField(default=timezone.now)
+    duration_ms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'dashboard_stats_snapshot'
+        indexes = [
+            models.Index(fields=['group', '-computed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.group} @ {self.computed_at:%Y-%m-%d %H:%M}"
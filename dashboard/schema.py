@@ -0,0 +1,387 @@
+"""Database schema introspection for the admin schema pages and exports.
+
+On PostgreSQL the whole schema (tables with row estimates, columns,
+constraints with their foreign-key targets, and indexes) is read with
+four catalog queries, however many tables there are; SQLite does the same
+with three pragma queries (no row estimates). Other backends fall back to
+Django's per-table introspection.
+
+The result is cached under a key derived from the applied migrations, so
+it is rebuilt after ``migrate`` and otherwise only when the cache entry
+expires (``DASHBOARD_SCHEMA_CACHE_SECONDS``, which also bounds how stale
+the row estimates get).
+
+``browse()`` pages through a table's rows by primary key, using only table
+and column names taken from the introspected schema and a bound parameter
+for the cursor.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Count, Max
+
+CACHE_KEY = 'dashboard_schema:{alias}:{state}'
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class Column:
+    name: str
+    type: str
+    not_null: bool
+    default: Optional[str] = None
+    max_length: Optional[int] = None
+    primary_key: bool = False
+
+
+@dataclass
+class Constraint:
+    name: str
+    kind: str  # primary_key, unique, foreign_key, check
+    columns: List[str]
+    references: Optional[Tuple[str, List[str]]] = None
+    definition: Optional[str] = None
+
+
+@dataclass
+class Index:
+    name: str
+    columns: List[str]
+    unique: bool = False
+    primary: bool = False
+    method: Optional[str] = None
+    definition: Optional[str] = None
+
+
+@dataclass
+class Table:
+    name: str
+    row_estimate: Optional[int] = None
+    columns: List[Column] = field(default_factory=list)
+    constraints: List[Constraint] = field(default_factory=list)
+    indexes: List[Index] = field(default_factory=list)
+
+    @property
+    def primary_key(self) -> List[str]:
+        return next((c.columns for c in self.constraints if c.kind == 'primary_key'), [])
+
+    @property
+    def foreign_keys(self) -> List[Constraint]:
+        return [c for c in self.constraints if c.kind == 'foreign_key']
+
+    def column(self, name: str) -> Optional[Column]:
+        return next((c for c in self.columns if c.name == name), None)
+
+
+@dataclass
+class Schema:
+    state: str
+    tables: Dict[str, Table] = field(default_factory=dict)
+
+    def fk_graph(self) -> Dict[str, List[str]]:
+        """table -> the tables its foreign keys point at."""
+        return {
+            name: sorted({fk.references[0] for fk in table.foreign_keys if fk.references})
+            for name, table in self.tables.items()
+        }
+
+    def as_dict(self) -> dict:
+        return {
+            'state': self.state,
+            'tables': {
+                name: {**asdict(table), 'primary_key': table.primary_key}
+                for name, table in self.tables.items()
+            },
+            'fk_graph': self.fk_graph(),
+        }
+
+
+# --- PostgreSQL: one catalog query per kind of object -----------------------------
+
+PG_TABLES = """
+    SELECT c.relname, c.reltuples::bigint
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+    ORDER BY c.relname
+"""
+
+PG_COLUMNS = """
+    SELECT table_name, column_name, data_type, is_nullable = 'NO', column_default, character_maximum_length
+    FROM information_schema.columns
+    WHERE table_schema = current_schema()
+    ORDER BY table_name, ordinal_position
+"""
+
+PG_CONSTRAINTS = """
+    SELECT cl.relname, con.conname, con.contype,
+           ARRAY(SELECT a.attname FROM unnest(con.conkey) WITH ORDINALITY k(num, ord)
+                 JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.num ORDER BY k.ord),
+           ref.relname,
+           ARRAY(SELECT a.attname FROM unnest(con.confkey) WITH ORDINALITY k(num, ord)
+                 JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.num ORDER BY k.ord),
+           pg_get_constraintdef(con.oid)
+    FROM pg_constraint con
+    JOIN pg_class cl ON cl.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = cl.relnamespace
+    LEFT JOIN pg_class ref ON ref.oid = con.confrelid
+    WHERE n.nspname = current_schema() AND con.contype IN ('p', 'u', 'f', 'c')
+    ORDER BY cl.relname, con.conname
+"""
+
+PG_INDEXES = """
+    SELECT t.relname, i.relname, ix.indisunique, ix.indisprimary,
+           ARRAY(SELECT a.attname FROM unnest(ix.indkey::int2[]) WITH ORDINALITY k(num, ord)
+                 JOIN pg_attribute a ON a.attrelid = ix.indrelid AND a.attnum = k.num ORDER BY k.ord),
+           am.amname, pg_get_indexdef(ix.indexrelid)
+    FROM pg_index ix
+    JOIN pg_class t ON t.oid = ix.indrelid
+    JOIN pg_class i ON i.oid = ix.indexrelid
+    JOIN pg_am am ON am.oid = i.relam
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = current_schema()
+    ORDER BY t.relname, i.relname
+"""
+
+PG_CONSTRAINT_KINDS = {'p': 'primary_key', 'u': 'unique', 'f': 'foreign_key', 'c': 'check'}
+
+
+def _postgresql(connection, state: str) -> Schema:
+    schema = Schema(state=state)
+    with connection.cursor() as cursor:
+        cursor.execute(PG_TABLES)
+        for name, estimate in cursor.fetchall():
+            # reltuples is -1 (or 0 on old servers) until the table is first analyzed
+            schema.tables[name] = Table(name=name, row_estimate=estimate if estimate and estimate > 0 else None)
+
+        cursor.execute(PG_COLUMNS)
+        for table, *column in cursor.fetchall():
+            if table in schema.tables:
+                schema.tables[table].columns.append(Column(*column))
+
+        cursor.execute(PG_CONSTRAINTS)
+        for table, name, kind, columns, ref_table, ref_columns, definition in cursor.fetchall():
+            if table in schema.tables:
+                schema.tables[table].constraints.append(Constraint(
+                    name=name, kind=PG_CONSTRAINT_KINDS[kind], columns=list(columns),
+                    references=(ref_table, list(ref_columns)) if ref_table else None, definition=definition,
+                ))
+
+        cursor.execute(PG_INDEXES)
+        for table, name, unique, primary, columns, method, definition in cursor.fetchall():
+            if table in schema.tables:
+                schema.tables[table].indexes.append(Index(
+                    name=name, columns=list(columns), unique=unique, primary=primary,
+                    method=method, definition=definition,
+                ))
+    _mark_primary_keys(schema)
+    return schema
+
+
+# --- SQLite: the same, through the pragma table-valued functions ------------------------
+
+SQLITE_COLUMNS = """
+    SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk
+    FROM sqlite_master m, pragma_table_info(m.name) p
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+    ORDER BY m.name, p.cid
+"""
+
+SQLITE_FOREIGN_KEYS = """
+    SELECT m.name, p.id, p."table", p."from", p."to"
+    FROM sqlite_master m, pragma_foreign_key_list(m.name) p
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+    ORDER BY m.name, p.id, p.seq
+"""
+
+SQLITE_INDEXES = """
+    SELECT m.name, il.name, il."unique", il.origin, ii.name
+    FROM sqlite_master m, pragma_index_list(m.name) il, pragma_index_info(il.name) ii
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+    ORDER BY m.name, il.name, ii.seqno
+"""
+
+
+def _sqlite(connection, state: str) -> Schema:
+    schema = Schema(state=state)
+    with connection.cursor() as cursor:
+        cursor.execute(SQLITE_COLUMNS)
+        keys: Dict[str, List[Tuple[int, str]]] = {}
+        for table, name, type_, not_null, default, pk in cursor.fetchall():
+            length = re.search(r'\((\d+)\)', type_ or '')
+            schema.tables.setdefault(table, Table(name=table)).columns.append(Column(
+                name=name, type=type_, not_null=bool(not_null), default=default,
+                max_length=int(length.group(1)) if length else None,
+            ))
+            if pk:
+                keys.setdefault(table, []).append((pk, name))
+        for table, columns in keys.items():
+            schema.tables[table].constraints.append(Constraint(
+                name=f'{table}_pkey', kind='primary_key', columns=[name for _, name in sorted(columns)],
+            ))
+
+        cursor.execute(SQLITE_FOREIGN_KEYS)
+        foreign_keys: Dict[tuple, Constraint] = {}
+        for table, key_id, ref_table, column, ref_column in cursor.fetchall():
+            constraint = foreign_keys.get((table, key_id))
+            if constraint is None:
+                constraint = foreign_keys[(table, key_id)] = Constraint(
+                    name=f'{table}_fk_{key_id}', kind='foreign_key', columns=[], references=(ref_table, []),
+                )
+                schema.tables[table].constraints.append(constraint)
+            constraint.columns.append(column)
+            constraint.references[1].append(ref_column)
+
+        cursor.execute(SQLITE_INDEXES)
+        indexes: Dict[tuple, Index] = {}
+        for table, name, unique, origin, column in cursor.fetchall():
+            index = indexes.get((table, name))
+            if index is None:
+                index = indexes[(table, name)] = Index(name=name, columns=[], unique=bool(unique), primary=origin == 'pk')
+                schema.tables[table].indexes.append(index)
+                if origin == 'u':
+                    schema.tables[table].constraints.append(Constraint(name=name, kind='unique', columns=index.columns))
+            index.columns.append(column)
+    _mark_primary_keys(schema)
+    return schema
+
+
+# --- other backends: Django's introspection, per table ------------------------------
+
+
+def _generic(connection, state: str) -> Schema:
+    schema = Schema(state=state)
+    introspection = connection.introspection
+    with connection.cursor() as cursor:
+        for info in sorted(introspection.get_table_list(cursor), key=lambda t: t.name):
+            if info.type != 't':
+                continue
+            table = schema.tables[info.name] = Table(name=info.name)
+            for description in introspection.get_table_description(cursor, info.name):
+                table.columns.append(Column(
+                    name=description.name, type=str(description.type_code), not_null=not description.null_ok,
+                    default=description.default, max_length=description.internal_size or None,
+                ))
+            for name, details in introspection.get_constraints(cursor, info.name).items():
+                columns = list(details['columns'] or [])
+                if details['primary_key']:
+                    kind = 'primary_key'
+                elif details['foreign_key']:
+                    kind = 'foreign_key'
+                elif details['check']:
+                    kind = 'check'
+                elif details['unique'] and not details['index']:
+                    kind = 'unique'
+                else:
+                    kind = None
+                if kind:
+                    ref_table, ref_column = details['foreign_key'] or (None, None)
+                    table.constraints.append(Constraint(
+                        name=name, kind=kind, columns=columns,
+                        references=(ref_table, [ref_column]) if ref_table else None,
+                    ))
+                if details['index']:
+                    table.indexes.append(Index(
+                        name=name, columns=columns, unique=bool(details['unique']),
+                        primary=bool(details['primary_key']), method=details.get('type'),
+                    ))
+    _mark_primary_keys(schema)
+    return schema
+
+
+def _mark_primary_keys(schema: Schema) -> None:
+    for table in schema.tables.values():
+        for name in table.primary_key:
+            column = table.column(name)
+            if column is not None:
+                column.primary_key = True
+
+
+READERS = {'postgresql': _postgresql, 'sqlite': _sqlite}
+
+
+# --- public API ------------------------------------------------------------------
+
+
+def migration_state(using: str = 'default') -> str:
+    """A fingerprint of the applied migrations; changes whenever ``migrate`` does something."""
+    recorder = MigrationRecorder(connections[using])
+    if not recorder.has_table():
+        return 'unmigrated'
+    state = recorder.migration_qs.aggregate(count=Count('pk'), last=Max('pk'), applied=Max('applied'))
+    return hashlib.sha1(repr(sorted(state.items())).encode()).hexdigest()[:16]
+
+
+def introspect(using: str = 'default', refresh: bool = False) -> Schema:
+    """The database schema, from the cache unless the migration state changed."""
+    connection = connections[using]
+    state = migration_state(using)
+    key = CACHE_KEY.format(alias=using, state=state)
+    if not refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    reader = READERS.get(connection.vendor, _generic)
+    schema = reader(connection, state)
+    cache.set(key, schema, settings.DASHBOARD_SCHEMA_CACHE_SECONDS)
+    return schema
+
+
+@dataclass
+class Page:
+    table: str
+    columns: List[str]
+    data: List[dict]
+    next: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {'table': self.table, 'columns': self.columns, 'data': self.data,
+                'count': len(self.data), 'next': self.next}
+
+
+def browse(table_name: str, after: Optional[str] = None, limit: int = 100, using: str = 'default') -> Page:
+    """One page of ``table_name`` ordered by its primary key, starting after the ``after`` key.
+
+    Raises KeyError for a table not in the schema and ValueError for a bad cursor.
+    Tables without a single-column primary key can only be read from the start.
+    """
+    schema = introspect(using)
+    table = schema.tables.get(table_name)
+    if table is None:
+        raise KeyError(table_name)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    key = table.primary_key[0] if len(table.primary_key) == 1 else None
+
+    sql = f'SELECT * FROM {quote(table.name)}'
+    params = []
+    if key is not None:
+        if after is not None:
+            if 'int' in table.column(key).type.lower():
+                after = int(after)
+            sql += f' WHERE {quote(key)} > %s'
+            params.append(after)
+        sql += f' ORDER BY {quote(key)}'
+    elif after is not None:
+        raise ValueError(f'{table.name} has no single-column primary key to page by')
+    sql += ' LIMIT %s'
+    params.append(limit + 1)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [description[0] for description in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    page = Page(table=table.name, columns=columns, data=rows[:limit])
+    if key is not None and len(rows) > limit:
+        page.next = str(page.data[-1][key])
+    return page
@@ -0,0 +1,226 @@
+"""Materialized dashboard statistics.
+
+Dashboards read their numbers from ``StatsSnapshot`` rows instead of
+running a dozen COUNT/SUM queries per page load. Each app declares its
+metrics in a ``stats`` module (autodiscovered when the dashboard app is
+ready)::
+
+    register('rnd', [
+        Metric('total_projects', 'rnd.Project', Count('pk')),
+        Metric('active_projects', 'rnd.Project', Count('pk', filter=Q(status='active'))),
+        Metric('total_grant_amount', 'rnd.Grant', Sum('amount')),
+    ])
+
+``refresh()`` evaluates every requested metric at once: metrics on the same
+model (across all groups) share a single ``aggregate()`` query, and
+breakdown metrics share one ``values().annotate()`` query per model and
+field. Each group's result is stored as one JSON snapshot; when nothing
+changed since the previous refresh that row is only re-stamped, so the
+table keeps one row per change and ``history()`` reads trends from it.
+
+Refreshes run on a schedule (``refresh_dashboard_stats``) and, sooner, for
+groups whose source models were saved or deleted since the last refresh
+(dirty flags kept in the cache; see ``mark_dirty``).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import StatsSnapshot
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'dashboard_stats:dirty:{}'
+
+
+@dataclass(frozen=True)
+class Metric:
+    """One number (or breakdown) on a dashboard.
+
+    ``key`` is a dotted path into the group's snapshot (``users.total``).
+    ``aggregate`` is an aggregate expression, or a callable taking the
+    refresh time and returning one, for metrics relative to "today".
+    With ``by`` the metric is a breakdown: ``{value of by: aggregate}``.
+    """
+    key: str
+    model: str
+    aggregate: Union[Any, Callable[[datetime], Any]] = field(default_factory=lambda: Count('pk'))
+    by: Optional[str] = None
+    default: Any = 0
+
+    def expression(self, now: datetime):
+        return self.aggregate(now) if callable(self.aggregate) else self.aggregate
+
+
+REGISTRY: Dict[str, List[Metric]] = {}
+_watched = set()
+
+
+def register(group: str, metrics: Iterable[Metric]) -> None:
+    """Add metrics to a group; saves and deletes of their models mark the group dirty."""
+    metrics = list(metrics)
+    REGISTRY.setdefault(group, []).extend(metrics)
+    for model in {m.model for m in metrics}:
+        if model not in _watched:
+            _watched.add(model)
+            post_save.connect(_changed, sender=model, dispatch_uid=f'dashboard_stats_{model}', weak=False)
+            post_delete.connect(_changed, sender=model, dispatch_uid=f'dashboard_stats_delete_{model}', weak=False)
+
+
+def groups_for(model_label: str) -> List[str]:
+    return [group for group, metrics in REGISTRY.items() if any(m.model == model_label for m in metrics)]
+
+
+def mark_dirty(*groups: str) -> None:
+    cache.set_many({DIRTY_KEY.format(group): True for group in groups}, None)
+
+
+def dirty_groups() -> List[str]:
+    found = cache.get_many([DIRTY_KEY.format(group) for group in REGISTRY])
+    return [group for group in REGISTRY if found.get(DIRTY_KEY.format(group))]
+
+
+def _changed(sender, **kwargs) -> None:
+    mark_dirty(*groups_for(sender._meta.label))
+
+
+# --- computing ------------------------------------------------------------------
+
+
+def _plain(value):
+    # Decimal sums (money) are stored as strings, as DRF's DecimalField renders them; a float would round
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _assign(values: dict, key: str, value) -> None:
+    *path, leaf = key.split('.')
+    for part in path:
+        values = values.setdefault(part, {})
+    values[leaf] = value
+
+
+def compute(groups: Iterable[str], now: Optional[datetime] = None) -> Dict[str, dict]:
+    """Evaluate the metrics of ``groups`` with one query per model (plus one per breakdown)."""
+    now = now or timezone.now()
+    metrics = [(group, metric) for group in groups for metric in REGISTRY[group]]
+    buckets: Dict[tuple, List[tuple]] = defaultdict(list)
+    for group, metric in metrics:
+        buckets[(metric.model, metric.by)].append((group, metric))
+
+    results: Dict[str, dict] = {group: {} for group in groups}
+    for (model_label, by), members in buckets.items():
+        manager = apps.get_model(model_label)._default_manager
+        aliases = {f'm{i}': (group, metric) for i, (group, metric) in enumerate(members)}
+        expressions = {alias: metric.expression(now) for alias, (_, metric) in aliases.items()}
+        if by is None:
+            row = manager.aggregate(**expressions)
+            for alias, (group, metric) in aliases.items():
+                value = row[alias]
+                _assign(results[group], metric.key, metric.default if value is None else _plain(value))
+        else:
+            rows = list(manager.order_by().values(by).annotate(**expressions))
+            for alias, (group, metric) in aliases.items():
+                breakdown = {str(row[by]): _plain(row[alias]) for row in rows if row[alias] is not None}
+                _assign(results[group], metric.key, breakdown)
+    return results
+
+
+@dataclass
+class RefreshRun:
+    groups: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    duration_ms: int = 0
+
+    def as_dict(self) -> dict:
+        return {'groups': self.groups, 'changed': self.changed, 'duration_ms': self.duration_ms}
+
+
+def refresh(groups: Optional[Iterable[str]] = None, now: Optional[datetime] = None) -> RefreshRun:
+    """Recompute ``groups`` (default: all) and store a snapshot per group."""
+    groups = list(REGISTRY if groups is None else groups)
+    unknown = sorted(set(groups) - set(REGISTRY))
+    if unknown:
+        raise KeyError(f"Unknown stats group(s): {', '.join(unknown)}")
+    now = now or timezone.now()
+    # Clear first: a save landing during the computation marks the group dirty again
+    cache.delete_many([DIRTY_KEY.format(group) for group in groups])
+    started = time.perf_counter()
+    computed = compute(groups, now)
+    run = RefreshRun(groups=groups, duration_ms=int((time.perf_counter() - started) * 1000))
+
+    latest = {snapshot.group: snapshot for snapshot in _latest(groups)}
+    for group in groups:
+        previous = latest.get(group)
+        if previous is not None and previous.values == computed[group]:
+            StatsSnapshot.objects.filter(pk=previous.pk).update(computed_at=now, duration_ms=run.duration_ms)
+            continue
+        StatsSnapshot.objects.create(
+            group=group, values=computed[group], created_at=now, computed_at=now, duration_ms=run.duration_ms,
+        )
+        run.changed.append(group)
+    return run
+
+
+def prune(now: Optional[datetime] = None) -> int:
+    """Drop history older than ``DASHBOARD_STATS_HISTORY_DAYS``, keeping each group's latest snapshot."""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.DASHBOARD_STATS_HISTORY_DAYS)
+    keep = [snapshot.pk for snapshot in _latest(REGISTRY)]
+    deleted, _ = StatsSnapshot.objects.filter(computed_at__lt=cutoff).exclude(pk__in=keep).delete()
+    return deleted
+
+
+# --- reading ----------------------------------------------------------------------
+
+
+def _latest(groups: Iterable[str]) -> List[StatsSnapshot]:
+    groups = list(groups)
+    if not groups:
+        return []
+    # The newest row per group: DISTINCT ON where supported, else a query per group
+    if connection.features.can_distinct_on_fields:
+        return list(StatsSnapshot.objects.filter(group__in=groups).order_by('group', '-computed_at').distinct('group'))
+    return [s for s in (StatsSnapshot.objects.filter(group=g).order_by('-computed_at').first() for g in groups) if s]
+
+
+def snapshot(group: str) -> StatsSnapshot:
+    """The latest snapshot of ``group``; computed on the spot the first time it is asked for."""
+    latest = StatsSnapshot.objects.filter(group=group).order_by('-computed_at').first()
+    if latest is None:
+        refresh([group])
+        latest = StatsSnapshot.objects.filter(group=group).order_by('-computed_at').first()
+    return latest
+
+
+def values(group: str) -> dict:
+    return snapshot(group).values
+
+
+def history(group: str, key: str, since: Optional[datetime] = None) -> List[dict]:
+    """``key``'s value over time: one point per snapshot (a snapshot holds until the next one)."""
+    snapshots = StatsSnapshot.objects.filter(group=group).order_by('created_at')
+    if since is not None:
+        snapshots = snapshots.filter(computed_at__gte=since)
+    points = []
+    for created_at, stored in snapshots.values_list('created_at', 'values'):
+        value = stored
+        for part in key.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        points.append({'at': created_at, 'value': value})
+    return points
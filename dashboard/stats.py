@@ -0,0 +1,18 @@
+"""Admin dashboard metrics (served by api_dashboard_stats)."""
+
+from django.db.models import Count, Q
+
+from .snapshots import Metric, register
+
+register('dashboard', [
+    Metric('users.total', 'accounts.User'),
+    Metric('users.active', 'accounts.User', Count('pk', filter=Q(is_active=True))),
+    Metric('users.staff', 'accounts.User', Count('pk', filter=Q(is_staff=True))),
+    Metric('users.verified', 'accounts.User', Count('pk', filter=Q(is_verified=True))),
+    Metric('auth.roles', 'accounts.Role'),
+    Metric('auth.permissions', 'accounts.Permission'),
+    Metric('auth.identifiers', 'accounts.AuthIdentifier'),
+    Metric('auth.active_sessions', 'accounts.UserSession', Count('pk', filter=Q(revoked=False))),
+    Metric('security.failed_logins', 'accounts.FailedLogin'),
+    Metric('security.audit_logs', 'accounts.AuditLog'),
+])
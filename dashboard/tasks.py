@@ -0,0 +1,24 @@
+"""Celery tasks for the dashboard app."""
+
+import logging
+
+from celery import shared_task
+
+from .snapshots import dirty_groups, prune, refresh
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_dashboard_stats(dirty_only=False):
+    """Recompute the materialized dashboard statistics; with ``dirty_only`` just the groups
+    whose source tables changed since their last refresh (runs every minute)."""
+    groups = dirty_groups() if dirty_only else None
+    if groups == []:
+        return {'groups': [], 'changed': [], 'duration_ms': 0}
+    run = refresh(groups)
+    if not dirty_only:
+        pruned = prune()
+        if pruned:
+            logger.info("Pruned %s dashboard stats snapshots", pruned)
+    return run.as_dict()
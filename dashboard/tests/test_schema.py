@@ -0,0 +1,81 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from dashboard import schema
+from dashboard.models import StatsSnapshot
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'schema-tests'}}
+    cache.clear()
+
+
+@pytest.fixture
+def snapshots():
+    now = timezone.now()
+    return StatsSnapshot.objects.bulk_create([
+        StatsSnapshot(group=f'g{i}', values={'n': i}, created_at=now, computed_at=now) for i in range(5)
+    ])
+
+
+def test_introspection_covers_columns_keys_and_indexes():
+    result = schema.introspect()
+    table = result.tables['dashboard_stats_snapshot']
+    assert table.primary_key == ['id']
+    assert [c.name for c in table.columns if c.primary_key] == ['id']
+    assert {'group', 'values', 'computed_at'} <= {c.name for c in table.columns}
+    assert any(index.columns == ['group', 'computed_at'] for index in table.indexes)
+
+    students = result.tables['students_student']
+    assert ('students_studentbatch', ['id']) in [fk.references for fk in students.foreign_keys]
+    assert 'students_studentbatch' in result.fk_graph()['students_student']
+
+
+def test_schema_is_cached():
+    first = schema.introspect()
+    with CaptureQueriesContext(connection) as queries:
+        assert schema.introspect() is not first  # unpickled from the cache
+    # Only the migration fingerprint is read
+    assert len(queries) == 1
+    assert set(schema.introspect().tables) == set(first.tables)
+
+
+def test_a_new_migration_state_rebuilds_the_schema(monkeypatch):
+    first = schema.introspect()
+    monkeypatch.setattr(schema, 'migration_state', lambda using='default': 'after-migrate')
+    assert schema.introspect().state == 'after-migrate'
+    assert first.state != 'after-migrate'
+
+
+def test_browse_pages_by_primary_key(snapshots):
+    page = schema.browse('dashboard_stats_snapshot', limit=2)
+    assert [row['group'] for row in page.data] == ['g0', 'g1']
+    page = schema.browse('dashboard_stats_snapshot', after=page.next, limit=2)
+    assert [row['group'] for row in page.data] == ['g2', 'g3']
+    page = schema.browse('dashboard_stats_snapshot', after=page.next, limit=2)
+    assert ([row['group'] for row in page.data], page.next) == (['g4'], None)
+
+    with pytest.raises(KeyError):
+        schema.browse('dashboard_stats_snapshot; DROP TABLE students_student')
+    with pytest.raises(ValueError):
+        schema.browse('dashboard_stats_snapshot', after='1 OR 1=1')
+
+
+def test_schema_api_without_table_browsing(snapshots, django_user_model):
+    client = APIClient()
+    client.force_authenticate(django_user_model.objects.create_user(
+        email='sc@example.com', username='sc', password='p', is_staff=True,
+    ))
+    data = client.get(reverse('dashboard:api_database_schema')).json()
+    assert data['tables']['dashboard_stats_snapshot']['primary_key'] == ['id']
+    # Raw rows (password hashes, session keys, device API keys) are not exposed over HTTP
+    assert client.get('/dashboard/api/table/accounts_user/').status_code == 404
@@ -0,0 +1,126 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from dashboard import snapshots
+from dashboard.models import StatsSnapshot
+from dashboard.tasks import refresh_dashboard_stats
+from facilities.models import Room
+from rnd.models import Grant
+from rnd.views import DashboardStatsView
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'stats-tests'}}
+    cache.clear()
+
+
+@pytest.fixture
+def rooms():
+    building = baker.make('facilities.Building', code='SCI', name='Science')
+    return [
+        Room.objects.create(building=building, code='101', name='A', room_type=Room.CLASSROOM, capacity=30),
+        Room.objects.create(building=building, code='102', name='B', room_type=Room.CLASSROOM, capacity=30, is_active=False),
+        Room.objects.create(building=building, code='201', name='C', room_type=Room.LAB, capacity=20),
+    ]
+
+
+def test_metrics_on_one_model_share_a_query(rooms):
+    with CaptureQueriesContext(connection) as queries:
+        computed = snapshots.compute(['facilities', 'rnd'])
+    # facilities: Room, Room breakdown, Booking, Maintenance; rnd: 7 models
+    assert len(queries) == 11
+    assert computed['facilities']['rooms'] == {'total': 3, 'active': 2, 'by_type': {'classroom': 2, 'lab': 1}}
+    assert computed['rnd']['total_grant_amount'] == '0.00'
+    assert computed['rnd']['recent_activities'] == {'new_projects': 0, 'new_publications': 0, 'new_grants': 0}
+
+
+def test_decimal_sums_are_kept_as_strings():
+    Grant.objects.create(title='A', amount=Decimal('1000.25'))
+    Grant.objects.create(title='B', amount=Decimal('234.25'))
+    total = snapshots.compute(['rnd'])['rnd']['total_grant_amount']
+    # Exact, not a float; trailing zeros depend on the backend (sqlite drops them)
+    assert isinstance(total, str) and Decimal(total) == Decimal('1234.50')
+
+
+def test_rnd_stats_view_renders_the_grant_total_as_a_number(django_user_model):
+    Grant.objects.create(title='A', amount=Decimal('1000.25'))
+    user = django_user_model.objects.create_user(email='rs@example.com', username='rs', password='p')
+    request = APIRequestFactory().get('/')
+    force_authenticate(request, user)
+    response = DashboardStatsView.as_view()(request)
+    response.render()
+    assert json.loads(response.content)['total_grant_amount'] == 1000.25
+    assert snapshots.values('rnd')['total_grant_amount'] == '1000.25'
+
+
+def test_refresh_keeps_one_row_per_change_and_history(rooms):
+    start = timezone.now() - timedelta(hours=2)
+    snapshots.refresh(['facilities'], now=start)
+    run = snapshots.refresh(['facilities'], now=start + timedelta(hours=1))
+    assert run.changed == []
+    assert StatsSnapshot.objects.filter(group='facilities').count() == 1
+
+    Room.objects.filter(pk=rooms[1].pk).update(is_active=True)
+    assert snapshots.refresh(['facilities']).changed == ['facilities']
+    points = snapshots.history('facilities', 'rooms.active')
+    assert [p['value'] for p in points] == [2, 3]
+    assert points[0]['at'] == start
+    assert snapshots.values('facilities')['rooms']['active'] == 3
+
+    with pytest.raises(KeyError):
+        snapshots.refresh(['nope'])
+
+
+def test_saves_mark_groups_dirty_for_the_minutely_refresh(rooms):
+    refresh_dashboard_stats()
+    assert snapshots.dirty_groups() == []
+    assert refresh_dashboard_stats(dirty_only=True)['groups'] == []
+
+    rooms[0].delete()
+    assert snapshots.dirty_groups() == ['facilities']
+    run = refresh_dashboard_stats(dirty_only=True)
+    assert (run['groups'], run['changed']) == (['facilities'], ['facilities'])
+    assert snapshots.values('facilities')['rooms']['total'] == 2
+
+
+def test_prune_drops_old_history_but_keeps_the_latest(rooms, settings):
+    settings.DASHBOARD_STATS_HISTORY_DAYS = 30
+    old = timezone.now() - timedelta(days=60)
+    snapshots.refresh(['facilities', 'departments'], now=old)
+    Room.objects.filter(pk=rooms[0].pk).delete()
+    snapshots.refresh(['facilities'], now=old + timedelta(days=1))
+    snapshots.refresh(['facilities'])
+
+    assert snapshots.prune() == 1
+    assert sorted(StatsSnapshot.objects.values_list('group', flat=True)) == ['departments', 'facilities']
+
+
+def test_views_read_the_snapshot(rooms, django_user_model):
+    admin = django_user_model.objects.create_user(email='st@example.com', username='st', password='p', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    data = client.get(reverse('dashboard:api_dashboard_stats')).json()
+    assert data['users']['staff'] == 1
+    assert StatsSnapshot.objects.filter(group='dashboard').count() == 1
+
+    with CaptureQueriesContext(connection) as queries:
+        client.get(reverse('dashboard:api_dashboard_stats'))
+    assert sum('dashboard_stats_snapshot' in q['sql'] for q in queries) == 1
+
+    history = client.get(reverse('dashboard:api_stats_history', args=['dashboard']), {'metric': 'users.total'}).json()
+    assert [p['value'] for p in history['points']] == [1]
+    assert client.get(reverse('dashboard:api_stats_history', args=['nope']), {'metric': 'x'}).status_code == 400
@@ -16,11 +16,12 @@ urlpatterns = [
     path('roles/', views.roles_list, name='roles'),
     path('sessions/', views.sessions_list, name='sessions'),
     path('audit/', views.audit_logs, name='audit'),
-    # Schema pages (disable if heavy or missing)
-    # path('schema/', views.database_schema, name='schema'),
-    # path('schema/excel/', views.download_schema_excel, name='schema_excel'),
-    # path('schema/excel-single/', views.download_schema_excel_single, name='schema_excel_single'),
-    # path('schema/csv/', views.download_schema_csv, name='schema_csv'),
+    # Schema pages
+    path('schema/', views.database_schema, name='schema'),
+    path('schema/excel/', views.download_schema_excel, name='schema_excel'),
+    path('schema/excel-single/', views.download_schema_excel_single, name='schema_excel_single'),
+    path('schema/csv/', views.download_schema_csv, name='schema_csv'),
+    path('api/schema/', views.api_database_schema, name='api_database_schema'),
     # path('er/', views.er_diagram_page, name='er'),
     
     # Student Management
@@ -38,6 +39,8 @@ urlpatterns = [
     path('students/assignments/', views.student_assignments, name='student_assignments'),
     path('students/division-statistics/', views.student_division_statistics, name='student_division_statistics'),
     path('api/students/bulk-assign/', views.bulk_assign_students, name='bulk_assign_students'),
+    path('api/stats/', views.api_dashboard_stats, name='api_dashboard_stats'),
+    path('api/stats/<str:group>/history/', views.api_stats_history, name='api_stats_history'),
     
     # Faculty Management
     path('faculty/', views.faculty_list, name='faculty_list'),
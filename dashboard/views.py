@@ -2,13 +2,13 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import logout
 from django.contrib import messages
-from django.db import connection, models
+from django.db import models
 from django.apps import apps
 from django.http import JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from accounts.models import User, Role, Permission, AuthIdentifier, UserSession, AuditLog, FailedLogin
+from accounts.models import User, Role, Permission, AuthIdentifier, UserSession, AuditLog
 from students.models import Student, StudentEnrollmentHistory, StudentDocument, CustomField, StudentImport
 from departments.models import Department
 from academics.models import AcademicProgram
@@ -20,6 +20,9 @@ from django.db.models import Q, Count
 import csv
 import os
 
+from . import schema as schema_service
+from . import snapshots
+
 try:
     from .models import APICollection, APIEnvironment, APIRequest, APITest, APITestResult, APITestSuite, APITestSuiteResult, APIAutomation
 except Exception:  # Models were removed; provide dummies for view compatibility
@@ -697,43 +700,30 @@ def grads_transcript(request, student_id):
     return render(request, 'dashboard/grads/transcript.html', context)
 
 
+def _schema_rows():
+    """(table, column) pairs of the introspected schema, in table order."""
+    for table in schema_service.introspect().tables.values():
+        for column in table.columns:
+            yield table, column
+
+
 @login_required
 @user_passes_test(is_admin)
 def database_schema(request):
     """Database schema overview"""
-    with connection.cursor() as cursor:
-        # PostgreSQL-compatible query to get table names
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_type = 'BASE TABLE'
-            ORDER BY table_name;
-        """)
-        tables = [row[0] for row in cursor.fetchall()]
-    
-    schema_info = []
-    for table in tables:
-        with connection.cursor() as cursor:
-            # PostgreSQL-compatible query to get column information
-            cursor.execute("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    character_maximum_length
-                FROM information_schema.columns 
-                WHERE table_name = %s 
-                AND table_schema = 'public'
-                ORDER BY ordinal_position;
-            """, [table])
-            columns = cursor.fetchall()
-            schema_info.append({
-                'table': table,
-                'columns': columns
-            })
-    
+    schema = schema_service.introspect()
+    graph = schema.fk_graph()
+    schema_info = [
+        {
+            'table': table.name,
+            'columns': table.columns,
+            'indexes': table.indexes,
+            'constraints': table.constraints,
+            'references': graph[table.name],
+            'row_estimate': table.row_estimate,
+        }
+        for table in schema.tables.values()
+    ]
     return render(request, 'dashboard/schema.html', {'schema_info': schema_info})
 
 
@@ -742,46 +732,7 @@ def database_schema(request):
 @permission_classes([IsAdminUser])
 def api_database_schema(request):
     """API endpoint to get database schema information"""
-    with connection.cursor() as cursor:
-        # PostgreSQL-compatible query to get table names
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_type = 'BASE TABLE'
-            ORDER BY table_name;
-        """)
-        tables = [row[0] for row in cursor.fetchall()]
-    
-    schema_data = {}
-    for table in tables:
-        with connection.cursor() as cursor:
-            # PostgreSQL-compatible query to get column information
-            cursor.execute("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    character_maximum_length
-                FROM information_schema.columns 
-                WHERE table_name = %s 
-                AND table_schema = 'public'
-                ORDER BY ordinal_position;
-            """, [table])
-            columns = cursor.fetchall()
-            schema_data[table] = [
-                {
-                    'name': col[0],
-                    'type': col[1],
-                    'not_null': col[2] == 'NO',
-                    'default': col[3],
-                    'max_length': col[4]
-                }
-                for col in columns
-            ]
-    
-    return Response(schema_data)
+    return Response(schema_service.introspect().as_dict())
 
 
 @login_required
@@ -799,36 +750,11 @@ def download_schema_excel(request):
     wb = Workbook()
     wb.remove(wb.active)
 
-    with connection.cursor() as cursor:
-        # PostgreSQL-compatible query to get table names
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_type = 'BASE TABLE'
-            ORDER BY table_name;
-        """)
-        tables = [row[0] for row in cursor.fetchall()]
-
-    for table in tables:
-        ws = wb.create_sheet(title=str(table)[:31])  # Excel sheet name limit
+    for table in schema_service.introspect().tables.values():
+        ws = wb.create_sheet(title=str(table.name)[:31])  # Excel sheet name limit
         ws.append(["column", "type", "not_null", "default", "max_length"])  
-        with connection.cursor() as cursor:
-            # PostgreSQL-compatible query to get column information
-            cursor.execute("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    character_maximum_length
-                FROM information_schema.columns 
-                WHERE table_name = %s 
-                AND table_schema = 'public'
-                ORDER BY ordinal_position;
-            """, [table])
-            for col in cursor.fetchall():
-                ws.append([col[0], col[1], col[2] == 'NO', col[3], col[4]])
+        for col in table.columns:
+            ws.append([col.name, col.type, col.not_null, col.default, col.max_length])
 
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = 'attachment; filename="database_schema.xlsx"'
@@ -852,34 +778,8 @@ def download_schema_excel_single(request):
     ws.title = 'schema'
     ws.append(["table", "column", "type", "not_null", "default", "max_length"])  
 
-    with connection.cursor() as cursor:
-        # PostgreSQL-compatible query to get table names
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_type = 'BASE TABLE'
-            ORDER BY table_name;
-        """)
-        tables = [row[0] for row in cursor.fetchall()]
-
-    for table in tables:
-        with connection.cursor() as cursor:
-            # PostgreSQL-compatible query to get column information
-            cursor.execute("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    character_maximum_length
-                FROM information_schema.columns 
-                WHERE table_name = %s 
-                AND table_schema = 'public'
-                ORDER BY ordinal_position;
-            """, [table])
-            for col in cursor.fetchall():
-                ws.append([table, col[0], col[1], col[2] == 'NO', col[3], col[4]])
+    for table, col in _schema_rows():
+        ws.append([table.name, col.name, col.type, col.not_null, col.default, col.max_length])
 
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = 'attachment; filename="database_schema_single.xlsx"'
@@ -897,35 +797,8 @@ def download_schema_csv(request):
 
         writer = csv.writer(response)
         writer.writerow(["table", "column", "type", "not_null", "default", "max_length"])  
-
-        with connection.cursor() as cursor:
-            # PostgreSQL-compatible query to get table names
-            cursor.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_type = 'BASE TABLE'
-                ORDER BY table_name;
-            """)
-            tables = [row[0] for row in cursor.fetchall()]
-
-        for table in tables:
-            with connection.cursor() as cursor:
-                # PostgreSQL-compatible query to get column information
-                cursor.execute("""
-                    SELECT 
-                        column_name,
-                        data_type,
-                        is_nullable,
-                        column_default,
-                        character_maximum_length
-                    FROM information_schema.columns 
-                    WHERE table_name = %s 
-                    AND table_schema = 'public'
-                    ORDER BY ordinal_position;
-                """, [table])
-                for col in cursor.fetchall():
-                    writer.writerow([table, col[0], col[1], col[2] == 'NO', col[3], col[4]])
+        for table, col in _schema_rows():
+            writer.writerow([table.name, col.name, col.type, col.not_null, col.default, col.max_length])
 
         return response
     except Exception as e:
@@ -935,50 +808,39 @@ def download_schema_csv(request):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def api_table_data(request, table_name):
-    """API endpoint to get data from any table"""
+    """API endpoint to page through any table by primary key: ?after=<last key>&limit=100"""
     try:
-        with connection.cursor() as cursor:
-            cursor.execute(f"SELECT * FROM {table_name} LIMIT 100;")
-            columns = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
-            
-            data = []
-            for row in rows:
-                data.append(dict(zip(columns, row)))
-        
-        return Response({
-            'table': table_name,
-            'columns': columns,
-            'data': data,
-            'count': len(data)
-        })
-    except Exception as e:
+        page = schema_service.browse(
+            table_name, after=request.query_params.get('after'), limit=request.query_params.get('limit', 100),
+        )
+    except KeyError:
+        return Response({'error': f'Unknown table: {table_name}'}, status=404)
+    except ValueError as e:
         return Response({'error': str(e)}, status=400)
+    return Response(page.as_dict())
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def api_dashboard_stats(request):
-    """API endpoint for dashboard statistics"""
-    stats = {
-        'users': {
-            'total': User.objects.count(),
-            'active': User.objects.filter(is_active=True).count(),
-            'staff': User.objects.filter(is_staff=True).count(),
-            'verified': User.objects.filter(is_verified=True).count(),
-        },
-        'auth': {
-            'roles': Role.objects.count(),
-            'permissions': Permission.objects.count(),
-            'identifiers': AuthIdentifier.objects.count(),
-            'active_sessions': UserSession.objects.filter(revoked=False).count(),
-        },
-        'security': {
-            'failed_logins': FailedLogin.objects.count(),
-            'audit_logs': AuditLog.objects.count(),
-        }
-    }
-    return Response(stats)
+    """API endpoint for dashboard statistics (materialized; see dashboard/stats.py)"""
+    return Response(snapshots.values('dashboard'))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def api_stats_history(request, group):
+    """Trend of one materialized metric: ?metric=users.total&days=30"""
+    metric = request.query_params.get('metric')
+    if group not in snapshots.REGISTRY or not metric:
+        return Response({'error': 'Unknown group or missing metric', 'groups': sorted(snapshots.REGISTRY)}, status=400)
+    try:
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        return Response({'error': 'days must be an integer'}, status=400)
+    from datetime import timedelta
+    since = timezone.now() - timedelta(days=days)
+    return Response({'group': group, 'metric': metric, 'points': snapshots.history(group, metric, since)})
 
 
 @api_view(['GET'])
@@ -0,0 +1,273 @@
+"""Department headcounts maintained by deltas.
+
+``current_student_count`` / ``current_faculty_count`` count ACTIVE
+students (through their batch) and ACTIVE faculty. Instead of recounting
+on every save, each save or delete that changes what a row contributes
+(its department or whether it is active) records a +1/-1 delta:
+
+- the original (department, active) state is remembered when the row is
+  loaded, so saves that touch neither, such as profile edits, cost
+  nothing;
+- deltas are summed per transaction and written after commit with one
+  ``UPDATE ... SET count = count + n`` per department, so a 5,000-row
+  import inside one transaction is a handful of UPDATEs. Deltas made
+  inside a savepoint that rolls back are discarded with it;
+- outside a transaction each change is written straight away.
+
+``bulk_create``, queryset ``update()`` and ``SET_NULL`` cascades bypass
+signals; ``reconcile`` (beat task ``reconcile_department_headcounts``)
+corrects any drift with a single aggregate query over all departments.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Department
+
+logger = logging.getLogger(__name__)
+
+STUDENTS = 'current_student_count'
+FACULTY = 'current_faculty_count'
+
+UNKNOWN = object()
+
+
+class _Pending:
+    """Deltas waiting for one transaction (or savepoint) to commit."""
+
+    def __init__(self, hooks):
+        self.hooks = hooks
+        self.deltas: Dict[Tuple[str, str], int] = defaultdict(int)
+
+
+def apply_deltas(deltas: Dict[Tuple[str, str], int]) -> int:
+    """Write {(department_id, counter): delta}; departments sharing a delta share an UPDATE."""
+    grouped: Dict[tuple, List[str]] = defaultdict(list)
+    per_department: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for (department_id, counter), delta in deltas.items():
+        if delta:
+            per_department[department_id][counter] = delta
+    for department_id, changes in per_department.items():
+        grouped[tuple(sorted(changes.items()))].append(department_id)
+    for changes, department_ids in grouped.items():
+        Department.objects.filter(pk__in=department_ids).update(**{
+            # Never below zero; reconcile() repairs whatever drift made that necessary
+            counter: Greatest(F(counter) + Value(delta), Value(0)) for counter, delta in changes
+        })
+    return len(grouped)
+
+
+def _flush(pending: _Pending, connection) -> None:
+    groups = getattr(connection, '_headcount_pending', {})
+    for key, value in list(groups.items()):
+        if value is pending:
+            del groups[key]
+    apply_deltas(pending.deltas)
+
+
+def record_delta(department_id, counter: str, delta: int, using: Optional[str] = None) -> None:
+    if not department_id or not delta:
+        return
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        apply_deltas({(department_id, counter): delta})
+        return
+    groups = connection.__dict__.setdefault('_headcount_pending', {})
+    key = tuple(connection.savepoint_ids)
+    pending = groups.get(key)
+    # A new hook list means the transaction ended or a savepoint was rolled back
+    if pending is None or pending.hooks is not connection.run_on_commit:
+        pending = groups[key] = _Pending(connection.run_on_commit)
+        transaction.on_commit(partial(_flush, pending, connection), using=using)
+    pending.deltas[(department_id, counter)] += delta
+
+
+def record_move(before, after, counter: str, using: Optional[str] = None) -> None:
+    """A row's counted department went from ``before`` to ``after`` (None = not counted)."""
+    if before == after:
+        return
+    record_delta(before, counter, -1, using)
+    record_delta(after, counter, +1, using)
+
+
+# --- tracking saves and deletes ---------------------------------------------------
+
+TRACKED = {
+    'students.Student': ('student_batch_id', 'status'),
+    'faculty.Faculty': ('department_ref_id', 'status'),
+    'students.StudentBatch': ('department_id',),
+}
+
+
+def _fields(sender):
+    return TRACKED[sender._meta.label]
+
+
+def _snapshot(instance, fields, before=UNKNOWN):
+    """The tracked values from ``__dict__``, so deferred fields are never fetched; a
+    deferred field is unknown unless ``before`` (the stored state) supplies it."""
+    values = instance.__dict__
+    if before is UNKNOWN and any(name not in values for name in fields):
+        return UNKNOWN
+    return tuple(values.get(name, before[i] if before is not UNKNOWN else None) for i, name in enumerate(fields))
+
+
+def remember(sender, instance, **kwargs) -> None:
+    """post_init: keep the loaded state to diff against on save."""
+    instance._headcount_state = _snapshot(instance, _fields(sender))
+
+
+def load_unknown(sender, instance, using=None, **kwargs) -> None:
+    """pre_save: fetch the stored state when the instance was loaded with it deferred."""
+    if instance._state.adding or getattr(instance, '_headcount_state', UNKNOWN) is not UNKNOWN:
+        return
+    fields = _fields(sender)
+    row = sender._base_manager.using(using).filter(pk=instance.pk).values_list(*fields).first()
+    instance._headcount_state = row or (None,) * len(fields)
+
+
+def _watched(sender, update_fields) -> bool:
+    if update_fields is None:
+        return True
+    names = set()
+    for attname in _fields(sender):
+        names.update((attname, sender._meta.get_field(attname.removesuffix('_id')).name))
+    return bool(names & set(update_fields))
+
+
+def _batch_departments(batch_ids, using) -> dict:
+    from students.models import StudentBatch
+
+    batch_ids = [pk for pk in batch_ids if pk]
+    if not batch_ids:
+        return {}
+    return dict(StudentBatch.objects.using(using).filter(pk__in=batch_ids).values_list('pk', 'department_id'))
+
+
+def _active(state, index=0):
+    """The counted key of a (key, status) state: the key while ACTIVE, else None."""
+    if state is UNKNOWN or state[1] != 'ACTIVE':
+        return None
+    return state[index]
+
+
+def _move(sender, instance, before, after, using) -> None:
+    label = sender._meta.label
+    if label == 'faculty.Faculty':
+        record_move(_active(before), _active(after), FACULTY, using)
+    elif label == 'students.Student':
+        old_batch, new_batch = _active(before), _active(after)
+        if old_batch == new_batch:
+            return
+        departments = {}
+        # A batch assigned as an object (the import case) already knows its department
+        cached = instance._state.fields_cache.get('student_batch')
+        if cached is not None and cached.pk == new_batch:
+            departments[new_batch] = cached.department_id
+        departments.update(_batch_departments({old_batch, new_batch} - set(departments), using))
+        record_move(departments.get(old_batch), departments.get(new_batch), STUDENTS, using)
+
+
+def saved(sender, instance, created, update_fields=None, using=None, **kwargs) -> None:
+    """post_save for students and faculty: count the change in department or status, if any."""
+    if not _watched(sender, update_fields):
+        return
+    before = (None, None) if created else getattr(instance, '_headcount_state', UNKNOWN)
+    after = _snapshot(instance, _fields(sender), before)
+    instance._headcount_state = after
+    if before is UNKNOWN or after is UNKNOWN or before == after:
+        return
+    _move(sender, instance, before, after, using)
+
+
+def deleted(sender, instance, using=None, **kwargs) -> None:
+    """post_delete for students and faculty: remove what the stored row contributed."""
+    before = getattr(instance, '_headcount_state', UNKNOWN)
+    if before is UNKNOWN:
+        before = _snapshot(instance, _fields(sender))
+    _move(sender, instance, before, (None, None), using)
+
+
+def _active_students(batch, using) -> int:
+    return batch.students.using(using).filter(status='ACTIVE').count()
+
+
+def batch_saved(sender, instance, created, update_fields=None, using=None, **kwargs) -> None:
+    """post_save for batches: moving a batch moves its active students with it."""
+    if created or not _watched(sender, update_fields):
+        return
+    before = getattr(instance, '_headcount_state', UNKNOWN)
+    after = _snapshot(instance, _fields(sender), before)
+    instance._headcount_state = after
+    if before is UNKNOWN or after is UNKNOWN or before == after:
+        return
+    count = _active_students(instance, using)
+    record_delta(before[0], STUDENTS, -count, using)
+    record_delta(after[0], STUDENTS, count, using)
+
+
+def batch_deleting(sender, instance, using=None, **kwargs) -> None:
+    """pre_delete for batches, while the students still point at the batch (they are SET_NULL)."""
+    record_delta(instance.department_id, STUDENTS, -_active_students(instance, using), using)
+
+
+# --- reconciliation --------------------------------------------------------------
+
+
+@dataclass
+class ReconcileRun:
+    departments: int = 0
+    corrected: Dict[str, dict] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {'departments': self.departments, 'corrected': self.corrected}
+
+
+def actual_counts():
+    """Departments annotated with their true active student and faculty counts, in one query."""
+    from faculty.models import Faculty
+    from students.models import Student
+
+    students = (
+        Student.objects.filter(student_batch__department=OuterRef('pk'), status='ACTIVE')
+        .order_by().values('student_batch__department').annotate(n=Count('pk')).values('n')
+    )
+    faculty = (
+        Faculty.objects.filter(department_ref=OuterRef('pk'), status='ACTIVE')
+        .order_by().values('department_ref').annotate(n=Count('pk')).values('n')
+    )
+    return Department.objects.annotate(
+        actual_students=Coalesce(Subquery(students), 0),
+        actual_faculty=Coalesce(Subquery(faculty), 0),
+    )
+
+
+def reconcile() -> ReconcileRun:
+    """Correct drifted counters. Each fix is conditional on the counter still holding the
+    value that was read, so a delta landing meanwhile is never overwritten (the next run
+    picks that department up instead)."""
+    run = ReconcileRun()
+    rows = actual_counts().values_list('pk', STUDENTS, 'actual_students', FACULTY, 'actual_faculty')
+    for pk, students, actual_students, faculty, actual_faculty in rows:
+        run.departments += 1
+        if (students, faculty) == (actual_students, actual_faculty):
+            continue
+        updated = Department.objects.filter(pk=pk, **{STUDENTS: students, FACULTY: faculty}).update(**{
+            STUDENTS: actual_students, FACULTY: actual_faculty,
+        })
+        if updated:
+            run.corrected[str(pk)] = {
+                'students': [students, actual_students], 'faculty': [faculty, actual_faculty],
+            }
+    if run.corrected:
+        logger.warning("Corrected headcount drift in %s department(s)", len(run.corrected))
+    return run
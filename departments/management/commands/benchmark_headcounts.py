@@ -0,0 +1,91 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from departments import headcount
+from departments.headcount import reconcile
+from departments.models import Department
+from students.models import AcademicYear, Student, StudentBatch
+
+
+class Command(BaseCommand):
+    help = 'Benchmark department headcount upkeep during a student import (recount per save vs coalesced deltas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Students imported one save at a time')
+        parser.add_argument('--departments', type=int, default=20)
+        parser.add_argument('--existing', type=int, default=50000, help='Students already on the rolls')
+
+    def handle(self, *args, **options):
+        # Runs in autocommit so the import transaction really commits (and flushes its deltas)
+        year = AcademicYear.objects.create(year='2093-2094', start_date=date(2093, 6, 1), end_date=date(2094, 5, 31))
+        try:
+            self._run(year, options)
+        finally:
+            with transaction.atomic():
+                Student.objects.filter(student_batch__academic_year=year).delete()
+                Department.objects.filter(code__startswith='BH').delete()
+                year.delete()
+
+    def _timed(self, label, fn):
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+            t0 = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - t0
+        department_queries = sum('departments_department' in sql for sql in queries)
+        self.stdout.write(
+            f'{label:32s} {elapsed * 1000:9.1f} ms  {len(queries):6d} queries  '
+            f'({department_queries} on departments)  -> {result}'
+        )
+
+    def _students(self, batches, count, offset):
+        return [
+            Student(
+                roll_number=f'BH{offset + i:07d}', first_name='Bench', last_name=str(i), date_of_birth=date(2005, 1, 1),
+                gender='M', student_batch=batches[i % len(batches)], status='ACTIVE',
+            )
+            for i in range(count)
+        ]
+
+    def _run(self, year, options):
+        batches = self._seed(year, options['departments'])
+        Student.objects.bulk_create(self._students(batches, options['existing'], 0), batch_size=2000)
+        reconcile()
+        departments = {b.pk: b.department for b in batches}
+        # The imported rows are inserted up front; only the per-save receiver work is timed
+        imported = Student.objects.bulk_create(
+            self._students(batches, options['students'], 10**6), batch_size=2000,
+        )
+
+        def deltas():
+            with transaction.atomic():
+                for student in imported:
+                    headcount.saved(Student, student, created=True, using='default')
+            return len(imported)
+
+        def recount_per_save():
+            # What the old receivers did: two COUNTs and a save for every student saved
+            for student in imported:
+                departments[student.student_batch_id].update_counts()
+            return len(imported)
+
+        self._timed(f"coalesced deltas ({options['students']})", deltas)
+        self._timed('reconcile (expect 0 corrected)', lambda: len(reconcile().corrected))
+        self._timed(f"recount per save ({options['students']})", recount_per_save)
+
+    def _seed(self, year, count):
+        batches = []
+        for i in range(count):
+            department = Department.objects.create(
+                name=f'Bench Headcount {i}', short_name=f'BH{i}', code=f'BH{i:03d}', email=f'bh{i}@example.com',
+                phone='+911234567890', building='B', established_date=date(2000, 1, 1), description='benchmark',
+                max_student_capacity=10**6,
+            )
+            batches.append(StudentBatch.objects.create(
+                department=department, academic_year=year, year_of_study='1', section='A',
+                batch_name=f'BH-{i}', batch_code=f'BENCH-BH-{i}',
+            ))
+        return batches
@@ -351,7 +351,11 @@ class Department(TimeStampedUUIDModel):
         """Update current counts from related objects"""
         self.current_faculty_count = self.get_faculty_count()
         self.current_student_count = self.get_student_count()
-        self.save(update_fields=['current_faculty_count', 'current_student_count'])
+        # Not save(): full_clean() would reject a count that is over capacity
+        Department.objects.filter(pk=self.pk).update(
+            current_faculty_count=self.current_faculty_count,
+            current_student_count=self.current_student_count,
+        )
 
 
 """DepartmentProgram removed. Consolidated into academics.AcademicProgram."""
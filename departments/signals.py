@@ -1,64 +1,59 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from django.contrib.auth import get_user_model
-from .models import Department
 
-User = get_user_model()
+from . import headcount
 
+# Department headcounts follow students and faculty by deltas (see departments.headcount);
+# User saves such as last-login updates no longer touch departments at all.
 
-@receiver(post_save, sender=User)
-def update_department_counts_on_faculty_change(sender, instance, created, **kwargs):
-    """
-    Update department counts when faculty is created or updated
-    """
-    if hasattr(instance, 'faculty_profile'):
-        faculty = instance.faculty_profile
-        if faculty.department_ref:
-            faculty.department_ref.update_counts()
-
-
-@receiver(post_delete, sender=User)
-def update_department_counts_on_faculty_delete(sender, instance, **kwargs):
-    """
-    Update department counts when faculty is deleted
-    """
-    if hasattr(instance, 'faculty_profile'):
-        faculty = instance.faculty_profile
-        if faculty.department_ref:
-            faculty.department_ref.update_counts()
+for _sender in ('students.Student', 'faculty.Faculty', 'students.StudentBatch'):
+    post_init.connect(headcount.remember, sender=_sender, dispatch_uid=f'headcount_remember_{_sender}')
+    pre_save.connect(headcount.load_unknown, sender=_sender, dispatch_uid=f'headcount_load_{_sender}')
 
 
 @receiver(post_save, sender='students.Student')
 def update_department_counts_on_student_change(sender, instance, created, **kwargs):
     """
-    Update department counts when student is created or updated
+    Adjust the student count when a student changes batch or status
     """
-    if instance.department:
-        instance.department.update_counts()
+    headcount.saved(sender, instance, created, **kwargs)
 
 
 @receiver(post_delete, sender='students.Student')
 def update_department_counts_on_student_delete(sender, instance, **kwargs):
     """
-    Update department counts when student is deleted
+    Adjust the student count when an active student is deleted
     """
-    if instance.department:
-        instance.department.update_counts()
+    headcount.deleted(sender, instance, **kwargs)
 
 
 @receiver(post_save, sender='faculty.Faculty')
 def update_department_counts_on_faculty_profile_change(sender, instance, created, **kwargs):
     """
-    Update department counts when faculty profile is created or updated
+    Adjust the faculty count when a faculty member changes department or status
     """
-    if instance.department_ref:
-        instance.department_ref.update_counts()
+    headcount.saved(sender, instance, created, **kwargs)
 
 
 @receiver(post_delete, sender='faculty.Faculty')
 def update_department_counts_on_faculty_profile_delete(sender, instance, **kwargs):
     """
-    Update department counts when faculty profile is deleted
+    Adjust the faculty count when an active faculty member is deleted
+    """
+    headcount.deleted(sender, instance, **kwargs)
+
+
+@receiver(post_save, sender='students.StudentBatch')
+def update_department_counts_on_batch_change(sender, instance, created, **kwargs):
+    """
+    Move a batch's active students when the batch changes department
+    """
+    headcount.batch_saved(sender, instance, created, **kwargs)
+
+
+@receiver(pre_delete, sender='students.StudentBatch')
+def update_department_counts_on_batch_delete(sender, instance, **kwargs):
+    """
+    Drop a batch's active students before they are detached from it
     """
-    if instance.department_ref:
-        instance.department_ref.update_counts()
+    headcount.batch_deleting(sender, instance, **kwargs)
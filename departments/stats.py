@@ -0,0 +1,19 @@
+"""Department metrics (served by DepartmentViewSet.stats)."""
+
+from django.db.models import Count, Q, Sum
+
+from dashboard.snapshots import Metric, register
+
+register('departments', [
+    Metric('total_departments', 'departments.Department'),
+    Metric('active_departments', 'departments.Department', Count('pk', filter=Q(is_active=True))),
+    Metric('academic_departments', 'departments.Department', Count('pk', filter=Q(department_type='ACADEMIC'))),
+    Metric('administrative_departments', 'departments.Department',
+           Count('pk', filter=Q(department_type='ADMINISTRATIVE'))),
+    Metric('research_departments', 'departments.Department', Count('pk', filter=Q(department_type='RESEARCH'))),
+    Metric('total_faculty', 'departments.Department', Sum('current_faculty_count')),
+    Metric('total_students', 'departments.Department', Sum('current_student_count')),
+    Metric('total_resources', 'departments.DepartmentResource'),
+    Metric('upcoming_events', 'departments.DepartmentEvent', lambda now: Count('pk', filter=Q(start_date__gte=now))),
+    Metric('active_announcements', 'departments.DepartmentAnnouncement', Count('pk', filter=Q(is_published=True))),
+])
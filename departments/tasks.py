@@ -0,0 +1,17 @@
+"""Celery tasks for the departments app."""
+
+import logging
+
+from celery import shared_task
+
+from .headcount import reconcile
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_department_headcounts():
+    """Daily: correct headcount drift left by bulk writes that bypass the save signals."""
+    run = reconcile()
+    logger.info("Reconciled headcounts for %s departments, %s corrected", run.departments, len(run.corrected))
+    return run.as_dict()
@@ -1,3 +1,106 @@
+"""
+Tests for delta-maintained department headcounts (departments.headcount).
+"""
+
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from attendance.factories import DepartmentFactory, FacultyFactory, StudentBatchFactory, StudentFactory
+from departments.headcount import reconcile
+from departments.models import Department
+from students.models import Student
+
+
+class TestHeadcounts(TestCase):
+
+    def setUp(self):
+        self.batch = StudentBatchFactory()
+        self.department = self.batch.department
+        self.other = DepartmentFactory()
+
+    def _counts(self, department=None):
+        department = Department.objects.get(pk=(department or self.department).pk)
+        return department.current_student_count, department.current_faculty_count
+
+    def test_creates_in_one_transaction_are_coalesced_into_one_update(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for _ in range(5):
+                StudentFactory(student_batch=self.batch)
+            StudentFactory(student_batch=self.batch, status='INACTIVE')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._counts(), (5, 0))
+
+    def test_only_department_or_status_changes_touch_the_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            student = StudentFactory(student_batch=self.batch)
+            faculty = FacultyFactory(department='CSE', department_ref=self.department, status='ACTIVE')
+        self.assertEqual(self._counts(), (1, 1))
+
+        student = Student.objects.get(pk=student.pk)
+        student.first_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, CaptureQueriesContext(connection) as queries:
+            student.save()
+        self.assertEqual(len(callbacks), 0)
+        self.assertFalse([q for q in queries if 'departments_department' in q['sql']])
+
+        other_batch = StudentBatchFactory(department=self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            student.student_batch = other_batch
+            student.save()
+            faculty.status = 'ON_LEAVE'
+            faculty.save()
+        self.assertEqual(self._counts(), (0, 0))
+        self.assertEqual(self._counts(self.other), (1, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            faculty.status = 'ACTIVE'
+            faculty.save(update_fields=['status'])
+            student.delete()
+        self.assertEqual(self._counts(), (0, 1))
+        self.assertEqual(self._counts(self.other), (0, 0))
+
+    def test_deferred_fields_are_diffed_against_the_stored_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            student = StudentFactory(student_batch=self.batch)
+        student = Student.objects.only('pk', 'first_name').get(pk=student.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            student.status = 'GRADUATED'
+            student.save()
+        self.assertEqual(self._counts(), (0, 0))
+
+    def test_rolled_back_savepoint_discards_its_deltas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentFactory(student_batch=self.batch)
+            try:
+                with transaction.atomic():
+                    StudentFactory(student_batch=self.batch)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            StudentFactory(student_batch=self.batch)
+        self.assertEqual(self._counts(), (2, 0))
+
+    def test_moving_or_deleting_a_batch_moves_its_students(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                StudentFactory(student_batch=self.batch)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.department = self.other
+            self.batch.save()
+        self.assertEqual((self._counts()[0], self._counts(self.other)[0]), (0, 3))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.delete()
+        self.assertEqual(self._counts(self.other), (0, 0))
+
+    def test_reconcile_corrects_drift_from_bulk_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            students = [StudentFactory(student_batch=self.batch) for _ in range(2)]
+        Student.objects.filter(pk=students[0].pk).update(status='INACTIVE')
+        Department.objects.filter(pk=self.other.pk).update(current_faculty_count=4)
 
-# Create your tests here.
+        run = reconcile()
+        self.assertEqual(set(run.corrected), {str(self.department.pk), str(self.other.pk)})
+        self.assertEqual(self._counts(), (1, 0))
+        self.assertEqual(self._counts(self.other), (0, 0))
+        self.assertEqual(reconcile().corrected, {})
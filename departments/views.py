@@ -3,11 +3,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Count
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from dashboard import snapshots
+
 from .models import (
     Department, DepartmentResource, 
     DepartmentAnnouncement, DepartmentEvent, DepartmentDocument
@@ -158,27 +160,8 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get department statistics"""
-        stats = {
-            'total_departments': Department.objects.count(),
-            'active_departments': Department.objects.filter(is_active=True).count(),
-            'academic_departments': Department.objects.filter(department_type='ACADEMIC').count(),
-            'administrative_departments': Department.objects.filter(department_type='ADMINISTRATIVE').count(),
-            'research_departments': Department.objects.filter(department_type='RESEARCH').count(),
-            'total_faculty': Department.objects.aggregate(
-                total=Sum('current_faculty_count')
-            )['total'] or 0,
-            'total_students': Department.objects.aggregate(
-                total=Sum('current_student_count')
-            )['total'] or 0,
-            'total_resources': DepartmentResource.objects.count(),
-            'upcoming_events': DepartmentEvent.objects.filter(
-                start_date__gte=timezone.now()
-            ).count(),
-            'active_announcements': DepartmentAnnouncement.objects.filter(
-                is_published=True
-            ).count(),
-        }
+        """Get department statistics (materialized; see departments/stats.py)"""
+        stats = snapshots.values('departments')
         serializer = DepartmentStatsSerializer(stats)
         return Response(serializer.data)
     
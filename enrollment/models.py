@@ -1,7 +1,8 @@
 from django.db import models
 from django.conf import settings
 from departments.models import Department
-from academics.models import AcademicProgram, Course, CourseSection
+from academics.conflicts import IntervalIndex
+from academics.models import AcademicProgram, Course, CourseSection, Timetable
 from faculty.models import Faculty
 from students.models import Student
 from django.core.exceptions import ValidationError
@@ -69,6 +70,25 @@ class CourseAssignment(models.Model):
         return f"{self.course.code} - {self.department.code} - {self.academic_program.code} ({self.academic_year} {self.semester})"
 
 
+def find_schedule_conflict(course_section, assignments):
+    """Return the section of ``assignments`` whose active timetable overlaps ``course_section``'s.
+
+    Two queries: the other sections' timetables go into one interval index,
+    then each of this section's entries is checked with a bisect lookup.
+    """
+    others = Timetable.objects.filter(
+        is_active=True,
+        course_section__in=assignments.values('course_section'),
+    ).exclude(course_section=course_section).select_related('course_section')
+    # A single dimension: every entry belongs to the same faculty's week
+    index = IntervalIndex.build(others, {'faculty': lambda timetable: True})
+    for timetable in course_section.timetables.filter(is_active=True):
+        hits = index.query(timetable)
+        if hits:
+            return hits[0].first.course_section
+    return None
+
+
 class FacultyAssignment(models.Model):
     """Model for assigning faculty to course sections"""
     ASSIGNMENT_STATUS = [
@@ -110,13 +130,9 @@ class FacultyAssignment(models.Model):
                 status__in=['ASSIGNED', 'CONFIRMED']
             ).exclude(pk=self.pk)
             
-            for assignment in conflicting_assignments:
-                for timetable1 in self.course_section.timetables.filter(is_active=True):
-                    for timetable2 in assignment.course_section.timetables.filter(is_active=True):
-                        if (timetable1.day_of_week == timetable2.day_of_week and
-                            timetable1.start_time < timetable2.end_time and
-                            timetable1.end_time > timetable2.start_time):
-                            raise ValidationError(f"Faculty has conflicting schedule with {assignment.course_section}")
+            conflict = find_schedule_conflict(self.course_section, conflicting_assignments)
+            if conflict is not None:
+                raise ValidationError(f"Faculty has conflicting schedule with {conflict}")
 
 
 class StudentEnrollmentPlan(models.Model):
@@ -3,7 +3,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from .models import (
     EnrollmentRule, CourseAssignment, FacultyAssignment, StudentEnrollmentPlan,
-    PlannedCourse, EnrollmentRequest, WaitlistEntry
+    PlannedCourse, EnrollmentRequest, WaitlistEntry, find_schedule_conflict
 )
 from academics.models import Course, CourseSection, CourseEnrollment
 from faculty.models import Faculty
@@ -112,13 +112,9 @@ class EnrollmentService:
                     status__in=['ASSIGNED', 'CONFIRMED']
                 ).exclude(course_section=course_section)
                 
-                for assignment in conflicting_assignments:
-                    for timetable1 in course_section.timetables.filter(is_active=True):
-                        for timetable2 in assignment.course_section.timetables.filter(is_active=True):
-                            if (timetable1.day_of_week == timetable2.day_of_week and
-                                timetable1.start_time < timetable2.end_time and
-                                timetable1.end_time > timetable2.start_time):
-                                raise ValidationError(f"Faculty has conflicting schedule with {assignment.course_section}")
+                conflict = find_schedule_conflict(course_section, conflicting_assignments)
+                if conflict is not None:
+                    raise ValidationError(f"Faculty has conflicting schedule with {conflict}")
             
             # Create or update faculty assignment
             assignment, created = FacultyAssignment.objects.get_or_create(
@@ -18,7 +18,8 @@ class EventCategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
-    list_display = ('title', 'category', 'venue', 'start_at', 'end_at', 'status', 'is_public')
+    list_display = ('title', 'category', 'venue', 'start_at', 'end_at', 'status', 'is_public', 'max_attendees', 'seats_taken')
+    readonly_fields = ('seats_taken',)
     list_filter = ('status', 'is_public', 'category')
     search_fields = ('title', 'description')
     autocomplete_fields = ('category', 'venue',)
@@ -26,9 +27,10 @@ class EventAdmin(admin.ModelAdmin):
 
 @admin.register(EventRegistration)
 class EventRegistrationAdmin(admin.ModelAdmin):
-    list_display = ('event', 'attendee_name', 'attendee_email', 'attendee_type', 'is_waitlisted', 'created_at')
+    list_display = ('event', 'attendee_name', 'attendee_email', 'attendee_type', 'is_waitlisted', 'checked_in_at', 'cancelled_at', 'created_at')
     list_filter = ('attendee_type', 'is_waitlisted')
-    search_fields = ('attendee_name', 'attendee_email')
+    search_fields = ('attendee_name', 'attendee_email', 'check_in_code')
+    readonly_fields = ('check_in_code', 'promoted_at', 'cancelled_at')
     autocomplete_fields = ('event', 'user')
 
 
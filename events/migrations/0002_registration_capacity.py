@@ -0,0 +1,60 @@
+import secrets
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventRegistration = apps.get_model('events', 'EventRegistration')
+    confirmed = (
+        EventRegistration.objects.filter(event=OuterRef('pk'), is_waitlisted=False)
+        .order_by().values('event').annotate(n=Count('pk')).values('n')
+    )
+    Event.objects.update(seats_taken=Coalesce(Subquery(confirmed), Value(0)))
+
+    pending = list(EventRegistration.objects.filter(check_in_code__isnull=True).only('pk'))
+    for registration in pending:
+        registration.check_in_code = secrets.token_hex(5).upper()
+    EventRegistration.objects.bulk_update(pending, ['check_in_code'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Confirmed registrations; maintained by events.registration'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='max_attendees',
+            field=models.PositiveIntegerField(default=0, help_text='0 means unlimited'),
+        ),
+        migrations.AddField(
+            model_name='eventregistration',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventregistration',
+            name='check_in_code',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='eventregistration',
+            name='promoted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['event', 'is_waitlisted', 'created_at'], name='events_even_event_i_3e064e_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -52,7 +52,8 @@ class Event(TimeStampedUUIDModel):
     start_at = models.DateTimeField()
     end_at = models.DateTimeField()
     timezone_str = models.CharField(max_length=64, default='Asia/Kolkata')
-    max_attendees = models.PositiveIntegerField(default=0)
+    max_attendees = models.PositiveIntegerField(default=0, help_text='0 means unlimited')
+    seats_taken = models.PositiveIntegerField(default=0, editable=False, help_text='Confirmed registrations; maintained by events.registration')
     is_public = models.BooleanField(default=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='events_created')
@@ -96,6 +97,9 @@ class EventRegistration(TimeStampedUUIDModel):
     attendee_type = models.CharField(max_length=20, choices=ATTENDEE_TYPE_CHOICES)
     checked_in_at = models.DateTimeField(blank=True, null=True)
     is_waitlisted = models.BooleanField(default=False)
+    check_in_code = models.CharField(max_length=16, unique=True, blank=True, null=True, editable=False)
+    promoted_at = models.DateTimeField(blank=True, null=True, editable=False)
+    cancelled_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     class Meta:
         unique_together = ('event', 'user', 'attendee_email')
@@ -103,9 +107,15 @@ class EventRegistration(TimeStampedUUIDModel):
             models.Index(fields=['event']),
             models.Index(fields=['user']),
             models.Index(fields=['attendee_email']),
+            # Waitlist promotion order
+            models.Index(fields=['event', 'is_waitlisted', 'created_at']),
         ]
 
     def __str__(self):
         return f"{self.attendee_name} - {self.event.title}"
 
+    @property
+    def is_active(self):
+        return self.cancelled_at is None
+
 
@@ -0,0 +1,216 @@
+"""Event registration engine.
+
+Seats are allocated against ``Event.seats_taken`` with one conditional
+UPDATE (``seats_taken < max_attendees``), so the database decides which of
+several concurrent registrations gets the last seat; the losers are put on
+the waitlist instead of overbooking the event. ``max_attendees = 0`` means
+unlimited.
+
+Cancelling a confirmed registration hands its seat straight to the oldest
+waitlisted one while the event row is locked, so a freed seat is never
+taken by a newcomer ahead of the queue. ``promote_waitlist`` fills any
+seats freed by raising ``max_attendees``.
+
+Check-in is by the code printed on the attendee's pass (QR or typed);
+``check_in`` handles a whole scanner batch with two queries per chunk.
+"""
+
+from __future__ import annotations
+
+import secrets
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Event, EventRegistration
+
+
+class RegistrationClosed(ValidationError):
+    """Raised when an event does not accept (more) registrations."""
+
+
+class AlreadyRegistered(ValidationError):
+    """Raised when the attendee already holds an active registration."""
+
+
+def new_check_in_code() -> str:
+    return secrets.token_hex(5).upper()
+
+
+def lock_event(event_id) -> None:
+    """Serialize seat hand-overs for one event until the current transaction ends."""
+    if connection.features.has_select_for_update:
+        list(Event.objects.select_for_update().filter(pk=event_id).values_list('pk', flat=True))
+    else:
+        # sqlite: the first write takes the database write lock for the transaction
+        Event.objects.filter(pk=event_id).update(seats_taken=F('seats_taken'))
+
+
+def _claim_seat(event_id) -> bool:
+    has_room = Q(max_attendees=0) | Q(seats_taken__lt=F('max_attendees'))
+    return bool(Event.objects.filter(has_room, pk=event_id).update(seats_taken=F('seats_taken') + 1))
+
+
+def _waitlist(event_id):
+    return EventRegistration.objects.filter(
+        event_id=event_id, is_waitlisted=True, cancelled_at__isnull=True,
+    ).order_by('created_at', 'pk')
+
+
+def _promote(event_id, limit: Optional[int]) -> List:
+    """Confirm the first ``limit`` waitlisted registrations (all if None); the caller owns the seats."""
+    queue = _waitlist(event_id).values_list('pk', flat=True)
+    ids = list(queue if limit is None else queue[:limit])
+    if ids:
+        EventRegistration.objects.filter(pk__in=ids).update(is_waitlisted=False, promoted_at=timezone.now())
+    return ids
+
+
+def register(
+    event: Event,
+    *,
+    attendee_name: str,
+    attendee_type: str,
+    user=None,
+    attendee_email: Optional[str] = None,
+    attendee_mobile: Optional[str] = None,
+    allow_waitlist: bool = True,
+) -> EventRegistration:
+    """Register an attendee, confirmed if a seat is free and waitlisted otherwise.
+
+    With ``allow_waitlist=False`` a full event raises ``RegistrationClosed``
+    instead. A previously cancelled registration of the same attendee is
+    replaced, so re-registering joins the back of the waitlist.
+    """
+    if event.status != 'PUBLISHED':
+        raise RegistrationClosed("Registration is only open for published events.")
+    if event.end_at <= timezone.now():
+        raise RegistrationClosed("This event has already ended.")
+
+    with transaction.atomic():
+        previous = EventRegistration.objects.filter(event=event)
+        if user is not None:
+            previous = previous.filter(user=user)
+        elif attendee_email:
+            previous = previous.filter(user__isnull=True, attendee_email__iexact=attendee_email)
+        else:
+            previous = previous.none()
+        for registration in previous:
+            if registration.is_active:
+                raise AlreadyRegistered("This attendee is already registered for the event.")
+            registration.delete()
+
+        seated = _claim_seat(event.pk)
+        if not seated and not allow_waitlist:
+            raise RegistrationClosed("This event is full.")
+        return EventRegistration.objects.create(
+            event=event, user=user, attendee_name=attendee_name, attendee_email=attendee_email,
+            attendee_mobile=attendee_mobile, attendee_type=attendee_type, is_waitlisted=not seated,
+            check_in_code=new_check_in_code(),
+        )
+
+
+def cancel(registration: EventRegistration) -> Optional[EventRegistration]:
+    """Cancel a registration; returns the waitlisted registration promoted into its seat, if any."""
+    with transaction.atomic():
+        lock_event(registration.event_id)
+        now = timezone.now()
+        # Re-checked under the lock so a double cancel frees the seat only once
+        held_seat = EventRegistration.objects.filter(
+            pk=registration.pk, cancelled_at__isnull=True, is_waitlisted=False,
+        ).update(cancelled_at=now)
+        if not held_seat:
+            EventRegistration.objects.filter(pk=registration.pk, cancelled_at__isnull=True).update(cancelled_at=now)
+            registration.refresh_from_db(fields=['cancelled_at'])
+            return None
+        registration.cancelled_at = now
+        promoted = _promote(registration.event_id, 1)
+        if not promoted:
+            Event.objects.filter(pk=registration.event_id, seats_taken__gt=0).update(seats_taken=F('seats_taken') - 1)
+            return None
+    return EventRegistration.objects.get(pk=promoted[0])
+
+
+def promote_waitlist(event: Event) -> List:
+    """Move waitlisted registrations into free seats, oldest first; returns the promoted ids."""
+    with transaction.atomic():
+        lock_event(event.pk)
+        max_attendees, seats_taken = Event.objects.filter(pk=event.pk).values_list('max_attendees', 'seats_taken').get()
+        if max_attendees and seats_taken >= max_attendees:
+            return []
+        promoted = _promote(event.pk, max_attendees - seats_taken if max_attendees else None)
+        if promoted:
+            Event.objects.filter(pk=event.pk).update(seats_taken=F('seats_taken') + len(promoted))
+    return promoted
+
+
+def waitlist_position(registration: EventRegistration) -> Optional[int]:
+    """1-based place in the event's waitlist, or None if not waitlisted."""
+    if not registration.is_waitlisted or not registration.is_active:
+        return None
+    ahead = _waitlist(registration.event_id).filter(
+        Q(created_at__lt=registration.created_at) | Q(created_at=registration.created_at, pk__lt=registration.pk)
+    )
+    return ahead.count() + 1
+
+
+@dataclass
+class CheckInReport:
+    checked_in: List[str] = field(default_factory=list)
+    already_checked_in: List[str] = field(default_factory=list)
+    waitlisted: List[str] = field(default_factory=list)
+    cancelled: List[str] = field(default_factory=list)
+    unknown: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            'checked_in_count': len(self.checked_in),
+            'already_checked_in': self.already_checked_in,
+            'waitlisted': self.waitlisted,
+            'cancelled': self.cancelled,
+            'unknown': self.unknown,
+        }
+
+
+def check_in(event: Event, codes: Iterable[str], at: Optional[datetime] = None, batch_size: int = 1000) -> CheckInReport:
+    """Check in every confirmed registration whose code is in ``codes``.
+
+    Per chunk of codes: one SELECT to classify them and one UPDATE stamping
+    ``checked_in_at``. Codes already checked in keep their first timestamp.
+    """
+    at = at or timezone.now()
+    report = CheckInReport()
+    codes = list(dict.fromkeys(c.strip().upper() for c in codes if c and c.strip()))
+    for start in range(0, len(codes), batch_size):
+        chunk = codes[start:start + batch_size]
+        found = {
+            code: (checked_in_at, is_waitlisted, cancelled_at)
+            for code, checked_in_at, is_waitlisted, cancelled_at in EventRegistration.objects.filter(
+                event=event, check_in_code__in=chunk,
+            ).values_list('check_in_code', 'checked_in_at', 'is_waitlisted', 'cancelled_at')
+        }
+        eligible = []
+        for code in chunk:
+            if code not in found:
+                report.unknown.append(code)
+                continue
+            checked_in_at, is_waitlisted, cancelled_at = found[code]
+            if cancelled_at is not None:
+                report.cancelled.append(code)
+            elif is_waitlisted:
+                report.waitlisted.append(code)
+            elif checked_in_at is not None:
+                report.already_checked_in.append(code)
+            else:
+                eligible.append(code)
+        if eligible:
+            EventRegistration.objects.filter(
+                event=event, check_in_code__in=eligible, checked_in_at__isnull=True,
+            ).update(checked_in_at=at)
+            report.checked_in.extend(eligible)
+    return report
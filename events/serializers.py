@@ -1,5 +1,7 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import Venue, EventCategory, Event, EventRegistration
+from . import registration
 
 
 class VenueSerializer(serializers.ModelSerializer):
@@ -26,9 +28,31 @@ class EventSerializer(serializers.ModelSerializer):
 
 class EventRegistrationSerializer(serializers.ModelSerializer):
     event_title = serializers.ReadOnlyField(source='event.title')
+    allow_waitlist = serializers.BooleanField(default=True, write_only=True)
 
     class Meta:
         model = EventRegistration
         fields = '__all__'
+        read_only_fields = ['is_waitlisted', 'checked_in_at']
+
+    def create(self, validated_data):
+        data = dict(validated_data)
+        event = data.pop('event')
+        try:
+            return registration.register(event, **data)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({'detail': exc.messages[0]})
+
+    def update(self, instance, validated_data):
+        # Seats follow the event; moving a registration means cancelling and registering again
+        validated_data.pop('allow_waitlist', None)
+        if 'event' in validated_data and validated_data['event'] != instance.event:
+            raise serializers.ValidationError({'event': 'A registration cannot be moved to another event.'})
+        return super().update(instance, validated_data)
+
+
+class CheckInSerializer(serializers.Serializer):
+    codes = serializers.ListField(child=serializers.CharField(max_length=16), allow_empty=False, max_length=20000)
+    checked_in_at = serializers.DateTimeField(required=False)
 
 
@@ -0,0 +1,131 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from events.models import Event, EventRegistration
+from events.registration import (
+    AlreadyRegistered, RegistrationClosed, cancel, check_in, promote_waitlist, register, waitlist_position,
+)
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def event():
+    start = timezone.now() + timedelta(days=3)
+    return baker.make(Event, status='PUBLISHED', start_at=start, end_at=start + timedelta(hours=2), max_attendees=2)
+
+
+def _register(event, n, **kwargs):
+    return register(event, attendee_name=f'A{n}', attendee_email=f'a{n}@example.com', attendee_type='GUEST', **kwargs)
+
+
+def test_overflow_is_waitlisted_and_promoted_in_order(event):
+    regs = [_register(event, n) for n in range(5)]
+    assert [r.is_waitlisted for r in regs] == [False, False, True, True, True]
+    assert [waitlist_position(r) for r in regs] == [None, None, 1, 2, 3]
+    event.refresh_from_db()
+    assert event.seats_taken == 2
+
+    promoted = cancel(regs[0])
+    assert promoted.pk == regs[2].pk and promoted.promoted_at is not None
+    assert waitlist_position(EventRegistration.objects.get(pk=regs[3].pk)) == 1
+    # Cancelling a waitlisted registration does not touch the seats
+    assert cancel(regs[4]) is None
+    event.refresh_from_db()
+    assert event.seats_taken == 2
+
+    # A raised capacity promotes the rest of the queue
+    Event.objects.filter(pk=event.pk).update(max_attendees=4)
+    assert promote_waitlist(event) == [regs[3].pk]
+    event.refresh_from_db()
+    assert event.seats_taken == 3
+    assert EventRegistration.objects.filter(event=event, is_waitlisted=False, cancelled_at__isnull=True).count() == 3
+
+
+def test_cancel_without_waitlist_frees_the_seat_once(event):
+    first, second = _register(event, 0), _register(event, 1)
+    assert cancel(first) is None
+    assert cancel(first) is None
+    event.refresh_from_db()
+    assert event.seats_taken == 1
+    # Re-registering after a cancel is allowed; a duplicate active one is not
+    again = _register(event, 0)
+    assert not again.is_waitlisted
+    with pytest.raises(AlreadyRegistered):
+        _register(event, 1)
+    with pytest.raises(RegistrationClosed):
+        _register(event, 9, allow_waitlist=False)
+    assert second.check_in_code != again.check_in_code
+
+
+def test_draft_events_do_not_accept_registrations(event):
+    Event.objects.filter(pk=event.pk).update(status='DRAFT')
+    event.refresh_from_db()
+    with pytest.raises(RegistrationClosed):
+        _register(event, 0)
+
+
+def test_bulk_check_in_classifies_codes(event, django_assert_num_queries):
+    event.max_attendees = 0
+    event.save()
+    regs = [_register(event, n) for n in range(6)]
+    cancel(regs[5])
+    check_in(event, [regs[0].check_in_code])
+    codes = [r.check_in_code.lower() for r in regs] + ['NOPE']
+
+    with django_assert_num_queries(2):
+        report = check_in(event, codes)
+    assert sorted(report.checked_in) == sorted(r.check_in_code for r in regs[1:5])
+    assert report.already_checked_in == [regs[0].check_in_code]
+    assert report.cancelled == [regs[5].check_in_code]
+    assert report.unknown == ['NOPE']
+    assert EventRegistration.objects.filter(event=event, checked_in_at__isnull=False).count() == 5
+
+
+def test_api_register_cancel_and_check_in(event):
+    client = APIClient()
+    client.force_authenticate(baker.make('accounts.User'))
+    payload = {'event': str(event.pk), 'attendee_name': 'X', 'attendee_type': 'GUEST'}
+    codes = []
+    for n in range(3):
+        response = client.post('/api/v1/events/registrations/', {**payload, 'attendee_email': f'x{n}@example.com'}, format='json')
+        assert response.status_code == 201, response.data
+        codes.append((response.data['id'], response.data['is_waitlisted'], response.data['check_in_code']))
+    assert [w for _, w, _ in codes] == [False, False, True]
+
+    response = client.post(f'/api/v1/events/registrations/{codes[0][0]}/cancel/')
+    assert response.status_code == 200
+    assert response.data['promoted']['id'] == codes[2][0]
+
+    response = client.post(f'/api/v1/events/events/{event.pk}/check-in/', {'codes': [codes[1][2]]}, format='json')
+    assert response.status_code == 200
+    assert response.data['checked_in_count'] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_registrations_cannot_overbook(event):
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        pytest.skip('needs a database shared between threads')
+    results = []
+
+    def attempt(n):
+        try:
+            results.append(_register(event, n).is_waitlisted)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=attempt, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count(False) == 2
+    event.refresh_from_db()
+    assert event.seats_taken == 2
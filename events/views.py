@@ -1,13 +1,18 @@
 from django.utils import timezone
+from django.core.cache import cache
 from django.db.models import Q
-from rest_framework import filters
+from rest_framework import filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from core.viewsets import HighPerformanceViewSet
 from .models import Venue, EventCategory, Event, EventRegistration
+from . import registration
 from .serializers import (
     VenueSerializer,
     EventCategorySerializer,
     EventSerializer,
     EventRegistrationSerializer,
+    CheckInSerializer,
 )
 
 
@@ -49,6 +54,23 @@ class EventViewSet(HighPerformanceViewSet):
             qs = qs.filter(start_at__gte=timezone.now())
         return qs
 
+    def perform_update(self, serializer):
+        event = super().perform_update(serializer)
+        # A raised max_attendees frees seats for the waitlist
+        if registration.promote_waitlist(event):
+            cache.delete(f"{self.__class__.__name__.lower()}_detail:{event.id}")
+        return event
+
+    @action(detail=True, methods=['post'], url_path='check-in')
+    def check_in(self, request, pk=None):
+        """Check in a batch of scanned registration codes."""
+        serializer = CheckInSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = registration.check_in(
+            self.get_object(), serializer.validated_data['codes'], at=serializer.validated_data.get('checked_in_at'),
+        )
+        return Response(report.as_dict())
+
 
 class EventRegistrationViewSet(HighPerformanceViewSet):
     queryset = EventRegistration.objects.select_related('event', 'user').all()
@@ -57,4 +79,38 @@ class EventRegistrationViewSet(HighPerformanceViewSet):
     search_fields = ['attendee_name', 'attendee_email']
     ordering_fields = ['created_at']
 
+    def perform_create(self, serializer):
+        # Registrations have no created_by/updated_by
+        instance = serializer.save()
+        self._invalidate_related_caches()
+        return instance
+
+    def perform_update(self, serializer):
+        instance = serializer.save()
+        cache.delete(f"{self.__class__.__name__.lower()}_detail:{instance.id}")
+        return instance
+
+    def perform_destroy(self, instance):
+        if instance.is_active:
+            registration.cancel(instance)
+        super().perform_destroy(instance)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel the registration, promoting the next waitlisted attendee into a freed seat."""
+        instance = self.get_object()
+        if not instance.is_active:
+            return Response({'detail': 'Registration is already cancelled.'}, status=status.HTTP_400_BAD_REQUEST)
+        promoted = registration.cancel(instance)
+        cache.delete(f"{self.__class__.__name__.lower()}_detail:{instance.id}")
+        return Response({
+            'registration': self.get_serializer(instance).data,
+            'promoted': self.get_serializer(promoted).data if promoted else None,
+        })
+
+    @action(detail=True, methods=['get'], url_path='waitlist-position')
+    def waitlist_position(self, request, pk=None):
+        instance = self.get_object()
+        return Response({'id': instance.id, 'position': registration.waitlist_position(instance)})
+
 
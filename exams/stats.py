@@ -0,0 +1,26 @@
+"""Examination dashboard metrics (served by DashboardStatsView)."""
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from dashboard.snapshots import Metric, register
+
+
+def _today(lookup):
+    """Count rows whose ``lookup`` equals the date of the refresh."""
+    return lambda now: Count('pk', filter=Q(**{lookup: timezone.localdate(now)}))
+
+
+register('exams', [
+    Metric('overview.total_exam_sessions', 'exams.ExamSession'),
+    Metric('overview.active_exam_sessions', 'exams.ExamSession', Count('pk', filter=Q(is_active=True))),
+    Metric('overview.total_exam_schedules', 'exams.ExamSchedule'),
+    Metric('overview.total_students', 'exams.ExamRegistration', Count('student', distinct=True)),
+    Metric('today.exams_count', 'exams.ExamSchedule', _today('exam_date')),
+    Metric('today.ongoing_exams', 'exams.ExamSchedule', Count('pk', filter=Q(status='ONGOING'))),
+    Metric('pending.registrations', 'exams.ExamRegistration', Count('pk', filter=Q(status='PENDING'))),
+    Metric('pending.overdue_dues', 'exams.StudentDue',
+           lambda now: Count('pk', filter=Q(due_date__lt=timezone.localdate(now), status='PENDING'))),
+    Metric('recent_activity.registrations', 'exams.ExamRegistration', _today('created_at__date')),
+    Metric('recent_activity.hall_tickets', 'exams.HallTicket', _today('generated_date__date')),
+])
@@ -14,6 +14,8 @@ from reportlab.lib.units import inch
 from io import BytesIO
 import json
 
+from dashboard import snapshots
+
 from .models import (
     ExamSession, ExamSchedule, ExamRoom, ExamRoomAllocation,
     ExamStaffAssignment, StudentDue, ExamRegistration, HallTicket,
@@ -560,60 +562,8 @@ class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        # Get current date
-        today = timezone.now().date()
-        
-        # Overall statistics
-        total_exam_sessions = ExamSession.objects.count()
-        active_exam_sessions = ExamSession.objects.filter(is_active=True).count()
-        total_exam_schedules = ExamSchedule.objects.count()
-        total_students = ExamRegistration.objects.values('student').distinct().count()
-        
-        # Today's exams
-        today_exams = ExamSchedule.objects.filter(exam_date=today)
-        today_exams_count = today_exams.count()
-        ongoing_exams = ExamSchedule.objects.filter(status='ONGOING').count()
-        
-        # Pending approvals
-        pending_registrations = ExamRegistration.objects.filter(status='PENDING').count()
-        
-        # Overdue dues
-        overdue_dues = StudentDue.objects.filter(
-            due_date__lt=today,
-            status='PENDING'
-        ).count()
-        
-        # Recent activities
-        recent_registrations = ExamRegistration.objects.filter(
-            created_at__date=today
-        ).count()
-        
-        recent_hall_tickets = HallTicket.objects.filter(
-            generated_date__date=today
-        ).count()
-        
-        stats = {
-            'overview': {
-                'total_exam_sessions': total_exam_sessions,
-                'active_exam_sessions': active_exam_sessions,
-                'total_exam_schedules': total_exam_schedules,
-                'total_students': total_students,
-            },
-            'today': {
-                'exams_count': today_exams_count,
-                'ongoing_exams': ongoing_exams,
-            },
-            'pending': {
-                'registrations': pending_registrations,
-                'overdue_dues': overdue_dues,
-            },
-            'recent_activity': {
-                'registrations': recent_registrations,
-                'hall_tickets': recent_hall_tickets,
-            }
-        }
-        
-        return Response(stats)
+        # Materialized by dashboard.snapshots; definitions in exams/stats.py
+        return Response(snapshots.values('exams'))
 
 
 class ExamSummaryReportView(APIView):
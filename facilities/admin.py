@@ -1,6 +1,6 @@
 from django.contrib import admin, messages
 from django.db import IntegrityError
-from .models import Building, Room, Equipment, RoomEquipment, Booking, Maintenance
+from .models import Building, Room, Equipment, RoomEquipment, Booking, Maintenance, RoomUtilizationDaily
 
 
 @admin.register(Building)
@@ -51,7 +51,7 @@ class RoomEquipmentAdmin(admin.ModelAdmin):
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ("title", "room", "starts_at", "ends_at", "is_approved")
+    list_display = ("title", "room", "starts_at", "ends_at", "attendees", "is_approved")
     list_filter = ("is_approved", "room__building")
     search_fields = ("title", "purpose")
 
@@ -61,4 +61,12 @@ class MaintenanceAdmin(admin.ModelAdmin):
     list_display = ("room", "title", "status", "scheduled_for", "resolved_at")
     list_filter = ("status", "room__building")
 
+
+@admin.register(RoomUtilizationDaily)
+class RoomUtilizationDailyAdmin(admin.ModelAdmin):
+    list_display = ("date", "room", "booked_minutes", "available_minutes", "booking_count")
+    list_filter = ("building", "room_type")
+    date_hierarchy = "date"
+
 # Register your models here.
+
@@ -5,3 +5,6 @@ class FacilitiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'facilities'
     verbose_name = 'Facilities & Rooms'
+
+    def ready(self):
+        import facilities.signals  # noqa: F401
@@ -0,0 +1,304 @@
+"""Free/busy bitmaps for room availability search.
+
+Every active room gets an int bitmap over a rolling horizon split into
+``FACILITIES_SLOT_MINUTES`` slots (bit i = slot i is busy). Bits come from
+bookings, maintenance windows and weekly timetable entries (``Timetable`` and
+``AcademicTimetableSlot`` reference rooms by code/name text). A query for
+"rooms of type X, capacity >= N, free 10:00-12:00" is then an attribute filter
+plus one AND per room.
+
+Slots are conservative: anything touching a slot marks it busy, so a room is
+reported free only if it is free for every slot the requested window touches.
+
+The index is per process. Changes mark rooms dirty through signals (see
+``facilities.signals``); a per-room version in the shared cache lets other
+processes notice and rebuild just those rooms on their next query.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+
+from .models import Booking, Maintenance, Room, RoomEquipment
+
+
+WEEKDAY_CODES = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+VERSION_KEY = 'facilities:freebusy:room:{}'
+GENERATION_KEY = 'facilities:freebusy:generation'
+
+
+def _slot_minutes() -> int:
+    return getattr(settings, 'FACILITIES_SLOT_MINUTES', 15)
+
+
+def _horizon_days() -> int:
+    return getattr(settings, 'FACILITIES_AVAILABILITY_HORIZON_DAYS', 28)
+
+
+def _maintenance_hours() -> int:
+    return getattr(settings, 'FACILITIES_MAINTENANCE_DEFAULT_HOURS', 4)
+
+
+@dataclass
+class RoomInfo:
+    id: int
+    building_id: int
+    room_type: str
+    capacity: int
+    label: str
+    equipment: FrozenSet[int] = field(default_factory=frozenset)
+    busy: int = 0
+
+
+class FreeBusyIndex:
+    def __init__(self, anchor: Optional[datetime] = None):
+        tz = timezone.get_current_timezone()
+        today = timezone.localdate()
+        self.anchor = anchor or timezone.make_aware(datetime.combine(today, time.min), tz)
+        self.slot = timedelta(minutes=_slot_minutes())
+        self.n_slots = int(timedelta(days=_horizon_days()) / self.slot)
+        self.end = self.anchor + self.slot * self.n_slots
+        self.rooms: Dict[int, RoomInfo] = {}
+        self.versions: Dict[int, Optional[int]] = {}
+        self._room_names: Dict[str, int] = {}
+        self.generation = None
+
+    # -- bit helpers -------------------------------------------------------
+
+    def mask(self, start: datetime, end: datetime) -> int:
+        """Bits of every slot touched by [start, end), clipped to the horizon."""
+        first = max(0, int((start - self.anchor) // self.slot))
+        last = min(self.n_slots, -int(-(end - self.anchor) // self.slot))
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.anchor <= start and end <= self.end
+
+    # -- building ----------------------------------------------------------
+
+    def build(self) -> 'FreeBusyIndex':
+        rooms = Room.objects.filter(is_active=True).select_related('building')
+        self.rooms = {
+            r.id: RoomInfo(r.id, r.building_id, r.room_type, r.capacity, str(r)) for r in rooms
+        }
+        self._index_names(rooms)
+        self.versions = self._shared_versions(self.rooms)
+        self.fill(self.rooms)
+        return self
+
+    def _index_names(self, rooms: Iterable[Room]) -> None:
+        names: Dict[str, Set[int]] = defaultdict(set)
+        for r in rooms:
+            for name in (str(r), r.code, r.name):
+                if name:
+                    names[name.strip().lower()].add(r.id)
+        # Ambiguous names (same code in two buildings) are not mapped
+        self._room_names = {name: next(iter(ids)) for name, ids in names.items() if len(ids) == 1}
+
+    def fill(self, room_ids: Iterable[int]) -> None:
+        """(Re)compute busy bitmaps and equipment for ``room_ids``."""
+        room_ids = [rid for rid in room_ids if rid in self.rooms]
+        if not room_ids:
+            return
+        busy = dict.fromkeys(room_ids, 0)
+        equipment: Dict[int, Set[int]] = defaultdict(set)
+        for room_id, equipment_id in RoomEquipment.objects.filter(room_id__in=room_ids).values_list('room_id', 'equipment_id'):
+            equipment[room_id].add(equipment_id)
+
+        bookings = Booking.objects.filter(room_id__in=room_ids, starts_at__lt=self.end, ends_at__gt=self.anchor)
+        for room_id, starts_at, ends_at in bookings.values_list('room_id', 'starts_at', 'ends_at'):
+            busy[room_id] |= self.mask(starts_at, ends_at)
+
+        open_statuses = [Maintenance.SCHEDULED, Maintenance.IN_PROGRESS]
+        maintenance = Maintenance.objects.filter(room_id__in=room_ids, scheduled_for__lt=self.end).filter(
+            Q(status__in=open_statuses) | Q(resolved_at__gt=self.anchor)
+        )
+        for room_id, status, scheduled_for, resolved_at in maintenance.values_list('room_id', 'status', 'scheduled_for', 'resolved_at'):
+            if resolved_at is not None:
+                until = resolved_at
+            elif status == Maintenance.IN_PROGRESS:
+                until = self.end  # out of service until resolved
+            else:
+                until = scheduled_for + timedelta(hours=_maintenance_hours())
+            busy[room_id] |= self.mask(scheduled_for, until)
+
+        for room_id, bits in self._timetable_bits(set(room_ids)).items():
+            busy[room_id] |= bits
+
+        for room_id in room_ids:
+            self.rooms[room_id].busy = busy[room_id]
+            self.rooms[room_id].equipment = frozenset(equipment.get(room_id, ()))
+
+    def _timetable_bits(self, room_ids: Set[int]) -> Dict[int, int]:
+        from academics.models import AcademicTimetableSlot, Timetable
+
+        names = [name for name, rid in self._room_names.items() if rid in room_ids]
+        if not names:
+            return {}
+        # Timetable rooms are free text; match case-insensitively on known names
+        fields = ('room', 'day_of_week', 'start_time', 'end_time')
+        rows = itertools.chain.from_iterable(
+            model.objects.filter(is_active=True)
+            .annotate(room_key=Lower(Trim('room')))
+            .filter(room_key__in=names)
+            .values_list(*fields)
+            for model in (Timetable, AcademicTimetableSlot)
+        )
+        tz = timezone.get_current_timezone()
+        first_day = timezone.localtime(self.anchor, tz).date()
+        weeks = _horizon_days() // 7 + 1
+        bits: Dict[int, int] = defaultdict(int)
+        for room, day_code, start_time, end_time in rows:
+            room_id = self._room_names.get((room or '').strip().lower())
+            if room_id not in room_ids or day_code not in WEEKDAY_CODES or end_time <= start_time:
+                continue
+            offset = (WEEKDAY_CODES.index(day_code) - first_day.weekday()) % 7
+            for week in range(weeks):
+                day = first_day + timedelta(days=offset + 7 * week)
+                start = timezone.make_aware(datetime.combine(day, start_time), tz)
+                end = timezone.make_aware(datetime.combine(day, end_time), tz)
+                bits[room_id] |= self.mask(start, end)
+        return bits
+
+    # -- incremental refresh -----------------------------------------------
+
+    @staticmethod
+    def _shared_versions(room_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+        keys = {VERSION_KEY.format(rid): rid for rid in room_ids}
+        try:
+            found = cache.get_many(list(keys))
+        except Exception:
+            found = {}
+        return {rid: found.get(key) for key, rid in keys.items()}
+
+    def stale_rooms(self) -> Set[int]:
+        current = self._shared_versions(self.rooms)
+        stale = {rid for rid, version in current.items() if version != self.versions.get(rid)}
+        self.versions = current
+        return stale
+
+    # -- queries -------------------------------------------------------------
+
+    def free_rooms(
+        self,
+        start: datetime,
+        end: datetime,
+        room_type: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+        building_id: Optional[int] = None,
+        equipment_ids: Iterable[int] = (),
+    ) -> List[RoomInfo]:
+        wanted = self.mask(start, end)
+        needed = frozenset(equipment_ids)
+        found = [
+            info for info in self.rooms.values()
+            if (room_type is None or info.room_type == room_type)
+            and (min_capacity is None or info.capacity >= min_capacity)
+            and (building_id is None or info.building_id == building_id)
+            and needed <= info.equipment
+            and not info.busy & wanted
+        ]
+        # Best fit first: the smallest room that satisfies the request
+        return sorted(found, key=lambda info: (info.capacity, info.label))
+
+    def busy_slots(self, room_id: int, start: datetime, end: datetime) -> List[Dict[str, datetime]]:
+        """Merged busy windows of one room within [start, end)."""
+        info = self.rooms.get(room_id)
+        if info is None:
+            return []
+        bits = info.busy & self.mask(start, end)
+        windows = []
+        while bits:
+            low = (bits & -bits).bit_length() - 1
+            run = bits >> low
+            length = ((run + 1) & ~run).bit_length() - 1  # trailing ones
+            windows.append({
+                'start': self.anchor + self.slot * low,
+                'end': self.anchor + self.slot * (low + length),
+            })
+            bits &= ~(((1 << length) - 1) << low)
+        return windows
+
+
+_index: Optional[FreeBusyIndex] = None
+_index_lock = threading.Lock()
+_dirty: Set[int] = set()
+_rebuild_all = False
+
+
+def mark_rooms_dirty(room_ids: Iterable[int]) -> None:
+    """Record that the busy state of ``room_ids`` changed."""
+    ids = {rid for rid in room_ids if rid is not None}
+    _dirty.update(ids)
+    for rid in ids:
+        key = VERSION_KEY.format(rid)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None) or cache.incr(key)
+        except Exception:
+            pass
+
+
+def mark_all_dirty() -> None:
+    """Room attributes or timetable rows changed: rebuild on the next query."""
+    global _rebuild_all
+    _rebuild_all = True
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+    except Exception:
+        pass
+
+
+def _generation():
+    try:
+        return cache.get(GENERATION_KEY)
+    except Exception:
+        return None
+
+
+def get_index() -> FreeBusyIndex:
+    """The process index, rebuilt when the day rolls over and refreshed for dirty rooms."""
+    global _index, _rebuild_all
+    with _index_lock:
+        generation = _generation()
+        index = _index
+        if (
+            index is None
+            or _rebuild_all
+            or timezone.localdate() != timezone.localtime(index.anchor).date()
+            or index.generation != generation
+        ):
+            _rebuild_all = False
+            _dirty.clear()
+            index = FreeBusyIndex().build()
+            index.generation = generation
+            _index = index
+            return index
+        stale = index.stale_rooms() | _dirty
+        _dirty.clear()
+        index.fill(stale)
+        return index
+
+
+def reset_index() -> None:
+    global _index, _rebuild_all
+    with _index_lock:
+        _index = None
+        _rebuild_all = False
+        _dirty.clear()
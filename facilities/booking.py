@@ -0,0 +1,262 @@
+"""Room booking engine.
+
+Non-overlap is enforced by the database where it can be: on Postgres the
+``facilities_booking_no_overlap`` exclusion constraint (room =, tstzrange &&)
+rejects a concurrent double booking even if both requests passed the check.
+It covers pending bookings as well as approved ones, like the check itself:
+a request holds its slot until it is approved or deleted.
+Other backends take a write lock on the room row first (``SELECT ... FOR
+UPDATE``, or a no-op UPDATE on sqlite, which has no row locks) so the
+check-then-insert is serialized per room.
+
+Recurring bookings are expanded into occurrences up front and checked
+against existing bookings with one query and a sorted sweep, so a proposed
+series reports every conflicting occurrence at once.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .availability import mark_rooms_dirty
+from .models import Booking, BookingSeries, Room
+
+
+EXCLUSION_CONSTRAINT = 'facilities_booking_no_overlap'
+
+Occurrence = Tuple[datetime, datetime]
+
+
+@dataclass
+class OccurrenceConflict:
+    starts_at: datetime
+    ends_at: datetime
+    booking_ids: List[int] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {'starts_at': self.starts_at, 'ends_at': self.ends_at, 'conflicts_with': self.booking_ids}
+
+
+class BookingConflict(ValidationError):
+    """Raised when a booking or series overlaps existing bookings."""
+
+    def __init__(self, conflicts: Sequence[OccurrenceConflict], message: Optional[str] = None):
+        self.conflicts = list(conflicts)
+        if message is None:
+            message = (
+                "Booking overlaps with an existing booking."
+                if len(self.conflicts) <= 1
+                else f"{len(self.conflicts)} occurrences overlap existing bookings."
+            )
+        super().__init__(message)
+
+
+def _max_occurrences() -> int:
+    return getattr(settings, 'BOOKING_SERIES_MAX_OCCURRENCES', 520)
+
+
+def expand_weekly(
+    first_starts_at: datetime,
+    first_ends_at: datetime,
+    interval: int = 1,
+    weekdays: Optional[Iterable[int]] = None,
+    until: Optional[datetime] = None,
+    count: Optional[int] = None,
+    excluded_dates: Iterable = (),
+) -> List[Occurrence]:
+    """Expand a weekly rule into (starts_at, ends_at) pairs.
+
+    Occurrences keep the wall-clock time of the first one in the current
+    timezone, so they do not drift across DST changes.
+    """
+    first_starts_at, first_ends_at = _aware(first_starts_at), _aware(first_ends_at)
+    until = _aware(until) if until is not None else None
+    if first_ends_at <= first_starts_at:
+        raise ValidationError("Booking end time must be after start time.")
+    if until is None and count is None:
+        raise ValidationError("A recurring booking needs either 'until' or 'count'.")
+    # One past the cap for open-ended rules, so an over-long 'until' is detected
+    limit = count or _max_occurrences() + 1
+    if limit > _max_occurrences() + (count is None):
+        raise ValidationError(f"A series may have at most {_max_occurrences()} occurrences.")
+    tz = timezone.get_current_timezone()
+    local_start = timezone.localtime(first_starts_at, tz)
+    duration = first_ends_at - first_starts_at
+    days = sorted(set(weekdays or [local_start.weekday()]))
+    if any(d not in range(7) for d in days):
+        raise ValidationError("Weekdays must be between 0 (Monday) and 6 (Sunday).")
+    skip = {d if isinstance(d, date) else date.fromisoformat(str(d)) for d in excluded_dates}
+
+    occurrences: List[Occurrence] = []
+    week_start = local_start.date() - timedelta(days=local_start.weekday())
+    while len(occurrences) < limit:
+        for weekday in days:
+            day = week_start + timedelta(days=weekday)
+            if day < local_start.date() or day in skip:
+                continue
+            starts_at = timezone.make_aware(datetime.combine(day, local_start.time().replace(tzinfo=None)), tz)
+            if until is not None and starts_at > until:
+                return occurrences
+            occurrences.append((starts_at, starts_at + duration))
+            if len(occurrences) >= limit:
+                break
+        week_start += timedelta(weeks=interval)
+    if len(occurrences) > _max_occurrences():
+        raise ValidationError(f"A series may have at most {_max_occurrences()} occurrences.")
+    return occurrences
+
+
+def find_conflicts(
+    room_id,
+    occurrences: Sequence[Occurrence],
+    exclude_ids: Iterable[int] = (),
+) -> List[OccurrenceConflict]:
+    """Every occurrence overlapping an existing booking (or another occurrence).
+
+    One range query fetches the candidate bookings; each occurrence is then
+    matched with a bisect over them sorted by start.
+    """
+    if not occurrences:
+        return []
+    ordered = sorted(occurrences)
+    window_start = ordered[0][0]
+    window_end = max(end for _, end in ordered)
+    existing = list(
+        Booking.objects.filter(room_id=room_id, starts_at__lt=window_end, ends_at__gt=window_start)
+        .exclude(pk__in=list(exclude_ids))
+        .order_by('starts_at')
+        .values_list('starts_at', 'ends_at', 'pk')
+    )
+    starts = [row[0] for row in existing]
+    longest = max((end - start for start, end, _ in existing), default=timedelta(0))
+
+    conflicts: List[OccurrenceConflict] = []
+    for index, (starts_at, ends_at) in enumerate(ordered):
+        hits = []
+        lo = bisect_left(starts, starts_at - longest)
+        hi = bisect_left(starts, ends_at)
+        for other_start, other_end, pk in existing[lo:hi]:
+            if other_end > starts_at:
+                hits.append(pk)
+        # Occurrences of the proposed series overlapping each other
+        self_overlap = index + 1 < len(ordered) and ordered[index + 1][0] < ends_at
+        if hits or self_overlap:
+            conflicts.append(OccurrenceConflict(starts_at, ends_at, hits))
+    return conflicts
+
+
+def lock_room(room_id) -> None:
+    """Serialize bookings for one room until the current transaction ends."""
+    if connection.features.has_select_for_update:
+        list(Room.objects.select_for_update().filter(pk=room_id).values_list('pk', flat=True))
+    else:
+        # sqlite: the first write takes the database write lock for the transaction
+        Room.objects.filter(pk=room_id).update(is_active=F('is_active'))
+
+
+def _is_exclusion_violation(exc: IntegrityError) -> bool:
+    cause = getattr(exc, '__cause__', None)
+    return getattr(cause, 'pgcode', None) == '23P01' or EXCLUSION_CONSTRAINT in str(exc)
+
+
+def _aware(value: datetime) -> datetime:
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _check_window(starts_at: datetime, ends_at: datetime, is_new: bool) -> None:
+    if ends_at <= starts_at:
+        raise ValidationError("Booking end time must be after start time.")
+    if is_new and ends_at <= timezone.now():
+        raise ValidationError("Cannot create bookings that have already ended.")
+
+
+def book(room: Room, starts_at: datetime, ends_at: datetime, instance: Optional[Booking] = None, **fields) -> Booking:
+    """Create (or move) a booking, guaranteeing it does not overlap another one."""
+    starts_at, ends_at = _aware(starts_at), _aware(ends_at)
+    booking = instance or Booking(room=room)
+    _check_window(starts_at, ends_at, is_new=booking.pk is None)
+    booking.room = room
+    booking.starts_at, booking.ends_at = starts_at, ends_at
+    for name, value in fields.items():
+        setattr(booking, name, value)
+    try:
+        with transaction.atomic():
+            lock_room(room.pk)
+            exclude = [booking.pk] if booking.pk else []
+            conflicts = find_conflicts(room.pk, [(starts_at, ends_at)], exclude_ids=exclude)
+            if conflicts:
+                raise BookingConflict(conflicts)
+            booking.save()
+    except IntegrityError as exc:
+        if _is_exclusion_violation(exc):
+            raise BookingConflict([OccurrenceConflict(starts_at, ends_at)]) from exc
+        raise
+    return booking
+
+
+def create_series(
+    room: Room,
+    title: str,
+    first_starts_at: datetime,
+    first_ends_at: datetime,
+    *,
+    interval: int = 1,
+    weekdays: Optional[Sequence[int]] = None,
+    until: Optional[datetime] = None,
+    count: Optional[int] = None,
+    excluded_dates: Sequence = (),
+    purpose: str = '',
+    created_by=None,
+    is_approved: bool = False,
+    dry_run: bool = False,
+) -> Tuple[Optional[BookingSeries], List[Occurrence]]:
+    """Expand a weekly series, check all occurrences at once and insert them in bulk.
+
+    Raises ``BookingConflict`` listing every conflicting occurrence; nothing
+    is written in that case. With ``dry_run`` the conflict check runs but
+    nothing is saved (returns ``(None, occurrences)``).
+    """
+    occurrences = expand_weekly(
+        first_starts_at, first_ends_at, interval=interval, weekdays=weekdays,
+        until=until, count=count, excluded_dates=excluded_dates,
+    )
+    occurrences = [occ for occ in occurrences if occ[1] > timezone.now()]
+    if not occurrences:
+        raise ValidationError("The series has no upcoming occurrences.")
+    try:
+        with transaction.atomic():
+            if not dry_run:
+                lock_room(room.pk)
+            conflicts = find_conflicts(room.pk, occurrences)
+            if conflicts:
+                raise BookingConflict(conflicts)
+            if dry_run:
+                return None, occurrences
+            series = BookingSeries.objects.create(
+                room=room, title=title, purpose=purpose, interval=interval,
+                weekdays=list(weekdays or []), first_starts_at=first_starts_at, first_ends_at=first_ends_at,
+                until=until, count=count, excluded_dates=[str(d) for d in excluded_dates], created_by=created_by,
+            )
+            Booking.objects.bulk_create([
+                Booking(
+                    room=room, series=series, title=title, purpose=purpose, starts_at=starts_at,
+                    ends_at=ends_at, created_by=created_by, is_approved=is_approved,
+                )
+                for starts_at, ends_at in occurrences
+            ])
+            # bulk_create sends no signals; refresh the free/busy index explicitly
+            transaction.on_commit(lambda: mark_rooms_dirty([room.pk]))
+    except IntegrityError as exc:
+        if _is_exclusion_violation(exc):
+            raise BookingConflict(find_conflicts(room.pk, occurrences)) from exc
+        raise
+    return series, occurrences
@@ -0,0 +1,38 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from facilities.utilization import materialize, utilization_report
+
+
+class Command(BaseCommand):
+    help = 'Materialize daily room utilization summaries (run nightly; re-runs are idempotent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Rebuild this many full days ending yesterday')
+        parser.add_argument('--start', help='First day (YYYY-MM-DD); overrides --days')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD), default yesterday')
+        parser.add_argument('--report', action='store_true', help='Print the utilization totals afterwards')
+
+    def handle(self, *args, **options):
+        try:
+            end = date.fromisoformat(options['end']) if options['end'] else timezone.localdate() - timedelta(days=1)
+            start = date.fromisoformat(options['start']) if options['start'] else end - timedelta(days=options['days'] - 1)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if end < start:
+            raise CommandError('--end must not be before --start')
+
+        t0 = time.perf_counter()
+        rows = materialize(start, end)
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(f'{start}..{end}: {rows} room-day rows in {elapsed:.2f}s'))
+
+        if options['report']:
+            totals = utilization_report(start, end).totals
+            self.stdout.write(
+                f"booked {totals['booked_hours']}h of {totals['available_hours']}h "
+                f"({totals['utilization']}%), seats {totals['seat_utilization']}%"
+            )
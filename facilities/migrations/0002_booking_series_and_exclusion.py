@@ -0,0 +1,101 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+EXCLUSION_NAME = 'facilities_booking_no_overlap'
+REPORT_LIMIT = 50
+
+# The constraint covers every booking, approved or pending, as Booking.clean()
+# and facilities.booking.find_conflicts always have: a pending request holds
+# its slot until it is approved or deleted.
+OVERLAPS_SQL = f"""
+SELECT a.id, b.id, a.room_id, a.starts_at, a.ends_at, b.starts_at, b.ends_at
+FROM facilities_booking a
+JOIN facilities_booking b
+  ON a.room_id = b.room_id AND a.id < b.id
+ AND a.starts_at < b.ends_at AND b.starts_at < a.ends_at
+ORDER BY a.room_id, a.starts_at
+LIMIT {REPORT_LIMIT + 1}
+"""
+
+
+def check_no_overlaps(cursor):
+    """Abort before adding the constraint if existing bookings already overlap.
+
+    Which booking of a pair should win is a decision for the facilities
+    office, so nothing is moved or deleted here; the report lists the pairs
+    to resolve before migrating again.
+    """
+    cursor.execute(OVERLAPS_SQL)
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    lines = [
+        f'  room {room_id}: booking {a} ({a_start} - {a_end}) overlaps booking {b} ({b_start} - {b_end})'
+        for a, b, room_id, a_start, a_end, b_start, b_end in rows[:REPORT_LIMIT]
+    ]
+    if len(rows) > REPORT_LIMIT:
+        lines.append(f'  ... and more (first {REPORT_LIMIT} shown)')
+    raise RuntimeError(
+        f'Cannot add {EXCLUSION_NAME}: existing bookings overlap. Delete or move one booking of each '
+        'pair, then run the migration again.\n' + '\n'.join(lines)
+    )
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # Postgres only: other backends rely on the locked check in facilities.booking
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        check_no_overlaps(cursor)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f'ALTER TABLE facilities_booking ADD CONSTRAINT {EXCLUSION_NAME} '
+        "EXCLUDE USING gist (room_id WITH =, tstzrange(starts_at, ends_at, '[)') WITH &&)"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE facilities_booking DROP CONSTRAINT IF EXISTS {EXCLUSION_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('purpose', models.CharField(blank=True, max_length=255)),
+                ('frequency', models.CharField(choices=[('weekly', 'Weekly')], default='weekly', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every N weeks')),
+                ('weekdays', models.JSONField(blank=True, default=list, help_text="Weekday numbers (0=Mon); empty means the first occurrence's weekday")),
+                ('first_starts_at', models.DateTimeField()),
+                ('first_ends_at', models.DateTimeField()),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Number of occurrences', null=True)),
+                ('excluded_dates', models.JSONField(blank=True, default=list, help_text='ISO dates to skip')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_series', to='facilities.room')),
+            ],
+            options={
+                'ordering': ['first_starts_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='facilities.bookingseries'),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,57 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0002_booking_series_and_exclusion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='attendees',
+            field=models.PositiveIntegerField(blank=True, help_text='Expected number of attendees', null=True),
+        ),
+        migrations.CreateModel(
+            name='RoomUtilizationDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('available_minutes', models.PositiveIntegerField(default=0)),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('booking_count', models.PositiveIntegerField(default=0)),
+                ('attendee_minutes', models.PositiveBigIntegerField(default=0)),
+                ('seat_minutes', models.PositiveBigIntegerField(default=0)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='utilization_days', to='facilities.building')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='utilization_days', to='facilities.room')),
+            ],
+            options={
+                'ordering': ['-date', 'room'],
+                'indexes': [
+                    models.Index(fields=['date', 'building'], name='facilities__date_15a73b_idx'),
+                    models.Index(fields=['date', 'room_type'], name='facilities__date_4113fc_idx'),
+                ],
+                'unique_together': {('room', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FacilityHourlyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('room_type', models.CharField(max_length=20)),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('rooms_in_use', models.PositiveIntegerField(default=0)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_usage', to='facilities.building')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'hour'], name='facilities__date_745762_idx')],
+                'unique_together': {('date', 'hour', 'building', 'room_type')},
+            },
+        ),
+    ]
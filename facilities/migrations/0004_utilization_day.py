@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def mark_materialized_days(apps, schema_editor):
+    # Days summarized before the marker existed (days that produced no rows are rebuilt once)
+    RoomUtilizationDaily = apps.get_model('facilities', 'RoomUtilizationDaily')
+    UtilizationDay = apps.get_model('facilities', 'UtilizationDay')
+    db = schema_editor.connection.alias
+    days = RoomUtilizationDaily.objects.using(db).values_list('date', flat=True).distinct()
+    UtilizationDay.objects.using(db).bulk_create([UtilizationDay(date=day) for day in days], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0003_utilization_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UtilizationDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('materialized_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(mark_materialized_days, migrations.RunPython.noop),
+    ]
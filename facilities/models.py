@@ -57,12 +57,42 @@ class RoomEquipment(models.Model):
         unique_together = ('room', 'equipment')
 
 
+class BookingSeries(models.Model):
+    """A weekly recurring booking; its occurrences are ordinary Booking rows."""
+    WEEKLY = 'weekly'
+    FREQUENCY_CHOICES = [
+        (WEEKLY, 'Weekly'),
+    ]
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='booking_series')
+    title = models.CharField(max_length=255)
+    purpose = models.CharField(max_length=255, blank=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=WEEKLY)
+    interval = models.PositiveSmallIntegerField(default=1, help_text="Repeat every N weeks")
+    weekdays = models.JSONField(default=list, blank=True, help_text="Weekday numbers (0=Mon); empty means the first occurrence's weekday")
+    first_starts_at = models.DateTimeField()
+    first_ends_at = models.DateTimeField()
+    until = models.DateTimeField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True, help_text="Number of occurrences")
+    excluded_dates = models.JSONField(default=list, blank=True, help_text="ISO dates to skip")
+    created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['first_starts_at']
+
+    def __str__(self) -> str:
+        return f"{self.title} @ {self.room} (every {self.interval} week(s))"
+
+
 class Booking(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='bookings')
+    series = models.ForeignKey(BookingSeries, on_delete=models.CASCADE, null=True, blank=True, related_name='bookings')
     title = models.CharField(max_length=255)
     purpose = models.CharField(max_length=255, blank=True)
     starts_at = models.DateTimeField()
     ends_at = models.DateTimeField()
+    attendees = models.PositiveIntegerField(null=True, blank=True, help_text="Expected number of attendees")
     created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True)
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -118,4 +148,61 @@ class Maintenance(models.Model):
         return f"{self.room} - {self.title} ({self.status})"
 
 
+class RoomUtilizationDaily(models.Model):
+    """Per-room, per-day utilization summary (materialized by facilities.utilization)."""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='utilization_days')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='utilization_days')
+    room_type = models.CharField(max_length=20)
+    date = models.DateField()
+    capacity = models.PositiveIntegerField(default=0)
+    available_minutes = models.PositiveIntegerField(default=0)
+    booked_minutes = models.PositiveIntegerField(default=0)
+    booking_count = models.PositiveIntegerField(default=0)
+    # Seat usage over bookings that declared attendees: attendee-minutes vs capacity-minutes
+    attendee_minutes = models.PositiveBigIntegerField(default=0)
+    seat_minutes = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('room', 'date')
+        indexes = [
+            models.Index(fields=['date', 'building']),
+            models.Index(fields=['date', 'room_type']),
+        ]
+        ordering = ['-date', 'room']
+
+    def __str__(self) -> str:
+        return f"{self.room} {self.date}: {self.booked_minutes}/{self.available_minutes} min"
+
+
+class FacilityHourlyUsage(models.Model):
+    """Booked minutes per hour of day, by building and room type (peak-hour heatmaps)."""
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='hourly_usage')
+    room_type = models.CharField(max_length=20)
+    booked_minutes = models.PositiveIntegerField(default=0)
+    rooms_in_use = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'hour', 'building', 'room_type')
+        indexes = [
+            models.Index(fields=['date', 'hour']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.date} {self.hour:02d}:00 {self.building_id}/{self.room_type}: {self.booked_minutes} min"
+
+
+class UtilizationDay(models.Model):
+    """A day whose utilization summaries are materialized (also marks days that produced no rows)."""
+    date = models.DateField(unique=True)
+    materialized_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self) -> str:
+        return f"{self.date} (materialized {self.materialized_at:%Y-%m-%d %H:%M})"
+
+
 # Create your models here.
@@ -1,5 +1,7 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import Building, Room, Equipment, RoomEquipment, Booking, Maintenance
+from .models import Building, Room, Equipment, RoomEquipment, Booking, BookingSeries, Maintenance
+from .booking import BookingConflict, book, create_series
 
 
 class BuildingSerializer(serializers.ModelSerializer):
@@ -43,6 +45,67 @@ class BookingSerializer(serializers.ModelSerializer):
         instance.clean()
         return attrs
 
+    def _book(self, validated_data, instance=None):
+        data = dict(validated_data)
+        room = data.pop('room', None) or instance.room
+        starts_at = data.pop('starts_at', None) or instance.starts_at
+        ends_at = data.pop('ends_at', None) or instance.ends_at
+        try:
+            # Locked check + insert (exclusion constraint on Postgres)
+            return book(room, starts_at, ends_at, instance=instance, **data)
+        except BookingConflict as exc:
+            raise serializers.ValidationError({
+                'detail': exc.messages[0],
+                'conflicts': [c.as_dict() for c in exc.conflicts],
+            })
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+
+    def create(self, validated_data):
+        return self._book(validated_data)
+
+    def update(self, instance, validated_data):
+        return self._book(validated_data, instance=instance)
+
+
+class BookingSeriesSerializer(serializers.ModelSerializer):
+    dry_run = serializers.BooleanField(default=False, write_only=True)
+    is_approved = serializers.BooleanField(default=False, write_only=True)
+    occurrences = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookingSeries
+        fields = [
+            'id', 'room', 'title', 'purpose', 'frequency', 'interval', 'weekdays',
+            'first_starts_at', 'first_ends_at', 'until', 'count', 'excluded_dates',
+            'created_by', 'created_at', 'dry_run', 'is_approved', 'occurrences',
+        ]
+        read_only_fields = ['id', 'created_by', 'created_at']
+
+    def get_occurrences(self, obj):
+        return getattr(obj, '_occurrence_count', None)
+
+    def create(self, validated_data):
+        data = dict(validated_data)
+        data.pop('frequency', None)
+        room = data.pop('room')
+        try:
+            series, occurrences = create_series(
+                room, data.pop('title'), data.pop('first_starts_at'), data.pop('first_ends_at'), **data
+            )
+        except BookingConflict as exc:
+            raise serializers.ValidationError({
+                'detail': exc.messages[0],
+                'conflicts': [c.as_dict() for c in exc.conflicts],
+            })
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+        if series is None:
+            # Dry run: report what would be booked
+            series = BookingSeries(room=room, **{k: v for k, v in validated_data.items() if k not in ('room', 'dry_run', 'is_approved')})
+        series._occurrence_count = len(occurrences)
+        return series
+
 
 class MaintenanceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from academics.models import AcademicTimetableSlot, Timetable
+from .availability import mark_all_dirty, mark_rooms_dirty
+from .models import Booking, Maintenance, Room, RoomEquipment
+from .utilization import invalidate_days
+
+
+@receiver(pre_save, sender=Booking)
+@receiver(pre_save, sender=Maintenance)
+def remember_previous_room(sender, instance, **kwargs):
+    """A booking moved to another room frees the old one."""
+    if instance.pk:
+        if sender is Booking:
+            previous = sender.objects.filter(pk=instance.pk).values_list('room_id', 'starts_at', 'ends_at').first()
+            instance._previous_room_id, instance._previous_span = (
+                (previous[0], previous[1:]) if previous else (None, None)
+            )
+        else:
+            instance._previous_room_id = sender.objects.filter(pk=instance.pk).values_list('room_id', flat=True).first()
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Maintenance)
+@receiver(post_delete, sender=Maintenance)
+@receiver(post_save, sender=RoomEquipment)
+@receiver(post_delete, sender=RoomEquipment)
+def refresh_room_availability(sender, instance, **kwargs):
+    rooms = [instance.room_id, getattr(instance, '_previous_room_id', None)]
+    # After commit, so other workers do not rebuild from the old rows
+    transaction.on_commit(lambda: mark_rooms_dirty(rooms))
+
+
+def _span_days(starts_at, ends_at):
+    if starts_at is None or ends_at is None:
+        return []
+    day, last = timezone.localtime(starts_at).date(), timezone.localtime(ends_at).date()
+    return [day + timedelta(days=i) for i in range((last - day).days + 1)]
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def refresh_utilization_summaries(sender, instance, **kwargs):
+    # Materialized summaries of past days the booking covers (before or after the change)
+    days = _span_days(instance.starts_at, instance.ends_at)
+    days += _span_days(*(getattr(instance, '_previous_span', None) or (None, None)))
+    if days and min(days) < timezone.localdate():
+        transaction.on_commit(lambda: invalidate_days(days))
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Timetable)
+@receiver(post_delete, sender=Timetable)
+@receiver(post_save, sender=AcademicTimetableSlot)
+@receiver(post_delete, sender=AcademicTimetableSlot)
+def rebuild_availability(sender, **kwargs):
+    # Room attributes and free-text timetable rooms can affect any room
+    transaction.on_commit(mark_all_dirty)
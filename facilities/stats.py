@@ -0,0 +1,17 @@
+"""Facilities analytics metrics (served by analytics_dashboard)."""
+
+from django.db.models import Count, Q
+
+from dashboard.snapshots import Metric, register
+
+from .models import Maintenance
+
+register('facilities', [
+    Metric('rooms.total', 'facilities.Room'),
+    Metric('rooms.active', 'facilities.Room', Count('pk', filter=Q(is_active=True))),
+    Metric('rooms.by_type', 'facilities.Room', by='room_type'),
+    Metric('bookings.total', 'facilities.Booking'),
+    Metric('bookings.approved', 'facilities.Booking', Count('pk', filter=Q(is_approved=True))),
+    Metric('maintenance.total', 'facilities.Maintenance'),
+    Metric('maintenance.completed', 'facilities.Maintenance', Count('pk', filter=Q(status=Maintenance.COMPLETED))),
+])
@@ -0,0 +1,22 @@
+"""Celery tasks for the facilities app."""
+
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from .utilization import ensure_materialized
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def materialize_facility_utilization(days=None):
+    """Materialize utilization summaries of recent past days that have none (new or invalidated)."""
+    days = days or settings.FACILITIES_UTILIZATION_BACKFILL_DAYS
+    yesterday = timezone.localdate() - timedelta(days=1)
+    written = ensure_materialized(yesterday - timedelta(days=days - 1), yesterday)
+    logger.info("Materialized %s room-day utilization rows", written)
+    return written
@@ -0,0 +1,82 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from facilities import availability
+from facilities.booking import book
+from facilities.models import Maintenance, Room, RoomEquipment
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _fresh_index():
+    availability.reset_index()
+    yield
+    availability.reset_index()
+
+
+def _at(days, hour, minute=0):
+    day = timezone.localdate() + timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+@pytest.fixture
+def rooms():
+    building = baker.make('facilities.Building', code='SCI')
+    small = Room.objects.create(building=building, code='101', name='Seminar', room_type=Room.CLASSROOM, capacity=30)
+    large = Room.objects.create(building=building, code='201', name='Hall', room_type=Room.LECTURE_HALL, capacity=120)
+    lab = Room.objects.create(building=building, code='301', name='Chem Lab', room_type=Room.LAB, capacity=40)
+    return small, large, lab
+
+
+def test_mask_is_conservative_and_clipped():
+    index = availability.FreeBusyIndex()
+    start = index.anchor + timedelta(minutes=20)
+    assert index.mask(start, start + timedelta(minutes=20)) == 0b110  # 00:20-00:40 touches slots 1 and 2
+    assert index.mask(index.anchor - timedelta(days=1), index.anchor + timedelta(minutes=15)) == 1
+    assert index.mask(index.end, index.end + timedelta(hours=1)) == 0
+
+
+def test_free_rooms_filters_and_respects_all_busy_sources(rooms, django_capture_on_commit_callbacks):
+    small, large, lab = rooms
+    start, end = _at(2, 10), _at(2, 12)
+    found = availability.get_index().free_rooms(start, end, min_capacity=25)
+    assert [r.id for r in found] == [small.id, lab.id, large.id]  # best fit first
+
+    with django_capture_on_commit_callbacks(execute=True):
+        book(small, _at(2, 11, 30), _at(2, 13), title='Viva')
+        Maintenance.objects.create(room=lab, title='Fume hood', scheduled_for=_at(2, 9))
+        projector = baker.make('facilities.Equipment', name='Projector')
+        RoomEquipment.objects.create(room=large, equipment=projector)
+    index = availability.get_index()
+    assert [r.id for r in index.free_rooms(start, end)] == [large.id]
+    assert [r.id for r in index.free_rooms(_at(2, 14), _at(2, 15), equipment_ids=[projector.id])] == [large.id]
+    assert [r.id for r in index.free_rooms(_at(2, 14), _at(2, 15), room_type=Room.LAB)] == [lab.id]
+    assert index.busy_slots(small.id, _at(2, 0), _at(3, 0)) == [{'start': _at(2, 11, 30), 'end': _at(2, 13)}]
+
+
+def test_weekly_timetable_entries_block_rooms(rooms, django_capture_on_commit_callbacks):
+    small, large, _ = rooms
+    day = timezone.localdate() + timedelta(days=3)
+    code = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN'][day.weekday()]
+    availability.get_index()
+    with django_capture_on_commit_callbacks(execute=True):
+        baker.make('academics.Timetable', room='sci-201', day_of_week=code, start_time=time(10), end_time=time(11), is_active=True)
+    index = availability.get_index()
+    assert large.id not in {r.id for r in index.free_rooms(_at(3, 10), _at(3, 11))}
+    assert large.id not in {r.id for r in index.free_rooms(_at(10, 10, 30), _at(10, 11))}
+    assert large.id in {r.id for r in index.free_rooms(_at(4, 10), _at(4, 11))}
+
+
+def test_free_rooms_view(rooms, client, django_user_model):
+    client.force_login(django_user_model.objects.create_user(email='fr@example.com', username='fr', password='p'))
+    url = reverse('facilities:free_rooms')
+    res = client.get(url, {'start': _at(1, 9).isoformat(), 'end': _at(1, 10).isoformat(), 'min_capacity': 100})
+    assert res.status_code == 200
+    assert [r['capacity'] for r in res.json()['rooms']] == [120]
+    assert client.get(url, {'start': _at(90, 9).isoformat(), 'end': _at(90, 10).isoformat()}).status_code == 400
@@ -0,0 +1,139 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from facilities import utilization
+from facilities.models import Booking, FacilityHourlyUsage, Room, RoomUtilizationDaily, UtilizationDay
+from facilities.tasks import materialize_facility_utilization
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _hours(settings):
+    settings.FACILITIES_OPERATING_HOURS = ('08:00', '20:00')
+    settings.FACILITIES_OPERATING_WEEKDAYS = [0, 1, 2, 3, 4, 5]
+
+
+@pytest.fixture
+def monday():
+    today = timezone.localdate()
+    return today - timedelta(days=today.weekday() + 7)
+
+
+def _at(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+@pytest.fixture
+def rooms():
+    sci = baker.make('facilities.Building', code='SCI', name='Science')
+    art = baker.make('facilities.Building', code='ART', name='Arts')
+    seminar = Room.objects.create(building=sci, code='101', name='Seminar', room_type=Room.CLASSROOM, capacity=30)
+    hall = Room.objects.create(building=art, code='201', name='Hall', room_type=Room.LECTURE_HALL, capacity=120)
+    return seminar, hall
+
+
+def _booking(room, start, end, **fields):
+    return Booking.objects.create(room=room, title='b', starts_at=start, ends_at=end, is_approved=True, **fields)
+
+
+def test_summaries_merge_overlaps_clip_to_operating_hours_and_track_seats(rooms, monday):
+    seminar, hall = rooms
+    _booking(seminar, _at(monday, 9), _at(monday, 11), attendees=15)
+    _booking(seminar, _at(monday, 10), _at(monday, 12))
+    _booking(seminar, _at(monday, 19), _at(monday, 21))
+    Booking.objects.create(room=hall, title='pending', starts_at=_at(monday, 9), ends_at=_at(monday, 17))
+
+    assert utilization.materialize(monday, monday + timedelta(days=6)) == 14
+    row = RoomUtilizationDaily.objects.get(room=seminar, date=monday)
+    assert (row.available_minutes, row.booked_minutes, row.booking_count) == (720, 240, 3)
+    assert (row.attendee_minutes, row.seat_minutes) == (15 * 120, 30 * 120)
+    assert RoomUtilizationDaily.objects.get(room=hall, date=monday).booked_minutes == 0
+    assert RoomUtilizationDaily.objects.get(room=seminar, date=monday + timedelta(days=6)).available_minutes == 0
+
+    hours = dict(FacilityHourlyUsage.objects.filter(date=monday).values_list('hour', 'booked_minutes'))
+    assert hours == {9: 60, 10: 60, 11: 60, 19: 60, 20: 60}
+
+
+def test_report_aggregates_in_constant_queries(rooms, monday, django_assert_num_queries):
+    seminar, hall = rooms
+    for week in range(2):
+        day = monday - timedelta(weeks=week)
+        _booking(seminar, _at(day, 9), _at(day, 15), attendees=30)
+        _booking(hall, _at(day, 9), _at(day, 10), attendees=60)
+    start, end = monday - timedelta(weeks=1), monday + timedelta(days=5)
+    utilization.materialize(start, end)
+
+    with django_assert_num_queries(6):
+        report = utilization.utilization_report(start, end)
+    assert report.totals['booked_minutes'] == 2 * (360 + 60)
+    assert report.totals['available_minutes'] == 2 * 12 * 720
+    by_building = {row['building__code']: row for row in report.by_building}
+    assert by_building['SCI']['utilization'] == round(100 * 720 / (12 * 720), 1)
+    assert by_building['ART']['seat_utilization'] == 50.0
+    assert [row['room_id'] for row in report.by_room] == [seminar.id, hall.id]
+    peak = report.peak_hours(1)[0]
+    assert (peak['weekday'], peak['hour'], peak['day']) == (1, 9, 'Mon')
+    assert peak['occupancy'] == 100.0  # both rooms busy 09:00-10:00 on both Mondays
+
+    only_labs = utilization.utilization_report(start, end, room_type=Room.LAB)
+    assert only_labs.totals['available_minutes'] == 0 and only_labs.by_building == []
+
+
+def test_ensure_materialized_fills_missing_past_days_only(rooms, monday):
+    seminar, _ = rooms
+    utilization.materialize(monday)
+    today = timezone.localdate()
+    written = utilization.ensure_materialized(monday, today + timedelta(days=3))
+    assert written == 2 * ((today - monday).days - 1)
+    assert not RoomUtilizationDaily.objects.filter(date__gte=today).exists()
+    assert utilization.ensure_materialized(monday, today) == 0
+
+
+def test_days_without_rows_are_marked_and_not_recomputed(monday, django_assert_num_queries):
+    # No active rooms: nothing to store, but the days still count as materialized
+    assert utilization.ensure_materialized(monday, monday + timedelta(days=2)) == 0
+    assert set(UtilizationDay.objects.values_list('date', flat=True)) == {monday + timedelta(days=i) for i in range(3)}
+    with django_assert_num_queries(1):
+        utilization.ensure_materialized(monday, monday + timedelta(days=2))
+
+
+def test_booking_change_on_past_day_drops_its_summary(rooms, monday, django_capture_on_commit_callbacks):
+    seminar, _ = rooms
+    booking = _booking(seminar, _at(monday, 9), _at(monday, 10))
+    utilization.materialize(monday, monday + timedelta(days=1))
+    with django_capture_on_commit_callbacks(execute=True):
+        booking.starts_at, booking.ends_at = _at(monday + timedelta(days=1), 9), _at(monday + timedelta(days=1), 11)
+        booking.save()
+    assert not RoomUtilizationDaily.objects.filter(date__in=[monday, monday + timedelta(days=1)]).exists()
+    assert not UtilizationDay.objects.filter(date__in=[monday, monday + timedelta(days=1)]).exists()
+
+    utilization.ensure_materialized(monday, monday + timedelta(days=1))
+    assert RoomUtilizationDaily.objects.get(room=seminar, date=monday + timedelta(days=1)).booked_minutes == 120
+
+
+def test_analytics_views(rooms, monday, client, django_user_model):
+    seminar, _ = rooms
+    _booking(seminar, _at(monday, 9), _at(monday, 12), attendees=10)
+    client.force_login(django_user_model.objects.create_user(email='an@example.com', username='an', password='p'))
+
+    # Reports only read the summaries; the beat task writes them
+    assert client.get(reverse('facilities:analytics')).status_code == 200
+    assert not UtilizationDay.objects.exists()
+    assert materialize_facility_utilization(days=30) > 0
+
+    res = client.get(reverse('facilities:analytics'))
+    assert res.status_code == 200
+    assert res.context['room_utilization'] > 0
+    assert {b['code']: b['total_capacity'] for b in res.context['buildings']} == {'ART': 120, 'SCI': 30}
+
+    url = reverse('facilities:utilization')
+    data = client.get(url, {'start': monday.isoformat(), 'end': monday.isoformat()}).json()
+    assert data['totals']['booked_minutes'] == 180
+    assert data['totals']['seat_utilization'] == round(100 * 10 / 30, 1)
+    assert client.get(url, {'start': monday.isoformat(), 'end': (monday - timedelta(days=1)).isoformat()}).status_code == 400
@@ -25,7 +25,9 @@ urlpatterns = [
     path('maintenance/', views.maintenance_list, name='maintenance_list'),
     path('equipment/', views.equipment_list, name='equipment_list'),
     path('analytics/', views.analytics_dashboard, name='analytics'),
+    path('analytics/utilization/', views.api_utilization, name='utilization'),
     path('rooms/<int:room_id>/availability/', views.api_room_availability, name='room_availability'),
+    path('rooms/free/', views.api_free_rooms, name='free_rooms'),
     
     # API endpoints (temporarily disabled to fix routing)
     # path('api/v1/', include(router.urls)),
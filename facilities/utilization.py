@@ -0,0 +1,276 @@
+"""Room utilization summaries.
+
+Approved bookings are folded once per day into ``RoomUtilizationDaily`` (one
+row per active room: available vs booked minutes within operating hours,
+attendee- vs capacity-minutes) and ``FacilityHourlyUsage`` (booked minutes
+per hour by building and room type). Reports over any period are then a
+handful of ``SUM`` aggregates over those tables, independent of how many
+bookings the period holds.
+
+Past days are materialized by the ``materialize_facility_utilization``
+beat task (``ensure_materialized`` over the recent past) or command;
+reports only read. Every materialized day gets a ``UtilizationDay`` marker,
+so a day that produced no rows is not recomputed on each run. A booking
+change touching a past day drops that day's rows and marker (see
+``facilities.signals``) so the next task run rebuilds it. Today and future
+days are never stored.
+"""
+
+from __future__ import annotations
+
+import calendar
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractIsoWeekDay
+from django.utils import timezone
+
+from .models import Booking, FacilityHourlyUsage, Room, RoomUtilizationDaily, UtilizationDay
+
+
+SUM_FIELDS = ('available_minutes', 'booked_minutes', 'booking_count', 'attendee_minutes', 'seat_minutes')
+
+
+def _operating_hours() -> Tuple[time, time]:
+    opens, closes = getattr(settings, 'FACILITIES_OPERATING_HOURS', ('08:00', '20:00'))
+    return time.fromisoformat(opens), time.fromisoformat(closes)
+
+
+def _operating_weekdays() -> Iterable[int]:
+    return getattr(settings, 'FACILITIES_OPERATING_WEEKDAYS', (0, 1, 2, 3, 4, 5))
+
+
+def _at(day: date, at: time) -> datetime:
+    return timezone.make_aware(datetime.combine(day, at), timezone.get_current_timezone())
+
+
+def _merge(intervals: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _minutes(start: datetime, end: datetime) -> float:
+    return max(0.0, (end - start).total_seconds() / 60)
+
+
+def _days(start_date: date, end_date: date) -> List[date]:
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+def summarize(start_date: date, end_date: date) -> Tuple[List[RoomUtilizationDaily], List[FacilityHourlyUsage]]:
+    """Compute (unsaved) summary rows for every day in [start_date, end_date].
+
+    Overlapping bookings in one room are merged, so booked minutes never
+    exceed the room's available minutes.
+    """
+    opens, closes = _operating_hours()
+    weekdays = set(_operating_weekdays())
+    rooms = list(Room.objects.filter(is_active=True).values_list('id', 'building_id', 'room_type', 'capacity'))
+    room_info = {rid: (building_id, room_type, capacity) for rid, building_id, room_type, capacity in rooms}
+
+    range_start = _at(start_date, time.min)
+    range_end = _at(end_date + timedelta(days=1), time.min)
+    bookings = Booking.objects.filter(
+        is_approved=True, room_id__in=list(room_info), starts_at__lt=range_end, ends_at__gt=range_start,
+    ).values_list('room_id', 'starts_at', 'ends_at', 'attendees')
+
+    # (room, day) -> [(start, end, attendees)], each booking clipped to the days it spans
+    spans: Dict[Tuple[int, date], List[Tuple[datetime, datetime, Optional[int]]]] = defaultdict(list)
+    for room_id, starts_at, ends_at, attendees in bookings:
+        day = max(timezone.localtime(starts_at).date(), start_date)
+        last = min(timezone.localtime(ends_at - timedelta(microseconds=1)).date(), end_date)
+        while day <= last:
+            day_start, day_end = _at(day, time.min), _at(day + timedelta(days=1), time.min)
+            spans[(room_id, day)].append((max(starts_at, day_start), min(ends_at, day_end), attendees))
+            day += timedelta(days=1)
+
+    daily: List[RoomUtilizationDaily] = []
+    hourly: Dict[Tuple[date, int, int, str], List[float]] = defaultdict(lambda: [0.0, 0])
+    for day in _days(start_date, end_date):
+        is_open = day.weekday() in weekdays
+        window = (_at(day, opens), _at(day, closes))
+        available = _minutes(*window) if is_open else 0.0
+        for room_id, (building_id, room_type, capacity) in room_info.items():
+            day_spans = spans.get((room_id, day), [])
+            booked = attendee = seats = 0.0
+            if is_open:
+                clipped = [(max(s, window[0]), min(e, window[1]), a) for s, e, a in day_spans]
+                booked = sum(_minutes(s, e) for s, e in _merge([(s, e) for s, e, _ in clipped if e > s]))
+                for s, e, attendees in clipped:
+                    if attendees is not None and e > s:
+                        attendee += attendees * _minutes(s, e)
+                        seats += capacity * _minutes(s, e)
+            daily.append(RoomUtilizationDaily(
+                room_id=room_id, building_id=building_id, room_type=room_type, date=day, capacity=capacity,
+                available_minutes=round(available), booked_minutes=round(booked), booking_count=len(day_spans),
+                attendee_minutes=round(attendee), seat_minutes=round(seats),
+            ))
+            # Peak-hour usage covers the whole day, not just operating hours
+            room_hours: Dict[int, float] = defaultdict(float)
+            for start, end in _merge([(s, e) for s, e, _ in day_spans]):
+                hour_start = timezone.localtime(start).replace(minute=0, second=0, microsecond=0)
+                while hour_start < end:
+                    hour_end = hour_start + timedelta(hours=1)
+                    room_hours[hour_start.hour] += _minutes(max(start, hour_start), min(end, hour_end))
+                    hour_start = hour_end
+            for hour, minutes in room_hours.items():
+                cell = hourly[(day, hour, building_id, room_type)]
+                cell[0] += minutes
+                cell[1] += 1
+
+    hourly_rows = [
+        FacilityHourlyUsage(
+            date=day, hour=hour, building_id=building_id, room_type=room_type,
+            booked_minutes=round(minutes), rooms_in_use=rooms_in_use,
+        )
+        for (day, hour, building_id, room_type), (minutes, rooms_in_use) in hourly.items()
+        if round(minutes)
+    ]
+    return daily, hourly_rows
+
+
+def materialize(start_date: date, end_date: Optional[date] = None) -> int:
+    """Replace the summary rows of [start_date, end_date]; returns daily rows written."""
+    end_date = end_date or start_date
+    daily, hourly = summarize(start_date, end_date)
+    with transaction.atomic():
+        RoomUtilizationDaily.objects.filter(date__range=(start_date, end_date)).delete()
+        FacilityHourlyUsage.objects.filter(date__range=(start_date, end_date)).delete()
+        UtilizationDay.objects.filter(date__range=(start_date, end_date)).delete()
+        RoomUtilizationDaily.objects.bulk_create(daily, batch_size=1000)
+        FacilityHourlyUsage.objects.bulk_create(hourly, batch_size=1000)
+        UtilizationDay.objects.bulk_create([UtilizationDay(date=day) for day in _days(start_date, end_date)], batch_size=1000)
+    return len(daily)
+
+
+def ensure_materialized(start_date: date, end_date: date) -> int:
+    """Materialize the past days in [start_date, end_date] not marked as materialized yet."""
+    end_date = min(end_date, timezone.localdate() - timedelta(days=1))
+    if end_date < start_date:
+        return 0
+    present = set(UtilizationDay.objects.filter(date__range=(start_date, end_date)).values_list('date', flat=True))
+    missing = [day for day in _days(start_date, end_date) if day not in present]
+    written = 0
+    # One pass per contiguous run of missing days
+    run_start = None
+    for index, day in enumerate(missing):
+        if run_start is None:
+            run_start = day
+        if index + 1 == len(missing) or missing[index + 1] != day + timedelta(days=1):
+            written += materialize(run_start, day)
+            run_start = None
+    return written
+
+
+def invalidate_days(days: Iterable[date]) -> None:
+    """Drop summary rows and markers of past ``days`` so the next task run rebuilds them."""
+    today = timezone.localdate()
+    days = {day for day in days if day is not None and day < today}
+    if days:
+        RoomUtilizationDaily.objects.filter(date__in=days).delete()
+        FacilityHourlyUsage.objects.filter(date__in=days).delete()
+        UtilizationDay.objects.filter(date__in=days).delete()
+
+
+def _percent(part, whole) -> float:
+    return round(100.0 * part / whole, 1) if whole else 0.0
+
+
+def _with_ratios(row: dict) -> dict:
+    row = {key: (value or 0) if key in SUM_FIELDS else value for key, value in row.items()}
+    row['utilization'] = _percent(row['booked_minutes'], row['available_minutes'])
+    row['seat_utilization'] = _percent(row['attendee_minutes'], row['seat_minutes'])
+    row['booked_hours'] = round(row['booked_minutes'] / 60, 1)
+    row['available_hours'] = round(row['available_minutes'] / 60, 1)
+    return row
+
+
+@dataclass
+class UtilizationReport:
+    start_date: date
+    end_date: date
+    totals: dict
+    by_building: List[dict] = field(default_factory=list)
+    by_room_type: List[dict] = field(default_factory=list)
+    by_room: List[dict] = field(default_factory=list)
+    heatmap: List[dict] = field(default_factory=list)
+
+    def peak_hours(self, limit: int = 3) -> List[dict]:
+        return sorted(self.heatmap, key=lambda cell: -cell['booked_minutes'])[:limit]
+
+    def as_dict(self) -> dict:
+        return {
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'totals': self.totals,
+            'by_building': self.by_building,
+            'by_room_type': self.by_room_type,
+            'by_room': self.by_room,
+            'heatmap': self.heatmap,
+        }
+
+
+def utilization_report(
+    start_date: date,
+    end_date: date,
+    building_id: Optional[int] = None,
+    room_type: Optional[str] = None,
+    top_rooms: int = 10,
+) -> UtilizationReport:
+    """Utilization over [start_date, end_date] from the summary tables.
+
+    Six aggregate queries regardless of the period length or booking
+    volume. Heatmap cells are keyed by ISO weekday (1 = Monday) and hour;
+    ``occupancy`` is booked minutes over the room-hours on those days.
+    """
+    filters = {'date__range': (start_date, end_date)}
+    if building_id is not None:
+        filters['building_id'] = building_id
+    if room_type:
+        filters['room_type'] = room_type
+    days = RoomUtilizationDaily.objects.filter(**filters)
+    sums = {name: Sum(name) for name in SUM_FIELDS}
+
+    totals = _with_ratios(days.aggregate(**sums))
+    by_building = [
+        _with_ratios(row) for row in
+        days.values('building_id', 'building__code', 'building__name')
+        .annotate(rooms=Count('room_id', distinct=True), **sums).order_by('building__code')
+    ]
+    by_room_type = [
+        _with_ratios(row) for row in
+        days.values('room_type').annotate(rooms=Count('room_id', distinct=True), **sums).order_by('room_type')
+    ]
+    by_room = [
+        _with_ratios(row) for row in
+        days.values('room_id', 'room__code', 'room__name', 'building__code', 'capacity')
+        .annotate(**sums).order_by('-booked_minutes', 'room_id')[:top_rooms]
+    ]
+
+    room_days = dict(
+        days.annotate(weekday=ExtractIsoWeekDay('date')).values('weekday')
+        .annotate(n=Count('id')).values_list('weekday', 'n')
+    )
+    hours = FacilityHourlyUsage.objects.filter(**filters)
+    heatmap = [
+        {
+            'weekday': row['weekday'],
+            'day': calendar.day_abbr[row['weekday'] - 1],
+            'hour': row['hour'],
+            'booked_minutes': row['minutes'],
+            'occupancy': _percent(row['minutes'], 60 * room_days.get(row['weekday'], 0)),
+        }
+        for row in hours.annotate(weekday=ExtractIsoWeekDay('date')).values('weekday', 'hour')
+        .annotate(minutes=Sum('booked_minutes')).order_by('weekday', 'hour')
+    ]
+    return UtilizationReport(start_date, end_date, totals, by_building, by_room_type, by_room, heatmap)
@@ -8,11 +8,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Count, Q
+from django.db.models import Avg, Count, Q, Sum
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.core.exceptions import ValidationError
 import json
 
+from dashboard import snapshots
+
 from .models import Building, Room, Equipment, RoomEquipment, Booking, Maintenance
 from .serializers import (
     BuildingSerializer,
@@ -20,8 +23,12 @@ from .serializers import (
     EquipmentSerializer,
     RoomEquipmentSerializer,
     BookingSerializer,
+    BookingSeriesSerializer,
     MaintenanceSerializer,
 )
+from .booking import BookingConflict, book
+from .availability import get_index
+from .utilization import utilization_report
 
 
 class IsAuthenticatedOrReadOnly(permissions.IsAuthenticatedOrReadOnly):
@@ -69,6 +76,49 @@ class RoomViewSet(viewsets.ModelViewSet):
         data = BookingSerializer(bookings, many=True).data
         return Response({"room": room.id, "busy": data})
 
+    @action(detail=False, methods=["get"], url_path="free")
+    def free(self, request):
+        """Rooms free for the whole [start, end) window, filtered by type/capacity/building/equipment."""
+        if not (request.query_params.get("start") and request.query_params.get("end")):
+            return Response({"detail": "start and end are required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(_free_rooms_payload(request.query_params))
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _free_rooms_payload(params):
+    """Shared by the API action and the dashboard JSON view; raises ValueError on bad input."""
+    start = timezone.datetime.fromisoformat(params["start"])
+    end = timezone.datetime.fromisoformat(params["end"])
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    if end <= start:
+        raise ValueError("end must be after start")
+    index = get_index()
+    if not index.covers(start, end):
+        raise ValueError(f"Window must fall between {index.anchor.isoformat()} and {index.end.isoformat()}")
+    equipment = [int(e) for e in params.get("equipment", "").split(",") if e.strip()]
+    rooms = index.free_rooms(
+        start,
+        end,
+        room_type=params.get("room_type") or None,
+        min_capacity=int(params["min_capacity"]) if params.get("min_capacity") else None,
+        building_id=int(params["building"]) if params.get("building") else None,
+        equipment_ids=equipment,
+    )
+    return {
+        "start": start,
+        "end": end,
+        "count": len(rooms),
+        "rooms": [
+            {"id": r.id, "room": r.label, "room_type": r.room_type, "capacity": r.capacity, "building": r.building_id}
+            for r in rooms
+        ],
+    }
+
 
 class BookingViewSet(viewsets.ModelViewSet):
     queryset = Booking.objects.select_related("room").all()
@@ -82,6 +132,15 @@ class BookingViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=False, methods=["post"], url_path="series")
+    def series(self, request):
+        """Create a weekly recurring booking; ``dry_run`` only reports conflicts."""
+        serializer = BookingSeriesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        series = serializer.save(created_by=request.user)
+        code = status.HTTP_201_CREATED if series.pk else status.HTTP_200_OK
+        return Response(BookingSeriesSerializer(series).data, status=code)
+
     @action(detail=False, methods=["get"], url_path="conflicts")
     def conflicts(self, request):
         room_id = request.query_params.get("room")
@@ -239,24 +298,20 @@ def booking_create(request):
             starts_at = timezone.datetime.fromisoformat(data['starts_at'])
             ends_at = timezone.datetime.fromisoformat(data['ends_at'])
             
-            # Check for conflicts
-            conflicts = Booking.objects.filter(
-                room=room,
-                starts_at__lt=ends_at,
-                ends_at__gt=starts_at
-            ).exists()
-            
-            if conflicts:
+            # Conflict check and insert happen under a room lock
+            try:
+                booking = book(
+                    room,
+                    starts_at,
+                    ends_at,
+                    title=data['title'],
+                    purpose=data.get('purpose', ''),
+                    created_by=request.user
+                )
+            except BookingConflict:
                 return JsonResponse({'error': 'Booking conflicts with existing schedule'}, status=400)
-            
-            booking = Booking.objects.create(
-                room=room,
-                title=data['title'],
-                purpose=data.get('purpose', ''),
-                starts_at=starts_at,
-                ends_at=ends_at,
-                created_by=request.user
-            )
+            except ValidationError as e:
+                return JsonResponse({'error': e.messages[0]}, status=400)
             
             return JsonResponse({'success': True, 'booking_id': booking.id})
             
@@ -302,41 +357,95 @@ def equipment_list(request):
     return render(request, 'facilities/equipment_list.html', {'equipment': equipment})
 
 
+def _utilization_period(params):
+    """(start_date, end_date) from ?start=&end= (ISO dates), default the last 30 full days."""
+    today = timezone.localdate()
+    end = timezone.datetime.fromisoformat(params["end"]).date() if params.get("end") else today - timedelta(days=1)
+    start = timezone.datetime.fromisoformat(params["start"]).date() if params.get("start") else end - timedelta(days=29)
+    if end < start:
+        raise ValueError("end must not be before start")
+    if (end - start).days > 366:
+        raise ValueError("Period may span at most one year")
+    return start, end
+
+
+def _utilization_report(params):
+    # Summaries are written by the materialize_facility_utilization task; reports only read
+    start, end = _utilization_period(params)
+    return utilization_report(
+        start,
+        end,
+        building_id=int(params["building"]) if params.get("building") else None,
+        room_type=params.get("room_type") or None,
+    )
+
+
 @login_required
 def analytics_dashboard(request):
-    """Analytics and reporting dashboard"""
-    # Room utilization statistics
-    total_rooms = Room.objects.count()
-    active_rooms = Room.objects.filter(is_active=True).count()
-    
-    # Booking statistics
-    total_bookings = Booking.objects.count()
-    approved_bookings = Booking.objects.filter(is_approved=True).count()
-    pending_bookings = total_bookings - approved_bookings
-    
+    """Analytics and reporting dashboard (utilization from the daily summary tables)"""
+    try:
+        report = _utilization_report(request.GET)
+    except ValueError as e:
+        messages.error(request, str(e))
+        report = _utilization_report({})
+
+    # Counts are materialized (facilities/stats.py)
+    stats = snapshots.values('facilities')
+    room_counts, booking_counts, maintenance_counts = stats['rooms'], stats['bookings'], stats['maintenance']
+
     # Room type distribution
-    room_type_stats = Room.objects.values('room_type').annotate(count=Count('id'))
-    
+    room_type_stats = [{'room_type': t, 'count': n} for t, n in room_counts['by_type'].items()]
+
     # Building capacity distribution
+    active = Q(rooms__is_active=True)
     building_stats = Building.objects.annotate(
-        total_capacity=Count('rooms', filter=Q(rooms__is_active=True)),
-        avg_capacity=Count('rooms', filter=Q(rooms__is_active=True))
-    )
-    
+        room_count=Count('rooms', filter=active),
+        total_capacity=Sum('rooms__capacity', filter=active),
+        avg_capacity=Avg('rooms__capacity', filter=active),
+    ).order_by('code')
+    usage = {row['building_id']: row for row in report.by_building}
+    buildings = [
+        {
+            'id': b.id,
+            'code': b.code,
+            'name': b.name,
+            'rooms': b.room_count,
+            'total_capacity': b.total_capacity or 0,
+            'avg_capacity': b.avg_capacity or 0,
+            'utilization': usage.get(b.id, {}).get('utilization', 0),
+            'seat_utilization': usage.get(b.id, {}).get('seat_utilization', 0),
+            'bookings': usage.get(b.id, {}).get('booking_count', 0),
+        }
+        for b in building_stats
+    ]
+
     # Recent activity
     recent_bookings = Booking.objects.select_related('room', 'created_by').order_by('-created_at')[:10]
-    
+
+    totals = report.totals
     context = {
-        'total_rooms': total_rooms,
-        'active_rooms': active_rooms,
-        'total_bookings': total_bookings,
-        'approved_bookings': approved_bookings,
-        'pending_bookings': pending_bookings,
+        'total_rooms': room_counts['total'],
+        'active_rooms': room_counts['active'],
+        'total_bookings': booking_counts['total'],
+        'approved_bookings': booking_counts['approved'],
+        'pending_bookings': booking_counts['total'] - booking_counts['approved'],
         'room_type_stats': room_type_stats,
         'building_stats': building_stats,
+        'buildings': buildings,
         'recent_bookings': recent_bookings,
+        'report': report,
+        'period_start': report.start_date,
+        'period_end': report.end_date,
+        'room_utilization': totals['utilization'],
+        'seat_utilization': totals['seat_utilization'],
+        'avg_booking_duration': totals['booked_minutes'] / totals['booking_count'] / 60 if totals['booking_count'] else 0,
+        'maintenance_completion_rate': (
+            100.0 * maintenance_counts['completed'] / maintenance_counts['total'] if maintenance_counts['total'] else 0
+        ),
+        'room_type_usage': report.by_room_type,
+        'peak_hours': report.peak_hours(),
     }
-    
+
     return render(request, 'facilities/analytics.html', context)
 
 
@@ -373,3 +482,34 @@ def api_room_availability(request, room_id):
         return JsonResponse(events, safe=False)
     
     return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@login_required
+def api_free_rooms(request):
+    """Search free rooms across the campus (free/busy bitmap index)"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    if not (request.GET.get('start') and request.GET.get('end')):
+        return JsonResponse({'error': 'start and end are required'}, status=400)
+    try:
+        payload = _free_rooms_payload(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    payload['start'] = payload['start'].isoformat()
+    payload['end'] = payload['end'].isoformat()
+    return JsonResponse(payload)
+
+
+@login_required
+def api_utilization(request):
+    """Utilization by building, room type and room plus a peak-hour heatmap"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        report = _utilization_report(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    payload = report.as_dict()
+    payload['start_date'] = report.start_date.isoformat()
+    payload['end_date'] = report.end_date.isoformat()
+    return JsonResponse(payload)
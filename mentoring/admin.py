@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Mentorship, Project, Meeting, Feedback, ActionItem
+from .models import Mentorship, Project, Meeting, Feedback, ActionItem, MentorshipRiskSnapshot
 
 
 class ProjectInline(admin.TabularInline):
@@ -69,3 +69,12 @@ class ActionItemAdmin(admin.ModelAdmin):
     search_fields = (
         'title', 'description', 'mentorship__mentor__name', 'mentorship__student__first_name', 'mentorship__student__last_name'
     )
+
+
+@admin.register(MentorshipRiskSnapshot)
+class MentorshipRiskSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('mentorship', 'student', 'scored_on', 'risk_score')
+    list_filter = ('scored_on',)
+    search_fields = ('student__first_name', 'student__last_name', 'student__roll_number', 'mentorship__mentor__name')
+    date_hierarchy = 'scored_on'
+    raw_id_fields = ('mentorship', 'student')
@@ -0,0 +1,224 @@
+"""Capacity-aware mentor assignment.
+
+The cohort, the eligible mentors, every mentor's current active load and
+the active mentorships already touching the cohort's batches are loaded
+with four queries. Assignment then runs in memory:
+
+* a student is only given a mentor from their batch's department (unless
+  ``match_department`` is off) who is below ``max_mentees``;
+* each department's pool is levelled towards a target load, the smallest
+  load every mentor of the pool can share once the new students are added;
+* a section (``StudentBatch``) is handed out in contiguous runs, first to
+  mentors who already mentor that section, then to the mentor with the most
+  room under the target, so a section ends up split across as few mentors
+  as balance allows.
+
+This is a greedy fill rather than an optimal solver; it is deterministic
+and linear in the cohort size. New mentorships are written with one
+``bulk_create``; ``dry_run`` returns the same report without writing.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from faculty.models import Faculty
+from students.models import Student
+
+from .models import Mentorship
+
+
+NO_MENTOR_IN_DEPARTMENT = "no_mentor_in_department"
+MENTORS_FULL = "mentors_at_capacity"
+
+
+@dataclass
+class MentorSlot:
+    id: object
+    name: str
+    department_id: object
+    before: int
+    load: int = 0
+    sections: set = field(default_factory=set)
+
+    def __post_init__(self):
+        self.load = self.before
+
+
+@dataclass
+class AssignmentPlan:
+    max_mentees: int
+    mentors: Dict[object, MentorSlot] = field(default_factory=dict)
+    assignments: List[Tuple[object, object]] = field(default_factory=list)  # (student id, mentor id)
+    unassigned: List[Tuple[object, str]] = field(default_factory=list)      # (student id, reason)
+    already_mentored: int = 0
+    created: int = 0
+
+    def distribution(self) -> List[dict]:
+        return [
+            {
+                "mentor_id": str(m.id),
+                "mentor": m.name,
+                "department_id": str(m.department_id) if m.department_id else None,
+                "before": m.before,
+                "after": m.load,
+                "sections": len(m.sections),
+            }
+            for m in sorted(self.mentors.values(), key=lambda m: (str(m.department_id), m.name, str(m.id)))
+        ]
+
+    def stats(self) -> dict:
+        loads = [m.load for m in self.mentors.values()]
+        if not loads:
+            return {"mentors": 0}
+        mean = sum(loads) / len(loads)
+        return {
+            "mentors": len(loads),
+            "min": min(loads),
+            "max": max(loads),
+            "mean": round(mean, 2),
+            "stddev": round(math.sqrt(sum((x - mean) ** 2 for x in loads) / len(loads)), 2),
+        }
+
+    def as_dict(self, dry_run: bool) -> dict:
+        return {
+            "dry_run": dry_run,
+            "assigned": self.created if not dry_run else len(self.assignments),
+            "already_mentored": self.already_mentored,
+            "unassigned": [{"student_id": str(s), "reason": r} for s, r in self.unassigned],
+            "max_mentees_per_mentor": self.max_mentees,
+            "load_stats": self.stats(),
+            "distribution": self.distribution(),
+        }
+
+
+def _cohort(department_id=None, academic_year=None, grade_level=None, section=None):
+    students = Student.objects.filter(status="ACTIVE", student_batch__isnull=False)
+    if department_id:
+        students = students.filter(student_batch__department_id=department_id)
+    if academic_year:
+        students = students.filter(student_batch__academic_year__year=academic_year)
+    if grade_level:
+        students = students.filter(student_batch__year_of_study=grade_level)
+    if section:
+        students = students.filter(student_batch__section=section)
+    return students
+
+
+def plan_assignments(
+    department_id=None,
+    academic_year: Optional[str] = None,
+    grade_level: Optional[str] = None,
+    section: Optional[str] = None,
+    max_mentees: int = 25,
+    match_department: bool = True,
+) -> Tuple[AssignmentPlan, Dict[object, tuple]]:
+    """Compute the assignment; returns the plan and the cohort's batch context per student."""
+    plan = AssignmentPlan(max_mentees)
+    students = list(
+        _cohort(department_id, academic_year, grade_level, section)
+        .order_by("student_batch_id", "last_name", "first_name", "pk")
+        .values_list(
+            "pk", "student_batch_id", "student_batch__department_id", "student_batch__academic_year__year",
+            "student_batch__year_of_study", "student_batch__section",
+        )
+    )
+    context = {pk: rest for pk, *rest in students}
+
+    mentors = Faculty.objects.filter(status="ACTIVE", currently_associated=True, is_mentor=True)
+    if department_id:
+        mentors = mentors.filter(department_ref_id=department_id)
+    for pk, name, dept in mentors.order_by("name", "pk").values_list("pk", "name", "department_ref_id"):
+        plan.mentors[pk] = MentorSlot(pk, name, dept, 0)
+    loads = (
+        Mentorship.objects.filter(is_active=True, mentor_id__in=list(plan.mentors))
+        .values_list("mentor_id").annotate(n=Count("id"))
+    )
+    for mentor_id, n in loads:
+        plan.mentors[mentor_id].before = plan.mentors[mentor_id].load = n
+
+    # Active mentorships in the cohort's sections: who is mentored, and by whom per section
+    batch_ids = {batch_id for batch_id, *_ in context.values()}
+    mentored = set()
+    for student_id, mentor_id, batch_id in Mentorship.objects.filter(
+        is_active=True, student__student_batch_id__in=batch_ids,
+    ).order_by().values_list("student_id", "mentor_id", "student__student_batch_id"):
+        mentored.add(student_id)
+        if mentor_id in plan.mentors:
+            plan.mentors[mentor_id].sections.add(batch_id)
+
+    sections: Dict[object, List[object]] = defaultdict(list)
+    for pk, (batch_id, *_rest) in context.items():
+        if pk in mentored:
+            plan.already_mentored += 1
+        else:
+            sections[batch_id].append(pk)
+
+    pools: Dict[object, List[MentorSlot]] = defaultdict(list)
+    for mentor in plan.mentors.values():
+        pools[mentor.department_id if match_department else None].append(mentor)
+    demand: Dict[object, int] = defaultdict(int)
+    for batch_id, members in sections.items():
+        demand[context[members[0]][1] if match_department else None] += len(members)
+    targets = {
+        dept: min(max_mentees, math.ceil((sum(m.load for m in pool) + demand[dept]) / len(pool)))
+        for dept, pool in pools.items()
+    }
+
+    # Largest sections first, so they get the widest choice of mentors
+    for batch_id, members in sorted(sections.items(), key=lambda item: (-len(item[1]), str(item[0]))):
+        dept = context[members[0]][1] if match_department else None
+        pool = pools.get(dept, [])
+        if not pool:
+            plan.unassigned.extend((pk, NO_MENTOR_IN_DEPARTMENT) for pk in members)
+            continue
+        queue = list(members)
+        for limit in (targets[dept], max_mentees):
+            while queue:
+                open_mentors = [m for m in pool if m.load < limit]
+                if not open_mentors:
+                    break
+                mentor = max(open_mentors, key=lambda m: (batch_id in m.sections, limit - m.load, str(m.id)))
+                take = min(limit - mentor.load, len(queue))
+                for pk in queue[:take]:
+                    plan.assignments.append((pk, mentor.id))
+                mentor.load += take
+                mentor.sections.add(batch_id)
+                queue = queue[take:]
+        plan.unassigned.extend((pk, MENTORS_FULL) for pk in queue)
+    return plan, context
+
+
+def assign_mentors(
+    department_id=None,
+    academic_year: Optional[str] = None,
+    grade_level: Optional[str] = None,
+    section: Optional[str] = None,
+    max_mentees: int = 25,
+    start_date: Optional[date] = None,
+    match_department: bool = True,
+    dry_run: bool = False,
+    objective: str = "Auto-assigned mentorship",
+) -> AssignmentPlan:
+    with transaction.atomic():
+        plan, context = plan_assignments(department_id, academic_year, grade_level, section, max_mentees, match_department)
+        if dry_run or not plan.assignments:
+            return plan
+        start_date = start_date or timezone.localdate()
+        rows = []
+        for student_id, mentor_id in plan.assignments:
+            _, dept, year, grade, sec = context[student_id]
+            rows.append(Mentorship(
+                mentor_id=mentor_id, student_id=student_id, start_date=start_date, is_active=True,
+                objective=objective, department_ref_id=dept, academic_year=year, grade_level=grade, section=sec,
+            ))
+        plan.created = len(Mentorship.objects.bulk_create(rows, batch_size=1000))
+    return plan
@@ -0,0 +1,146 @@
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from academics.models import Course, CourseSection
+from assignments.models import Assignment, AssignmentSubmission
+from attendance.models import AttendanceRecord, AttendanceSession
+from departments.models import Department
+from faculty.models import Faculty
+from fees.models import FeeCategory, FeeStructure, FeeStructureDetail, StudentFee
+from mentoring.models import Mentorship
+from mentoring.risk import score, score_mentorships
+from students.models import AcademicYear, Student, StudentBatch
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_score(m):
+    """The per-mentee counts compute_risk ran before mentoring.risk (with the current field names)."""
+    factors = {}
+    total = AttendanceRecord.objects.filter(student=m.student_id).count()
+    absents = AttendanceRecord.objects.filter(student=m.student_id, mark='absent').count()
+    if total:
+        factors['attendance_absence_ratio'] = round(absents / total, 3)
+    factors['fees_overdue_count'] = StudentFee.objects.filter(student=m.student_id, status='OVERDUE').count()
+    factors['fees_pending_count'] = StudentFee.objects.filter(student=m.student_id, status__in=['PENDING', 'PARTIAL']).count()
+    factors['assignments_late'] = AssignmentSubmission.objects.filter(student=m.student_id, is_late=True).count()
+    factors['assignments_missing'] = 0
+    m.risk_score, m.risk_factors, m.last_risk_evaluated_at = score(factors), factors, timezone.now()
+    m.save(update_fields=['risk_score', 'risk_factors', 'last_risk_evaluated_at'])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark mentee risk scoring (per-mentorship counts vs grouped batch pipeline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20000, help='Active mentorships to score (rolled back)')
+        parser.add_argument('--sessions', type=int, default=10, help='Attendance sessions per student')
+        parser.add_argument('--legacy-sample', type=int, default=500, help='Mentorships timed with the old loop')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['students'], options['sessions'], options['legacy_sample'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _timed(self, label, fn, scale=1):
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+            t0 = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - t0
+        note = f'  (x{scale:.0f} extrapolated: {elapsed * scale:.1f} s, {len(queries) * scale:.0f} queries)' if scale > 1 else ''
+        self.stdout.write(f'{label:22s} {elapsed * 1000:9.1f} ms  {len(queries):6d} queries{note}')
+
+    def _run(self, n, sessions, sample):
+        t0 = time.perf_counter()
+        students = self._seed(n, sessions)
+        self.stdout.write(f'seeded {n} students / mentorships in {time.perf_counter() - t0:.1f} s')
+
+        sample_rows = list(Mentorship.objects.filter(student__in=students[:sample]))
+        self._timed(f'per-mentorship ({len(sample_rows)})', lambda: [_legacy_score(m) for m in sample_rows],
+                    scale=n / max(len(sample_rows), 1))
+        self._timed(f'batch ({n})', lambda: score_mentorships())
+
+    def _seed(self, n, sessions):
+        department = Department.objects.create(
+            name='Bench Risk', short_name='BR', code='BR', email='br@example.com', phone='+911234567890',
+            building='B', established_date=date(2000, 1, 1), description='benchmark',
+        )
+        year = AcademicYear.objects.create(year='2090-2091', start_date=date(2090, 6, 1), end_date=date(2091, 5, 31))
+        batch = StudentBatch.objects.create(
+            department=department, academic_year=year, year_of_study='1', section='A',
+            batch_name='BR-1-A', batch_code='BENCH-BR-1-A',
+        )
+        mentors = Faculty.objects.bulk_create([
+            Faculty(
+                name=f'Mentor {i}', email=f'br-mentor{i}@example.com', employee_id=f'BR-M{i}',
+                apaar_faculty_id=f'BR-APAAR-{i}', department_ref=department, is_mentor=True,
+            )
+            for i in range(max(n // 25, 1))
+        ])
+        students = Student.objects.bulk_create([
+            Student(
+                roll_number=f'BR{i:06d}', first_name='Bench', last_name=str(i), date_of_birth=date(2005, 1, 1),
+                gender='M', student_batch=batch, status='ACTIVE',
+            )
+            for i in range(n)
+        ], batch_size=1000)
+        Mentorship.objects.bulk_create([
+            Mentorship(mentor=mentors[i % len(mentors)], student=s, start_date=date(2090, 6, 1), department_ref=department)
+            for i, s in enumerate(students)
+        ], batch_size=1000)
+
+        course = Course.objects.create(code='BR101', title='Bench', description='benchmark')
+        section = CourseSection.objects.create(course=course, student_batch=batch, faculty=mentors[0])
+        start = timezone.make_aware(datetime(2090, 7, 1, 9))
+        session_rows = AttendanceSession.objects.bulk_create([
+            AttendanceSession(
+                course_section=section, faculty=mentors[0], scheduled_date=(start + timedelta(days=d)).date(),
+                start_datetime=start + timedelta(days=d), end_datetime=start + timedelta(days=d, hours=1),
+            )
+            for d in range(sessions)
+        ])
+        AttendanceRecord.objects.bulk_create((
+            AttendanceRecord(session=session, student=s, mark='absent' if (i + d) % 7 == 0 else 'present')
+            for d, session in enumerate(session_rows) for i, s in enumerate(students)
+        ), batch_size=2000)
+
+        structure = FeeStructure.objects.create(name='Bench', academic_year='2090-2091', grade_level='1')
+        detail = FeeStructureDetail.objects.create(
+            fee_structure=structure, fee_category=FeeCategory.objects.create(name='Bench tuition'),
+            amount=1000, frequency='ANNUAL',
+        )
+        StudentFee.objects.bulk_create([
+            StudentFee(
+                student=s, fee_structure_detail=detail, academic_year='2090-2091', due_date=date(2090, 8, 1),
+                amount_due=1000, status='OVERDUE' if i % 3 == 0 else 'PENDING' if i % 5 == 0 else 'PAID',
+            )
+            for i, s in enumerate(students)
+        ], batch_size=1000)
+
+        due = timezone.now() - timedelta(days=1)
+        assignments = [
+            Assignment.objects.create(
+                title=f'Bench {k}', description='benchmark', faculty=mentors[0], max_marks=10, due_date=due,
+                status='PUBLISHED',
+            )
+            for k in range(3)
+        ]
+        Through = Assignment.assigned_to_students.through
+        Through.objects.bulk_create(
+            (Through(assignment=a, student=s) for a in assignments for s in students), batch_size=2000,
+        )
+        AssignmentSubmission.objects.bulk_create((
+            AssignmentSubmission(assignment=a, student=s, is_late=(i % 4 == 0))
+            for k, a in enumerate(assignments[:2]) for i, s in enumerate(students) if (i + k) % 6
+        ), batch_size=2000)
+        return students
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mentoring.models import Mentorship
+from mentoring.risk import score_mentorships
+
+
+class Command(BaseCommand):
+    help = 'Score every active mentorship and record the day\'s risk snapshot (re-runs overwrite the day)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', help='Only mentorships of this department id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        mentorships = Mentorship.objects.filter(is_active=True)
+        if options['department']:
+            mentorships = mentorships.filter(department_ref_id=options['department'])
+        t0 = time.perf_counter()
+        run = score_mentorships(mentorships, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(f'{run.scored} mentorships scored in {elapsed:.2f}s'))
+        for name, count in run.as_dict()['risk_distribution'].items():
+            self.stdout.write(f'  {name:16s} {count}')
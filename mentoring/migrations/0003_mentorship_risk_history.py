@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentoring', '0002_mentorship_last_risk_evaluated_at_and_more'),
+        ('students', '0020_merge_0002_initial_0019_add_missing_fields_to_caste'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorshipRiskSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scored_on', models.DateField()),
+                ('risk_score', models.PositiveSmallIntegerField(default=0)),
+                ('risk_factors', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('mentorship', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_history', to='mentoring.mentorship')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_history', to='students.student')),
+            ],
+            options={
+                'ordering': ['scored_on'],
+                'indexes': [
+                    models.Index(fields=['student', 'scored_on'], name='mentoring_m_student_1ce9bb_idx'),
+                    models.Index(fields=['scored_on', 'risk_score'], name='mentoring_m_scored__342caf_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('mentorship', 'scored_on'), name='uniq_risk_snapshot_per_day'),
+                ],
+            },
+        ),
+    ]
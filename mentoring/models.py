@@ -98,3 +98,23 @@ class ActionItem(TimeStampedUUIDModel):
     class Meta:
         ordering = ['status', 'due_date', '-created_at']
 
+
+
+class MentorshipRiskSnapshot(models.Model):
+    """One row per mentorship per scoring day, kept for risk trend charts."""
+    mentorship = models.ForeignKey(Mentorship, on_delete=models.CASCADE, related_name='risk_history')
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE, related_name='risk_history')
+    scored_on = models.DateField()
+    risk_score = models.PositiveSmallIntegerField(default=0)
+    risk_factors = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['scored_on']
+        constraints = [
+            models.UniqueConstraint(fields=['mentorship', 'scored_on'], name='uniq_risk_snapshot_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'scored_on']),
+            models.Index(fields=['scored_on', 'risk_score']),
+        ]
@@ -0,0 +1,17 @@
+"""Celery tasks for the mentoring app."""
+
+import logging
+
+from celery import shared_task
+
+from .risk import score_mentorships
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def score_mentee_risk():
+    """Nightly: re-score every active mentorship and record the day's risk snapshot."""
+    run = score_mentorships()
+    logger.info("Scored %s mentorships: %s", run.scored, run.as_dict()['risk_distribution'])
+    return run.as_dict()
@@ -1,3 +1,5 @@
+from datetime import date, timedelta
+
 from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
@@ -6,8 +8,14 @@ from rest_framework import status
 from accounts.models import User
 from departments.models import Department
 from faculty.models import Faculty
-from students.models import Student
-from mentoring.models import Mentorship, ActionItem
+from students.models import AcademicYear, Student, StudentBatch
+from mentoring.assignment import plan_assignments
+from mentoring.models import Mentorship, ActionItem, MentorshipRiskSnapshot
+from mentoring.risk import score_mentorships
+from academics.models import Course, CourseSection
+from assignments.models import Assignment, AssignmentSubmission
+from attendance.models import AttendanceRecord, AttendanceSession
+from fees.models import FeeCategory, FeeStructure, FeeStructureDetail, StudentFee
 
 
 class MentoringApiTests(APITestCase):
@@ -18,7 +26,10 @@ class MentoringApiTests(APITestCase):
         self.client.force_authenticate(user=self.admin)
 
         # Department
-        self.department = Department.objects.create(name='Computer Science', code='CSE')
+        self.department = Department.objects.create(
+            name='Computer Science', short_name='CSE', code='CSE', email='cse@example.com', phone='+911234567890',
+            building='Main', established_date=timezone.now().date(), description='CSE',
+        )
 
         # Faculty mentor
         self.mentor = Faculty.objects.create(
@@ -91,7 +102,7 @@ class MentoringApiTests(APITestCase):
 
         list_resp = self.client.get(url)
         self.assertEqual(list_resp.status_code, status.HTTP_200_OK)
-        self.assertTrue(any(ai['id'] == action_id for ai in list_resp.data))
+        self.assertTrue(any(ai['id'] == action_id for ai in list_resp.data['results']))
 
     def test_compute_risk_and_analytics(self):
         # Create mentorship
@@ -116,3 +127,189 @@ class MentoringApiTests(APITestCase):
         self.assertIn('total', aresp.data)
 
 
+
+class AutoAssignTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin+assign@example.com', password='AdminPass123!', username='admin_assign', is_staff=True, is_superuser=True)
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('mentoring:mentorship-auto-assign')
+        self.year = AcademicYear.objects.create(year='2024-2025', start_date=date(2024, 6, 1), end_date=date(2025, 5, 31))
+        self.cse = self._department('CSE')
+        self.ece = self._department('ECE')
+
+    def _department(self, code):
+        return Department.objects.create(
+            name=code, short_name=code, code=code, email=f'{code.lower()}@example.com', phone='+911234567890',
+            building='Main', established_date=date(2000, 1, 1), description=code,
+        )
+
+    def _mentor(self, name, department):
+        return Faculty.objects.create(
+            name=name, apaar_faculty_id=f'APAAR-{name}', employee_id=f'EMP-{name}', email=f'{name.lower()}@example.com',
+            department_ref=department, is_mentor=True, currently_associated=True, status='ACTIVE',
+        )
+
+    def _section(self, department, section, size):
+        batch = StudentBatch.objects.create(
+            department=department, academic_year=self.year, year_of_study='1', section=section,
+            batch_name=f'{department.code}-1-{section}', batch_code=f'{department.code}-1-{section}',
+        )
+        Student.objects.bulk_create([
+            Student(
+                roll_number=f'{department.code}{section}{i:03d}', first_name='S', last_name=f'{section}{i:03d}',
+                date_of_birth=date(2005, 1, 1), gender='M', student_batch=batch, status='ACTIVE',
+            )
+            for i in range(size)
+        ])
+        return batch
+
+    def test_dry_run_reports_balanced_distribution_without_writing(self):
+        a, b = self._mentor('Alpha', self.cse), self._mentor('Beta', self.cse)
+        self._section(self.cse, 'A', 6)
+        self._section(self.cse, 'B', 4)
+        existing = Student.objects.filter(student_batch__section='B').first()
+        Mentorship.objects.create(mentor=a, student=existing, start_date=date(2024, 6, 1), is_active=True)
+
+        resp = self.client.post(self.url, {'department_id': str(self.cse.id), 'dry_run': True}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, resp.data)
+        self.assertEqual((resp.data['assigned'], resp.data['already_mentored']), (9, 1))
+        loads = {row['mentor']: (row['before'], row['after']) for row in resp.data['distribution']}
+        self.assertEqual(loads, {'Alpha': (1, 5), 'Beta': (0, 5)})
+        self.assertEqual(resp.data['load_stats']['stddev'], 0)
+        self.assertEqual(Mentorship.objects.count(), 1)
+
+        resp = self.client.post(self.url, {'department_id': str(self.cse.id)}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, resp.data)
+        self.assertEqual(Mentorship.objects.filter(mentor=b).count(), 5)
+        # Alpha already mentors section B, so the rest of B stays with Alpha
+        b_mentors = set(Mentorship.objects.filter(student__student_batch__section='B').values_list('mentor_id', flat=True))
+        self.assertEqual(b_mentors, {a.id})
+        row = Mentorship.objects.filter(mentor=b).first()
+        self.assertEqual((row.department_ref_id, row.academic_year, row.grade_level), (self.cse.id, '2024-2025', '1'))
+
+    def test_department_match_and_capacity(self):
+        self._mentor('Alpha', self.cse)
+        self._section(self.cse, 'A', 5)
+        self._section(self.ece, 'A', 2)
+
+        resp = self.client.post(self.url, {'max_mentees_per_mentor': 3}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, resp.data)
+        self.assertEqual(resp.data['assigned'], 3)
+        reasons = [row['reason'] for row in resp.data['unassigned']]
+        self.assertEqual(sorted(reasons), ['mentors_at_capacity'] * 2 + ['no_mentor_in_department'] * 2)
+        self.assertFalse(Mentorship.objects.filter(student__student_batch__department=self.ece).exists())
+
+        resp = self.client.post(self.url, {'max_mentees_per_mentor': 10, 'match_department': False}, format='json')
+        self.assertEqual(resp.data['assigned'], 4)
+        self.assertEqual(Mentorship.objects.count(), 7)
+
+    def test_query_count_does_not_grow_with_cohort(self):
+        for i in range(3):
+            self._mentor(f'M{i}', self.cse)
+        self._section(self.cse, 'A', 40)
+        self._section(self.cse, 'B', 40)
+        with self.assertNumQueries(4):
+            plan, _ = plan_assignments(department_id=self.cse.id, max_mentees=30)
+        self.assertEqual(len(plan.assignments), 80)
+
+
+class RiskScoringTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin+risk@example.com', password='AdminPass123!', username='admin_risk', is_staff=True, is_superuser=True)
+        self.client.force_authenticate(user=self.admin)
+        self.department = Department.objects.create(
+            name='Computer Science', short_name='CSE', code='CSE', email='cse@example.com', phone='+911234567890',
+            building='Main', established_date=date(2000, 1, 1), description='CSE',
+        )
+        self.mentor = Faculty.objects.create(
+            name='Dr. Risk', apaar_faculty_id='APAAR-R-0001', employee_id='EMP-R-0001', email='risk@example.com',
+            department_ref=self.department, is_mentor=True, currently_associated=True, status='ACTIVE',
+        )
+        self.students = Student.objects.bulk_create([
+            Student(roll_number=f'21CSE{i:03d}', first_name='S', last_name=str(i), date_of_birth=date(2005, 1, 1), gender='M')
+            for i in range(3)
+        ])
+        self.mentorships = [
+            Mentorship.objects.create(mentor=self.mentor, student=s, start_date=date(2024, 6, 1), is_active=True)
+            for s in self.students
+        ]
+
+    def _factors_for_first_student(self):
+        student = self.students[0]
+        batch = StudentBatch.objects.create(
+            department=self.department, year_of_study='1', section='A', batch_name='CSE-1-A', batch_code='CSE-1-A',
+            academic_year=AcademicYear.objects.create(year='2024-2025', start_date=date(2024, 6, 1), end_date=date(2025, 5, 31)),
+        )
+        section = CourseSection.objects.create(
+            course=Course.objects.create(code='CS101', title='Intro', description='d'), student_batch=batch, faculty=self.mentor,
+        )
+        start = timezone.now() - timedelta(days=10)
+        for d, mark in enumerate(['absent', 'present', 'present', 'absent']):
+            session = AttendanceSession.objects.create(
+                course_section=section, faculty=self.mentor, scheduled_date=(start + timedelta(days=d)).date(),
+                start_datetime=start + timedelta(days=d), end_datetime=start + timedelta(days=d, hours=1),
+            )
+            AttendanceRecord.objects.create(session=session, student=student, mark=mark)
+        structure = FeeStructure.objects.create(name='F', academic_year='2024-2025', grade_level='1')
+        for fee_status in ('OVERDUE', 'PENDING', 'PAID'):
+            detail = FeeStructureDetail.objects.create(
+                fee_structure=structure, fee_category=FeeCategory.objects.create(name=fee_status), amount=100, frequency='ANNUAL',
+            )
+            StudentFee.objects.create(
+                student=student, fee_structure_detail=detail, academic_year='2024-2025',
+                due_date=date(2024, 8, 1), amount_due=100, status=fee_status,
+            )
+        done, missed = [
+            Assignment.objects.create(
+                title=title, description='d', faculty=self.mentor, max_marks=10, status='PUBLISHED',
+                due_date=timezone.now() - timedelta(days=1),
+            )
+            for title in ('Done', 'Missed')
+        ]
+        for a in (done, missed):
+            a.assigned_to_students.add(student)
+        AssignmentSubmission.objects.create(assignment=done, student=student, is_late=True)
+        return student
+
+    def test_batch_scoring_updates_mentorships_and_history(self):
+        self._factors_for_first_student()
+        run = score_mentorships()
+        self.assertEqual(run.scored, 3)
+        self.assertEqual(run.as_dict()['risk_distribution'], {'low_0_25': 2, 'mid_26_50': 1, 'high_51_75': 0, 'critical_76_100': 0})
+
+        m = Mentorship.objects.get(pk=self.mentorships[0].pk)
+        self.assertEqual(m.risk_factors, {
+            'attendance_absence_ratio': 0.5, 'fees_overdue_count': 1, 'fees_pending_count': 1,
+            'assignments_late': 1, 'assignments_missing': 1,
+        })
+        # 50 * 0.5 + 13 * 0.3 + 15 * 0.2
+        self.assertEqual(m.risk_score, 25 + 3 + 3)
+        self.assertIsNotNone(m.last_risk_evaluated_at)
+        self.assertEqual(Mentorship.objects.get(pk=self.mentorships[1].pk).risk_score, 0)
+
+        score_mentorships()
+        score_mentorships(scored_on=timezone.localdate() - timedelta(days=1))
+        self.assertEqual(MentorshipRiskSnapshot.objects.filter(mentorship=m).count(), 2)
+
+        resp = self.client.get(reverse('mentoring:mentorship-risk-history', args=[m.id]))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['risk_score'] for row in resp.data['history']], [31, 31])
+        resp = self.client.get(reverse('mentoring:mentorship-risk-history', args=[m.id]), {'since': 'bad'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_single_and_scoped_scoring_endpoints(self):
+        self._factors_for_first_student()
+        resp = self.client.post(reverse('mentoring:mentorship-compute-risk', args=[self.mentorships[0].id]), {}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, resp.data)
+        self.assertEqual(resp.data['risk_score'], 31)
+        self.assertEqual(MentorshipRiskSnapshot.objects.count(), 1)
+
+        resp = self.client.post(reverse('mentoring:mentorship-score-risk'), {}, format='json')
+        self.assertEqual(resp.data['scored'], 3)
+
+    def test_query_count_does_not_grow_with_mentorships(self):
+        one = Mentorship.objects.filter(pk=self.mentorships[0].pk)
+        with self.assertNumQueries(9):
+            score_mentorships(one)
+        with self.assertNumQueries(9):
+            score_mentorships()
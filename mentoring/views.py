@@ -7,11 +7,11 @@ from .serializers import (
     FeedbackSerializer,
     ActionItemSerializer,
 )
-from django.db import transaction
+from datetime import date
 from django.utils import timezone
-from students.models import Student
-from faculty.models import Faculty
 from departments.models import Department
+from .assignment import assign_mentors
+from .risk import score_mentorships
 from django.db.models import Count, Avg
 
 
@@ -49,119 +49,60 @@ class MentorshipViewSet(viewsets.ModelViewSet):
 
     @decorators.action(detail=False, methods=['post'], url_path='auto-assign', permission_classes=[permissions.IsAdminUser])
     def auto_assign(self, request):
-        """Bulk auto-assign mentors to students by department/year/section with simple round-robin."""
-        department_id = request.data.get('department_id')
-        academic_year = request.data.get('academic_year')
-        grade_level = request.data.get('grade_level')
-        section = request.data.get('section')
-        start_date = request.data.get('start_date') or timezone.now().date()
+        """Assign mentors to unmentored students by department/year/section, balancing mentor loads.
 
-        try:
-            department = Department.objects.get(id=department_id) if department_id else None
-        except Department.DoesNotExist:
+        Pass ``dry_run: true`` to get the resulting load distribution without writing.
+        """
+        department_id = request.data.get('department_id')
+        if department_id and not Department.objects.filter(id=department_id).exists():
             return response.Response({'detail': 'Invalid department_id'}, status=status.HTTP_400_BAD_REQUEST)
-
-        students_qs = Student.objects.all()
-        if grade_level:
-            students_qs = students_qs.filter(grade_level=grade_level)
-        if section:
-            students_qs = students_qs.filter(section=section)
-        if academic_year:
-            students_qs = students_qs.filter(academic_year=academic_year)
-
-        mentors_qs = Faculty.objects.filter(status='ACTIVE', currently_associated=True, is_mentor=True)
-        if department:
-            mentors_qs = mentors_qs.filter(department_ref=department)
-
-        students = list(students_qs.order_by('last_name', 'first_name'))
-        mentors = list(mentors_qs.order_by('name'))
-
-        if not students or not mentors:
-            return response.Response({'assigned': 0, 'detail': 'No students or mentors found'}, status=status.HTTP_200_OK)
-
-        created = 0
-        max_mentees = int(request.data.get('max_mentees_per_mentor', 25))
-        with transaction.atomic():
-            mentor_idx = 0
-            # Track current load per mentor
-            mentor_load = {m.id: Mentorship.objects.filter(mentor=m, is_active=True).count() for m in mentors}
-            for student in students:
-                # Skip if active mentorship already exists for same context
-                exists = Mentorship.objects.filter(student=student, is_active=True).exists()
-                if exists:
-                    continue
-                # pick next mentor with capacity
-                attempts = 0
-                mentor = None
-                while attempts < len(mentors):
-                    candidate = mentors[mentor_idx]
-                    mentor_idx = (mentor_idx + 1) % len(mentors)
-                    if mentor_load.get(candidate.id, 0) < max_mentees:
-                        mentor = candidate
-                        break
-                    attempts += 1
-                if mentor is None:
-                    break
-                Mentorship.objects.create(
-                    mentor=mentor,
-                    student=student,
-                    start_date=start_date,
-                    is_active=True,
-                    objective='Auto-assigned mentorship',
-                    department_ref=department,
-                    academic_year=academic_year,
-                    grade_level=student.grade_level,
-                    section=student.section,
-                )
-                mentor_load[mentor.id] = mentor_load.get(mentor.id, 0) + 1
-                created += 1
-        return response.Response({'assigned': created}, status=status.HTTP_201_CREATED)
+        try:
+            max_mentees = int(request.data.get('max_mentees_per_mentor', 25))
+        except (TypeError, ValueError):
+            return response.Response({'detail': 'max_mentees_per_mentor must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        plan = assign_mentors(
+            department_id=department_id,
+            academic_year=request.data.get('academic_year'),
+            grade_level=request.data.get('grade_level'),
+            section=request.data.get('section'),
+            max_mentees=max_mentees,
+            start_date=request.data.get('start_date') or timezone.now().date(),
+            match_department=str(request.data.get('match_department', 'true')).lower() not in ('0', 'false', 'no'),
+            dry_run=dry_run,
+        )
+        code = status.HTTP_200_OK if dry_run or not plan.created else status.HTTP_201_CREATED
+        return response.Response(plan.as_dict(dry_run), status=code)
 
     @decorators.action(detail=True, methods=['post'], url_path='compute-risk')
     def compute_risk(self, request, pk=None):
         m: Mentorship = self.get_object()
-        # Simple heuristic: attendance absences and fee overdue influence risk
-        risk = 0
-        factors = {}
-        try:
-            from attendance.models import AttendanceRecord
-            total_records = AttendanceRecord.objects.filter(student=m.student).count()
-            absents = AttendanceRecord.objects.filter(student=m.student, status='ABSENT').count()
-            if total_records > 0:
-                absence_ratio = absents / max(total_records, 1)
-                absence_score = min(int(absence_ratio * 100), 100)
-                risk += int(absence_score * 0.5)
-                factors['attendance_absence_ratio'] = round(absence_ratio, 3)
-        except Exception:
-            pass
-        try:
-            from fees.models import StudentFee
-            overdue = StudentFee.objects.filter(student=m.student, status='OVERDUE').count()
-            pending = StudentFee.objects.filter(student=m.student, status__in=['PENDING', 'PARTIAL']).count()
-            fee_score = min((overdue * 10) + (pending * 3), 100)
-            risk += int(fee_score * 0.3)
-            factors['fees_overdue_count'] = overdue
-            factors['fees_pending_count'] = pending
-        except Exception:
-            pass
-        # Academic performance proxy via assignments if available
-        try:
-            from assignments.models import Submission
-            late = Submission.objects.filter(student=m.student, is_late=True).count()
-            missing = Submission.objects.filter(student=m.student, status='MISSING').count()
-            acad_score = min((late * 5) + (missing * 10), 100)
-            risk += int(acad_score * 0.2)
-            factors['assignments_late'] = late
-            factors['assignments_missing'] = missing
-        except Exception:
-            pass
-
-        risk = max(0, min(risk, 100))
-        m.risk_score = risk
-        m.risk_factors = factors
-        m.last_risk_evaluated_at = timezone.now()
-        m.save(update_fields=['risk_score', 'risk_factors', 'last_risk_evaluated_at'])
-        return response.Response({'risk_score': risk, 'risk_factors': factors})
+        score_mentorships(Mentorship.objects.filter(pk=m.pk))
+        m.refresh_from_db(fields=['risk_score', 'risk_factors', 'last_risk_evaluated_at'])
+        return response.Response({'risk_score': m.risk_score, 'risk_factors': m.risk_factors})
+
+    @decorators.action(detail=False, methods=['post'], url_path='score-risk', permission_classes=[permissions.IsAdminUser])
+    def score_risk(self, request):
+        """Re-score every active mentorship in the filtered scope (the nightly task scores all of them)."""
+        run = score_mentorships(self.get_queryset().filter(is_active=True))
+        return response.Response(run.as_dict())
+
+    @decorators.action(detail=True, methods=['get'], url_path='risk-history')
+    def risk_history(self, request, pk=None):
+        m: Mentorship = self.get_object()
+        history = m.risk_history.all()
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = date.fromisoformat(since)
+            except ValueError:
+                return response.Response({'detail': 'since must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+            history = history.filter(scored_on__gte=since)
+        return response.Response({
+            'mentorship': str(m.id),
+            'history': list(history.values('scored_on', 'risk_score', 'risk_factors')),
+        })
 
     @decorators.action(detail=False, methods=['get'], url_path='analytics/summary')
     def analytics_summary(self, request):
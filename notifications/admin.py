@@ -0,0 +1,33 @@
+from django.contrib import admin
+from .models import InboxMessage, Notification, NotificationPreference
+from .outbox import requeue_dead
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'channel', 'category', 'subject', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status', 'channel', 'category')
+    search_fields = ('subject', 'address', 'dedupe_key')
+    raw_id_fields = ('recipient', 'digest')
+    readonly_fields = ('claim_token', 'lease_expires_at', 'last_error', 'created_at')
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected dead-lettered notifications')
+    def requeue(self, request, queryset):
+        count = requeue_dead(queryset.filter(status=Notification.DEAD).values_list('pk', flat=True))
+        self.message_user(request, f'{count} notifications requeued.')
+
+
+@admin.register(NotificationPreference)
+class NotificationPreferenceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'channel', 'category', 'delivery', 'updated_at')
+    list_filter = ('channel', 'delivery')
+    raw_id_fields = ('user',)
+
+
+@admin.register(InboxMessage)
+class InboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'category', 'subject', 'is_read', 'created_at')
+    list_filter = ('category', 'is_read')
+    search_fields = ('subject',)
+    raw_id_fields = ('recipient', 'notification')
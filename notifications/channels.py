@@ -0,0 +1,97 @@
+"""Delivery adapters, one per ``Channel``.
+
+Each adapter takes a batch of claimed ``Notification`` rows and returns
+``{notification_id: error}`` for the ones that failed; everything else in
+the batch counts as delivered. Adapters must be safe to retry: the worker
+re-sends a row whose outcome was not recorded.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import deque
+from typing import Deque, Dict, List
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from .models import Channel, InboxMessage, Notification
+
+logger = logging.getLogger(__name__)
+
+SMS_MAX_CHARS = 160
+SMS_OUTBOX_SIZE = 100
+
+
+class EmailChannel:
+    """Sends through a Django email backend (smtp, console, file or locmem), one connection per batch."""
+    name = Channel.EMAIL
+
+    def send(self, notifications: List[Notification]) -> Dict[int, str]:
+        errors = {}
+        backend = getattr(settings, 'NOTIFICATIONS_EMAIL_BACKEND', '') or None
+        connection = get_connection(backend)
+        connection.open()
+        try:
+            for n in notifications:
+                if not n.address:
+                    errors[n.pk] = 'Recipient has no email address.'
+                    continue
+                message = EmailMessage(n.subject, n.body, settings.DEFAULT_FROM_EMAIL, [n.address], connection=connection)
+                try:
+                    connection.send_messages([message])
+                except Exception as exc:
+                    errors[n.pk] = str(exc) or exc.__class__.__name__
+        finally:
+            connection.close()
+        return errors
+
+
+class InAppChannel:
+    """Writes the batch to the recipients' inboxes with one insert."""
+    name = Channel.INAPP
+
+    def send(self, notifications: List[Notification]) -> Dict[int, str]:
+        InboxMessage.objects.bulk_create(
+            [
+                InboxMessage(
+                    recipient_id=n.recipient_id, notification_id=n.pk, category=n.category,
+                    subject=n.subject, body=n.body,
+                )
+                for n in notifications
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,  # already delivered by an earlier, unrecorded attempt
+        )
+        return {}
+
+
+class SmsChannel:
+    """Stub gateway: logs the message and keeps the last ``SMS_OUTBOX_SIZE`` in ``outbox``
+    (like Django's locmem mail.outbox, but bounded: the stub also runs in long-lived workers)."""
+    name = Channel.SMS
+    outbox: Deque[dict] = deque(maxlen=SMS_OUTBOX_SIZE)
+
+    def send(self, notifications: List[Notification]) -> Dict[int, str]:
+        errors = {}
+        for n in notifications:
+            if not n.address:
+                errors[n.pk] = 'Recipient has no phone number.'
+                continue
+            text = f"{n.subject}: {n.body}" if n.body else n.subject
+            if len(text) > SMS_MAX_CHARS:
+                text = text[:SMS_MAX_CHARS - 1] + '…'
+            SmsChannel.outbox.append({'to': n.address, 'text': text})
+            logger.info("SMS to %s: %s", n.address, text)
+        return errors
+
+
+CHANNELS = {
+    Channel.EMAIL: EmailChannel(),
+    Channel.INAPP: InAppChannel(),
+    Channel.SMS: SmsChannel(),
+}
+
+
+def get_channel(name: str):
+    return CHANNELS[name]
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from notifications.models import InboxMessage, Notification
+from notifications.outbox import drain, notify
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _per_recipient(users, subject, body):
+    """Synchronous delivery in the request/task, one recipient at a time."""
+    for user in users:
+        InboxMessage.objects.create(recipient=user, category='announcement', subject=subject, body=body)
+        mail.send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark notification fan-out (per-recipient sends vs outbox enqueue + bulk drain)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=50000, help='Users to notify (rolled back)')
+        parser.add_argument('--legacy-sample', type=int, default=1000, help='Recipients timed with the per-recipient loop')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--email-backend', default='django.core.mail.backends.locmem.EmailBackend')
+
+    def handle(self, *args, **options):
+        backend = options['email_backend']
+        with override_settings(EMAIL_BACKEND=backend, NOTIFICATIONS_EMAIL_BACKEND=backend):
+            mail.outbox = []
+            try:
+                with transaction.atomic():
+                    self._run(options['recipients'], options['legacy_sample'], options['batch_size'])
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    def _timed(self, label, fn, scale=1, messages=None):
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+            t0 = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - t0
+        note = f'  (x{scale:.0f} extrapolated: {elapsed * scale:.1f} s, {len(queries) * scale:.0f} queries)' if scale > 1 else ''
+        rate = f'  {messages / elapsed:,.0f} msg/s' if messages else ''
+        self.stdout.write(f'{label:26s} {elapsed * 1000:10.1f} ms  {len(queries):7d} queries{rate}{note}')
+        return result
+
+    def _run(self, n, sample, batch_size):
+        User = get_user_model()
+        t0 = time.perf_counter()
+        users = User.objects.bulk_create(
+            [User(username=f'bench-notify-{i}', email=f'bench-notify-{i}@example.com') for i in range(n)],
+            batch_size=2000,
+        )
+        self.stdout.write(f'seeded {n} users in {time.perf_counter() - t0:.1f} s')
+        subject, body = 'Campus closed tomorrow', 'All classes are cancelled because of the weather warning.'
+
+        sample_users = users[:sample]
+        self._timed(f'per-recipient ({len(sample_users)})', lambda: _per_recipient(sample_users, subject, body),
+                    scale=n / max(len(sample_users), 1), messages=2 * len(sample_users))
+        InboxMessage.objects.all().delete()
+        mail.outbox = []
+
+        fan_out = self._timed(f'enqueue ({n} x 2 channels)', lambda: notify(
+            users, 'announcement', subject, body, channels=['inapp', 'email'],
+        ), messages=2 * n)
+        self.stdout.write(f'  {fan_out.as_dict()}')
+        run = self._timed(f'drain (batch {batch_size})', lambda: drain(batch_size=batch_size), messages=2 * n)
+        self.stdout.write(f'  {run.as_dict()}')
+        self.stdout.write(
+            f'delivered: {InboxMessage.objects.count()} inbox, {len(mail.outbox)} email; '
+            f'{Notification.objects.exclude(status=Notification.SENT).count()} outbox rows not sent'
+        )
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Channel(models.TextChoices):
+    EMAIL = 'email', 'Email'
+    INAPP = 'inapp', 'In-app'
+    SMS = 'sms', 'SMS'
+
+
+class Notification(models.Model):
+    """Outbox row: one message for one recipient on one channel.
+
+    Written in the same transaction as the change that caused it and
+    delivered later by ``notifications.outbox.drain``.
+    """
+    PENDING = 'PENDING'
+    SENDING = 'SENDING'
+    SENT = 'SENT'
+    HELD = 'HELD'
+    DIGESTED = 'DIGESTED'
+    DEAD = 'DEAD'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (HELD, 'Held for digest'),
+        (DIGESTED, 'Sent in a digest'),
+        (DEAD, 'Dead-lettered'),
+    ]
+
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=8, choices=Channel.choices)
+    category = models.CharField(max_length=32, help_text='e.g. attendance, assignment, announcement')
+    address = models.CharField(max_length=254, blank=True, help_text='Email address or phone number at enqueue time')
+    subject = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    context = models.JSONField(default=dict, blank=True)
+    dedupe_key = models.CharField(max_length=128, unique=True, null=True, blank=True)
+
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    digest = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='digested')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Worker scan: due rows first
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['claim_token']),
+            # Rate limits: recent sends per recipient and channel
+            models.Index(fields=['recipient', 'channel', 'sent_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.channel}:{self.recipient_id} {self.subject} [{self.status}]"
+
+
+class NotificationPreference(models.Model):
+    """Per-recipient switch for a channel, for one category or ('') all of them."""
+    IMMEDIATE = 'IMMEDIATE'
+    DIGEST = 'DIGEST'
+    OFF = 'OFF'
+    DELIVERY_CHOICES = [
+        (IMMEDIATE, 'Immediately'),
+        (DIGEST, 'Daily digest'),
+        (OFF, 'Off'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_preferences')
+    channel = models.CharField(max_length=8, choices=Channel.choices)
+    category = models.CharField(max_length=32, blank=True, help_text='Empty applies to every category')
+    delivery = models.CharField(max_length=10, choices=DELIVERY_CHOICES, default=IMMEDIATE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'channel', 'category'], name='uniq_notification_preference'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.channel}/{self.category or '*'}: {self.delivery}"
+
+
+class InboxMessage(models.Model):
+    """In-app channel target."""
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='inbox_messages')
+    notification = models.OneToOneField(Notification, on_delete=models.SET_NULL, null=True, blank=True, related_name='inbox_message')
+    category = models.CharField(max_length=32)
+    subject = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    is_read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_id}: {self.subject}"
@@ -0,0 +1,343 @@
+"""Notification outbox: fan-out, draining, retries and digests.
+
+``notify`` (one message to many users) and ``enqueue`` (personalised
+messages) expand into ``Notification`` rows, one per recipient and
+channel, applying each recipient's preferences (off, immediate or daily
+digest) with one query per chunk of recipients. The
+rows are written in the caller's transaction, so a notification exists
+exactly when the change that caused it was committed.
+
+``drain`` is the worker. It claims a batch of due rows by stamping them
+with a claim token (rows are picked ``FOR UPDATE SKIP LOCKED`` where the
+database supports it, so parallel workers split the outbox), enforces
+per-recipient hourly rate limits, hands each channel its slice of the
+batch and records the outcome with set-based updates: sent rows in one
+UPDATE, failures rescheduled with exponential backoff until
+``NOTIFICATIONS_MAX_ATTEMPTS``, then dead-lettered. A worker that dies
+mid-batch leaves its rows ``SENDING``; they are reclaimed once their
+lease expires.
+
+``build_digests`` folds the rows held for digest delivery into one
+message per recipient and channel.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from campshub360.utils import chunked
+
+from .channels import get_channel
+from .models import Channel, Notification, NotificationPreference
+
+RATE_WINDOW = timedelta(hours=1)
+LEASE = timedelta(minutes=5)
+MAX_BACKOFF = timedelta(hours=6)
+
+
+def _setting(name, default):
+    return getattr(settings, f'NOTIFICATIONS_{name}', default)
+
+
+# --- fan-out -------------------------------------------------------------------
+
+@dataclass
+class FanOut:
+    queued: int = 0
+    held: int = 0
+    skipped: int = 0
+
+    def as_dict(self) -> dict:
+        return {'queued': self.queued, 'held_for_digest': self.held, 'skipped': self.skipped}
+
+
+def _deliveries(user_ids, category, channels) -> Dict[tuple, str]:
+    """(user_id, channel) -> delivery, where a category-specific preference beats the catch-all."""
+    rows = NotificationPreference.objects.filter(
+        user_id__in=user_ids, channel__in=channels, category__in=[category, ''],
+    ).values_list('user_id', 'channel', 'category', 'delivery')
+    resolved = {}
+    for user_id, channel, pref_category, delivery in sorted(rows, key=lambda r: r[2]):
+        resolved[(user_id, channel)] = delivery  # '' sorts first, so the specific row wins
+    return resolved
+
+
+def _addresses(user_ids, channels) -> Dict[str, Dict]:
+    addresses = {}
+    if Channel.EMAIL in channels:
+        User = get_user_model()
+        addresses[Channel.EMAIL] = dict(User.objects.filter(pk__in=user_ids).exclude(email='').values_list('pk', 'email'))
+    if Channel.SMS in channels:
+        from faculty.models import Faculty
+        from students.models import Student
+
+        phones = dict(
+            Faculty.objects.filter(user_id__in=user_ids).exclude(phone_number='').values_list('user_id', 'phone_number')
+        )
+        phones.update(
+            Student.objects.filter(user_id__in=user_ids).exclude(student_mobile__isnull=True)
+            .exclude(student_mobile='').values_list('user_id', 'student_mobile')
+        )
+        addresses[Channel.SMS] = phones
+    return addresses
+
+
+@dataclass
+class Message:
+    """One personalised notification for ``enqueue``."""
+    recipient: object  # user or user id
+    subject: str
+    body: str = ''
+    context: Optional[dict] = None
+    dedupe_key: Optional[str] = None
+
+
+def enqueue(category: str, messages: Iterable[Message], channels: Optional[Sequence[str]] = None) -> FanOut:
+    """Queue each message on every channel its recipient has not switched off.
+
+    A message with a ``dedupe_key`` is idempotent: a (recipient, channel)
+    that already has a row for the key is skipped, so a retried task or a
+    re-saved object does not notify twice.
+    """
+    channels = list(channels or _setting('DEFAULT_CHANNELS', [Channel.INAPP, Channel.EMAIL]))
+    messages = list(messages)
+    report = FanOut()
+    for chunk in chunked(messages):
+        user_ids = list({getattr(m.recipient, 'pk', m.recipient) for m in chunk})
+        deliveries = _deliveries(user_ids, category, channels)
+        addresses = _addresses(user_ids, channels)
+        rows = []
+        for message in chunk:
+            user_id = getattr(message.recipient, 'pk', message.recipient)
+            for channel in channels:
+                delivery = deliveries.get((user_id, channel), NotificationPreference.IMMEDIATE)
+                address = addresses[channel].get(user_id, '') if channel in addresses else ''
+                if delivery == NotificationPreference.OFF or (channel in addresses and not address):
+                    report.skipped += 1
+                    continue
+                held = delivery == NotificationPreference.DIGEST
+                rows.append(Notification(
+                    recipient_id=user_id, channel=channel, category=category, address=address,
+                    subject=message.subject[:200], body=message.body, context=message.context or {},
+                    dedupe_key=f'{message.dedupe_key}:{user_id}:{channel}'[:128] if message.dedupe_key else None,
+                    status=Notification.HELD if held else Notification.PENDING,
+                ))
+                if held:
+                    report.held += 1
+                else:
+                    report.queued += 1
+        Notification.objects.bulk_create(
+            rows, batch_size=1000, ignore_conflicts=any(m.dedupe_key for m in chunk),
+        )
+    return report
+
+
+def notify(
+    recipients: Iterable,
+    category: str,
+    subject: str,
+    body: str = '',
+    *,
+    channels: Optional[Sequence[str]] = None,
+    context: Optional[dict] = None,
+    dedupe_key: Optional[str] = None,
+) -> FanOut:
+    """Queue the same ``subject``/``body`` for every recipient (users or user ids)."""
+    recipients = dict.fromkeys(getattr(r, 'pk', r) for r in recipients)
+    return enqueue(
+        category,
+        (Message(user_id, subject, body, context, dedupe_key) for user_id in recipients),
+        channels=channels,
+    )
+
+
+# --- worker --------------------------------------------------------------------
+
+@dataclass
+class DrainRun:
+    batches: int = 0
+    sent: int = 0
+    retried: int = 0
+    dead: int = 0
+    deferred: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'batches': self.batches, 'sent': self.sent, 'retried': self.retried,
+            'dead_lettered': self.dead, 'rate_limited': self.deferred,
+        }
+
+
+def _claim(now: datetime, batch_size: int) -> List[Notification]:
+    token = uuid.uuid4().hex
+    due = Q(status=Notification.PENDING, available_at__lte=now) | Q(status=Notification.SENDING, lease_expires_at__lt=now)
+    with transaction.atomic():
+        candidates = Notification.objects.filter(due).order_by('available_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # The status guard is repeated so a row another worker claimed meanwhile is not taken twice
+        Notification.objects.filter(due, pk__in=ids).update(
+            status=Notification.SENDING, claim_token=token, lease_expires_at=now + LEASE,
+        )
+    return list(
+        Notification.objects.filter(claim_token=token, status=Notification.SENDING)
+        .only(
+            'pk', 'recipient_id', 'channel', 'category', 'address', 'subject', 'body',
+            'attempts', 'status', 'available_at', 'last_error', 'lease_expires_at',
+        )
+        .order_by('pk')
+    )
+
+
+def _rate_limited(batch: List[Notification], now: datetime) -> Dict[int, datetime]:
+    """Rows over their channel's hourly limit -> when to try them again."""
+    limits = {c: n for c, n in _setting('RATE_LIMITS', {}).items() if n}
+    limited = [n for n in batch if n.channel in limits]
+    if not limited:
+        return {}
+    recent = {
+        (row['recipient_id'], row['channel']): (row['n'], row['oldest'])
+        for row in Notification.objects.filter(
+            status=Notification.SENT, sent_at__gte=now - RATE_WINDOW, channel__in=list(limits),
+            recipient_id__in={n.recipient_id for n in limited},
+        ).values('recipient_id', 'channel').annotate(n=Count('pk'), oldest=Min('sent_at')).order_by()
+    }
+    used: Counter = Counter()
+    deferred = {}
+    for n in limited:
+        key = (n.recipient_id, n.channel)
+        sent, oldest = recent.get(key, (0, None))
+        used[key] += 1
+        if sent + used[key] > limits[n.channel]:
+            deferred[n.pk] = (oldest or now) + RATE_WINDOW
+    return deferred
+
+
+def _backoff(attempts: int) -> timedelta:
+    base = timedelta(seconds=_setting('RETRY_BACKOFF_SECONDS', 60))
+    return min(base * (2 ** (attempts - 1)), MAX_BACKOFF)
+
+
+def _process(batch: List[Notification], now: datetime, run: DrainRun) -> None:
+    deferred = _rate_limited(batch, now)
+    by_channel = defaultdict(list)
+    for n in batch:
+        if n.pk not in deferred:
+            by_channel[n.channel].append(n)
+
+    errors: Dict[int, str] = {}
+    for channel, rows in by_channel.items():
+        try:
+            errors.update(get_channel(channel).send(rows))
+        except Exception as exc:
+            errors.update({n.pk: str(exc) or exc.__class__.__name__ for n in rows})
+
+    sent_ids = [n.pk for rows in by_channel.values() for n in rows if n.pk not in errors]
+    for ids in chunked(sent_ids):
+        Notification.objects.filter(pk__in=ids).update(
+            status=Notification.SENT, sent_at=now, last_error='', lease_expires_at=None,
+        )
+    run.sent += len(sent_ids)
+
+    for available_at, group in groupby(sorted(deferred.items(), key=lambda kv: kv[1]), key=lambda kv: kv[1]):
+        ids = [pk for pk, _ in group]
+        Notification.objects.filter(pk__in=ids).update(
+            status=Notification.PENDING, available_at=available_at, lease_expires_at=None,
+        )
+        run.deferred += len(ids)
+
+    failed = [n for n in batch if n.pk in errors]
+    max_attempts = _setting('MAX_ATTEMPTS', 5)
+    for n in failed:
+        n.attempts += 1
+        n.last_error = errors[n.pk][:2000]
+        n.lease_expires_at = None
+        if n.attempts >= max_attempts:
+            n.status = Notification.DEAD
+            run.dead += 1
+        else:
+            n.status = Notification.PENDING
+            n.available_at = now + _backoff(n.attempts)
+            run.retried += 1
+    Notification.objects.bulk_update(
+        failed, ['attempts', 'last_error', 'lease_expires_at', 'status', 'available_at'], batch_size=500,
+    )
+
+
+def drain(batch_size: Optional[int] = None, now: Optional[datetime] = None, max_batches: Optional[int] = None) -> DrainRun:
+    """Deliver due outbox rows until none are left (or ``max_batches`` is reached)."""
+    batch_size = batch_size or _setting('BATCH_SIZE', 500)
+    run = DrainRun()
+    while max_batches is None or run.batches < max_batches:
+        batch = _claim(now or timezone.now(), batch_size)
+        if not batch:
+            break
+        run.batches += 1
+        _process(batch, now or timezone.now(), run)
+    return run
+
+
+def requeue_dead(ids: Optional[Iterable[int]] = None) -> int:
+    """Give dead-lettered rows (all, or ``ids``) a fresh set of attempts."""
+    dead = Notification.objects.filter(status=Notification.DEAD)
+    if ids is not None:
+        dead = dead.filter(pk__in=list(ids))
+    return dead.update(status=Notification.PENDING, attempts=0, available_at=timezone.now(), claim_token='')
+
+
+# --- digests -------------------------------------------------------------------
+
+def _digest_body(rows) -> str:
+    return '\n'.join(f"- [{category}] {subject}" for _, _, _, _, category, subject in rows)
+
+
+def build_digests(page_size: int = 1000) -> int:
+    """Fold every held row into one pending digest per (recipient, channel); returns digests queued."""
+    created = 0
+    while True:
+        with transaction.atomic():
+            held = Notification.objects.filter(status=Notification.HELD)
+            if connection.features.has_select_for_update:
+                # A concurrent run waits, then no longer sees the rows it would fold twice
+                held = held.select_for_update()
+            recipients = list(
+                Notification.objects.filter(status=Notification.HELD).order_by('recipient_id')
+                .values_list('recipient_id', flat=True).distinct()[:page_size]
+            )
+            if not recipients:
+                return created
+            rows = list(
+                held.filter(recipient_id__in=recipients)
+                .order_by('recipient_id', 'channel', 'created_at', 'pk')
+                .values_list('pk', 'recipient_id', 'channel', 'address', 'category', 'subject')
+            )
+            digests, members = [], []
+            for (recipient_id, channel), group in groupby(rows, key=lambda r: (r[1], r[2])):
+                group = list(group)
+                digests.append(Notification(
+                    recipient_id=recipient_id, channel=channel, category='digest', address=group[-1][3],
+                    subject=f"{len(group)} new notification{'s' if len(group) != 1 else ''}",
+                    body=_digest_body(group), context={'notification_ids': [r[0] for r in group]},
+                ))
+                members.append([r[0] for r in group])
+            Notification.objects.bulk_create(digests, batch_size=1000)
+            folded = [
+                Notification(pk=pk, status=Notification.DIGESTED, digest_id=digest.pk)
+                for digest, ids in zip(digests, members) for pk in ids
+            ]
+            Notification.objects.bulk_update(folded, ['status', 'digest'], batch_size=1000)
+            created += len(digests)
@@ -0,0 +1,37 @@
+from rest_framework import serializers
+from .models import InboxMessage, Notification, NotificationPreference
+
+
+class InboxMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InboxMessage
+        fields = ['id', 'category', 'subject', 'body', 'is_read', 'read_at', 'created_at']
+        read_only_fields = ['category', 'subject', 'body', 'read_at', 'created_at']
+
+
+class NotificationPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationPreference
+        fields = ['id', 'channel', 'category', 'delivery', 'updated_at']
+        read_only_fields = ['updated_at']
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        channel = attrs.get('channel', getattr(self.instance, 'channel', None))
+        category = attrs.get('category', getattr(self.instance, 'category', ''))
+        clash = NotificationPreference.objects.filter(user=user, channel=channel, category=category)
+        if self.instance is not None:
+            clash = clash.exclude(pk=self.instance.pk)
+        if clash.exists():
+            raise serializers.ValidationError('A preference for this channel and category already exists.')
+        return attrs
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = [
+            'id', 'recipient', 'channel', 'category', 'address', 'subject', 'status', 'attempts',
+            'available_at', 'last_error', 'sent_at', 'digest', 'created_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,73 @@
+"""Queue deliveries for notifications other apps create.
+
+The outbox rows are written in the same transaction as the source row, so
+a rolled-back save never notifies anyone.
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from assignments.models import AssignmentNotification
+from departments.models import DepartmentAnnouncement
+
+from .models import Channel
+from .outbox import notify
+
+
+def _default_channels(*, inapp=True, sms=False):
+    channels = list(getattr(settings, 'NOTIFICATIONS_DEFAULT_CHANNELS', [Channel.INAPP, Channel.EMAIL]))
+    if not inapp and Channel.INAPP in channels:
+        channels.remove(Channel.INAPP)
+    if sms and Channel.SMS not in channels:
+        channels.append(Channel.SMS)
+    return channels
+
+
+@receiver(post_save, sender=AssignmentNotification)
+def deliver_assignment_notification(sender, instance, created, raw=False, **kwargs):
+    """AssignmentNotification is already the in-app record; deliver it on the other channels."""
+    if not created or raw:
+        return
+    channels = _default_channels(inapp=False)
+    if channels:
+        notify(
+            [instance.recipient_id], 'assignment', instance.title, instance.message, channels=channels,
+            context={'assignment_id': str(instance.assignment_id), 'type': instance.notification_type},
+            dedupe_key=f'assignment-notification:{instance.pk}',
+        )
+
+
+def announcement_recipients(announcement):
+    """User ids in the announcement's department matching its target audience."""
+    from faculty.models import Faculty
+    from students.models import Student
+
+    audience = (announcement.target_audience or 'ALL').upper()
+    user_ids = []
+    if audience in ('ALL', 'FACULTY', 'STAFF'):
+        user_ids += Faculty.objects.filter(
+            department_ref=announcement.department_id, user__isnull=False,
+        ).values_list('user_id', flat=True)
+    if audience in ('ALL', 'STUDENTS', 'STUDENT'):
+        user_ids += Student.objects.filter(
+            student_batch__department=announcement.department_id, status='ACTIVE', user__isnull=False,
+        ).values_list('user_id', flat=True)
+    return user_ids
+
+
+@receiver(post_save, sender=DepartmentAnnouncement)
+def deliver_department_announcement(sender, instance, raw=False, **kwargs):
+    if raw or not instance.is_published:
+        return
+    if instance.expiry_date and instance.expiry_date <= timezone.now():
+        return
+    urgent = instance.priority == 'URGENT' or instance.announcement_type == 'EMERGENCY'
+    # The dedupe key makes later saves of a published announcement no-ops
+    notify(
+        announcement_recipients(instance), 'announcement', instance.title, instance.content,
+        channels=_default_channels(sms=urgent),
+        context={'announcement_id': str(instance.pk), 'department_id': str(instance.department_id)},
+        dedupe_key=f'announcement:{instance.pk}',
+    )
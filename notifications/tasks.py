@@ -0,0 +1,26 @@
+"""Celery tasks for the notifications app."""
+
+import logging
+
+from celery import shared_task
+
+from .outbox import build_digests, drain
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def drain_notification_outbox(max_batches=None):
+    """Deliver due outbox rows; runs every few seconds, parallel workers split the outbox."""
+    run = drain(max_batches=max_batches)
+    if run.batches:
+        logger.info("Notification outbox drained: %s", run.as_dict())
+    return run.as_dict()
+
+
+@shared_task
+def send_notification_digests():
+    """Daily: fold held notifications into one digest per recipient and channel, then deliver."""
+    digests = build_digests()
+    logger.info("Queued %s notification digests", digests)
+    return digests
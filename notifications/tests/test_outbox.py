@@ -0,0 +1,138 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from notifications import channels
+from notifications.models import InboxMessage, Notification, NotificationPreference
+from notifications.outbox import build_digests, drain, enqueue, Message, notify, requeue_dead
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users():
+    return [baker.make('accounts.User', email=f'u{i}@example.com', username=f'u{i}') for i in range(4)]
+
+
+def test_notify_applies_preferences_and_is_idempotent(users):
+    a, b, c, d = users
+    NotificationPreference.objects.create(user=a, channel='email', category='', delivery='OFF')
+    # A category-specific preference beats the catch-all
+    NotificationPreference.objects.create(user=b, channel='email', category='', delivery='OFF')
+    NotificationPreference.objects.create(user=b, channel='email', category='attendance', delivery='IMMEDIATE')
+    NotificationPreference.objects.create(user=c, channel='inapp', category='attendance', delivery='DIGEST')
+
+    report = notify(users, 'attendance', 'Hello', 'Body', channels=['inapp', 'email', 'sms'], dedupe_key='k1')
+    rows = set(Notification.objects.values_list('recipient_id', 'channel', 'status'))
+    assert rows == {
+        (a.pk, 'inapp', 'PENDING'),
+        (b.pk, 'inapp', 'PENDING'), (b.pk, 'email', 'PENDING'),
+        (c.pk, 'inapp', 'HELD'), (c.pk, 'email', 'PENDING'),
+        (d.pk, 'inapp', 'PENDING'), (d.pk, 'email', 'PENDING'),
+    }
+    # a's email is off and nobody has a phone number
+    assert report.as_dict() == {'queued': 6, 'held_for_digest': 1, 'skipped': 5}
+    assert Notification.objects.get(recipient=d, channel='email').address == d.email
+
+    notify(users, 'attendance', 'Hello', 'Body', channels=['inapp', 'email', 'sms'], dedupe_key='k1')
+    assert Notification.objects.count() == 7
+
+
+def test_drain_delivers_each_channel_in_bulk(users, django_assert_max_num_queries):
+    enqueue('assignment', [Message(u, f'Due soon {u.pk}', 'Submit it') for u in users])
+    with django_assert_max_num_queries(12):
+        run = drain(batch_size=100)
+    assert run.as_dict() == {'batches': 1, 'sent': 8, 'retried': 0, 'dead_lettered': 0, 'rate_limited': 0}
+    assert sorted(m.to[0] for m in mail.outbox) == sorted(u.email for u in users)
+    assert InboxMessage.objects.filter(category='assignment').count() == 4
+    assert set(Notification.objects.values_list('status', flat=True)) == {'SENT'}
+    assert drain().batches == 0
+
+
+def test_failures_back_off_then_dead_letter(users, monkeypatch, settings):
+    settings.NOTIFICATIONS_MAX_ATTEMPTS = 2
+    monkeypatch.setattr(channels.EmailChannel, 'send', lambda self, rows: {n.pk: 'smtp down' for n in rows})
+    notify(users[:1], 'announcement', 'Hi', channels=['email'])
+    now = timezone.now()
+
+    run = drain(now=now)
+    row = Notification.objects.get()
+    assert (run.retried, row.status, row.attempts, row.last_error) == (1, 'PENDING', 1, 'smtp down')
+    assert row.available_at == now + timedelta(seconds=60)
+    assert drain(now=now).batches == 0  # not due yet
+
+    run = drain(now=now + timedelta(minutes=2))
+    row.refresh_from_db()
+    assert (run.dead, row.status, row.attempts) == (1, 'DEAD', 2)
+
+    monkeypatch.undo()
+    assert requeue_dead() == 1
+    assert drain().sent == 1
+    assert len(mail.outbox) == 1
+
+
+def test_rate_limit_defers_instead_of_dropping(users, settings):
+    settings.NOTIFICATIONS_RATE_LIMITS = {'email': 2}
+    for i in range(3):
+        notify(users[:1], 'announcement', f'N{i}', channels=['email'])
+    now = timezone.now()
+    run = drain(now=now)
+    assert (run.sent, run.deferred) == (2, 1)
+    deferred = Notification.objects.get(status='PENDING')
+    assert deferred.available_at == now + timedelta(hours=1)
+    assert drain(now=now + timedelta(hours=1, seconds=1)).sent == 1
+
+
+def test_held_notifications_are_sent_as_one_digest(users):
+    user = users[0]
+    NotificationPreference.objects.create(user=user, channel='email', category='', delivery='DIGEST')
+    for subject in ('First', 'Second', 'Third'):
+        notify([user], 'announcement', subject, channels=['email'])
+    assert drain().sent == 0
+
+    assert build_digests() == 1
+    assert build_digests() == 0
+    digest = Notification.objects.get(category='digest')
+    assert digest.subject == '3 new notifications'
+    assert set(Notification.objects.filter(digest=digest).values_list('status', flat=True)) == {'DIGESTED'}
+    drain()
+    assert len(mail.outbox) == 1 and '[announcement] Second' in mail.outbox[0].body
+
+
+def test_published_announcement_notifies_department_once(users):
+    department = baker.make('departments.Department', phone='+911234567890', email='d@example.com')
+    faculty, _ = [
+        baker.make(
+            'faculty.Faculty', user=user, department_ref=dept, email=f'f{i}@example.com',
+            employee_id=f'F{i}', apaar_faculty_id=f'APAAR-F{i}', phone_number='',
+        )
+        for i, (user, dept) in enumerate([(users[0], department), (users[1], None)])  # second: no department
+    ]
+    announcement = baker.make(
+        'departments.DepartmentAnnouncement', department=department, title='Exam schedule', is_published=False,
+    )
+    assert not Notification.objects.exists()
+
+    announcement.is_published = True
+    announcement.save()
+    announcement.save()
+    assert set(Notification.objects.values_list('recipient_id', 'category')) == {(faculty.user_id, 'announcement')}
+    assert Notification.objects.count() == 2  # inapp + email
+
+
+def test_inbox_api(users):
+    notify(users[:1], 'announcement', 'Read me', channels=['inapp'])
+    drain()
+    client = APIClient()
+    client.force_authenticate(users[0])
+    assert client.get('/api/v1/notifications/inbox/unread-count/').data == {'unread': 1}
+    message = InboxMessage.objects.get()
+    assert client.post(f'/api/v1/notifications/inbox/{message.pk}/read/').status_code == 200
+    assert client.get('/api/v1/notifications/inbox/unread-count/').data == {'unread': 0}
+    client.force_authenticate(users[1])
+    assert client.get(f'/api/v1/notifications/inbox/{message.pk}/').status_code == 404
@@ -0,0 +1,14 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import InboxViewSet, NotificationPreferenceViewSet, OutboxViewSet
+
+app_name = 'notifications'
+
+router = DefaultRouter()
+router.register(r'inbox', InboxViewSet, basename='inbox')
+router.register(r'preferences', NotificationPreferenceViewSet, basename='preference')
+router.register(r'outbox', OutboxViewSet, basename='outbox')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,72 @@
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import decorators, mixins, permissions, response, status, viewsets
+from .models import InboxMessage, Notification, NotificationPreference
+from .outbox import requeue_dead
+from .serializers import InboxMessageSerializer, NotificationPreferenceSerializer, NotificationSerializer
+
+
+class InboxViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """The signed-in user's in-app notifications."""
+    serializer_class = InboxMessageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = InboxMessage.objects.filter(recipient=self.request.user)
+        if self.request.query_params.get('unread') == 'true':
+            qs = qs.filter(is_read=False)
+        category = self.request.query_params.get('category')
+        if category:
+            qs = qs.filter(category=category)
+        return qs
+
+    @decorators.action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        message = self.get_object()
+        if not message.is_read:
+            message.is_read, message.read_at = True, timezone.now()
+            message.save(update_fields=['is_read', 'read_at'])
+        return response.Response(self.get_serializer(message).data)
+
+    @decorators.action(detail=False, methods=['post'], url_path='read-all')
+    def read_all(self, request):
+        updated = InboxMessage.objects.filter(recipient=request.user, is_read=False).update(
+            is_read=True, read_at=timezone.now(),
+        )
+        return response.Response({'marked_read': updated})
+
+    @decorators.action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return response.Response({'unread': InboxMessage.objects.filter(recipient=request.user, is_read=False).count()})
+
+
+class NotificationPreferenceViewSet(viewsets.ModelViewSet):
+    serializer_class = NotificationPreferenceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return NotificationPreference.objects.filter(user=self.request.user).order_by('channel', 'category')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class OutboxViewSet(viewsets.ReadOnlyModelViewSet):
+    """Admin view of the outbox: delivery status, dead letters and requeueing."""
+    queryset = Notification.objects.order_by('-created_at')
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = ['status', 'channel', 'category', 'recipient']
+
+    @decorators.action(detail=False, methods=['get'])
+    def stats(self, request):
+        rows = Notification.objects.values('status', 'channel').annotate(n=Count('pk')).order_by()
+        return response.Response([{'status': r['status'], 'channel': r['channel'], 'count': r['n']} for r in rows])
+
+    @decorators.action(detail=False, methods=['post'])
+    def requeue(self, request):
+        """Retry dead-lettered rows (``ids`` to limit which)."""
+        ids = request.data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            return response.Response({'detail': 'ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        return response.Response({'requeued': requeue_dead(ids)})
@@ -6,4 +6,5 @@ class RndConfig(AppConfig):
     name = 'rnd'
     verbose_name = 'Research & Development'
 
-
+    def ready(self):
+        import rnd.signals  # noqa: F401
@@ -0,0 +1,435 @@
+"""Bulk create/update/delete, import and streamed export for the R&D models.
+
+Rows are validated with the model's API serializer, one bound serializer for
+the whole batch; the related ids every row refers to are fetched with one
+``in_bulk`` per relation up front instead of one ``get`` per row and field.
+Rows that repeat a unique value, of an earlier row in the batch or of an
+existing record, are rejected the same way (one query per uniqueness rule)
+instead of surfacing as an ``IntegrityError``. Each invalid row is reported
+with its index and field errors. In ``atomic``
+mode (the default) any invalid row aborts the batch and nothing is written;
+in ``partial`` mode the valid rows are written and the rest reported.
+
+Writes are set-based: ``bulk_create`` (plus one ``bulk_create`` per
+many-to-many relation), ``bulk_update`` over the union of changed fields, and
+a single filtered ``delete``. Exports are generated row by row from a
+chunked iterator, so CSV and JSON stream and XLSX is built with openpyxl's
+write-only workbook.
+"""
+
+from __future__ import annotations
+
+import csv
+import datetime
+import decimal
+import io
+import json
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import ProtectedError
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+from . import models, search, serializers
+
+
+ATOMIC = 'atomic'
+PARTIAL = 'partial'
+MODES = (ATOMIC, PARTIAL)
+
+MODELS = {
+    'researcher': (models.Researcher, serializers.ResearcherSerializer),
+    'project': (models.Project, serializers.ProjectSerializer),
+    'publication': (models.Publication, serializers.PublicationSerializer),
+    'patent': (models.Patent, serializers.PatentSerializer),
+    'dataset': (models.Dataset, serializers.DatasetSerializer),
+    'collaboration': (models.Collaboration, serializers.CollaborationSerializer),
+}
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+@dataclass
+class RowError:
+    index: int
+    errors: object
+    id: Optional[object] = None
+
+    def as_dict(self) -> dict:
+        return {'row': self.index, 'id': self.id, 'errors': self.errors}
+
+
+@dataclass
+class BulkReport:
+    operation: str
+    model_type: str
+    mode: str
+    total: int = 0
+    ids: List[object] = field(default_factory=list)
+    errors: List[RowError] = field(default_factory=list)
+    committed: bool = False
+
+    def as_dict(self) -> dict:
+        done = len(self.ids) if self.committed else 0
+        verb = {'create': 'Created', 'update': 'Updated', 'delete': 'Deleted', 'import': 'Imported'}[self.operation]
+        return {
+            'message': f'{verb} {done} {self.model_type}s' + (f', {len(self.errors)} rows rejected' if self.errors else ''),
+            f'{verb.lower()}_count': done,
+            'operation': self.operation,
+            'model_type': self.model_type,
+            'mode': self.mode,
+            'committed': self.committed,
+            'total': self.total,
+            'succeeded': done,
+            'failed': len(self.errors),
+            'ids': self.ids if self.committed else [],
+            'errors': [e.as_dict() for e in self.errors],
+        }
+
+
+def _m2m_fields(model):
+    return {f.name: f for f in model._meta.many_to_many}
+
+
+def _writable_relations(serializer):
+    for f in serializer.fields.values():
+        if f.read_only:
+            continue
+        if isinstance(f, ManyRelatedField) and isinstance(f.child_relation, PrimaryKeyRelatedField):
+            yield f, f.child_relation, True
+        elif isinstance(f, PrimaryKeyRelatedField):
+            yield f, f, False
+
+
+def _prefetch_relations(serializer, rows) -> None:
+    """Resolve every related id in ``rows`` with one query per relation field."""
+    for bound, relation, many in _writable_relations(serializer):
+        pk_field = relation.get_queryset().model._meta.pk
+        keys = set()
+        for row in rows:
+            value = row.get(bound.field_name) if isinstance(row, dict) else None
+            for item in (value if many and isinstance(value, (list, tuple)) else [value]):
+                try:
+                    keys.add(pk_field.to_python(item))
+                except (DjangoValidationError, TypeError, ValueError):
+                    pass
+        keys.discard(None)
+        found = relation.get_queryset().in_bulk(list(keys))
+
+        def lookup(data, relation=relation, pk_field=pk_field, found=found):
+            if isinstance(data, bool):
+                relation.fail('incorrect_type', data_type=type(data).__name__)
+            try:
+                obj = found.get(pk_field.to_python(data))
+            except (DjangoValidationError, TypeError, ValueError):
+                relation.fail('incorrect_type', data_type=type(data).__name__)
+            if obj is None:
+                relation.fail('does_not_exist', pk_value=data)
+            return obj
+
+        relation.to_internal_value = lookup
+
+
+def validate_rows(serializer_class, rows, partial=False) -> Tuple[List[Tuple[int, dict]], List[RowError]]:
+    serializer = serializer_class(partial=partial)
+    _prefetch_relations(serializer, rows)
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append(RowError(index, {'non_field_errors': ['Expected an object.']}))
+            continue
+        try:
+            valid.append((index, serializer.run_validation(row)))
+        except ValidationError as exc:
+            errors.append(RowError(index, exc.detail, row.get('id')))
+    return valid, errors
+
+
+def _split(model, data: dict):
+    m2m = _m2m_fields(model)
+    return {k: v for k, v in data.items() if k not in m2m}, {k: v for k, v in data.items() if k in m2m}
+
+
+def _set_m2m(model, assignments: Dict[str, List[Tuple[object, list]]], replace=False) -> None:
+    """``assignments`` maps an m2m field name to (owner pk, related objects) pairs."""
+    for name, pairs in assignments.items():
+        m2m = _m2m_fields(model)[name]
+        through = m2m.remote_field.through
+        src, tgt = m2m.m2m_field_name(), m2m.m2m_reverse_field_name()
+        if replace:
+            through.objects.filter(**{f'{src}_id__in': [pk for pk, _ in pairs]}).delete()
+        through.objects.bulk_create(
+            [through(**{f'{src}_id': pk, f'{tgt}_id': obj.pk}) for pk, related in pairs for obj in related],
+            batch_size=1000, ignore_conflicts=True,
+        )
+
+
+def _unique_sets(model) -> List[Tuple[str, ...]]:
+    """Field names of every unconditional uniqueness rule on ``model`` other than the pk."""
+    sets = [(f.name,) for f in model._meta.concrete_fields if f.unique and not f.primary_key]
+    sets += [tuple(names) for names in model._meta.unique_together]
+    sets += [tuple(c.fields) for c in model._meta.total_unique_constraints]
+    return list(dict.fromkeys(sets))
+
+
+def _unique_key(data: dict, names) -> Optional[tuple]:
+    if not all(name in data for name in names):
+        return None
+    key = tuple(getattr(data[name], 'pk', data[name]) for name in names)
+    # NULLs never collide
+    return None if None in key else key
+
+
+def unique_collisions(model, model_type: str, valid: List[Tuple[int, dict]]) -> List[RowError]:
+    """Rows of ``valid`` whose unique values repeat an earlier row or an existing record."""
+    errors: Dict[int, RowError] = {}
+    for names in _unique_sets(model):
+        keyed = [
+            (index, key) for index, key in ((index, _unique_key(data, names)) for index, data in valid)
+            if key is not None and index not in errors
+        ]
+        if not keyed:
+            continue
+        attnames = [model._meta.get_field(name).attname for name in names]
+        # Filtering each column by its values is a superset of the wanted tuples
+        lookup = {f'{attname}__in': {key[i] for _, key in keyed} for i, attname in enumerate(attnames)}
+        taken = set(model.objects.filter(**lookup).values_list(*attnames))
+        label = ', '.join(names)
+        field_name = names[0] if len(names) == 1 else 'non_field_errors'
+        seen: Dict[tuple, int] = {}
+        for index, key in keyed:
+            if key in taken:
+                message = f'A {model_type} with this {label} already exists.'
+            elif key in seen:
+                message = f'Row {seen[key]} of this batch has the same {label}.'
+            else:
+                seen[key] = index
+                continue
+            errors[index] = RowError(index, {field_name: [message]})
+    return sorted(errors.values(), key=lambda e: e.index)
+
+
+def _reindex_after_commit(model_type, ids):
+    if model_type in search.KINDS and ids:
+        ids = list(ids)
+        transaction.on_commit(lambda: search.index_records(model_type, ids))
+
+
+def bulk_create(model_type: str, rows: list, mode: str = ATOMIC, operation: str = 'create') -> BulkReport:
+    model, serializer_class = MODELS[model_type]
+    report = BulkReport(operation, model_type, mode, total=len(rows))
+    valid, report.errors = validate_rows(serializer_class, rows)
+    if report.errors and mode == ATOMIC or not valid:
+        return report
+    collisions = unique_collisions(model, model_type, valid)
+    if collisions:
+        rejected = {e.index for e in collisions}
+        valid = [(index, data) for index, data in valid if index not in rejected]
+        report.errors = sorted(report.errors + collisions, key=lambda e: e.index)
+        if mode == ATOMIC or not valid:
+            return report
+    with transaction.atomic():
+        split = [_split(model, data) for _, data in valid]
+        created = model.objects.bulk_create([model(**plain) for plain, _ in split], batch_size=1000)
+        assignments: Dict[str, list] = {}
+        for obj, (_, m2m) in zip(created, split):
+            for name, related in m2m.items():
+                assignments.setdefault(name, []).append((obj.pk, related))
+        _set_m2m(model, assignments)
+        report.ids = [obj.pk for obj in created]
+        _reindex_after_commit(model_type, report.ids)
+    report.committed = True
+    return report
+
+
+def bulk_update(model_type: str, rows: list, mode: str = ATOMIC) -> BulkReport:
+    model, serializer_class = MODELS[model_type]
+    report = BulkReport('update', model_type, mode, total=len(rows))
+    pk_field = model._meta.pk
+    keyed = []
+    for index, row in enumerate(rows):
+        try:
+            keyed.append((index, pk_field.to_python(row.get('id')) if isinstance(row, dict) else None))
+        except DjangoValidationError:
+            keyed.append((index, None))
+    existing = model.objects.in_bulk([pk for _, pk in keyed if pk is not None])
+
+    candidates, positions = [], []
+    for index, pk in keyed:
+        if pk is None:
+            report.errors.append(RowError(index, {'id': ['This field is required.']}))
+        elif pk not in existing:
+            report.errors.append(RowError(index, {'id': [f'{model_type} {pk} does not exist.']}, pk))
+        else:
+            candidates.append(rows[index])
+            positions.append((index, pk))
+    valid, errors = validate_rows(serializer_class, candidates, partial=True)
+    for error in errors:
+        error.index, error.id = positions[error.index]
+    report.errors.extend(errors)
+    report.errors.sort(key=lambda e: e.index)
+    if report.errors and mode == ATOMIC or not valid:
+        return report
+
+    changed, objs, assignments = set(), [], {}
+    for position, data in valid:
+        obj = existing[positions[position][1]]
+        plain, m2m = _split(model, data)
+        for name, value in plain.items():
+            setattr(obj, name, value)
+        changed.update(plain)
+        objs.append(obj)
+        for name, related in m2m.items():
+            assignments.setdefault(name, []).append((obj.pk, related))
+    with transaction.atomic():
+        if changed:
+            fields = [model._meta.get_field(name).name for name in changed]
+            model.objects.bulk_update(objs, fields, batch_size=500)
+        _set_m2m(model, assignments, replace=True)
+        report.ids = [obj.pk for obj in objs]
+        _reindex_after_commit(model_type, report.ids)
+    report.committed = True
+    return report
+
+
+def _blocked_by(model, protected_objects, candidates) -> set:
+    """Pks of ``model`` rows that ``protected_objects`` still reference."""
+    blocked = set()
+    for obj in protected_objects:
+        for f in obj._meta.concrete_fields:
+            if f.is_relation and f.related_model is model and getattr(obj, f.attname) in candidates:
+                blocked.add(getattr(obj, f.attname))
+    return blocked
+
+
+def bulk_delete(model_type: str, ids: list, mode: str = ATOMIC) -> BulkReport:
+    model, _ = MODELS[model_type]
+    report = BulkReport('delete', model_type, mode, total=len(ids))
+    pk_field = model._meta.pk
+    wanted = {}
+    for index, raw in enumerate(ids):
+        try:
+            wanted[index] = pk_field.to_python(raw)
+        except DjangoValidationError:
+            report.errors.append(RowError(index, {'id': ['Invalid id.']}, raw))
+    found = set(model.objects.filter(pk__in=set(wanted.values())).values_list('pk', flat=True))
+    for index, pk in wanted.items():
+        if pk not in found:
+            report.errors.append(RowError(index, {'id': [f'{model_type} {pk} does not exist.']}, pk))
+    if report.errors and mode == ATOMIC:
+        return report
+
+    targets = set(found)
+    try:
+        with transaction.atomic():
+            model.objects.filter(pk__in=targets).delete()
+    except ProtectedError as exc:
+        blocked = _blocked_by(model, exc.protected_objects, targets)
+        for index, pk in wanted.items():
+            if pk in blocked:
+                report.errors.append(RowError(index, {'id': [f'{model_type} {pk} is still referenced.']}, pk))
+        if mode == ATOMIC:
+            return report
+        targets -= blocked
+        with transaction.atomic():
+            model.objects.filter(pk__in=targets).delete()
+    report.errors.sort(key=lambda e: e.index)
+    report.ids = sorted(targets)
+    report.committed = True
+    return report
+
+
+# --- import / export -------------------------------------------------------------
+
+def export_columns(model_type: str) -> List[Tuple[str, str]]:
+    """(column, attribute) pairs: concrete fields by attname, m2m by their serializer input name."""
+    model, serializer_class = MODELS[model_type]
+    columns = [(f.attname, f.attname) for f in model._meta.concrete_fields]
+    inputs = {f.source: f.field_name for f in serializer_class().fields.values() if isinstance(f, ManyRelatedField) and not f.read_only}
+    columns += [(inputs.get(name, name), name) for name in _m2m_fields(model)]
+    return columns
+
+
+def _cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def export_rows(model_type: str) -> Iterator[list]:
+    model, _ = MODELS[model_type]
+    columns = export_columns(model_type)
+    m2m = set(_m2m_fields(model))
+    yield [column for column, _ in columns]
+    records = model.objects.order_by('pk').prefetch_related(*m2m).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for obj in records:
+        yield [
+            ';'.join(str(r.pk) for r in getattr(obj, attr).all()) if attr in m2m else _cell(getattr(obj, attr))
+            for _, attr in columns
+        ]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv(model_type: str) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    for row in export_rows(model_type):
+        yield writer.writerow(['' if v is None else v for v in row])
+
+
+def stream_json(model_type: str) -> Iterator[str]:
+    rows = export_rows(model_type)
+    header = next(rows)
+    yield '['
+    for n, row in enumerate(rows):
+        yield (',' if n else '') + json.dumps(dict(zip(header, row)), default=str)
+    yield ']'
+
+
+def xlsx_file(model_type: str):
+    """A rewound temporary file holding the export; raises ImportError without openpyxl."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=model_type[:31])
+    for row in export_rows(model_type):
+        sheet.append(row)
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    workbook.save(out)
+    out.seek(0)
+    return out
+
+
+def rows_from_csv(model_type: str, upload) -> List[dict]:
+    """Parse an uploaded CSV into serializer input; m2m columns hold ';'-separated ids."""
+    model, _ = MODELS[model_type]
+    m2m_columns = {column for column, attr in export_columns(model_type) if attr in _m2m_fields(model)}
+    json_columns = {f.attname for f in model._meta.concrete_fields if f.get_internal_type() == 'JSONField'}
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    rows = []
+    for record in csv.DictReader(text):
+        row = {}
+        for key, value in record.items():
+            if key is None or key == 'id' or value in ('', None):
+                continue
+            if key in m2m_columns:
+                value = [v for v in value.split(';') if v]
+            elif key in json_columns:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            row[key] = value
+        rows.append(row)
+    return rows
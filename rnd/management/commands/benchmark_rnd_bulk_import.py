@@ -0,0 +1,68 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from rnd import bulk, serializers
+from rnd.models import Publication, Researcher
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_import(rows):
+    """The per-row loop ImportExportView ran before rnd.bulk: validate and save one publication at a time."""
+    imported = 0
+    for item in rows:
+        serializer = serializers.PublicationSerializer(data=item)
+        if serializer.is_valid():
+            serializer.save()
+            imported += 1
+    return imported
+
+
+class Command(BaseCommand):
+    help = 'Benchmark R&D publication imports (per-row serializer saves vs rnd.bulk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per import (rolled back)')
+        parser.add_argument('--authors', type=int, default=200, help='Researchers the rows refer to')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['rows'], options['authors'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, n, authors):
+        User = get_user_model()
+        users = User.objects.bulk_create([
+            User(email=f'bench-rnd{i}@example.com', username=f'bench-rnd{i}') for i in range(authors)
+        ])
+        people = Researcher.objects.bulk_create([Researcher(user=u, department='Bench') for u in users])
+        rows = [
+            {
+                'title': f'Benchmark paper {i}', 'venue': 'Bench Conf', 'year': 2000 + i % 25,
+                'publication_type': 'conference',
+                'author_ids': [people[i % authors].pk, people[(i * 7 + 1) % authors].pk],
+            }
+            for i in range(n)
+        ]
+        rows[n // 2]['year'] = 'not a year'
+
+        for label, run in (
+            ('per-row loop', lambda: _legacy_import(rows)),
+            ('bulk (partial)', lambda: bulk.bulk_create('publication', rows, bulk.PARTIAL).as_dict()['created_count']),
+        ):
+            baseline = set(Publication.objects.values_list('pk', flat=True))
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+                t0 = time.perf_counter()
+                imported = run()
+                elapsed = time.perf_counter() - t0
+            self.stdout.write(f'{label:15s} {elapsed * 1000:9.1f} ms  {len(queries):6d} queries  {imported} rows')
+            Publication.objects.exclude(pk__in=baseline).delete()
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rnd import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the R&D search documents (and the inverted index when Postgres full-text is not used)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f'Subset of: {", ".join(search.KINDS)}')
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(search.KINDS)
+        if unknown:
+            raise CommandError(f'Unknown kind(s): {", ".join(sorted(unknown))}')
+        t0 = time.perf_counter()
+        counts = search.rebuild(options['kinds'] or None)
+        elapsed = time.perf_counter() - t0
+        for kind, count in counts.items():
+            self.stdout.write(f'  {kind:12s} {count}')
+        self.stdout.write(self.style.SUCCESS(f'Indexed {sum(counts.values())} records ({search.backend()}) in {elapsed:.2f}s'))
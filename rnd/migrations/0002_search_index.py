@@ -0,0 +1,180 @@
+import math
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Postgres keeps a weighted tsvector next to each document; other databases
+# use the SearchPosting inverted index maintained by rnd.search instead.
+SEARCH_VECTOR_SQL = """
+ALTER TABLE rnd_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(keywords, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(body, '')), 'C')
+) STORED;
+CREATE INDEX rnd_searchdocument_vector_gin ON rnd_searchdocument USING gin (search_vector);
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP INDEX IF EXISTS rnd_searchdocument_vector_gin;
+ALTER TABLE rnd_searchdocument DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SEARCH_VECTOR_SQL)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_VECTOR_SQL)
+
+
+# Frozen copy of the rnd.search document and posting builders as of this
+# migration, so later changes to the live search code do not change what it writes
+FIELD_WEIGHTS = {'title': 1.0, 'keywords': 0.4, 'body': 0.2}
+TOKEN_RE = re.compile(r'\w+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the this to was were will with'.split()
+)
+
+
+def stem(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 5 and word.endswith('ing'):
+        return word[:-3]
+    if len(word) > 4 and word.endswith('ed'):
+        return word[:-2]
+    if len(word) > 4 and word.endswith(('ses', 'xes', 'zes', 'ches', 'shes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def terms(text):
+    words = (w.lower() for w in TOKEN_RE.findall(text or ''))
+    return [stem(w)[:64] for w in words if w not in STOPWORDS and (len(w) > 1 or w.isdigit())]
+
+
+def person(researcher):
+    user = researcher.user
+    return user.username or user.email.split('@')[0]
+
+
+def people(researchers):
+    return ', '.join(person(r) for r in researchers)
+
+
+def researcher_doc(r):
+    return person(r), ' '.join(filter(None, [r.title, r.department, r.orcid])), r.bio
+
+
+def project_doc(p):
+    keywords = ' '.join(str(k) for k in p.keywords) if isinstance(p.keywords, list) else str(p.keywords or '')
+    return p.title, ' '.join(filter(None, [keywords, person(p.principal_investigator)])), p.abstract
+
+
+def publication_doc(p):
+    return p.title, ' '.join(filter(None, [p.venue, p.doi, str(p.year or ''), people(p.authors.all())])), ''
+
+
+def patent_doc(p):
+    return p.title, ' '.join(filter(None, [p.application_number, p.grant_number, people(p.inventors.all())])), ''
+
+
+def dataset_doc(d):
+    return d.name, '', d.description
+
+
+SOURCES = [
+    ('researcher', 'Researcher', lambda qs: qs.select_related('user'), researcher_doc),
+    ('project', 'Project', lambda qs: qs.select_related('principal_investigator__user'), project_doc),
+    ('publication', 'Publication', lambda qs: qs.prefetch_related('authors__user'), publication_doc),
+    ('patent', 'Patent', lambda qs: qs.prefetch_related('inventors__user'), patent_doc),
+    ('dataset', 'Dataset', lambda qs: qs, dataset_doc),
+]
+
+
+def postings(SearchPosting, document_id, title, keywords, body):
+    weights = Counter()
+    for name, text in (('title', title), ('keywords', keywords), ('body', body)):
+        for term, tf in Counter(terms(text)).items():
+            weights[term] += FIELD_WEIGHTS[name] * (1 + math.log(tf))
+    return [SearchPosting(document_id=document_id, term=t, weight=w) for t, w in weights.items()]
+
+
+def index_existing_records(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    SearchDocument = apps.get_model('rnd', 'SearchDocument')
+    SearchPosting = apps.get_model('rnd', 'SearchPosting')
+    configured = getattr(settings, 'RND_SEARCH_BACKEND', 'auto')
+    inverted = configured == 'inverted' or (configured == 'auto' and schema_editor.connection.vendor != 'postgresql')
+    for kind, model_name, prepare, build in SOURCES:
+        records = prepare(apps.get_model('rnd', model_name).objects.using(alias)).order_by('pk')
+        last_pk = None
+        while True:
+            chunk = list((records.filter(pk__gt=last_pk) if last_pk is not None else records)[:500])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            docs = {}
+            for record in chunk:
+                title, keywords, body = build(record)
+                docs[record.pk] = SearchDocument(
+                    kind=kind, object_id=record.pk, title=(title or '')[:512], keywords=keywords or '', body=body or '',
+                )
+            SearchDocument.objects.using(alias).bulk_create(docs.values())
+            if inverted:
+                doc_ids = dict(
+                    SearchDocument.objects.using(alias).filter(kind=kind, object_id__in=list(docs))
+                    .values_list('object_id', 'id')
+                )
+                SearchPosting.objects.using(alias).bulk_create(
+                    [p for pk, doc in docs.items() for p in postings(SearchPosting, doc_ids[pk], doc.title, doc.keywords, doc.body)],
+                    batch_size=2000,
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rnd', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('researcher', 'Researcher'), ('project', 'Project'), ('publication', 'Publication'), ('patent', 'Patent'), ('dataset', 'Dataset')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(help_text='Weight A', max_length=512)),
+                ('keywords', models.TextField(blank=True, help_text='Weight B: names, venues, identifiers, keywords')),
+                ('body', models.TextField(blank=True, help_text='Weight C: abstract, description or bio')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='uniq_rnd_search_document')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='rnd.searchdocument')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'document'], name='rnd_searchp_term_7cee55_idx')],
+            },
+        ),
+        migrations.RunPython(add_search_vector, drop_search_vector),
+        migrations.RunPython(index_existing_records, migrations.RunPython.noop),
+    ]
@@ -118,3 +118,45 @@ class Collaboration(models.Model):
         return f"{self.partner_institution} - {self.project.title}"
 
 
+class SearchDocument(models.Model):
+    """Denormalized, weighted search text for one R&D record (see rnd.search)."""
+    RESEARCHER = 'researcher'
+    PROJECT = 'project'
+    PUBLICATION = 'publication'
+    PATENT = 'patent'
+    DATASET = 'dataset'
+
+    KIND_CHOICES = [
+        (RESEARCHER, 'Researcher'),
+        (PROJECT, 'Project'),
+        (PUBLICATION, 'Publication'),
+        (PATENT, 'Patent'),
+        (DATASET, 'Dataset'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=512, help_text='Weight A')
+    keywords = models.TextField(blank=True, help_text='Weight B: names, venues, identifiers, keywords')
+    body = models.TextField(blank=True, help_text='Weight C: abstract, description or bio')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='uniq_rnd_search_document'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.object_id} {self.title}"
+
+
+class SearchPosting(models.Model):
+    """Inverted-index entry used when the database has no full-text engine."""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'document']),
+        ]
@@ -0,0 +1,318 @@
+"""Ranked full-text search over Researcher, Project, Publication, Patent and Dataset.
+
+Every indexed record has one ``SearchDocument`` holding its text in three
+weighted fields (A: title/name, B: names, venues, identifiers and keywords,
+C: abstract/description/bio), kept current by ``rnd.signals``. Two backends
+read it:
+
+* ``postgres`` ranks with ``ts_rank_cd`` over a generated, GIN-indexed
+  ``tsvector`` column (added by migration 0002 on Postgres only);
+* ``inverted`` (sqlite and anything else) keeps a ``SearchPosting`` row per
+  (document, term) with a field-weighted term frequency, and ranks matching
+  documents by the sum of weight x idf over the query terms.
+
+Both return the same ``SearchPage``: cross-model hits ordered by score,
+paginated, with the matching words marked in the title and a snippet.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from . import models
+
+
+KINDS = [kind for kind, _ in models.SearchDocument.KIND_CHOICES]
+FIELD_WEIGHTS = {'title': 1.0, 'keywords': 0.4, 'body': 0.2}  # ts_rank's default A/B/C weights
+PG_CONFIG = 'english'
+SNIPPET_CHARS = 160
+
+_TOKEN_RE = re.compile(r'\w+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the this to was were will with'.split()
+)
+
+
+def stem(word: str) -> str:
+    """A deliberately small English suffix stripper (plurals, -ing, -ed)."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 5 and word.endswith('ing'):
+        return word[:-3]
+    if len(word) > 4 and word.endswith('ed'):
+        return word[:-2]
+    if len(word) > 4 and word.endswith(('ses', 'xes', 'zes', 'ches', 'shes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def terms(text: str) -> List[str]:
+    words = (w.lower() for w in _TOKEN_RE.findall(text or ''))
+    return [stem(w)[:64] for w in words if w not in _STOPWORDS and (len(w) > 1 or w.isdigit())]
+
+
+def backend() -> str:
+    configured = getattr(settings, 'RND_SEARCH_BACKEND', 'auto')
+    if configured == 'auto':
+        return 'postgres' if connection.vendor == 'postgresql' else 'inverted'
+    return configured
+
+
+# --- documents ---------------------------------------------------------------
+
+def _person(researcher) -> str:
+    user = researcher.user
+    return user.username or user.email.split('@')[0]
+
+
+def _people(researchers) -> str:
+    return ', '.join(_person(r) for r in researchers)
+
+
+def _researcher_doc(r):
+    return _person(r), ' '.join(filter(None, [r.title, r.department, r.orcid])), r.bio
+
+
+def _project_doc(p):
+    keywords = ' '.join(str(k) for k in p.keywords) if isinstance(p.keywords, list) else str(p.keywords or '')
+    return p.title, ' '.join(filter(None, [keywords, _person(p.principal_investigator)])), p.abstract
+
+
+def _publication_doc(p):
+    return p.title, ' '.join(filter(None, [p.venue, p.doi, str(p.year or ''), _people(p.authors.all())])), ''
+
+
+def _patent_doc(p):
+    return p.title, ' '.join(filter(None, [p.application_number, p.grant_number, _people(p.inventors.all())])), ''
+
+
+def _dataset_doc(d):
+    return d.name, '', d.description
+
+
+SOURCES = {
+    models.SearchDocument.RESEARCHER: (
+        lambda: models.Researcher.objects.select_related('user'), _researcher_doc,
+    ),
+    models.SearchDocument.PROJECT: (
+        lambda: models.Project.objects.select_related('principal_investigator__user'), _project_doc,
+    ),
+    models.SearchDocument.PUBLICATION: (
+        lambda: models.Publication.objects.prefetch_related('authors__user'), _publication_doc,
+    ),
+    models.SearchDocument.PATENT: (
+        lambda: models.Patent.objects.prefetch_related('inventors__user'), _patent_doc,
+    ),
+    models.SearchDocument.DATASET: (
+        lambda: models.Dataset.objects.all(), _dataset_doc,
+    ),
+}
+
+
+def _postings(document_id, title, keywords, body) -> List[models.SearchPosting]:
+    weights: Counter = Counter()
+    for name, text in (('title', title), ('keywords', keywords), ('body', body)):
+        for term, tf in Counter(terms(text)).items():
+            weights[term] += FIELD_WEIGHTS[name] * (1 + math.log(tf))
+    return [models.SearchPosting(document_id=document_id, term=t, weight=w) for t, w in weights.items()]
+
+
+def index_records(kind: str, ids: Optional[Iterable] = None, batch_size: int = 500) -> int:
+    """(Re)build the documents of ``kind`` for ``ids`` (default: all); missing ids are unindexed."""
+    queryset_for, build = SOURCES[kind]
+    records = queryset_for().order_by('pk')
+    if ids is not None:
+        ids = list(ids)
+        records = records.filter(pk__in=ids)
+    inverted = backend() == 'inverted'
+    seen = set()
+    indexed = 0
+    with transaction.atomic():
+        last_pk = None
+        while True:
+            chunk = list((records.filter(pk__gt=last_pk) if last_pk is not None else records)[:batch_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            docs = {}
+            for record in chunk:
+                title, keywords, body = build(record)
+                docs[record.pk] = models.SearchDocument(
+                    kind=kind, object_id=record.pk, title=(title or '')[:512], keywords=keywords or '', body=body or '',
+                )
+            models.SearchDocument.objects.bulk_create(
+                docs.values(), update_conflicts=True, unique_fields=['kind', 'object_id'],
+                update_fields=['title', 'keywords', 'body', 'updated_at'],
+            )
+            seen.update(docs)
+            indexed += len(docs)
+            if inverted:
+                doc_ids = dict(
+                    models.SearchDocument.objects.filter(kind=kind, object_id__in=list(docs))
+                    .values_list('object_id', 'id')
+                )
+                models.SearchPosting.objects.filter(document_id__in=doc_ids.values()).delete()
+                models.SearchPosting.objects.bulk_create(
+                    [p for pk, doc in docs.items() for p in _postings(doc_ids[pk], doc.title, doc.keywords, doc.body)],
+                    batch_size=2000,
+                )
+        stale = models.SearchDocument.objects.filter(kind=kind)
+        if ids is not None:
+            stale = stale.filter(object_id__in=[pk for pk in ids if pk not in seen])
+        else:
+            stale = stale.exclude(object_id__in=queryset_for().values('pk'))
+        stale.delete()
+    return indexed
+
+
+def remove_records(kind: str, ids: Iterable) -> None:
+    models.SearchDocument.objects.filter(kind=kind, object_id__in=list(ids)).delete()
+
+
+def rebuild(kinds: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    if backend() != 'inverted':
+        models.SearchPosting.objects.all().delete()
+    return {kind: index_records(kind) for kind in (kinds or KINDS)}
+
+
+# --- querying ------------------------------------------------------------------
+
+@dataclass
+class SearchHit:
+    kind: str
+    object_id: int
+    score: float
+    title: str
+    snippet: str
+
+    def as_dict(self) -> dict:
+        return {'type': self.kind, 'id': self.object_id, 'score': round(self.score, 4), 'title': self.title, 'snippet': self.snippet}
+
+
+@dataclass
+class SearchPage:
+    query: str
+    backend: str
+    total: int = 0
+    page: int = 1
+    page_size: int = 20
+    hits: List[SearchHit] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            'query': self.query,
+            'backend': self.backend,
+            'count': self.total,
+            'page': self.page,
+            'page_size': self.page_size,
+            'num_pages': max(1, math.ceil(self.total / self.page_size)),
+            'results': [hit.as_dict() for hit in self.hits],
+        }
+
+
+def highlight(text: str, query_terms, limit: Optional[int] = None) -> str:
+    """Escape ``text`` and wrap words matching ``query_terms`` in <mark>; ``limit`` trims to a window."""
+    text = text or ''
+    matches = [m for m in _TOKEN_RE.finditer(text) if stem(m.group().lower()) in query_terms]
+    start, end = 0, len(text)
+    if limit and len(text) > limit:
+        anchor = matches[0].start() if matches else 0
+        start = max(0, min(anchor - limit // 4, len(text) - limit))
+        end = start + limit
+    out, pos = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        out.extend([escape(text[pos:m.start()]), '<mark>', escape(m.group()), '</mark>'])
+        pos = m.end()
+    out.append(escape(text[pos:end]))
+    return ('…' if start else '') + ''.join(out) + ('…' if end < len(text) else '')
+
+
+def _pg_match(query):
+    return RawSQL(
+        'search_vector @@ websearch_to_tsquery(%s::regconfig, %s)', [PG_CONFIG, query], output_field=BooleanField(),
+    )
+
+
+def _inverted_matches(query_terms, kinds):
+    """Per-document (document_id, score) rows containing every query term, or None if one is unknown."""
+    df = dict(
+        models.SearchPosting.objects.filter(term__in=query_terms).values('term')
+        .annotate(n=Count('document_id')).order_by().values_list('term', 'n')
+    )
+    if len(df) < len(query_terms):
+        return None
+    total_docs = models.SearchDocument.objects.count()
+    idf = {t: math.log(1 + (total_docs - n + 0.5) / (n + 0.5)) for t, n in df.items()}
+    return (
+        models.SearchPosting.objects.filter(term__in=query_terms, document__kind__in=kinds)
+        .values('document_id')
+        .annotate(
+            matched=Count('term', distinct=True),
+            score=Sum(Case(*[When(term=t, then=F('weight') * Value(w)) for t, w in idf.items()], output_field=FloatField())),
+        )
+        .filter(matched=len(query_terms))
+        .order_by()
+    )
+
+
+def matching_ids(query: str, kind: str):
+    """Unranked object ids of ``kind`` matching ``query``, as a subquery for ``pk__in``."""
+    docs = models.SearchDocument.objects.filter(kind=kind)
+    if backend() == 'postgres':
+        return docs.filter(_pg_match(query)).values('object_id')
+    query_terms = sorted(set(terms(query)))
+    matches = _inverted_matches(query_terms, [kind]) if query_terms else None
+    if matches is None:
+        return docs.none().values('object_id')
+    return docs.filter(pk__in=matches.values('document_id')).values('object_id')
+
+
+def search(query: str, kinds: Optional[Iterable[str]] = None, page: int = 1, page_size: int = 20) -> SearchPage:
+    kinds = list(kinds or KINDS)
+    result = SearchPage(query=query, backend=backend(), page=page, page_size=page_size)
+    query_terms = set(terms(query))
+    if not query_terms:
+        return result
+    offset = (page - 1) * page_size
+
+    if result.backend == 'postgres':
+        matches = models.SearchDocument.objects.filter(_pg_match(query), kind__in=kinds)
+        result.total = matches.count()
+        rows = list(
+            matches.annotate(score=RawSQL(
+                'ts_rank_cd(search_vector, websearch_to_tsquery(%s::regconfig, %s), 32)', [PG_CONFIG, query],
+                output_field=FloatField(),
+            )).order_by('-score', 'kind', 'object_id')[offset:offset + page_size]
+        )
+        scored = [(doc, doc.score) for doc in rows]
+    else:
+        matches = _inverted_matches(sorted(query_terms), kinds)
+        if matches is None:
+            return result
+        result.total = matches.count()
+        rows = list(matches.order_by('-score', 'document_id').values_list('document_id', 'score')[offset:offset + page_size])
+        docs = models.SearchDocument.objects.in_bulk([doc_id for doc_id, _ in rows])
+        scored = [(docs[doc_id], score) for doc_id, score in rows]
+
+    for doc, score in scored:
+        body_hit = any(stem(w.lower()) in query_terms for w in _TOKEN_RE.findall(doc.body))
+        result.hits.append(SearchHit(
+            kind=doc.kind, object_id=doc.object_id, score=score or 0.0,
+            title=highlight(doc.title, query_terms),
+            snippet=highlight(doc.body if body_hit or not doc.keywords else doc.keywords, query_terms, SNIPPET_CHARS),
+        ))
+    return result
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .models import Dataset, Patent, Project, Publication, Researcher, SearchDocument
+
+
+KIND_BY_MODEL = {
+    Researcher: SearchDocument.RESEARCHER,
+    Project: SearchDocument.PROJECT,
+    Publication: SearchDocument.PUBLICATION,
+    Patent: SearchDocument.PATENT,
+    Dataset: SearchDocument.DATASET,
+}
+
+
+def _reindex(kind, ids):
+    ids = list(ids)
+    # After commit, so the document is built from the committed rows
+    transaction.on_commit(lambda: search.index_records(kind, ids))
+
+
+@receiver(post_save, sender=Researcher)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Publication)
+@receiver(post_save, sender=Patent)
+@receiver(post_save, sender=Dataset)
+def index_saved_record(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _reindex(KIND_BY_MODEL[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Researcher)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Publication)
+@receiver(post_delete, sender=Patent)
+@receiver(post_delete, sender=Dataset)
+def unindex_deleted_record(sender, instance, **kwargs):
+    search.remove_records(KIND_BY_MODEL[sender], [instance.pk])
+
+
+@receiver(m2m_changed, sender=Publication.authors.through)
+@receiver(m2m_changed, sender=Patent.inventors.through)
+def reindex_people(sender, instance, action, reverse, pk_set, **kwargs):
+    """Author and inventor names are part of the publication/patent document."""
+    model, field = (Publication, 'authors') if sender is Publication.authors.through else (Patent, 'inventors')
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _reindex(KIND_BY_MODEL[model], [instance.pk])
+    elif action == 'pre_clear':
+        instance._search_cleared = list(model.objects.filter(**{field: instance}).values_list('pk', flat=True))
+    elif action == 'post_clear':
+        _reindex(KIND_BY_MODEL[model], getattr(instance, '_search_cleared', []))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        _reindex(KIND_BY_MODEL[model], pk_set)
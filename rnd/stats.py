@@ -0,0 +1,30 @@
+"""R&D dashboard metrics (served by DashboardStatsView)."""
+
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from dashboard.snapshots import Metric, register
+
+
+def _last_30_days(now):
+    return Count('pk', filter=Q(start_date__gte=timezone.localdate(now) - timedelta(days=30)))
+
+
+register('rnd', [
+    Metric('total_researchers', 'rnd.Researcher'),
+    Metric('total_projects', 'rnd.Project'),
+    Metric('total_grants', 'rnd.Grant'),
+    Metric('total_publications', 'rnd.Publication'),
+    Metric('total_patents', 'rnd.Patent'),
+    Metric('total_datasets', 'rnd.Dataset'),
+    Metric('total_collaborations', 'rnd.Collaboration'),
+    Metric('active_projects', 'rnd.Project', Count('pk', filter=Q(status='active'))),
+    Metric('completed_projects', 'rnd.Project', Count('pk', filter=Q(status='completed'))),
+    Metric('total_grant_amount', 'rnd.Grant', Sum('amount'), default='0.00'),
+    Metric('recent_activities.new_projects', 'rnd.Project', _last_30_days),
+    Metric('recent_activities.new_publications', 'rnd.Publication',
+           lambda now: Count('pk', filter=Q(year=timezone.localdate(now).year))),
+    Metric('recent_activities.new_grants', 'rnd.Grant', _last_30_days),
+])
@@ -0,0 +1,128 @@
+import csv
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from rnd import bulk, search
+from rnd.models import Project, Publication, Researcher
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def researchers(django_user_model):
+    return [
+        Researcher.objects.create(user=django_user_model.objects.create_user(email=f'r{i}@example.com', username=f'r{i}', password='p'))
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def api(researchers):
+    client = APIClient()
+    client.force_authenticate(researchers[0].user)
+    return client
+
+
+def test_create_reports_rows_and_honours_mode(api, researchers, django_capture_on_commit_callbacks):
+    rows = [
+        {'title': 'Quantum dots', 'year': 2023, 'author_ids': [researchers[0].pk, researchers[1].pk]},
+        {'title': '', 'year': 2023},
+        {'title': 'Ghost author', 'author_ids': [9999]},
+    ]
+    url = reverse('rnd:bulk')
+    res = api.post(url, {'operation_type': 'create', 'model_type': 'publication', 'data': rows}, format='json')
+    assert res.status_code == 400
+    assert (res.data['committed'], res.data['failed']) == (False, 2)
+    assert [e['row'] for e in res.data['errors']] == [1, 2]
+    assert 'author_ids' in res.data['errors'][1]['errors']
+    assert not Publication.objects.exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        res = api.post(url, {'operation_type': 'create', 'model_type': 'publication', 'data': rows, 'mode': 'partial'}, format='json')
+    assert res.status_code == 200 and res.data['created_count'] == 1
+    paper = Publication.objects.get()
+    assert set(paper.authors.values_list('pk', flat=True)) == {r.pk for r in researchers}
+    assert search.search('quantum').hits[0].object_id == paper.pk
+
+
+def test_create_reports_unique_collisions_per_row(api, researchers, monkeypatch):
+    # No R&D model declares a uniqueness rule yet; treat the DOI as one
+    monkeypatch.setattr(bulk, '_unique_sets', lambda model: [('doi',)])
+    Publication.objects.create(title='Old', doi='10.1/a')
+    rows = [
+        {'title': 'Dup of existing', 'doi': '10.1/a'},
+        {'title': 'First', 'doi': '10.1/b'},
+        {'title': 'Dup in batch', 'doi': '10.1/b'},
+        {'title': 'No DOI'},
+    ]
+    url = reverse('rnd:bulk')
+    res = api.post(url, {'operation_type': 'create', 'model_type': 'publication', 'data': rows}, format='json')
+    assert res.status_code == 400 and res.data['committed'] is False
+    assert [(e['row'], list(e['errors'])) for e in res.data['errors']] == [(0, ['doi']), (2, ['doi'])]
+    assert 'Row 1' in res.data['errors'][1]['errors']['doi'][0]
+    assert Publication.objects.count() == 1
+
+    res = api.post(url, {'operation_type': 'create', 'model_type': 'publication', 'data': rows, 'mode': 'partial'}, format='json')
+    assert res.status_code == 200 and res.data['created_count'] == 2
+    assert sorted(Publication.objects.values_list('title', flat=True)) == ['First', 'No DOI', 'Old']
+
+
+def test_update_and_delete_are_set_based(api, researchers):
+    a, b = researchers
+    projects = [Project.objects.create(title=f'P{i}', principal_investigator=a) for i in range(3)]
+    url = reverse('rnd:bulk')
+    res = api.post(url, {'operation_type': 'update', 'model_type': 'project', 'data': [
+        {'id': projects[0].pk, 'status': 'active', 'member_ids': [b.pk]},
+        {'id': projects[1].pk, 'principal_investigator_id': b.pk},
+        {'id': 424242, 'status': 'active'},
+    ], 'mode': 'partial'}, format='json')
+    assert res.status_code == 200 and res.data['updated_count'] == 2
+    assert res.data['errors'][0]['row'] == 2
+    projects[0].refresh_from_db()
+    assert projects[0].status == 'active' and list(projects[0].members.all()) == [b]
+    assert Project.objects.get(pk=projects[1].pk).principal_investigator == b
+
+    # a still leads projects[0] and [2]: PROTECT blocks it, b is deleted after reassigning
+    Project.objects.filter(principal_investigator=b).update(principal_investigator=a)
+    res = api.post(url, {'operation_type': 'delete', 'model_type': 'researcher', 'data': [a.pk, b.pk]}, format='json')
+    assert res.status_code == 400 and Researcher.objects.count() == 2
+    res = api.post(url, {'operation_type': 'delete', 'model_type': 'researcher', 'data': [a.pk, b.pk], 'mode': 'partial'}, format='json')
+    assert res.data['deleted_count'] == 1 and res.data['errors'][0]['id'] == a.pk
+    assert list(Researcher.objects.values_list('pk', flat=True)) == [a.pk]
+
+
+def test_validation_queries_do_not_grow_with_rows(researchers, django_assert_max_num_queries):
+    rows = [{'title': f'T{i}', 'principal_investigator_id': researchers[i % 2].pk} for i in range(50)]
+    with django_assert_max_num_queries(4):
+        valid, errors = bulk.validate_rows(bulk.MODELS['project'][1], rows)
+    assert len(valid) == 50 and not errors
+
+
+def test_streamed_exports_round_trip_through_csv_import(api, researchers):
+    paper = Publication.objects.create(title='Graphs, again', year=2020, venue='SODA')
+    paper.authors.set(researchers)
+    url = reverse('rnd:import-export')
+
+    res = api.post(url, {'operation': 'export', 'model_type': 'publication', 'format': 'csv'}, format='json')
+    assert res.status_code == 200 and res.streaming
+    body = b''.join(res.streaming_content).decode()
+    exported = list(csv.DictReader(io.StringIO(body)))
+    assert exported[0]['title'] == 'Graphs, again'
+    assert exported[0]['author_ids'] == ';'.join(str(r.pk) for r in researchers)
+
+    upload = SimpleUploadedFile('pubs.csv', body.encode(), content_type='text/csv')
+    res = api.post(url, {'operation': 'import', 'model_type': 'publication', 'format': 'csv', 'file': upload}, format='multipart')
+    assert res.status_code == 200 and res.data['imported_count'] == 1
+    copy = Publication.objects.exclude(pk=paper.pk).get()
+    assert (copy.title, copy.venue, copy.authors.count()) == ('Graphs, again', 'SODA', 2)
+
+    res = api.post(url, {'operation': 'export', 'model_type': 'publication', 'format': 'xlsx'}, format='json')
+    sheet = load_workbook(io.BytesIO(b''.join(res.streaming_content))).active
+    assert sheet.max_row == 3 and sheet['B1'].value == 'title'
+    assert api.post(url, {'operation': 'export', 'model_type': 'publication', 'format': 'pdf'}, format='json').status_code == 400
@@ -0,0 +1,91 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rnd import search
+from rnd.models import Dataset, Project, Publication, Researcher, SearchDocument, SearchPosting
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def researcher(django_user_model):
+    user = django_user_model.objects.create_user(
+        email='ada@example.com', username='ada.lovelace', password='p',
+    )
+    return Researcher.objects.create(user=user, department='Computing', bio='Analytical engines')
+
+
+@pytest.fixture
+def records(researcher, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        graph = Project.objects.create(
+            title='Graph neural networks for traffic', abstract='Forecasting congestion.',
+            principal_investigator=researcher, keywords=['deep learning'],
+        )
+        soil = Project.objects.create(
+            title='Soil moisture sensing', abstract='We train a neural network on sensor readings.',
+            principal_investigator=researcher,
+        )
+        paper = Publication.objects.create(title='Scalable traffic forecasting', venue='NeurIPS', year=2024)
+        data = Dataset.objects.create(name='City traffic counts', description='Hourly vehicle counts.')
+    return graph, soil, paper, data
+
+
+def test_ranked_cross_model_results_with_highlighting(records):
+    graph, soil, paper, data = records
+    page = search.search('neural networks')
+    assert page.backend == 'inverted'
+    assert [(h.kind, h.object_id) for h in page.hits] == [('project', graph.pk), ('project', soil.pk)]
+    assert page.hits[0].title == 'Graph <mark>neural</mark> <mark>networks</mark> for traffic'
+    assert '<mark>neural</mark> <mark>network</mark>' in page.hits[1].snippet
+
+    traffic = search.search('traffic', page=1, page_size=2)
+    assert traffic.total == 3 and len(traffic.hits) == 2
+    assert traffic.as_dict()['num_pages'] == 2
+    assert search.search('traffic', page=2, page_size=2).hits[0].object_id in {graph.pk, paper.pk, data.pk}
+    assert {h.kind for h in search.search('traffic', kinds=['dataset']).hits} == {'dataset'}
+    assert search.search('traffic unicorns').total == 0
+
+
+def test_documents_follow_record_changes(records, researcher, django_capture_on_commit_callbacks):
+    graph, soil, paper, data = records
+    with django_capture_on_commit_callbacks(execute=True):
+        paper.authors.add(researcher)
+        graph.title = 'Hypergraph transformers'
+        graph.save()
+        data.delete()
+    assert [h.object_id for h in search.search('lovelace', kinds=['publication']).hits] == [paper.pk]
+    assert search.search('hypergraph').hits[0].object_id == graph.pk
+    assert not SearchDocument.objects.filter(kind='dataset').exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        researcher.publications.clear()
+    assert search.search('lovelace', kinds=['publication']).total == 0
+
+
+def test_rebuild_drops_orphans_and_search_uses_constant_queries(records, django_assert_num_queries):
+    SearchDocument.objects.create(kind='patent', object_id=999, title='Ghost')
+    assert search.rebuild()['project'] == 2
+    assert not SearchDocument.objects.filter(kind='patent').exists()
+    assert SearchPosting.objects.filter(term='traffic').count() == 3
+
+    with django_assert_num_queries(5):
+        search.search('traffic forecasting')
+
+
+def test_search_endpoints(records, researcher):
+    graph, soil, paper, data = records
+    client = APIClient()
+    client.force_authenticate(researcher.user)
+    url = reverse('rnd:search')
+    assert client.get(url).status_code == 400
+    assert client.get(url, {'q': 'x', 'types': 'grant'}).status_code == 400
+
+    data = client.get(url, {'q': 'forecasting', 'types': 'project,publication', 'page_size': 1}).json()
+    assert data['count'] == 2 and len(data['results']) == 1
+    assert data['results'][0]['type'] == 'publication'  # title hit outranks the abstract hit
+
+    listed = client.get(reverse('rnd:project-search'), {'q': 'neural'}).json()
+    assert {row['id'] for row in listed} == {graph.pk, soil.pk}
@@ -16,6 +16,9 @@ router.register(r'collaborations', views.CollaborationViewSet)
 
 
 urlpatterns = [
+    path('search/', views.SearchFilterView.as_view(), name='search'),
+    path('bulk/', views.BulkOperationsView.as_view(), name='bulk'),
+    path('import-export/', views.ImportExportView.as_view(), name='import-export'),
     path('', include(router.urls)),
 ]
 
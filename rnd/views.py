@@ -2,14 +2,18 @@ from rest_framework import viewsets, permissions, filters, status, views
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum, Avg, Max, Min
+from django.db.models import Count, Sum, Avg, Max, Min
+from django.conf import settings
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from datetime import date, timedelta
+from decimal import Decimal
 import json
 
-from . import models, serializers
+from dashboard import snapshots
+
+from . import bulk, models, search, serializers
 
 
 class DefaultPermissions(permissions.IsAuthenticated):
@@ -56,12 +60,7 @@ class ResearcherViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset()
         
         if query:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=query) |
-                Q(user__last_name__icontains=query) |
-                Q(user__username__icontains=query) |
-                Q(department__icontains=query)
-            )
+            queryset = queryset.filter(pk__in=search.matching_ids(query, models.SearchDocument.RESEARCHER))
         
         if department:
             queryset = queryset.filter(department__icontains=department)
@@ -130,11 +129,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset()
         
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(abstract__icontains=query) |
-                Q(keywords__contains=[query])
-            )
+            queryset = queryset.filter(pk__in=search.matching_ids(query, models.SearchDocument.PROJECT))
         
         if status_filter:
             queryset = queryset.filter(status=status_filter)
@@ -176,11 +171,7 @@ class PublicationViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset()
         
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(venue__icontains=query) |
-                Q(doi__icontains=query)
-            )
+            queryset = queryset.filter(pk__in=search.matching_ids(query, models.SearchDocument.PUBLICATION))
         
         if pub_type:
             queryset = queryset.filter(publication_type=pub_type)
@@ -258,27 +249,10 @@ class DashboardStatsView(views.APIView):
     permission_classes = [DefaultPermissions]
     
     def get(self, request):
-        """Get comprehensive dashboard statistics"""
-        today = timezone.now().date()
-        
-        stats = {
-            'total_researchers': models.Researcher.objects.count(),
-            'total_projects': models.Project.objects.count(),
-            'total_grants': models.Grant.objects.count(),
-            'total_publications': models.Publication.objects.count(),
-            'total_patents': models.Patent.objects.count(),
-            'total_datasets': models.Dataset.objects.count(),
-            'total_collaborations': models.Collaboration.objects.count(),
-            'active_projects': models.Project.objects.filter(status='active').count(),
-            'completed_projects': models.Project.objects.filter(status='completed').count(),
-            'total_grant_amount': models.Grant.objects.aggregate(total=Sum('amount'))['total'] or 0,
-            'recent_activities': {
-                'new_projects': models.Project.objects.filter(start_date__gte=today - timedelta(days=30)).count(),
-                'new_publications': models.Publication.objects.filter(year=today.year).count(),
-                'new_grants': models.Grant.objects.filter(start_date__gte=today - timedelta(days=30)).count()
-            }
-        }
-        
+        """Get comprehensive dashboard statistics (materialized; see rnd/stats.py)"""
+        stats = dict(snapshots.values('rnd'))
+        # The snapshot keeps the sum as an exact string; the API renders it as a number
+        stats['total_grant_amount'] = Decimal(stats.get('total_grant_amount') or '0.00')
         return Response(stats)
 
 
@@ -287,38 +261,25 @@ class SearchFilterView(views.APIView):
     permission_classes = [DefaultPermissions]
     
     def get(self, request):
-        """Search across all R&D models"""
-        query = request.query_params.get('q', '')
-        model_type = request.query_params.get('model_type', '')
-        
+        """Ranked search across researchers, projects, publications, patents and datasets"""
+        query = request.query_params.get('q', '').strip()
         if not query:
             return Response({'error': 'Query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        results = {}
+        types = request.query_params.get('types') or request.query_params.get('model_type') or ''
+        kinds = [t.strip() for t in types.split(',') if t.strip()]
+        unknown = sorted(set(kinds) - set(search.KINDS))
+        if unknown:
+            return Response({'error': f'Unknown type(s): {", ".join(unknown)}', 'types': search.KINDS},
+                            status=status.HTTP_400_BAD_REQUEST)
         
-        if not model_type or model_type == 'researcher':
-            researchers = models.Researcher.objects.filter(
-                Q(user__first_name__icontains=query) |
-                Q(user__last_name__icontains=query) |
-                Q(department__icontains=query)
-            )[:10]
-            results['researchers'] = serializers.ResearcherSerializer(researchers, many=True).data
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', 20)), 1), settings.RND_SEARCH_MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not model_type or model_type == 'project':
-            projects = models.Project.objects.filter(
-                Q(title__icontains=query) |
-                Q(abstract__icontains=query)
-            )[:10]
-            results['projects'] = serializers.ProjectSerializer(projects, many=True).data
-        
-        if not model_type or model_type == 'publication':
-            publications = models.Publication.objects.filter(
-                Q(title__icontains=query) |
-                Q(venue__icontains=query)
-            )[:10]
-            results['publications'] = serializers.PublicationSerializer(publications, many=True).data
-        
-        return Response(results)
+        return Response(search.search(query, kinds or None, page=page, page_size=page_size).as_dict())
 
 
 # Bulk Operations View
@@ -326,141 +287,91 @@ class BulkOperationsView(views.APIView):
     permission_classes = [DefaultPermissions]
     
     def post(self, request):
-        """Handle bulk operations"""
+        """Validate and apply a batch of creates, updates or deletes (``mode``: atomic or partial)"""
         operation_type = request.data.get('operation_type')
         model_type = request.data.get('model_type')
         data = request.data.get('data', [])
+        mode = request.data.get('mode', bulk.ATOMIC)
         
         if not all([operation_type, model_type, data]):
             return Response({'error': 'Missing required parameters'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        model_map = {
-            'researcher': models.Researcher,
-            'project': models.Project,
-            'publication': models.Publication,
-            'patent': models.Patent,
-            'dataset': models.Dataset,
-            'collaboration': models.Collaboration
-        }
-        
-        if model_type not in model_map:
+        if model_type not in bulk.MODELS:
             return Response({'error': 'Invalid model type'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        model_class = model_map[model_type]
+        if mode not in bulk.MODES:
+            return Response({'error': f'mode must be one of {", ".join(bulk.MODES)}'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(data, list):
+            return Response({'error': 'data must be a list'}, status=status.HTTP_400_BAD_REQUEST)
         
         if operation_type == 'create':
-            serializer_class = getattr(serializers, f'{model_type.capitalize()}Serializer')
-            created_objects = []
-            
-            for item_data in data:
-                serializer = serializer_class(data=item_data)
-                if serializer.is_valid():
-                    obj = serializer.save()
-                    created_objects.append(obj)
-            
-            return Response({
-                'message': f'Created {len(created_objects)} {model_type}s',
-                'created_count': len(created_objects)
-            })
-        
+            report = bulk.bulk_create(model_type, data, mode)
         elif operation_type == 'update':
-            updated_count = 0
-            for item_data in data:
-                obj_id = item_data.get('id')
-                if obj_id:
-                    try:
-                        obj = model_class.objects.get(id=obj_id)
-                        for field, value in item_data.items():
-                            if field != 'id' and hasattr(obj, field):
-                                setattr(obj, field, value)
-                        obj.save()
-                        updated_count += 1
-                    except model_class.DoesNotExist:
-                        continue
-            
-            return Response({
-                'message': f'Updated {updated_count} {model_type}s',
-                'updated_count': updated_count
-            })
-        
+            report = bulk.bulk_update(model_type, data, mode)
         elif operation_type == 'delete':
-            obj_ids = data
-            deleted_count = 0
-            
-            for obj_id in obj_ids:
-                try:
-                    obj = model_class.objects.get(id=obj_id)
-                    obj.delete()
-                    deleted_count += 1
-                except model_class.DoesNotExist:
-                    continue
-            
-            return Response({
-                'message': f'Deleted {deleted_count} {model_type}s',
-                'deleted_count': deleted_count
-            })
+            report = bulk.bulk_delete(model_type, data, mode)
+        else:
+            return Response({'error': 'Invalid operation type'}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response({'error': 'Invalid operation type'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict(), status=status.HTTP_200_OK if report.committed else status.HTTP_400_BAD_REQUEST)
 
 
 # Import/Export View
 class ImportExportView(views.APIView):
     permission_classes = [DefaultPermissions]
     
+    EXPORT_FORMATS = ('csv', 'xlsx', 'json')
+    
     def post(self, request):
-        """Handle data import/export"""
+        """Import rows (JSON ``data`` or an uploaded CSV ``file``) or stream an export as CSV, XLSX or JSON"""
         operation = request.data.get('operation')
         model_type = request.data.get('model_type')
         format_type = request.data.get('format')
         
         if not all([operation, model_type, format_type]):
             return Response({'error': 'Missing required parameters'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        model_map = {
-            'researcher': models.Researcher,
-            'project': models.Project,
-            'publication': models.Publication,
-            'patent': models.Patent,
-            'dataset': models.Dataset,
-            'collaboration': models.Collaboration
-        }
-        
-        if model_type not in model_map:
+        if model_type not in bulk.MODELS:
             return Response({'error': 'Invalid model type'}, status=status.HTTP_400_BAD_REQUEST)
         
-        model_class = model_map[model_type]
-        
         if operation == 'export':
-            queryset = model_class.objects.all()
-            serializer_class = getattr(serializers, f'{model_type.capitalize()}Serializer')
-            serializer = serializer_class(queryset, many=True)
-            
-            return Response({
-                'message': f'Exported {queryset.count()} {model_type}s',
-                'data': serializer.data,
-                'format': format_type
-            })
+            return self._export(model_type, format_type)
         
         elif operation == 'import':
-            data = request.data.get('data', [])
+            mode = request.data.get('mode', bulk.ATOMIC)
+            if mode not in bulk.MODES:
+                return Response({'error': f'mode must be one of {", ".join(bulk.MODES)}'}, status=status.HTTP_400_BAD_REQUEST)
+            upload = request.FILES.get('file')
+            if upload is not None:
+                data = bulk.rows_from_csv(model_type, upload)
+            else:
+                data = request.data.get('data', [])
             if not data:
                 return Response({'error': 'No data provided for import'}, status=status.HTTP_400_BAD_REQUEST)
             
-            serializer_class = getattr(serializers, f'{model_type.capitalize()}Serializer')
-            imported_count = 0
-            
-            for item_data in data:
-                serializer = serializer_class(data=item_data)
-                if serializer.is_valid():
-                    serializer.save()
-                    imported_count += 1
-            
-            return Response({
-                'message': f'Imported {imported_count} {model_type}s',
-                'imported_count': imported_count
-            })
+            report = bulk.bulk_create(model_type, data, mode, operation='import')
+            return Response(report.as_dict(), status=status.HTTP_200_OK if report.committed else status.HTTP_400_BAD_REQUEST)
         
         return Response({'error': 'Invalid operation'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def _export(self, model_type, format_type):
+        filename = f'rnd-{model_type}s-{timezone.localdate().isoformat()}.{format_type}'
+        if format_type == 'csv':
+            response = StreamingHttpResponse(bulk.stream_csv(model_type), content_type='text/csv')
+        elif format_type == 'json':
+            response = StreamingHttpResponse(bulk.stream_json(model_type), content_type='application/json')
+        elif format_type == 'xlsx':
+            try:
+                out = bulk.xlsx_file(model_type)
+            except ImportError:
+                return Response({'error': 'openpyxl is not installed. Please install it to use Excel export.'},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return FileResponse(
+                out, as_attachment=True, filename=filename,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        else:
+            return Response({'error': f'format must be one of {", ".join(self.EXPORT_FORMATS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 
 # Alert System View
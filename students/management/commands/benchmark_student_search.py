@@ -0,0 +1,99 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from departments.models import Department
+from students import search
+from students.models import AcademicYear, Student, StudentBatch
+
+
+FIRST = [
+    'Aarav', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Deepika', 'Divya', 'Gaurav', 'Ishaan', 'Kavya', 'Krishna',
+    'Lakshmi', 'Manoj', 'Meera', 'Nikhil', 'Pooja', 'Pranav', 'Priya', 'Rahul', 'Ravi', 'Sanjay', 'Shreya',
+    'Siddharth', 'Sneha', 'Suresh', 'Tanvi', 'Varun', 'Vikram', 'Yamini', 'José', 'Zoë', 'Ángel',
+]
+LAST = [
+    'Agarwal', 'Bhat', 'Chopra', 'Das', 'Desai', 'Gupta', 'Iyer', 'Joshi', 'Kapoor', 'Kumar', 'Menon', 'Mehta',
+    'Nair', 'Patel', 'Pillai', 'Rao', 'Reddy', 'Shah', 'Sharma', 'Singh', 'Srinivasan', 'Varma', 'Verma', 'Núñez',
+]
+QUERIES = [
+    ('exact name', 'Priya Sharma'),
+    ('typo', 'Siddarth Srinivasn'),
+    ('accent-free', 'jose nunez'),
+    ('partial word', 'vikr redd'),
+    ('roll prefix', 'BS00042'),
+    ('exact roll', 'BS00042424'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark student search on synthetic students (icontains OR scan vs the trigram/n-gram index)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the best is reported')
+
+    def handle(self, *args, **options):
+        # Everything is rolled back afterwards; deleting 100k students through the ORM cascade takes far longer
+        with transaction.atomic():
+            year = AcademicYear.objects.create(year='2095-2096', start_date=date(2095, 6, 1), end_date=date(2096, 5, 31))
+            self._run(year, options)
+            transaction.set_rollback(True)
+
+    def _timed(self, label, fn, repeat=1):
+        best, result, count = None, None, 0
+        for _ in range(repeat):
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+                t0 = time.perf_counter()
+                result = fn()
+                elapsed = time.perf_counter() - t0
+            best, count = min(best or elapsed, elapsed), len(queries)
+        self.stdout.write(f'{label:40s} {best * 1000:9.1f} ms  {count:4d} queries  -> {result}')
+        return result
+
+    def _run(self, year, options):
+        rng = random.Random(42)
+        batch = self._seed(year)
+        students = []
+        for i in range(options['students']):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            student = Student(
+                roll_number=f'BS{i:08d}', first_name=first, last_name=last, date_of_birth=date(2005, 1, 1),
+                gender='M', student_batch=batch, status='ACTIVE',
+                email=f'{first.lower()}.{last.lower()}{i}@example.com', father_name=f'{rng.choice(FIRST)} {last}',
+            )
+            students.append(student)
+        self._timed(f"bulk insert ({options['students']})", lambda: len(Student.objects.bulk_create(students, batch_size=2000)))
+        ids = [s.pk for s in students]
+        self._timed(f'index ({search.backend()})', lambda: search.index_students(ids))
+
+        queryset = Student.objects.filter(student_batch=batch)
+        for label, query in QUERIES:
+            self._timed(f'icontains: {label}', lambda: len(self._icontains(queryset, query)), options['repeat'])
+            self._timed(f'search: {label}', lambda: len(search.rank(Student.objects.all(), query)), options['repeat'])
+            top = search.rank(Student.objects.all(), query, limit=3)
+            names = dict(Student.objects.filter(pk__in=[pk for pk, _ in top]).values_list('pk', 'search_text'))
+            for pk, score in top:
+                self.stdout.write(f'    {score:.3f}  {names[pk][:60]}')
+
+    def _icontains(self, queryset, query):
+        # What StudentViewSet did before: an unranked OR of substring scans
+        return list(queryset.filter(
+            Q(first_name__icontains=query) | Q(last_name__icontains=query) | Q(roll_number__icontains=query)
+            | Q(email__icontains=query) | Q(father_name__icontains=query) | Q(mother_name__icontains=query)
+        ).values_list('pk', flat=True)[:500])
+
+    def _seed(self, year):
+        department = Department.objects.create(
+            name='Bench Search', short_name='BS', code='BS001', email='bs@example.com', phone='+911234567890',
+            building='B', established_date=date(2000, 1, 1), description='benchmark', max_student_capacity=10**6,
+        )
+        return StudentBatch.objects.create(
+            department=department, academic_year=year, year_of_study='1', section='A',
+            batch_name='BS-1', batch_code='BENCH-BS-1',
+        )
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from students import search
+
+
+class Command(BaseCommand):
+    help = 'Refresh every student\'s normalized search text (and the n-gram index when pg_trgm is not used)'
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        count = search.rebuild()
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} students ({search.backend()}) in {elapsed:.2f}s'))
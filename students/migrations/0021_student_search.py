@@ -0,0 +1,88 @@
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Postgres ranks students with pg_trgm over search_text and serves roll number
+# prefix lookups from an UPPER(roll_number) pattern index; other databases use
+# the StudentSearchGram n-gram index (built by rebuild_student_search_index).
+TRIGRAM_INDEX_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX students_student_search_trgm ON students_student USING gin (search_text gin_trgm_ops);
+CREATE INDEX students_student_roll_prefix ON students_student (UPPER(roll_number) text_pattern_ops);
+"""
+
+DROP_TRIGRAM_INDEX_SQL = """
+DROP INDEX IF EXISTS students_student_search_trgm;
+DROP INDEX IF EXISTS students_student_roll_prefix;
+"""
+
+
+def add_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(TRIGRAM_INDEX_SQL)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGRAM_INDEX_SQL)
+
+
+# Frozen copy of students.search.document_text as of this migration, so later
+# changes to the live search code do not change what this migration writes
+NON_WORD_RE = re.compile(r'[^0-9a-z]+')
+
+
+def document_text(student):
+    email = (student.email or '').split('@')[0]
+    parts = [
+        student.first_name, student.middle_name, student.last_name, student.roll_number,
+        email, student.father_name, student.mother_name,
+    ]
+    text = unicodedata.normalize('NFKD', ' '.join(p for p in parts if p))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return NON_WORD_RE.sub(' ', text).strip()
+
+
+def fill_search_text(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+    students = Student.objects.using(schema_editor.connection.alias).order_by('pk')
+    last_pk = None
+    while True:
+        chunk = list((students.filter(pk__gt=last_pk) if last_pk is not None else students)[:1000])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        for student in chunk:
+            student.search_text = document_text(student)
+        Student.objects.using(schema_editor.connection.alias).bulk_update(chunk, ['search_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0020_merge_0002_initial_0019_add_missing_fields_to_caste'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.CreateModel(
+            name='StudentSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to='students.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['gram', 'student'], name='idx_student_search_gram')],
+            },
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(add_trigram_index, drop_trigram_index),
+    ]
@@ -346,6 +346,9 @@ class Student(TimeStampedUUIDModel):
         blank=True, 
         related_name='updated_students'
     )
+
+    # Normalized names, email and roll number read by students.search; maintained by save()
+    search_text = models.TextField(blank=True, default='', editable=False)
     
     class Meta:
         ordering = ['last_name', 'first_name']
@@ -360,6 +363,19 @@ class Student(TimeStampedUUIDModel):
         
     def __str__(self):
         return f"{self.roll_number} - {self.first_name} {self.last_name}"
+
+    def save(self, *args, **kwargs):
+        from .search import SOURCE_FIELDS, document_text
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(SOURCE_FIELDS):
+            text = document_text(self)
+            # Read by students.signals to refresh the n-gram index only when the text changed
+            self._search_text_changed = text != self.__dict__.get('search_text')
+            self.search_text = text
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
     
     @property
     def full_name(self):
@@ -564,7 +580,8 @@ class StudentBatch(models.Model):
             status='ACTIVE'
         ).count()
         self.current_count = count
-        self.save(update_fields=['current_count'])
+        # Not save(): the batch post_save receiver calls this method again
+        StudentBatch.objects.filter(pk=self.pk).update(current_count=count)
 
 
 class StudentContact(TimeStampedUUIDModel):
@@ -1237,3 +1254,18 @@ class StudentFeedback(TimeStampedUUIDModel):
         if self.resolved_date and self.created_at:
             return self.resolved_date - self.created_at
         return None
+
+
+class StudentSearchGram(models.Model):
+    """One trigram of a student's ``search_text``: the n-gram index used by students.search
+    where pg_trgm is not available."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='search_grams')
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['gram', 'student'], name='idx_student_search_gram'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id}: {self.gram!r}"
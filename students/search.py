@@ -0,0 +1,297 @@
+"""Ranked, typo-tolerant student search.
+
+Every student carries ``search_text``: the names, roll number, email
+local part and parent names, accent-stripped, lowercased and reduced to
+words. ``Student.save()`` keeps it current; ``bulk_create`` and queryset
+``update()`` bypass that, so ``rebuild_student_search_index`` refreshes it
+(and the n-gram index) afterwards. Two backends rank against it:
+
+* ``trigram`` (Postgres) uses pg_trgm: ``word_similarity`` as the score and
+  the ``<%`` operator, served by a GIN ``gin_trgm_ops`` index (migration
+  0021, Postgres only), to find candidates;
+* ``ngram`` (sqlite and anything else) keeps a ``StudentSearchGram`` row
+  per (student, trigram) to find the students sharing the most trigrams
+  with the query, then scores those candidates in Python the same way.
+
+Queries that look like a roll number (one token with a digit) resolve as a
+case-insensitive roll number prefix, the exact roll number first, and
+return every match; only when no roll number starts with them are they
+matched like names. Name matching ranks at most
+``STUDENTS_SEARCH_MAX_RESULTS`` students, and ``search`` reports when that
+cap cut the results short. Scores are between 0 and 1.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import BooleanField, Case, Count, FloatField, Value, When
+from django.db.models.functions import Cast, Length, Round
+from django.db.models.expressions import RawSQL
+
+from .models import Student, StudentSearchGram
+
+
+SOURCE_FIELDS = ('first_name', 'middle_name', 'last_name', 'roll_number', 'email', 'father_name', 'mother_name')
+CANDIDATE_FACTOR = 4
+POSITION_PENALTY = 0.002
+
+_NON_WORD_RE = re.compile(r'[^0-9a-z]+')
+_ROLL_RE = re.compile(r'[0-9A-Za-z/-]*[0-9][0-9A-Za-z/-]*')
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII words: accents stripped, punctuation collapsed to single spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def document_text(student) -> str:
+    email = (student.email or '').split('@')[0]
+    parts = [
+        student.first_name, student.middle_name, student.last_name, student.roll_number,
+        email, student.father_name, student.mother_name,
+    ]
+    return normalize(' '.join(p for p in parts if p))
+
+
+@lru_cache(maxsize=65536)
+def trigrams(word: str) -> FrozenSet[str]:
+    """pg_trgm's trigrams of one word: padded with two spaces in front and one behind."""
+    padded = f'  {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def grams(text: str) -> Set[str]:
+    return set().union(*(trigrams(word) for word in text.split()))
+
+
+def backend() -> str:
+    configured = getattr(settings, 'STUDENTS_SEARCH_BACKEND', 'auto')
+    if configured == 'auto':
+        return 'trigram' if connections[DEFAULT_DB_ALIAS].vendor == 'postgresql' else 'ngram'
+    return configured
+
+
+def _word_score(word: str, word_grams: FrozenSet[str], candidate: str) -> float:
+    if candidate == word:
+        return 1.0
+    other = trigrams(candidate)
+    score = len(word_grams & other) / len(word_grams | other)
+    # Typing into a search box: a word's beginning counts by how much of it was typed
+    if len(word) > 1 and candidate.startswith(word):
+        score = max(score, len(word) / len(candidate))
+    return score
+
+
+def similarity(query: str, text: str) -> float:
+    """How well ``text`` matches ``query`` (both normalized): each query word's best
+    trigram similarity against a word of ``text``, averaged over the query words.
+
+    The student's own name comes first in ``search_text``, so matches further
+    along (parent names) lose ``POSITION_PENALTY`` per word of distance.
+    """
+    words = query.split()
+    candidates = list(dict.fromkeys(text.split()))
+    if not words or not candidates:
+        return 0.0
+    total = position = 0.0
+    for word in words:
+        word_grams = trigrams(word)
+        score, at = max((_word_score(word, word_grams, c), -i) for i, c in enumerate(candidates))
+        total += score
+        position -= at
+    distance = max(0.0, (position - len(words) * (len(words) - 1) / 2) / len(words))
+    return max(0.0, total / len(words) - POSITION_PENALTY * distance)
+
+
+def roll_score(query: str, roll_number: str) -> float:
+    if roll_number.upper() == query.upper():
+        return 1.0
+    return 0.6 + 0.4 * len(query) / len(roll_number)
+
+
+# --- indexing ----------------------------------------------------------------
+
+def _executemany(sql: str, rows: List[Tuple]) -> None:
+    # Index rows go in through plain executemany: building a model instance per
+    # trigram and compiling bulk_create/bulk_update SQL costs far more than the writes
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _db_pk(pk):
+    return Student._meta.pk.get_db_prep_value(pk, connections[DEFAULT_DB_ALIAS])
+
+
+def write_grams(students) -> None:
+    """Replace the n-gram postings of ``students`` with those of their current ``search_text``."""
+    quote = connections[DEFAULT_DB_ALIAS].ops.quote_name
+    StudentSearchGram.objects.filter(student_id__in=[s.pk for s in students]).delete()
+    _executemany(
+        f"INSERT INTO {quote(StudentSearchGram._meta.db_table)} ({quote('student_id')}, {quote('gram')}) VALUES (%s, %s)",
+        [(pk, g) for pk, text in ((_db_pk(s.pk), s.search_text) for s in students) for g in grams(text)],
+    )
+
+
+def _batches(ids: Optional[Iterable], batch_size: int):
+    students = Student.objects.order_by('pk').only(*SOURCE_FIELDS, 'search_text')
+    if ids is not None:
+        # A slice of ids per query; filtering every page by the full id list grows with its square
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            yield list(students.filter(pk__in=ids[start:start + batch_size]))
+        return
+    last_pk = None
+    while True:
+        chunk = list((students.filter(pk__gt=last_pk) if last_pk is not None else students)[:batch_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1].pk
+        yield chunk
+
+
+def index_students(ids: Optional[Iterable] = None, batch_size: int = 1000) -> int:
+    """Refresh ``search_text`` (and the n-gram index, when used) for ``ids`` (default: all)."""
+    ngram = backend() == 'ngram'
+    indexed = 0
+    with transaction.atomic():
+        for chunk in _batches(ids, batch_size):
+            changed = []
+            for student in chunk:
+                text = document_text(student)
+                if text != student.search_text:
+                    student.search_text = text
+                    changed.append(student)
+            if changed:
+                quote = connections[DEFAULT_DB_ALIAS].ops.quote_name
+                _executemany(
+                    f"UPDATE {quote(Student._meta.db_table)} SET {quote('search_text')} = %s WHERE {quote(Student._meta.pk.column)} = %s",
+                    [(student.search_text, _db_pk(student.pk)) for student in changed],
+                )
+            if ngram:
+                write_grams(chunk)
+            indexed += len(chunk)
+    return indexed
+
+
+def rebuild() -> int:
+    if backend() != 'ngram':
+        StudentSearchGram.objects.all().delete()
+    return index_students()
+
+
+# --- querying ----------------------------------------------------------------
+
+def _column(queryset) -> str:
+    quote = connections[queryset.db].ops.quote_name
+    return f'{quote(Student._meta.db_table)}.{quote("search_text")}'
+
+
+def _trigram_matches(queryset, text: str, limit: int) -> List[Tuple]:
+    column = _column(queryset)
+    with transaction.atomic(using=queryset.db):
+        with connections[queryset.db].cursor() as cursor:
+            # <% matches above this threshold; set per transaction so it only affects this query
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(settings.STUDENTS_SEARCH_MIN_SIMILARITY)],
+            )
+        return list(
+            queryset.filter(RawSQL(f'%s <%% {column}', [text], output_field=BooleanField()))
+            .annotate(search_score=RawSQL(f'word_similarity(%s, {column})', [text], output_field=FloatField()))
+            .order_by('-search_score').values_list('pk', 'search_score')[:limit]
+        )
+
+
+def _ngram_matches(queryset, text: str, limit: int) -> List[Tuple]:
+    postings = StudentSearchGram.objects.filter(gram__in=grams(text))
+    if queryset.query.where:
+        postings = postings.filter(student__in=queryset.values('pk'))
+    candidates = (
+        postings.values('student_id').annotate(shared=Count('id'))
+        .order_by('-shared').values_list('student_id', flat=True)[:limit * CANDIDATE_FACTOR]
+    )
+    threshold = settings.STUDENTS_SEARCH_MIN_SIMILARITY
+    scored = []
+    for pk, search_text in Student.objects.filter(pk__in=list(candidates)).values_list('pk', 'search_text'):
+        score = similarity(text, search_text)
+        if score >= threshold:
+            scored.append((pk, score))
+    scored.sort(key=lambda row: -row[1])
+    return scored[:limit]
+
+
+def _roll_prefix(queryset, query: str):
+    # Roll numbers are not stored in one case, so the match must ignore it: on Postgres
+    # this is served by the UPPER(roll_number) text_pattern_ops index, elsewhere by LIKE
+    return queryset.filter(roll_number__istartswith=query)
+
+
+def _roll_score_expression(query: str):
+    """``roll_score`` in SQL, so a prefix matching thousands of students is ranked by the database."""
+    partial = Value(0.6) + Value(0.4 * len(query)) / Cast(Length('roll_number'), FloatField())
+    return Round(Case(When(roll_number__iexact=query, then=Value(1.0)), default=partial, output_field=FloatField()), 4)
+
+
+def _fuzzy_matches(queryset, text: str, limit: int) -> List[Tuple]:
+    matches = _trigram_matches if backend() == 'trigram' else _ngram_matches
+    return matches(queryset, text, limit)
+
+
+def rank(queryset, query: str, limit: Optional[int] = None) -> List[Tuple]:
+    """(pk, score) of the students in ``queryset`` matching ``query``, best first.
+
+    Roll number prefixes return every match unless ``limit`` is given; name
+    matches are capped at ``limit`` (default ``STUDENTS_SEARCH_MAX_RESULTS``).
+    """
+    query = query.strip()
+    text = normalize(query)
+    if not text:
+        return []
+    if _ROLL_RE.fullmatch(query):
+        # Roll numbers resolve by prefix; similar-looking ones only when none starts with the query
+        rows = _roll_prefix(queryset, query).order_by('roll_number').values_list('pk', 'roll_number')
+        ranked = [(pk, roll_score(query, roll_number)) for pk, roll_number in (rows[:limit] if limit else rows)]
+        if ranked:
+            return sorted(ranked, key=lambda row: -row[1])
+    return _fuzzy_matches(queryset, text, limit or settings.STUDENTS_SEARCH_MAX_RESULTS)
+
+
+def search(queryset, query: str) -> Tuple[object, bool]:
+    """(``queryset`` narrowed to the students matching ``query``, annotated with
+    ``search_score`` and ordered by it; whether name matches were cut off at
+    ``STUDENTS_SEARCH_MAX_RESULTS``)."""
+    query = query.strip()
+    text = normalize(query)
+    if not text:
+        return queryset.none(), False
+    if _ROLL_RE.fullmatch(query):
+        matches = _roll_prefix(queryset, query)
+        if matches.exists():
+            return matches.annotate(search_score=_roll_score_expression(query)).order_by('-search_score', 'roll_number'), False
+    cap = settings.STUDENTS_SEARCH_MAX_RESULTS
+    # One past the cap tells a full result from a truncated one
+    ranked = _fuzzy_matches(queryset, text, cap + 1)
+    truncated = len(ranked) > cap
+    ranked = ranked[:cap]
+    if not ranked:
+        return queryset.none(), False
+    score = Case(
+        *[When(pk=pk, then=Value(round(s, 4))) for pk, s in ranked], default=Value(0.0), output_field=FloatField(),
+    )
+    return (
+        queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(search_score=score)
+        .order_by('-search_score', 'last_name', 'first_name')
+    ), truncated
+
+
+def filter_queryset(queryset, query: str):
+    """The queryset half of ``search``."""
+    return search(queryset, query)[0]
@@ -102,14 +102,19 @@ class StudentListSerializer(serializers.ModelSerializer):
     """Simplified serializer for listing students"""
     full_name = serializers.ReadOnlyField()
     age = serializers.ReadOnlyField()
+    relevance = serializers.SerializerMethodField()
     
     class Meta:
         model = Student
         fields = [
             'id', 'roll_number', 'full_name', 'age', 'gender', 'email',
-            'student_batch', 'status', 'enrollment_date', 'created_at'
+            'student_batch', 'status', 'enrollment_date', 'created_at', 'relevance'
         ]
 
+    def get_relevance(self, obj):
+        """Search score (0-1) when the list was searched, else None"""
+        return getattr(obj, 'search_score', None)
+
 
 class StudentEnrollmentHistorySerializer(serializers.ModelSerializer):
     """Serializer for Student Enrollment History"""
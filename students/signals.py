@@ -5,6 +5,7 @@ from django.utils import timezone
 from django.db import connection, DatabaseError
 import uuid as _uuid
 
+from . import search
 from .models import Student, StudentEnrollmentHistory
 from accounts.models import AuthIdentifier, IdentifierType, UserSession
 
@@ -193,3 +194,14 @@ def ensure_enrollment_history_on_batch_assignment(sender, instance: Student, cre
         status='ACTIVE',
     )
 
+
+@receiver(post_save, sender=Student)
+def reindex_student_search_grams(sender, instance: Student, raw=False, **kwargs):
+    """Rewrite the student's n-gram postings when save() changed its search text.
+
+    Done in the saving transaction: the postings depend on nothing but the row itself.
+    """
+    if raw or not getattr(instance, '_search_text_changed', False) or search.backend() != 'ngram':
+        return
+    instance._search_text_changed = False
+    search.write_grams([instance])
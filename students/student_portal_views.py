@@ -27,7 +27,7 @@ from .student_portal_permissions import (
     CanAccessRepresentedStudents, CanHandleFeedback,
     IsAPUniversityStudent, CanAccessClassData, CanAccessDepartmentData
 )
-from accounts.views import record_session
+from students.signals import record_session
 
 User = get_user_model()
 
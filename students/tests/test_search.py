@@ -0,0 +1,115 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from attendance.factories import StudentFactory
+from students import search
+from students.models import Student, StudentSearchGram
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def students():
+    priya = StudentFactory(
+        first_name='Priya', last_name='Sharma', roll_number='21BQ1A0501', email='priya.s@example.com',
+        father_name='Ramesh Sharma',
+    )
+    rahul = StudentFactory(first_name='Rahul', last_name='Sharma', roll_number='21BQ1A0502', email='rahul@example.com')
+    jose = StudentFactory(first_name='José', last_name='Núñez', roll_number='21BQ1A0511', email='jn@example.com')
+    verma = StudentFactory(first_name='Priyanka', last_name='Verma', roll_number='22BQ1A0501', email='pv@example.com')
+    return priya, rahul, jose, verma
+
+
+def _ranked(query, queryset=None):
+    return [pk for pk, _ in search.rank(queryset or Student.objects.all(), query)]
+
+
+def test_search_text_is_normalized_and_kept_current(students):
+    priya, rahul, jose, verma = students
+    assert jose.search_text == 'jose nunez 21bq1a0511 jn'
+    assert priya.search_text == 'priya sharma 21bq1a0501 priya s ramesh sharma'
+    assert StudentSearchGram.objects.filter(student=jose, gram='nun').exists()
+
+    jose.last_name = 'Ortega'
+    jose.save(update_fields=['last_name'])
+    assert Student.objects.get(pk=jose.pk).search_text == 'jose ortega 21bq1a0511 jn'
+    assert not StudentSearchGram.objects.filter(student=jose, gram='nun').exists()
+    assert _ranked('ortega') == [jose.pk]
+
+
+def test_typo_tolerant_ranking(students):
+    priya, rahul, jose, verma = students
+    assert set(_ranked('sharma')) == {priya.pk, rahul.pk}
+    assert _ranked('prya sharma')[0] == priya.pk
+    assert _ranked('Jose Nunez') == [jose.pk]
+    assert _ranked('priy')[:2] == [priya.pk, verma.pk]
+    # The same name as a parent's ranks below the student's own
+    father = StudentFactory(first_name='Ramesh', last_name='Sharma', roll_number='20BQ1A0501', email='rs@example.com')
+    assert _ranked('ramesh sharma')[:2] == [father.pk, priya.pk]
+    assert _ranked('zzzz') == []
+    ranked = search.rank(Student.objects.all(), 'priya sharma')
+    assert ranked[0] == (priya.pk, 1.0)
+    assert all(0 < score <= 1 for _, score in ranked)
+
+
+def test_roll_number_prefix_lookup(students):
+    priya, rahul, jose, verma = students
+    assert set(_ranked('21bq1a050')) == {priya.pk, rahul.pk}
+    assert _ranked('21BQ1A0511') == [jose.pk]
+    # Nothing starts with it: similar roll numbers instead
+    assert _ranked('21BQ1A0599')[0] in {priya.pk, rahul.pk, jose.pk}
+    assert _ranked('21BQ1A05', Student.objects.filter(first_name='Rahul')) == [rahul.pk]
+    assert search.rank(Student.objects.all(), '22BQ1A0501') == [(verma.pk, 1.0)]
+    assert [pk for pk, _ in search.rank(Student.objects.all(), '21BQ1A')] == [priya.pk, rahul.pk, jose.pk]
+
+
+
+def test_roll_number_prefix_ignores_case(students):
+    lower = StudentFactory(first_name='Kiran', last_name='Rao', roll_number='cs21a001', email='kr@example.com')
+    upper = StudentFactory(first_name='Meena', last_name='Iyer', roll_number='CS21A002', email='mi@example.com')
+    for query in ('cs21a', 'CS21A', 'Cs21A'):
+        assert set(_ranked(query)) == {lower.pk, upper.pk}
+    assert search.rank(Student.objects.all(), 'CS21A001') == [(lower.pk, 1.0)]
+
+def test_rebuild_indexes_bulk_created_students(students):
+    priya = students[0]
+    Student.objects.bulk_create([Student(
+        roll_number='23BQ1A0001', first_name='Anjali', last_name='Rao', date_of_birth=priya.date_of_birth,
+        gender='F', student_batch=priya.student_batch,
+    )])
+    assert _ranked('anjali') == []
+    assert search.rebuild() == 5
+    assert _ranked('anjali') == [Student.objects.get(roll_number='23BQ1A0001').pk]
+
+
+def test_api_list_is_ranked_with_relevance(students, django_user_model):
+    priya, rahul, jose, verma = students
+    client = APIClient()
+    client.force_authenticate(django_user_model.objects.create_user(email='ad@example.com', username='ad', password='p'))
+    url = reverse('students:student-list')
+
+    page = client.get(url, {'search': 'priya sharma'}).json()
+    assert page['count'] == 3
+    results = page['results']
+    assert results[0]['id'] == str(priya.pk) and results[0]['relevance'] == 1.0
+    assert [r['relevance'] for r in results] == sorted((r['relevance'] for r in results), reverse=True)
+    assert str(jose.pk) not in {r['id'] for r in results}
+
+    assert client.get(url, {'search': 'sharma', 'status': 'INACTIVE'}).json()['count'] == 0
+
+
+def test_only_name_matches_are_capped(students, django_user_model, settings):
+    settings.STUDENTS_SEARCH_MAX_RESULTS = 1
+    client = APIClient()
+    client.force_authenticate(django_user_model.objects.create_user(email='ad@example.com', username='ad', password='p'))
+    url = reverse('students:student-list')
+
+    page = client.get(url, {'search': 'sharma'}).json()
+    assert (page['count'], page['truncated']) == (1, True)
+    # A roll number prefix returns every student it matches
+    page = client.get(url, {'search': '21'}).json()
+    assert (page['count'], page['truncated']) == (3, False)
+    assert [r['relevance'] for r in page['results']] == [0.68] * 3
+    assert client.get(url, {'search': '21BQ1A0511'}).json()['results'][0]['relevance'] == 1.0
@@ -1,12 +1,13 @@
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Q
 from django.utils import timezone
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth import get_user_model
 
+from . import search as student_search
 from .models import (
     Student, StudentEnrollmentHistory, StudentDocument, CustomField, 
     StudentCustomFieldValue, StudentBatch, BulkAssignment
@@ -22,6 +23,25 @@ from .serializers import (
 User = get_user_model()
 
 
+class StudentSearchPagination(PageNumberPagination):
+    """Pages of ranked search results (cursor pagination would re-sort them by created_at).
+
+    ``truncated`` is true when name matching stopped at STUDENTS_SEARCH_MAX_RESULTS.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    truncated = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.truncated = getattr(view, 'search_truncated', False)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['truncated'] = self.truncated
+        return response
+
+
 class StudentViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing students
@@ -44,6 +64,13 @@ class StudentViewSet(viewsets.ModelViewSet):
         elif self.action == 'retrieve':
             return StudentDetailSerializer
         return StudentSerializer
+
+    @property
+    def paginator(self):
+        """Searches are paged by number so results stay in relevance order"""
+        if self.request.query_params.get('search') and not hasattr(self, '_paginator'):
+            self._paginator = StudentSearchPagination()
+        return super().paginator
     
     def get_queryset(self):
         """Filter queryset based on query parameters"""
@@ -51,18 +78,6 @@ class StudentViewSet(viewsets.ModelViewSet):
             'student_batch__department', 'student_batch__academic_program', 'student_batch__academic_year'
         )
         
-        # Search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(roll_number__icontains=search) |
-                Q(email__icontains=search) |
-                Q(father_name__icontains=search) |
-                Q(mother_name__icontains=search)
-            )
-        
         # Filter by status
         status_filter = self.request.query_params.get('status', None)
         if status_filter:
@@ -112,6 +127,12 @@ class StudentViewSet(viewsets.ModelViewSet):
         department_filter = self.request.query_params.get('department', None)
         if department_filter:
             queryset = queryset.filter(student_batch__department=department_filter)
+
+        # Search last, so ranking only considers students that pass the filters above
+        query = self.request.query_params.get('search', None)
+        if query:
+            queryset, self.search_truncated = student_search.search(queryset, query)
+            return queryset
         
         return queryset.order_by('last_name', 'first_name')
     
@@ -1060,12 +1081,7 @@ def student_list_view(request):
     # Handle search
     search_query = request.GET.get('search', '')
     if search_query:
-        students = students.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(roll_number__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        students = student_search.filter_queryset(Student.objects.all(), search_query)
     
     context = {
         'students': students,
@@ -29,6 +29,10 @@ MIGRATION_MODULES = DisableMigrations()
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
 
+# Write audit rows synchronously so tests see them immediately
+AUDIT_BUFFER_ENABLED = False
+LOGIN_SESSION_BUFFER_ENABLED = False
+
 # Disable cache for tests
 CACHES = {
     'default': {
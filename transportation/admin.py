@@ -1,8 +1,8 @@
 from django.contrib import admin, messages
 from django import forms
-from django.db import transaction
 from django.utils import timezone
 from .models import Vehicle, Driver, Route, Stop, RouteStop, VehicleAssignment, TripSchedule, TransportPass
+from .issuance import CREATED, NO_USER, faculty_cohort, issue_passes, student_cohort
 from departments.models import Department
 from students.models import Student, StudentBatch
 from faculty.models import Faculty
@@ -59,9 +59,21 @@ class TripScheduleAdmin(admin.ModelAdmin):
     list_filter = ("day_of_week",)
 
 
+PASS_FIELDS = (
+    "route", "start_stop", "end_stop", "valid_from", "valid_to", "price", "is_active", "skip_if_active_pass_exists",
+)
+
+
+def _summary(report):
+    """(created, skipped, errors) counts for the admin messages."""
+    created = report.count(CREATED)
+    errors = report.count(NO_USER)
+    return created, len(report.outcomes) - created - errors, errors
+
+
 @admin.register(TransportPass)
 class TransportPassAdmin(admin.ModelAdmin):
-    list_display = ("user", "route", "start_stop", "end_stop", "valid_from", "valid_to", "price", "is_active")
+    list_display = ("user", "route", "assignment", "start_stop", "end_stop", "valid_from", "valid_to", "price", "is_active")
     list_filter = ("is_active", "route")
     search_fields = ("user__username", "user__email")
 
@@ -126,50 +138,12 @@ class TransportPassAdmin(admin.ModelAdmin):
             messages.error(request, "Please provide all required fields for student bulk assignment.")
             return
 
-        # Resolve cohort
-        batches = StudentBatch.objects.filter(
-            department=department,
-            academic_year_id=academic_year_id,
-            year_of_study=year_of_study,
-            section=section,
-            is_active=True,
-        ).values_list("id", flat=True)
-
-        students = Student.objects.select_related("user").filter(
-            student_batch_id__in=list(batches),
-            status="ACTIVE",
-        ).only("id", "user_id")
-
-        created = 0
-        skipped = 0
-        errors = 0
-
-        with transaction.atomic():
-            for s in students:
-                if not s.user_id:
-                    errors += 1
-                    continue
-                if skip and TransportPass.objects.filter(
-                    user_id=s.user_id,
-                    route=route,
-                    is_active=True,
-                    valid_to__gte=timezone.now().date(),
-                ).exists():
-                    skipped += 1
-                    continue
-
-                TransportPass.objects.create(
-                    user_id=s.user_id,
-                    route=route,
-                    start_stop=start_stop,
-                    end_stop=end_stop,
-                    pass_type="STUDENT",
-                    valid_from=valid_from,
-                    valid_to=valid_to,
-                    price=price,
-                    is_active=is_active,
-                )
-                created += 1
+        cohort = student_cohort(department.pk, academic_year_id, year_of_study, section)
+        report = issue_passes(
+            cohort, "student_id", route=route, start_stop=start_stop, end_stop=end_stop, pass_type="STUDENT",
+            valid_from=valid_from, valid_to=valid_to, price=price, is_active=is_active, skip_if_active_pass_exists=skip,
+        )
+        created, skipped, errors = _summary(report)
 
         messages.success(request, f"Student passes created: {created}, skipped: {skipped}, errors: {errors}")
 
@@ -196,44 +170,12 @@ class TransportPassAdmin(admin.ModelAdmin):
             messages.error(request, "Please provide all required fields for faculty bulk assignment.")
             return
 
-        faculty_qs = Faculty.objects.select_related("user", "department_ref").filter(
-            status="ACTIVE",
-            currently_associated=True,
+        report = issue_passes(
+            faculty_cohort(department.pk), "faculty_id", route=route, start_stop=start_stop, end_stop=end_stop,
+            pass_type="STAFF", valid_from=valid_from, valid_to=valid_to, price=price, is_active=is_active,
+            skip_if_active_pass_exists=skip,
         )
-
-        created = 0
-        skipped = 0
-        errors = 0
-
-        with transaction.atomic():
-            for f in faculty_qs:
-                # Match department via FK reference
-                if f.department_ref_id != department.id:
-                    continue
-                if not f.user_id:
-                    errors += 1
-                    continue
-                if skip and TransportPass.objects.filter(
-                    user_id=f.user_id,
-                    route=route,
-                    is_active=True,
-                    valid_to__gte=timezone.now().date(),
-                ).exists():
-                    skipped += 1
-                    continue
-
-                TransportPass.objects.create(
-                    user_id=f.user_id,
-                    route=route,
-                    start_stop=start_stop,
-                    end_stop=end_stop,
-                    pass_type="STAFF",
-                    valid_from=valid_from,
-                    valid_to=valid_to,
-                    price=price,
-                    is_active=is_active,
-                )
-                created += 1
+        created, skipped, errors = _summary(report)
 
         messages.success(request, f"Faculty passes created: {created}, skipped: {skipped}, errors: {errors}")
 
@@ -294,39 +236,12 @@ class TransportPassAdmin(admin.ModelAdmin):
                 messages.error(request, 'Please select at least one student.')
             else:
                 pd = pass_form.cleaned_data
-                created = 0
-                skipped = 0
-                errors = 0
-                with transaction.atomic():
-                    for sid in selected_ids:
-                        try:
-                            s = Student.objects.select_related('user').only('id', 'user_id').get(id=sid)
-                        except Student.DoesNotExist:
-                            errors += 1
-                            continue
-                        if not s.user_id:
-                            errors += 1
-                            continue
-                        if pd['skip_if_active_pass_exists'] and TransportPass.objects.filter(
-                            user_id=s.user_id,
-                            route=pd['route'],
-                            is_active=True,
-                            valid_to__gte=timezone.now().date(),
-                        ).exists():
-                            skipped += 1
-                            continue
-                        TransportPass.objects.create(
-                            user_id=s.user_id,
-                            route=pd['route'],
-                            start_stop=pd['start_stop'],
-                            end_stop=pd['end_stop'],
-                            pass_type='STUDENT',
-                            valid_from=pd['valid_from'],
-                            valid_to=pd['valid_to'],
-                            price=pd['price'],
-                            is_active=pd['is_active'],
-                        )
-                        created += 1
+                report = issue_passes(
+                    Student.objects.filter(id__in=selected_ids), 'student_id', pass_type='STUDENT',
+                    **{name: pd[name] for name in PASS_FIELDS},
+                )
+                created, skipped, errors = _summary(report)
+                errors += len(set(selected_ids)) - len(report.outcomes)  # unknown ids
                 messages.success(request, f"Student passes created: {created}, skipped: {skipped}, errors: {errors}")
                 return redirect('admin:transport_pass_assign_students')
 
@@ -358,39 +273,12 @@ class TransportPassAdmin(admin.ModelAdmin):
                 messages.error(request, 'Please select at least one faculty member.')
             else:
                 pd = pass_form.cleaned_data
-                created = 0
-                skipped = 0
-                errors = 0
-                with transaction.atomic():
-                    for fid in selected_ids:
-                        try:
-                            f = Faculty.objects.select_related('user').only('id', 'user_id').get(id=fid)
-                        except Faculty.DoesNotExist:
-                            errors += 1
-                            continue
-                        if not f.user_id:
-                            errors += 1
-                            continue
-                        if pd['skip_if_active_pass_exists'] and TransportPass.objects.filter(
-                            user_id=f.user_id,
-                            route=pd['route'],
-                            is_active=True,
-                            valid_to__gte=timezone.now().date(),
-                        ).exists():
-                            skipped += 1
-                            continue
-                        TransportPass.objects.create(
-                            user_id=f.user_id,
-                            route=pd['route'],
-                            start_stop=pd['start_stop'],
-                            end_stop=pd['end_stop'],
-                            pass_type='STAFF',
-                            valid_from=pd['valid_from'],
-                            valid_to=pd['valid_to'],
-                            price=pd['price'],
-                            is_active=pd['is_active'],
-                        )
-                        created += 1
+                report = issue_passes(
+                    Faculty.objects.filter(id__in=selected_ids), 'faculty_id', pass_type='STAFF',
+                    **{name: pd[name] for name in PASS_FIELDS},
+                )
+                created, skipped, errors = _summary(report)
+                errors += len(set(selected_ids)) - len(report.outcomes)  # unknown ids
                 messages.success(request, f"Faculty passes created: {created}, skipped: {skipped}, errors: {errors}")
                 return redirect('admin:transport_pass_assign_faculty')
 
@@ -0,0 +1,148 @@
+"""Set-based transport pass issuance.
+
+A bulk request resolves its cohort with one query, finds the members that
+already hold an active pass on the route with one more (a subquery over the
+same cohort, so no id list is shipped back to the database) and inserts the
+new passes with ``bulk_create``. The query count does not grow with the
+cohort, apart from one INSERT per ``batch_size`` rows.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from faculty.models import Faculty
+from students.models import Student
+
+from .models import Route, TransportPass
+
+
+CREATED = "created"
+ACTIVE_PASS_EXISTS = "active_pass_exists"
+NO_USER = "no_linked_user"
+DUPLICATE_USER = "duplicate_user"
+
+
+@dataclass
+class PassOutcome:
+    subject_id: str
+    user_id: Optional[int]
+    status: str
+    pass_id: Optional[int] = None
+
+    def as_dict(self, subject_key: str) -> dict:
+        return {subject_key: self.subject_id, "user_id": self.user_id, "status": self.status, "pass_id": self.pass_id}
+
+
+@dataclass
+class IssueReport:
+    subject_key: str
+    outcomes: List[PassOutcome] = field(default_factory=list)
+
+    def count(self, status: str) -> int:
+        return sum(1 for o in self.outcomes if o.status == status)
+
+    def as_dict(self) -> dict:
+        created = self.count(CREATED)
+        return {
+            "ok": True,
+            "created": created,
+            "skipped": len(self.outcomes) - created,
+            # Kept for existing clients: cohort members that could not be issued a pass
+            "errors": [
+                {self.subject_key: o.subject_id, "reason": "No linked auth user"}
+                for o in self.outcomes if o.status == NO_USER
+            ],
+            "total_targeted": len(self.outcomes),
+            "results": [o.as_dict(self.subject_key) for o in self.outcomes],
+        }
+
+
+def student_cohort(department_id, academic_year_id, year_of_study, section):
+    return Student.objects.filter(
+        student_batch__department_id=department_id,
+        student_batch__academic_year_id=academic_year_id,
+        student_batch__year_of_study=year_of_study,
+        student_batch__section=section,
+        student_batch__is_active=True,
+        status="ACTIVE",
+    )
+
+
+def faculty_cohort(department_id):
+    return Faculty.objects.filter(status="ACTIVE", currently_associated=True, department_ref_id=department_id)
+
+
+def issue_passes(
+    cohort,
+    subject_key: str,
+    *,
+    route: Route,
+    start_stop,
+    end_stop,
+    pass_type: str,
+    valid_to,
+    price,
+    valid_from=None,
+    is_active: bool = True,
+    skip_if_active_pass_exists: bool = True,
+    batch_size: int = 1000,
+) -> IssueReport:
+    """Issue one pass per cohort member (a Student or Faculty queryset)."""
+    report = IssueReport(subject_key)
+    valid_from = valid_from or timezone.localdate()
+    with transaction.atomic():
+        # Serialize concurrent bulk issues for the same route
+        list(Route.objects.select_for_update().filter(pk=route.pk).values_list("pk", flat=True))
+        members = list(cohort.order_by("pk").values_list("pk", "user_id"))
+
+        holders = set()
+        if skip_if_active_pass_exists:
+            holders = set(
+                TransportPass.objects.filter(
+                    route=route,
+                    is_active=True,
+                    valid_to__gte=timezone.localdate(),
+                    user_id__in=cohort.exclude(user_id=None).values("user_id"),
+                ).values_list("user_id", flat=True)
+            )
+
+        seen = set()
+        pending: Dict[int, PassOutcome] = {}
+        for pk, user_id in members:
+            outcome = PassOutcome(str(pk), user_id, CREATED)
+            if user_id is None:
+                outcome.status = NO_USER
+            elif user_id in holders:
+                outcome.status = ACTIVE_PASS_EXISTS
+            elif user_id in seen:
+                outcome.status = DUPLICATE_USER
+            else:
+                seen.add(user_id)
+                pending[user_id] = outcome
+            report.outcomes.append(outcome)
+
+        passes = TransportPass.objects.bulk_create(
+            [
+                TransportPass(
+                    user_id=user_id,
+                    route=route,
+                    start_stop=start_stop,
+                    end_stop=end_stop,
+                    pass_type=pass_type,
+                    valid_from=valid_from,
+                    valid_to=valid_to,
+                    price=price,
+                    is_active=is_active,
+                )
+                for user_id in pending
+            ],
+            batch_size=batch_size,
+        )
+        for issued in passes:
+            pending[issued.user_id].pass_id = issued.pk
+    return report
@@ -0,0 +1,95 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from departments.models import Department
+from students.models import AcademicYear, Student, StudentBatch
+from transportation.issuance import CREATED, issue_passes, student_cohort
+from transportation.models import Route, Stop, TransportPass
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_issue(cohort, fields):
+    """The per-student loop the bulk-assign endpoint used before issue_passes()."""
+    created = 0
+    with transaction.atomic():
+        for s in cohort.only("id", "user_id"):
+            if TransportPass.objects.filter(
+                user_id=s.user_id, route=fields["route"], is_active=True, valid_to__gte=timezone.now().date(),
+            ).exists():
+                continue
+            TransportPass.objects.create(user_id=s.user_id, pass_type="STUDENT", **fields)
+            created += 1
+    cohort.count()
+    return created
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk transport pass issuance (per-student loop vs set-based pipeline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000, help='Cohort size (rolled back)')
+        parser.add_argument('--holders', type=float, default=0.1, help='Share of the cohort already holding a pass')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['students'], options['holders'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _cohort(self, n):
+        department = Department.objects.create(
+            name='Bench Transport', short_name='BT', code='BT', email='bt@example.com', phone='+911234567890',
+            building='B', established_date=date(2000, 1, 1), description='benchmark',
+        )
+        year = AcademicYear.objects.create(year='2090-2091', start_date=date(2090, 6, 1), end_date=date(2091, 5, 31))
+        batch = StudentBatch.objects.create(
+            department=department, academic_year=year, year_of_study='1', section='A',
+            batch_name='BT-1-A', batch_code='BENCH-BT-1-A', is_active=True,
+        )
+        users = User.objects.bulk_create([
+            User(email=f'pass{i}@example.com', username=f'pass{i}') for i in range(n)
+        ])
+        Student.objects.bulk_create([
+            Student(
+                roll_number=f'BT{i:06d}', first_name='Bench', last_name=str(i), date_of_birth=date(2005, 1, 1),
+                gender='M', student_batch=batch, user=user, status='ACTIVE',
+            )
+            for i, user in enumerate(users)
+        ], batch_size=1000)
+        return batch, users
+
+    def _run(self, n, holders):
+        batch, users = self._cohort(n)
+        route = Route.objects.create(name='Bench route')
+        start, end = Stop.objects.create(name='Bench A'), Stop.objects.create(name='Bench B')
+        fields = {
+            'route': route, 'start_stop': start, 'end_stop': end, 'valid_from': timezone.localdate(),
+            'valid_to': timezone.localdate() + timedelta(days=180), 'price': 1500, 'is_active': True,
+        }
+        TransportPass.objects.bulk_create([
+            TransportPass(user=user, pass_type='STUDENT', **fields) for user in users[:int(n * holders)]
+        ])
+        baseline = set(TransportPass.objects.values_list('pk', flat=True))
+        cohort = student_cohort(batch.department_id, batch.academic_year_id, '1', 'A')
+
+        for label, issue in (
+            ('per-student loop', lambda: _legacy_issue(cohort, fields)),
+            ('set-based', lambda: issue_passes(cohort, 'student_id', pass_type='STUDENT', **fields).count(CREATED)),
+        ):
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+                t0 = time.perf_counter()
+                created = issue()
+                elapsed = time.perf_counter() - t0
+            self.stdout.write(f'{label:17s} {elapsed * 1000:9.1f} ms  {len(queries):6d} queries  {created} passes')
+            TransportPass.objects.exclude(pk__in=baseline).delete()
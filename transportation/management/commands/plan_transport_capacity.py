@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transportation.planning import apply_moves, plan_capacity
+
+
+class Command(BaseCommand):
+    help = 'Report per-trip stop loads against vehicle capacity and propose pass moves between parallel vehicles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Plan for this day (YYYY-MM-DD), default today')
+        parser.add_argument('--route', type=int, action='append', help='Route id (repeatable), default all active routes')
+        parser.add_argument('--apply', action='store_true', help='Write the proposed pass assignments')
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        plans = plan_capacity(day, options['route'])
+        for plan in plans:
+            self.stdout.write(f'{plan.route_name} ({plan.day}): {len(plan.trips)} trips, {len(plan.moves)} proposed moves')
+            for trip in plan.trips:
+                flag = self.style.ERROR('OVERLOADED') if trip.overloaded else 'ok'
+                self.stdout.write(
+                    f'  {trip.departure_time:%H:%M} {trip.vehicle}: peak {trip.peak_load}/{trip.capacity}'
+                    f' at {trip.peak_stop or "-"} -> planned {trip.planned_peak_load}  {flag}'
+                )
+            if plan.still_overloaded:
+                self.stdout.write(self.style.WARNING(f'  no spare seats for assignments {plan.still_overloaded}'))
+            if plan.unserved_pass_ids or plan.invalid_pass_ids:
+                self.stdout.write(self.style.WARNING(
+                    f'  {len(plan.unserved_pass_ids)} passes without a vehicle, '
+                    f'{len(plan.invalid_pass_ids)} with stops not on the route'
+                ))
+        if options['apply']:
+            self.stdout.write(self.style.SUCCESS(f'Updated {apply_moves(plans)} passes'))
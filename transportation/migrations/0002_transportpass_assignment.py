@@ -0,0 +1,17 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transportation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transportpass',
+            name='assignment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='passes', to='transportation.vehicleassignment'),
+        ),
+    ]
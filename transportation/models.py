@@ -133,6 +133,10 @@ class TransportPass(TimeStampedModel):
     route = models.ForeignKey(Route, on_delete=models.PROTECT, related_name="passes")
     start_stop = models.ForeignKey(Stop, on_delete=models.PROTECT, related_name="pass_start_stops")
     end_stop = models.ForeignKey(Stop, on_delete=models.PROTECT, related_name="pass_end_stops")
+    # Vehicle the holder rides when a route runs parallel assignments (set by the capacity planner)
+    assignment = models.ForeignKey(
+        VehicleAssignment, on_delete=models.SET_NULL, null=True, blank=True, related_name="passes"
+    )
     pass_type = models.CharField(max_length=16, choices=PASS_TYPES, default="STUDENT")
     valid_from = models.DateField(default=timezone.now)
     valid_to = models.DateField()
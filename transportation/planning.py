@@ -0,0 +1,310 @@
+"""Route capacity and stop-load planning.
+
+For a given day every active pass occupies a seat on the route segments
+between its start and end stop (by ``RouteStop.order_index``; a pass whose
+end stop comes first rides the return leg over the same segments). Loads
+are kept per vehicle assignment as a list of seats taken per segment, so a
+trip's on-board count at each stop, its peak and whether it exceeds the
+vehicle's capacity fall out of one prefix-sum pass.
+
+Passes are tied to a vehicle through ``TransportPass.assignment``. When a
+route runs parallel assignments the planner proposes moves: passes with no
+(or an inactive) assignment are placed first, longest ride first, on the
+vehicle with the most spare seats over their segments; then passes crossing
+an overloaded vehicle's peak are moved, shortest ride first, to vehicles
+that can take them without overloading. Nothing is written unless the plan
+is applied with ``apply_moves``.
+
+Everything for all routes is read with five queries.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Route, RouteStop, TransportPass, TripSchedule, VehicleAssignment
+
+
+@dataclass
+class StopLoad:
+    stop_id: int
+    name: str
+    order_index: int
+    boarding: int
+    alighting: int
+    on_board: int  # seats taken when leaving this stop
+
+    def as_dict(self) -> dict:
+        return {
+            "stop_id": self.stop_id, "name": self.name, "order_index": self.order_index,
+            "boarding": self.boarding, "alighting": self.alighting, "on_board": self.on_board,
+        }
+
+
+@dataclass
+class VehicleLoad:
+    assignment_id: int
+    vehicle: str
+    capacity: int
+    loads: List[int]
+    passes: Dict[int, Tuple[int, int]] = field(default_factory=dict)  # pass id -> (lo, hi) segment span
+
+    def add(self, pass_id: int, span: Tuple[int, int]) -> None:
+        self.passes[pass_id] = span
+        for i in range(*span):
+            self.loads[i] += 1
+
+    def remove(self, pass_id: int) -> Tuple[int, int]:
+        span = self.passes.pop(pass_id)
+        for i in range(*span):
+            self.loads[i] -= 1
+        return span
+
+    @property
+    def peak(self) -> int:
+        return max(self.loads, default=0)
+
+    def headroom(self, span: Tuple[int, int]) -> int:
+        lo, hi = span
+        return self.capacity - max(self.loads[lo:hi], default=0)
+
+    def copy(self) -> "VehicleLoad":
+        return VehicleLoad(self.assignment_id, self.vehicle, self.capacity, list(self.loads), dict(self.passes))
+
+
+@dataclass
+class TripLoad:
+    schedule_id: int
+    assignment_id: int
+    vehicle: str
+    day_of_week: int
+    departure_time: object
+    capacity: int
+    passengers: int
+    peak_load: int
+    peak_stop: Optional[str]
+    planned_peak_load: int
+    stops: List[StopLoad] = field(default_factory=list)
+
+    @property
+    def overloaded(self) -> bool:
+        return self.peak_load > self.capacity
+
+    def as_dict(self) -> dict:
+        return {
+            "schedule_id": self.schedule_id,
+            "assignment_id": self.assignment_id,
+            "vehicle": self.vehicle,
+            "day_of_week": self.day_of_week,
+            "departure_time": self.departure_time.isoformat() if self.departure_time else None,
+            "capacity": self.capacity,
+            "passengers": self.passengers,
+            "peak_load": self.peak_load,
+            "peak_stop": self.peak_stop,
+            "overloaded": self.overloaded,
+            "planned_peak_load": self.planned_peak_load,
+            "stops": [s.as_dict() for s in self.stops],
+        }
+
+
+@dataclass
+class Move:
+    pass_id: int
+    user_id: int
+    from_assignment_id: Optional[int]
+    to_assignment_id: int
+
+    def as_dict(self) -> dict:
+        return {
+            "pass_id": self.pass_id, "user_id": self.user_id,
+            "from_assignment_id": self.from_assignment_id, "to_assignment_id": self.to_assignment_id,
+        }
+
+
+@dataclass
+class RoutePlan:
+    route_id: int
+    route_name: str
+    day: date
+    trips: List[TripLoad] = field(default_factory=list)
+    moves: List[Move] = field(default_factory=list)
+    unserved_pass_ids: List[int] = field(default_factory=list)  # no active vehicle on the route
+    invalid_pass_ids: List[int] = field(default_factory=list)   # start/end stop not on the route
+    still_overloaded: List[int] = field(default_factory=list)   # assignment ids the moves cannot relieve
+
+    @property
+    def overloaded_trips(self) -> List[TripLoad]:
+        return [t for t in self.trips if t.overloaded]
+
+    def as_dict(self) -> dict:
+        return {
+            "route_id": self.route_id,
+            "route": self.route_name,
+            "day": self.day.isoformat(),
+            "overloaded_trips": len(self.overloaded_trips),
+            "trips": [t.as_dict() for t in self.trips],
+            "moves": [m.as_dict() for m in self.moves],
+            "unserved_pass_ids": self.unserved_pass_ids,
+            "invalid_pass_ids": self.invalid_pass_ids,
+            "still_overloaded": self.still_overloaded,
+        }
+
+
+def _place(vehicles: List[VehicleLoad], span: Tuple[int, int], exclude: Optional[int] = None) -> Optional[VehicleLoad]:
+    """The vehicle with the most spare seats over ``span``."""
+    candidates = [v for v in vehicles if v.assignment_id != exclude]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda v: (v.headroom(span), -v.assignment_id))
+
+
+def _rebalance(vehicles: List[VehicleLoad], unallocated: List[Tuple[int, Tuple[int, int]]]) -> List[Tuple[int, Optional[int], int]]:
+    """Greedy moves as (pass id, from assignment, to assignment); mutates ``vehicles``."""
+    moves = []
+    for pass_id, span in sorted(unallocated, key=lambda p: (p[1][0] - p[1][1], p[0])):
+        target = _place(vehicles, span)
+        target.add(pass_id, span)
+        moves.append((pass_id, None, target.assignment_id))
+
+    for vehicle in vehicles:
+        while vehicle.peak > vehicle.capacity:
+            peak_segment = vehicle.loads.index(vehicle.peak)
+            riders = sorted(
+                (span[1] - span[0], pass_id, span) for pass_id, span in vehicle.passes.items()
+                if span[0] <= peak_segment < span[1]
+            )
+            moved = False
+            for _, pass_id, span in riders:
+                target = _place(vehicles, span, exclude=vehicle.assignment_id)
+                if target is not None and target.headroom(span) > 0:
+                    vehicle.remove(pass_id)
+                    target.add(pass_id, span)
+                    moves.append((pass_id, vehicle.assignment_id, target.assignment_id))
+                    moved = True
+                    break
+            if not moved:
+                break
+
+    # A pass moved twice (placed, then moved again) collapses into one move
+    final: Dict[int, Tuple[int, Optional[int], int]] = {}
+    for pass_id, source, target in moves:
+        first_source = final[pass_id][1] if pass_id in final else source
+        final[pass_id] = (pass_id, first_source, target)
+    return [m for m in final.values() if m[1] != m[2]]
+
+
+def _stop_profile(stops: List[Tuple[int, str, int]], vehicle: VehicleLoad) -> Tuple[List[StopLoad], Optional[str]]:
+    boarding: Dict[int, int] = defaultdict(int)
+    alighting: Dict[int, int] = defaultdict(int)
+    for lo, hi in vehicle.passes.values():
+        boarding[lo] += 1
+        alighting[hi] += 1
+    profile = [
+        StopLoad(stop_id, name, order_index, boarding[i], alighting[i], vehicle.loads[i] if i < len(vehicle.loads) else 0)
+        for i, (stop_id, name, order_index) in enumerate(stops)
+    ]
+    peak_stop = stops[vehicle.loads.index(vehicle.peak)][1] if vehicle.loads and vehicle.peak else None
+    return profile, peak_stop
+
+
+def plan_capacity(day: Optional[date] = None, route_ids: Optional[Iterable[int]] = None) -> List[RoutePlan]:
+    """Per-trip stop loads and rebalancing proposals for ``day`` (default today)."""
+    day = day or timezone.localdate()
+    routes = Route.objects.filter(is_active=True)
+    if route_ids is not None:
+        routes = routes.filter(pk__in=list(route_ids))
+    route_names = dict(routes.values_list("pk", "name"))
+
+    stops: Dict[int, List[Tuple[int, str, int]]] = defaultdict(list)
+    for route_id, stop_id, name, order_index in (
+        RouteStop.objects.filter(route_id__in=list(route_names))
+        .order_by("route_id", "order_index", "pk")
+        .values_list("route_id", "stop_id", "stop__name", "order_index")
+    ):
+        stops[route_id].append((stop_id, name, order_index))
+
+    running = Q(is_active=True, start_date__lte=day) & (Q(end_date__isnull=True) | Q(end_date__gte=day))
+    assignments = (
+        VehicleAssignment.objects.filter(running, route_id__in=list(route_names), vehicle__is_active=True)
+        .select_related("vehicle").order_by("pk")
+    )
+    vehicles: Dict[int, List[VehicleLoad]] = defaultdict(list)
+    by_assignment: Dict[int, VehicleLoad] = {}
+    for a in assignments:
+        load = VehicleLoad(a.pk, str(a.vehicle), a.vehicle.capacity, [0] * max(len(stops[a.route_id]) - 1, 0))
+        vehicles[a.route_id].append(load)
+        by_assignment[a.pk] = load
+
+    schedules = (
+        TripSchedule.objects.filter(assignment_id__in=list(by_assignment), day_of_week=day.weekday(), effective_from__lte=day)
+        .filter(Q(effective_to__isnull=True) | Q(effective_to__gte=day))
+        .order_by("departure_time", "pk")
+        .values_list("pk", "assignment_id", "assignment__route_id", "departure_time")
+    )
+
+    passes = TransportPass.objects.filter(
+        route_id__in=list(route_names), is_active=True, valid_from__lte=day, valid_to__gte=day,
+    ).order_by("pk").values_list("pk", "user_id", "route_id", "assignment_id", "start_stop_id", "end_stop_id")
+
+    plans = {rid: RoutePlan(rid, name, day) for rid, name in route_names.items()}
+    users: Dict[int, int] = {}
+    unallocated: Dict[int, List[Tuple[int, Tuple[int, int]]]] = defaultdict(list)
+    positions = {rid: {stop_id: i for i, (stop_id, _, _) in enumerate(route_stops)} for rid, route_stops in stops.items()}
+    for pass_id, user_id, route_id, assignment_id, start_id, end_id in passes:
+        users[pass_id] = user_id
+        plan = plans[route_id]
+        index = positions.get(route_id, {})
+        if start_id not in index or end_id not in index or start_id == end_id:
+            plan.invalid_pass_ids.append(pass_id)
+            continue
+        span = tuple(sorted((index[start_id], index[end_id])))
+        route_vehicles = vehicles.get(route_id, [])
+        vehicle = by_assignment.get(assignment_id)
+        if vehicle is None and len(route_vehicles) == 1:
+            vehicle = route_vehicles[0]  # the only bus on the route carries everyone
+        if vehicle is not None and any(v is vehicle for v in route_vehicles):
+            vehicle.add(pass_id, span)
+        elif route_vehicles:
+            unallocated[route_id].append((pass_id, span))
+        else:
+            plan.unserved_pass_ids.append(pass_id)
+
+    planned: Dict[int, VehicleLoad] = {}
+    for route_id, plan in plans.items():
+        route_vehicles = vehicles.get(route_id, [])
+        proposal = [v.copy() for v in route_vehicles]
+        for pass_id, source, target in _rebalance(proposal, unallocated.get(route_id, [])):
+            plan.moves.append(Move(pass_id, users[pass_id], source, target))
+        for v in proposal:
+            planned[v.assignment_id] = v
+            if v.peak > v.capacity:
+                plan.still_overloaded.append(v.assignment_id)
+
+    for schedule_id, assignment_id, route_id, departure_time in schedules:
+        vehicle = by_assignment[assignment_id]
+        profile, peak_stop = _stop_profile(stops[route_id], vehicle)
+        plans[route_id].trips.append(TripLoad(
+            schedule_id, assignment_id, vehicle.vehicle, day.weekday(), departure_time, vehicle.capacity,
+            len(vehicle.passes), vehicle.peak, peak_stop, planned[assignment_id].peak, profile,
+        ))
+    return [plans[rid] for rid in sorted(plans, key=lambda rid: route_names[rid])]
+
+
+def apply_moves(plans: Iterable[RoutePlan]) -> int:
+    """Write the proposed assignments; one UPDATE per target assignment."""
+    targets: Dict[int, List[int]] = defaultdict(list)
+    for plan in plans:
+        for move in plan.moves:
+            targets[move.to_assignment_id].append(move.pass_id)
+    updated = 0
+    with transaction.atomic():
+        for assignment_id, pass_ids in targets.items():
+            updated += TransportPass.objects.filter(pk__in=pass_ids).update(assignment_id=assignment_id)
+    return updated
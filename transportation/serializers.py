@@ -69,7 +69,7 @@ class BulkStudentPassAssignSerializer(serializers.Serializer):
     route = serializers.PrimaryKeyRelatedField(queryset=Route.objects.all())
     start_stop = serializers.PrimaryKeyRelatedField(queryset=Stop.objects.all())
     end_stop = serializers.PrimaryKeyRelatedField(queryset=Stop.objects.all())
-    valid_from = serializers.DateField(default=timezone.now)
+    valid_from = serializers.DateField(default=timezone.localdate)
     valid_to = serializers.DateField()
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
     is_active = serializers.BooleanField(default=True)
@@ -109,7 +109,7 @@ class BulkFacultyPassAssignSerializer(serializers.Serializer):
     route = serializers.PrimaryKeyRelatedField(queryset=Route.objects.all())
     start_stop = serializers.PrimaryKeyRelatedField(queryset=Stop.objects.all())
     end_stop = serializers.PrimaryKeyRelatedField(queryset=Stop.objects.all())
-    valid_from = serializers.DateField(default=timezone.now)
+    valid_from = serializers.DateField(default=timezone.localdate)
     valid_to = serializers.DateField()
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
     is_active = serializers.BooleanField(default=True)
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from students.models import Student
+from transportation.issuance import ACTIVE_PASS_EXISTS, CREATED, NO_USER, issue_passes, student_cohort
+from transportation.models import TransportPass
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cohort():
+    department = baker.make('departments.Department', phone='+911234567890')
+    program = baker.make('academics.AcademicProgram', department=department)
+    batch = baker.make('students.StudentBatch', department=department, academic_program=program,
+                       year_of_study='2', section='A', is_active=True)
+    other = baker.make('students.StudentBatch', department=department, academic_program=program,
+                       academic_year=batch.academic_year, year_of_study='2', section='B', is_active=True)
+    students = [baker.make('students.Student', student_batch=batch, status='ACTIVE', user=baker.make('accounts.User'))
+                for _ in range(4)]
+    unlinked = baker.make('students.Student', student_batch=batch, status='ACTIVE')
+    Student.objects.filter(pk=unlinked.pk).update(user=None)  # save() links a user automatically
+    baker.make('students.Student', student_batch=batch, status='GRADUATED', user=baker.make('accounts.User'))
+    baker.make('students.Student', student_batch=other, status='ACTIVE', user=baker.make('accounts.User'))
+    return batch, students, unlinked
+
+
+@pytest.fixture
+def route():
+    return baker.make('transportation.Route'), baker.make('transportation.Stop'), baker.make('transportation.Stop')
+
+
+def _fields(route):
+    route, start, end = route
+    return {'route': route, 'start_stop': start, 'end_stop': end, 'valid_to': timezone.localdate() + timedelta(days=180), 'price': '1500.00'}
+
+
+def test_issue_passes_reports_every_member_in_constant_queries(cohort, route, django_assert_max_num_queries):
+    batch, students, unlinked = cohort
+    holder = students[0]
+    baker.make(TransportPass, user=holder.user, route=route[0], is_active=True,
+               valid_to=timezone.localdate() + timedelta(days=10), price=1)
+    members = student_cohort(batch.department_id, batch.academic_year_id, '2', 'A')
+
+    # savepoint, route lock, cohort, existing passes, insert, release
+    with django_assert_max_num_queries(6):
+        report = issue_passes(members, 'student_id', pass_type='STUDENT', **_fields(route))
+
+    statuses = {o.subject_id: o.status for o in report.outcomes}
+    assert statuses == {
+        **{str(s.pk): CREATED for s in students[1:]},
+        str(holder.pk): ACTIVE_PASS_EXISTS,
+        str(unlinked.pk): NO_USER,
+    }
+    assert TransportPass.objects.filter(route=route[0], pass_type='STUDENT').count() == 4
+    created = {o.user_id: o.pass_id for o in report.outcomes if o.status == CREATED}
+    assert created == dict(TransportPass.objects.filter(user_id__in=created).values_list('user_id', 'id'))
+
+    summary = report.as_dict()
+    assert (summary['created'], summary['skipped'], summary['total_targeted']) == (3, 2, 5)
+    assert summary['errors'] == [{'student_id': str(unlinked.pk), 'reason': 'No linked auth user'}]
+
+    again = issue_passes(members, 'student_id', pass_type='STUDENT', **_fields(route))
+    assert again.count(CREATED) == 0 and again.count(ACTIVE_PASS_EXISTS) == 4
+
+
+def test_bulk_assign_endpoints(cohort, route):
+    batch, students, _ = cohort
+    staff = baker.make('accounts.User', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(staff)
+    payload = {**_fields(route), 'route': route[0].pk, 'start_stop': route[1].pk, 'end_stop': route[2].pk}
+
+    res = client.post(reverse('transportation:transportpass-bulk-assign-students'), {
+        **payload, 'department_id': str(batch.department_id), 'academic_year_id': batch.academic_year_id,
+        'year_of_study': '2', 'section': 'A',
+    }, format='json')
+    assert res.status_code == 200, res.data
+    assert res.data['created'] == 4 and len(res.data['results']) == 5
+
+    def make_faculty(n, **fields):
+        return baker.make('faculty.Faculty', status='ACTIVE', currently_associated=True, email=f'f{n}@example.com',
+                          employee_id=f'E{n}', apaar_faculty_id=f'A{n}', user=baker.make('accounts.User'), **fields)
+
+    faculty = make_faculty(1, department_ref=batch.department)
+    make_faculty(2)
+    res = client.post(reverse('transportation:transportpass-bulk-assign-faculty'), {
+        **payload, 'department_id': str(batch.department_id),
+    }, format='json')
+    assert res.status_code == 200, res.data
+    assert res.data['results'] == [
+        {'faculty_id': str(faculty.pk), 'user_id': faculty.user_id, 'status': CREATED,
+         'pass_id': TransportPass.objects.get(user=faculty.user).pk},
+    ]
+
+
+def test_admin_assign_view_uses_bulk_issue(cohort, route, client, django_user_model):
+    _, students, _ = cohort
+    admin_user = django_user_model.objects.create_superuser(email='adm@example.com', username='adm', password='p')
+    client.force_login(admin_user)
+    fields = _fields(route)
+    res = client.post(reverse('admin:transport_pass_assign_students'), {
+        'route': route[0].pk, 'start_stop': route[1].pk, 'end_stop': route[2].pk, 'valid_from': timezone.localdate(),
+        'valid_to': fields['valid_to'], 'price': fields['price'], 'is_active': 'on', 'skip_if_active_pass_exists': 'on',
+        'selected_ids': [str(s.pk) for s in students[:2]],
+    })
+    assert res.status_code == 302
+    assert set(TransportPass.objects.values_list('user_id', flat=True)) == {s.user_id for s in students[:2]}
@@ -0,0 +1,90 @@
+from datetime import date, time, timedelta
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from transportation.models import RouteStop, TransportPass, TripSchedule, VehicleAssignment
+from transportation.planning import apply_moves, plan_capacity
+
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2030, 1, 7)  # a Monday
+
+
+@pytest.fixture
+def route():
+    route = baker.make('transportation.Route', name='North', is_active=True)
+    stops = [baker.make('transportation.Stop', name=name) for name in ('Depot', 'Market', 'Station', 'Campus')]
+    for i, stop in enumerate(stops):
+        RouteStop.objects.create(route=route, stop=stop, order_index=i)
+    return route, stops
+
+
+def _bus(route, capacity, departure=time(7, 30)):
+    vehicle = baker.make('transportation.Vehicle', capacity=capacity, is_active=True)
+    assignment = VehicleAssignment.objects.create(vehicle=vehicle, route=route, start_date=DAY - timedelta(days=30))
+    TripSchedule.objects.create(assignment=assignment, day_of_week=DAY.weekday(), departure_time=departure,
+                                effective_from=DAY - timedelta(days=30))
+    return assignment
+
+
+def _passes(route, start, end, n, assignment=None):
+    return [
+        baker.make(TransportPass, route=route, start_stop=start, end_stop=end, assignment=assignment, is_active=True,
+                   valid_from=DAY - timedelta(days=1), valid_to=DAY + timedelta(days=90), price=1)
+        for _ in range(n)
+    ]
+
+
+def test_single_bus_stop_loads_and_overload(route, django_assert_num_queries):
+    route, (depot, market, station, campus) = route
+    _bus(route, capacity=3)
+    _passes(route, depot, campus, 2)
+    _passes(route, market, station, 2)
+    _passes(route, campus, station, 1)  # return leg over station-campus
+
+    with django_assert_num_queries(5):
+        [plan] = plan_capacity(DAY)
+    [trip] = plan.trips
+    assert [(s.boarding, s.alighting, s.on_board) for s in trip.stops] == [(2, 0, 2), (2, 0, 4), (1, 2, 3), (0, 3, 0)]
+    assert (trip.peak_load, trip.peak_stop, trip.overloaded) == (4, 'Market', True)
+    assert plan.moves == [] and plan.still_overloaded == [trip.assignment_id]
+
+
+def test_parallel_buses_are_rebalanced_and_applied(route):
+    route, (depot, market, station, campus) = route
+    full = _bus(route, capacity=4)
+    spare = _bus(route, capacity=4, departure=time(7, 45))
+    crowded = _passes(route, depot, campus, 5, assignment=full)
+    new = _passes(route, market, campus, 2)
+    bad = _passes(route, depot, baker.make('transportation.Stop'), 1)
+
+    [plan] = plan_capacity(DAY)
+    trips = {t.assignment_id: t for t in plan.trips}
+    assert trips[full.pk].overloaded and trips[full.pk].peak_load == 5
+    assert trips[full.pk].planned_peak_load <= 4 and trips[spare.pk].planned_peak_load <= 4
+    moved = {m.pass_id: (m.from_assignment_id, m.to_assignment_id) for m in plan.moves}
+    assert {pid for pid, (src, _) in moved.items() if src is None} == {p.pk for p in new}
+    assert sum(1 for src, _ in moved.values() if src == full.pk) == 1
+    assert plan.invalid_pass_ids == [bad[0].pk]
+
+    assert apply_moves([plan]) == len(plan.moves)
+    [after] = plan_capacity(DAY)
+    assert not after.overloaded_trips and after.moves == []
+    assert TransportPass.objects.filter(pk__in=[p.pk for p in crowded], assignment=spare).count() == 1
+
+
+def test_capacity_plan_endpoint(route):
+    route, (depot, _, _, campus) = route
+    _bus(route, capacity=1)
+    _passes(route, depot, campus, 2)
+    client = APIClient()
+    client.force_authenticate(baker.make('accounts.User', is_staff=True))
+    res = client.get(reverse('transportation:route-capacity-plan'), {'date': DAY.isoformat()})
+    assert res.status_code == 200
+    assert res.data['overloaded_trips'] == 1
+    assert res.data['routes'][0]['trips'][0]['stops'][0]['on_board'] == 2
+    assert client.get(reverse('transportation:route-capacity-plan'), {'date': 'soon'}).status_code == 400
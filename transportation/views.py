@@ -1,8 +1,8 @@
-from rest_framework import viewsets, permissions, filters
+from datetime import date
+
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import transaction
-from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Vehicle, Driver, Route, Stop, RouteStop, VehicleAssignment, TripSchedule, TransportPass
 from .serializers import (
@@ -18,9 +18,8 @@ from .serializers import (
     BulkFacultyPassAssignSerializer,
 )
 from .permissions import IsStaffOrReadOnly
-from students.models import Student
-from students.models import StudentBatch
-from faculty.models import Faculty
+from .issuance import faculty_cohort, issue_passes, student_cohort
+from .planning import apply_moves, plan_capacity
 
 
 class DefaultPermission(IsStaffOrReadOnly):
@@ -62,6 +61,24 @@ class RouteViewSet(viewsets.ModelViewSet):
     search_fields = ["name", "description"]
     ordering_fields = ["name", "created_at"]
 
+    @action(detail=False, methods=["get", "post"], url_path="capacity-plan")
+    def capacity_plan(self, request):
+        """Stop loads per trip, overloaded trips and proposed pass moves; POST applies the moves."""
+        params = request.data if request.method == "POST" else request.query_params
+        try:
+            day = date.fromisoformat(params["date"]) if params.get("date") else None
+            route_ids = [int(r) for r in str(params.get("route", "")).split(",") if r.strip()] or None
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        plans = plan_capacity(day, route_ids)
+        applied = apply_moves(plans) if request.method == "POST" else 0
+        return Response({
+            "routes": [p.as_dict() for p in plans],
+            "overloaded_trips": sum(len(p.overloaded_trips) for p in plans),
+            "moves": sum(len(p.moves) for p in plans),
+            "applied": applied,
+        })
+
 
 class RouteStopViewSet(viewsets.ModelViewSet):
     queryset = RouteStop.objects.select_related("route", "stop").all()
@@ -105,60 +122,11 @@ class TransportPassViewSet(viewsets.ModelViewSet):
         data = serializer.validated_data
 
         # Resolve target cohort (students) via StudentBatch fields
-        batches = StudentBatch.objects.filter(
-            department_id=data["department_id"],
-            academic_year_id=data["academic_year_id"],
-            year_of_study=data["year_of_study"],
-            section=data["section"],
-            is_active=True,
-        ).values_list("id", flat=True)
-
-        students = Student.objects.select_related("user").filter(
-            student_batch_id__in=list(batches),
-            status="ACTIVE",
-        ).only("id", "user_id")
-
-        created = 0
-        skipped = 0
-        errors = []
-
-        with transaction.atomic():
-            for s in students:
-                if not s.user_id:
-                    skipped += 1
-                    errors.append({"student_id": str(s.id), "reason": "No linked auth user"})
-                    continue
-                if data["skip_if_active_pass_exists"]:
-                    exists = TransportPass.objects.filter(
-                        user_id=s.user_id,
-                        route=data["route"],
-                        is_active=True,
-                        valid_to__gte=timezone.now().date(),
-                    ).exists()
-                    if exists:
-                        skipped += 1
-                        continue
-
-                TransportPass.objects.create(
-                    user_id=s.user_id,
-                    route=data["route"],
-                    start_stop=data["start_stop"],
-                    end_stop=data["end_stop"],
-                    pass_type="STUDENT",
-                    valid_from=data["valid_from"],
-                    valid_to=data["valid_to"],
-                    price=data["price"],
-                    is_active=data["is_active"],
-                )
-                created += 1
-
-        return Response({
-            "ok": True,
-            "created": created,
-            "skipped": skipped,
-            "errors": errors,
-            "total_targeted": students.count(),
-        })
+        cohort = student_cohort(
+            data["department_id"], data["academic_year_id"], data["year_of_study"], data["section"]
+        )
+        report = issue_passes(cohort, "student_id", pass_type="STUDENT", **_pass_fields(data))
+        return Response(report.as_dict())
 
     @action(detail=False, methods=["post"], url_path="bulk-assign-faculty")
     def bulk_assign_faculty(self, request):
@@ -166,64 +134,10 @@ class TransportPassViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        faculty_qs = Faculty.objects.select_related("user").filter(
-            status="ACTIVE",
-            currently_associated=True,
-        )
-        # department may be either legacy char or FK; use FK when present
-        faculty_qs = faculty_qs.filter(department_ref_id=data["department_id"]) | faculty_qs.filter(
-            department_ref_id__isnull=True
-        )  # Will refine below
-        # Refine: include those with department_ref match OR fallback where department_ref is null and legacy matches department by code
-        # To avoid complex union logic here, fetch all and post-filter in python according to department_ref
-
-        faculty = list(Faculty.objects.select_related("user").filter(
-            status="ACTIVE",
-            currently_associated=True,
-        ))
-
-        created = 0
-        skipped = 0
-        errors = []
-
-        with transaction.atomic():
-            for f in faculty:
-                # Filter to requested department
-                if str(getattr(f.department_ref_id, "__str__", lambda: None)()) != str(data["department_id"]) and getattr(f, "department_ref_id", None) != data["department_id"]:
-                    continue
-
-                if not f.user_id:
-                    skipped += 1
-                    errors.append({"faculty_id": str(f.id), "reason": "No linked auth user"})
-                    continue
-                if data["skip_if_active_pass_exists"]:
-                    exists = TransportPass.objects.filter(
-                        user_id=f.user_id,
-                        route=data["route"],
-                        is_active=True,
-                        valid_to__gte=timezone.now().date(),
-                    ).exists()
-                    if exists:
-                        skipped += 1
-                        continue
-
-                TransportPass.objects.create(
-                    user_id=f.user_id,
-                    route=data["route"],
-                    start_stop=data["start_stop"],
-                    end_stop=data["end_stop"],
-                    pass_type="STAFF",
-                    valid_from=data["valid_from"],
-                    valid_to=data["valid_to"],
-                    price=data["price"],
-                    is_active=data["is_active"],
-                )
-                created += 1
+        report = issue_passes(faculty_cohort(data["department_id"]), "faculty_id", pass_type="STAFF", **_pass_fields(data))
+        return Response(report.as_dict())
 
-        return Response({
-            "ok": True,
-            "created": created,
-            "skipped": skipped,
-            "errors": errors,
-        })
 
+def _pass_fields(data):
+    fields = ("route", "start_stop", "end_stop", "valid_from", "valid_to", "price", "is_active", "skip_if_active_pass_exists")
+    return {name: data[name] for name in fields}